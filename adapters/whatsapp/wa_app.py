@@ -5,6 +5,11 @@ import json
 import logging
 import os
 import socket
+import time
+import zlib
+from collections import deque
+from datetime import timedelta
+from dataclasses import dataclass, field
 from typing import Any
 
 from fastapi import Request
@@ -16,23 +21,17 @@ from adapters.whatsapp.wa_runtime import process_payload, verify_webhook_signatu
 from config.env import load_app_env
 from core.observability import log_system_event_sync
 from core.reports.reports_daily import (
-    build_daily_report_summary,
-    build_daily_report_text,
-    build_due_bill_reminders,
-    build_weekly_report_summary,
-    build_monthly_report_summary,
+    build_report_summaries,
+    closed_month_period,
+    closed_week_period,
 )
 from db import (
-    claim_daily_report_send,
-    claim_weekly_report_send,
-    claim_monthly_report_send,
-    get_daily_report_prefs,
+    claim_report_sends,
+    list_due_report_users,
     list_identities_by_user,
-    list_users_with_daily_report_enabled,
-    list_users_with_weekly_report_enabled,
-    list_users_with_monthly_report_enabled,
-    mark_card_reminder_sent,
+    list_whatsapp_identities,
 )
+from adapters.whatsapp.wa_broadcast import broadcast
 from utils_phone import phone_lookup_candidates
 from utils_date import now_tz
 
@@ -46,7 +45,6 @@ if (os.getenv("APP_ENV") or "").strip().lower() == "prod" and not APP_SECRET:
     raise RuntimeError(
         "WA_APP_SECRET is required when APP_ENV=prod: webhook signature verification must not be bypassed."
     )
-_queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=500)
 WA_DAILY_REPORT_DISABLE_ID = "daily_report_disable"
 WA_WEEKLY_REPORT_DISABLE_ID = "weekly_report_disable"
 WA_MONTHLY_REPORT_DISABLE_ID = "monthly_report_disable"
@@ -56,6 +54,113 @@ def _env_flag(name: str) -> bool:
     return (os.getenv(name) or "").strip().lower() in {"1", "true", "yes", "on"}
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int((os.getenv(name) or "").strip() or default))
+    except ValueError:
+        return default
+
+
+# ── Fila de entrada: pool de workers particionado por wa_id ───────────────────
+#
+# Antes era UMA fila e UM worker: um áudio sendo transcrito, um OFX grande ou
+# uma chamada de 30s à OpenAI seguravam a mensagem de todos os outros usuários,
+# e num pico a fila enchia e o webhook descartava payload.
+#
+# Agora são WA_WORKERS partições, cada uma com a própria fila e o próprio
+# worker. O payload cai na partição do wa_id do remetente (crc32, estável entre
+# reinícios), então as mensagens de um mesmo usuário continuam em ordem — a
+# confirmação "sim" nunca passa na frente do lançamento que ela confirma —
+# enquanto usuários diferentes andam em paralelo.
+#
+# WA_QUEUE_MAXSIZE é o teto TOTAL, dividido igualmente entre as partições: um
+# usuário que dispara uma rajada lota só a partição dele.
+
+WA_WORKERS = _env_int("WA_WORKERS", 4)
+WA_QUEUE_MAXSIZE = _env_int("WA_QUEUE_MAXSIZE", 500)
+
+
+@dataclass
+class _Shard:
+    index: int
+    queue: asyncio.Queue
+    # instante (monotonic) de entrada de cada payload ainda na fila, em ordem —
+    # a cabeça é o mais antigo, de onde sai o atraso atual da partição.
+    pending: deque = field(default_factory=deque)
+    enqueued: int = 0
+    processed: int = 0
+    errors: int = 0
+    dropped: int = 0
+    last_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+
+
+def _build_shards(workers: int, total_maxsize: int) -> list[_Shard]:
+    per_shard = max(1, total_maxsize // workers)
+    return [_Shard(index=i, queue=asyncio.Queue(maxsize=per_shard)) for i in range(workers)]
+
+
+_shards: list[_Shard] = _build_shards(WA_WORKERS, WA_QUEUE_MAXSIZE)
+
+
+def _payload_wa_id(payload: dict) -> str:
+    """wa_id do remetente do payload ("" para payloads só de status)."""
+    try:
+        value = payload["entry"][0]["changes"][0]["value"]
+    except Exception:
+        return ""
+    for message in value.get("messages") or []:
+        wa_id = (message.get("from") or "").strip()
+        if wa_id:
+            return wa_id
+    return ""
+
+
+def _shard_for(payload: dict) -> _Shard:
+    key = _payload_wa_id(payload)
+    return _shards[zlib.crc32(key.encode("utf-8")) % len(_shards)]
+
+
+def _enqueue(shard: _Shard, payload: dict) -> bool:
+    """Enfileira sem bloquear. False (e conta o drop) se a partição lotou."""
+    try:
+        shard.queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        shard.dropped += 1
+        return False
+    shard.pending.append(time.monotonic())
+    shard.enqueued += 1
+    return True
+
+
+def wa_queue_stats() -> dict[str, Any]:
+    """Profundidade, atraso por partição e contadores de drop da fila de entrada."""
+    now = time.monotonic()
+    shards = []
+    for shard in _shards:
+        oldest = shard.pending[0] if shard.pending else None
+        shards.append({
+            "index": shard.index,
+            "depth": shard.queue.qsize(),
+            "maxsize": shard.queue.maxsize,
+            "lag_ms": round((now - oldest) * 1000, 1) if oldest is not None else 0.0,
+            "last_lag_ms": round(shard.last_lag_ms, 1),
+            "max_lag_ms": round(shard.max_lag_ms, 1),
+            "enqueued": shard.enqueued,
+            "processed": shard.processed,
+            "errors": shard.errors,
+            "dropped": shard.dropped,
+        })
+    return {
+        "workers": len(_shards),
+        "depth": sum(s["depth"] for s in shards),
+        "maxsize": sum(s["maxsize"] for s in shards),
+        "dropped": sum(s["dropped"] for s in shards),
+        "max_lag_ms": max((s["lag_ms"] for s in shards), default=0.0),
+        "shards": shards,
+    }
+
+
 def _serialize_simulated_message(message: InboundMessage) -> dict[str, Any]:
     return {
         "wa_id": message.wa_id,
@@ -127,11 +232,7 @@ def _proactive_template_stop_button_enabled() -> bool:
     return os.getenv("WA_PROACTIVE_TEMPLATE_STOP_BUTTON", "0").strip() == "1"
 
 
-def _proactive_template_named_body_params(user_id: int) -> dict[str, str] | None:
-    if not _proactive_template_includes_report():
-        return None
-
-    summary = build_daily_report_summary(user_id)
+def _proactive_template_named_body_params(summary: dict[str, str]) -> dict[str, str]:
     return {
         "saldo": summary["saldo"],
         "gastos": summary["gastos"],
@@ -290,16 +391,19 @@ async def wa_webhook(request: Request):
                 )
     except Exception:
         logger.info("WA webhook received: unable to summarize payload")
-    try:
-        _queue.put_nowait(payload)
-    except asyncio.QueueFull:
-        logger.warning("WA queue full, dropping payload")
+    shard = _shard_for(payload)
+    if not _enqueue(shard, payload):
+        logger.warning("WA queue full (shard=%s), dropping payload", shard.index)
         log_system_event_sync(
             "error",
             "whatsapp_queue_drop",
             "Fila interna do WhatsApp lotou e o payload foi descartado.",
             source="wa_app",
-            details={"queue_maxsize": _queue.maxsize},
+            details={
+                "shard": shard.index,
+                "queue_maxsize": shard.queue.maxsize,
+                "shard_dropped": shard.dropped,
+            },
         )
         return JSONResponse({"ok": True, "dropped": True})
 
@@ -321,129 +425,197 @@ async def wa_simulate(payload: dict):
     return {"ok": True, "simulation_only": False, "processed_messages": count}
 
 
-async def _worker_loop():
+async def _shard_worker(shard: _Shard):
     while True:
-        payload = await _queue.get()
+        payload = await shard.queue.get()
+        if shard.pending:
+            lag_ms = (time.monotonic() - shard.pending.popleft()) * 1000
+            shard.last_lag_ms = lag_ms
+            shard.max_lag_ms = max(shard.max_lag_ms, lag_ms)
         try:
             await asyncio.to_thread(process_payload, payload)
+            shard.processed += 1
         except Exception as exc:
-            logger.exception("WA worker error: %s", exc)
+            shard.errors += 1
+            logger.exception("WA worker error (shard=%s): %s", shard.index, exc)
             log_system_event_sync(
                 "error",
                 "whatsapp_worker_error",
                 f"Erro no worker do WhatsApp: {exc}",
                 source="wa_app",
+                details={"shard": shard.index},
             )
         finally:
-            _queue.task_done()
+            shard.queue.task_done()
 
 
-def _daily_report_tick() -> None:
-    now = now_tz()
-    today = now.date()
-    instance = _runtime_instance_details()
+async def _worker_loop():
+    logger.info("WA worker pool started workers=%s queue_maxsize=%s", len(_shards), WA_QUEUE_MAXSIZE)
+    await asyncio.gather(*(_shard_worker(shard) for shard in _shards))
 
-    for uid in list_users_with_daily_report_enabled():
-        prefs = get_daily_report_prefs(uid)
-        if not prefs["enabled"]:
-            continue
 
-        hour = prefs["hour"]
-        minute = prefs["minute"]
-        if (now.hour, now.minute) < (hour, minute):
-            continue
-        ids = list_identities_by_user(uid)
-        wa_targets = _dedupe_whatsapp_targets(ids)
-        proactive_template = _proactive_template_config()
+# ── Resumos agendados (diário / semanal / mensal) em lote ─────────────────────
+#
+# O tick faz polling a cada 30s. Cada passo é uma query pro lote inteiro
+# (db/report_batch.py): quem está devido → claim → números de WhatsApp →
+# saldo e totais do período agrupados por usuário. Os templates saem pelo
+# `broadcast` (wa_broadcast.py): WA_REPORT_SEND_CONCURRENCY envios em voo,
+# no máximo WA_REPORT_SEND_RATE por segundo (limite de vazão do número na
+# Meta). Os usuários vão em lotes de WA_REPORT_BATCH_SIZE: o claim de um lote
+# só acontece quando o anterior já foi enviado, então uma queda no meio do
+# tick perde no máximo um lote.
+
+WA_REPORT_BATCH_SIZE = _env_int("WA_REPORT_BATCH_SIZE", 500)
+WA_REPORT_SEND_CONCURRENCY = _env_int("WA_REPORT_SEND_CONCURRENCY", 16)
+WA_REPORT_SEND_RATE = _env_int("WA_REPORT_SEND_RATE", 80)
+
+_REPORT_LABELS = {"daily": "diario", "weekly": "semanal", "monthly": "mensal"}
+
+
+@dataclass
+class _ReportSend:
+    user_id: int
+    to: str
+    named_body_params: dict[str, str] | None
+
+
+def _chunks(items: list[int], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _send_report_batch(
+    kind: str,
+    cfg: dict[str, str],
+    quick_reply_buttons: list[dict] | None,
+    sends: list[_ReportSend],
+    instance: dict,
+) -> tuple[int, int]:
+    """Envia o lote pelo broadcast e loga cada resultado. Devolve (enviados, falhas)."""
+    label = _REPORT_LABELS[kind]
+
+    def _send(item: _ReportSend) -> None:
+        send_template(
+            item.to,
+            cfg["name"],
+            language_code=cfg["language_code"],
+            named_body_params=item.named_body_params,
+            quick_reply_buttons=quick_reply_buttons,
+        )
 
-        if wa_targets and not proactive_template:
-            logger.warning("WA daily report skipped uid=%s: WA_PROACTIVE_TEMPLATE_NAME nao configurado", uid)
-            log_system_event_sync(
-                "warning",
-                "whatsapp_proactive_template_missing",
-                "Relatorio diario via WhatsApp ignorado: WA_PROACTIVE_TEMPLATE_NAME nao configurado.",
-                source="wa_app",
-                user_id=uid,
-                details={"targets": len(wa_targets)},
+    sent = failed = 0
+    for result in broadcast(sends, _send, concurrency=WA_REPORT_SEND_CONCURRENCY, rate=WA_REPORT_SEND_RATE):
+        item = result.job
+        if result.ok:
+            sent += 1
+            logger.info(
+                "WA %s report template sent uid=%s to=%s ms=%.0f pid=%s hostname=%s",
+                kind, item.user_id, item.to, result.elapsed_ms, instance["pid"], instance["hostname"],
             )
             continue
+        failed += 1
+        logger.warning("WA %s report send error uid=%s to=%s error=%s", kind, item.user_id, item.to, result.error)
+        log_system_event_sync(
+            "warning",
+            f"whatsapp_{kind}_report_send_failed",
+            f"Falha ao enviar relatorio {label} via WhatsApp: {result.error}",
+            source="wa_app",
+            user_id=item.user_id,
+            details={"to": item.to},
+        )
+    return sent, failed
+
+
+def _run_report_batches(
+    kind: str,
+    cfg: dict[str, str],
+    due: list[int],
+    period_date,
+    build_params,
+    quick_reply_buttons: list[dict] | None,
+) -> None:
+    """Claim → identidades → params → envio, lote a lote, e um evento de resumo no fim.
+
+    `build_params(user_ids)` devolve {uid: named_body_params} (None = template
+    sem parâmetros).
+    """
+    instance = _runtime_instance_details()
+    started = time.monotonic()
+    users = sent = failed = 0
 
-        if not claim_daily_report_send(uid, today):
+    for chunk in _chunks(due, WA_REPORT_BATCH_SIZE):
+        # claim atômico por período: o loop faz polling a cada 30s, o claim garante
+        # que cada resumo saia uma única vez (mesmo com reinício / múltiplas instâncias)
+        claimed = claim_report_sends(kind, chunk, period_date)
+        if not claimed:
             continue
+        identities = list_whatsapp_identities(claimed)
+        params = build_params(claimed)
+        sends = [
+            _ReportSend(uid, to, params.get(uid))
+            for uid in claimed
+            for to in _dedupe_whatsapp_targets(identities.get(uid, []))
+        ]
+        users += len(claimed)
+        batch_sent, batch_failed = _send_report_batch(kind, cfg, quick_reply_buttons, sends, instance)
+        sent += batch_sent
+        failed += batch_failed
+
+    if not users:
+        return
+    elapsed_ms = round((time.monotonic() - started) * 1000)
+    logger.info(
+        "WA %s report batch users=%s sent=%s failed=%s ms=%s pid=%s hostname=%s",
+        kind, users, sent, failed, elapsed_ms, instance["pid"], instance["hostname"],
+    )
+    log_system_event_sync(
+        "info",
+        f"whatsapp_{kind}_report_batch_sent",
+        f"Templates proativos de relatorio {_REPORT_LABELS[kind]} enviados para o WhatsApp.",
+        source="wa_app",
+        details={
+            "users": users,
+            "sent": sent,
+            "failed": failed,
+            "elapsed_ms": elapsed_ms,
+            "template_name": cfg["name"],
+            "language_code": cfg["language_code"],
+        },
+    )
 
-        message = _strip_daily_report_disable_hint(build_daily_report_text(uid))
-        reminders = build_due_bill_reminders(uid, today)
-
-        for to in wa_targets:
-            try:
-                template_body_params = _proactive_template_named_body_params(uid)
-                send_template(
-                    to,
-                    proactive_template["name"],
-                    language_code=proactive_template["language_code"],
-                    named_body_params=template_body_params,
-                    quick_reply_buttons=_proactive_template_quick_reply_buttons(),
-                )
-                logger.info(
-                    "WA daily report proactive template sent uid=%s to=%s reminders=%s pid=%s hostname=%s",
-                    uid,
-                    to,
-                    len(reminders),
-                    instance["pid"],
-                    instance["hostname"],
-                )
-                log_system_event_sync(
-                    "info",
-                    "whatsapp_daily_report_template_sent",
-                    "Template proativo de relatorio diario enviado para o WhatsApp.",
-                    source="wa_app",
-                    user_id=uid,
-                    details={
-                        "to": to,
-                        "template_name": proactive_template["name"],
-                        "language_code": proactive_template["language_code"],
-                        "included_report_param": bool(template_body_params),
-                    },
-                )
-                logger.info(
-                    "WA daily report sent uid=%s to=%s reminders=%s pid=%s hostname=%s",
-                    uid,
-                    to,
-                    len(reminders),
-                    instance["pid"],
-                    instance["hostname"],
-                )
-            except Exception as exc:
-                logger.warning("WA daily report send error to=%s error=%s", to, exc)
-                log_system_event_sync(
-                    "warning",
-                    "whatsapp_daily_report_send_failed",
-                    f"Falha ao enviar relatorio diario via WhatsApp: {exc}",
-                    source="wa_app",
-                    user_id=uid,
-                    details={"to": to},
-                )
 
-        if reminders:
-            logger.info(
-                "WA card reminders not marked uid=%s: proactive template uses compact daily report only",
-                uid,
-            )
-            continue
+def _daily_report_tick() -> None:
+    now = now_tz()
+    today = now.date()
 
-        for reminder in reminders:
-            try:
-                mark_card_reminder_sent(uid, reminder["card_id"], today)
-            except Exception as exc:
-                logger.warning("WA card reminder mark error uid=%s card_id=%s error=%s", uid, reminder["card_id"], exc)
-                log_system_event_sync(
-                    "warning",
-                    "whatsapp_card_reminder_mark_failed",
-                    f"Falha ao marcar lembrete de cartao enviado: {exc}",
-                    source="wa_app",
-                    user_id=uid,
-                    details={"card_id": reminder["card_id"]},
-                )
+    due = list_due_report_users("daily", now.hour, now.minute, today)
+    if not due:
+        return
+
+    proactive_template = _proactive_template_config()
+    if not proactive_template:
+        # sem claim: quando o template for configurado, os devidos de hoje ainda recebem
+        logger.warning("WA daily report skipped users=%s: WA_PROACTIVE_TEMPLATE_NAME nao configurado", len(due))
+        log_system_event_sync(
+            "warning",
+            "whatsapp_proactive_template_missing",
+            "Relatorio diario via WhatsApp ignorado: WA_PROACTIVE_TEMPLATE_NAME nao configurado.",
+            source="wa_app",
+            details={"users": len(due)},
+        )
+        return
+
+    ref_date = today - timedelta(days=1)  # o report roda de manhã e se refere a ontem
+
+    def _params(user_ids: list[int]) -> dict[int, dict[str, str]]:
+        if not _proactive_template_includes_report():
+            return {}
+        summaries = build_report_summaries(user_ids, ref_date, ref_date)
+        return {uid: _proactive_template_named_body_params(s) for uid, s in summaries.items()}
+
+    _run_report_batches(
+        "daily", proactive_template, due, today, _params, _proactive_template_quick_reply_buttons(),
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -600,49 +772,6 @@ async def _daily_report_loop():
         await asyncio.sleep(30)
 
 
-def _send_periodic_template(uid, wa_targets, cfg, summary, kind, instance) -> None:
-    named_params = _periodic_template_named_body_params(summary)
-    quick_reply_buttons = _periodic_template_quick_reply_buttons(kind)
-    label = "semanal" if kind == "weekly" else "mensal"
-
-    for to in wa_targets:
-        try:
-            send_template(
-                to,
-                cfg["name"],
-                language_code=cfg["language_code"],
-                named_body_params=named_params,
-                quick_reply_buttons=quick_reply_buttons,
-            )
-            logger.info(
-                "WA %s report template sent uid=%s to=%s pid=%s hostname=%s",
-                kind, uid, to, instance["pid"], instance["hostname"],
-            )
-            log_system_event_sync(
-                "info",
-                f"whatsapp_{kind}_report_template_sent",
-                f"Template proativo de relatorio {label} enviado para o WhatsApp.",
-                source="wa_app",
-                user_id=uid,
-                details={
-                    "to": to,
-                    "template_name": cfg["name"],
-                    "language_code": cfg["language_code"],
-                    "periodo": named_params["periodo"],
-                },
-            )
-        except Exception as exc:
-            logger.warning("WA %s report send error to=%s error=%s", kind, to, exc)
-            log_system_event_sync(
-                "warning",
-                f"whatsapp_{kind}_report_send_failed",
-                f"Falha ao enviar relatorio {label} via WhatsApp: {exc}",
-                source="wa_app",
-                user_id=uid,
-                details={"to": to},
-            )
-
-
 def _periodic_report_tick() -> None:
     now = now_tz()
     today = now.date()
@@ -654,37 +783,25 @@ def _periodic_report_tick() -> None:
 
     weekly_cfg  = _periodic_template_config("weekly") if is_monday else None
     monthly_cfg = _periodic_template_config("monthly") if is_first else None
-    if not weekly_cfg and not monthly_cfg:
-        # nenhum template configurado para hoje → nada a fazer (e não consome o claim)
-        return
-
-    # toggles independentes: cada resumo tem seu próprio liga/desliga
-    weekly_users  = set(list_users_with_weekly_report_enabled())  if weekly_cfg else set()
-    monthly_users = set(list_users_with_monthly_report_enabled()) if monthly_cfg else set()
-
-    instance = _runtime_instance_details()
-
-    for uid in (weekly_users | monthly_users):
-        prefs = get_daily_report_prefs(uid)
 
-        # entrega no mesmo horário configurado para o report diário do usuário
-        if (now.hour, now.minute) < (prefs["hour"], prefs["minute"]):
+    # toggles independentes: cada resumo tem seu próprio liga/desliga e claim;
+    # sem template configurado pra hoje → nada a fazer (e não consome o claim).
+    # Entrega no mesmo horário configurado para o report diário do usuário.
+    for kind, cfg, period in (
+        ("weekly", weekly_cfg, closed_week_period(today)),
+        ("monthly", monthly_cfg, closed_month_period(today)),
+    ):
+        if not cfg:
             continue
-
-        ids = list_identities_by_user(uid)
-        wa_targets = _dedupe_whatsapp_targets(ids)
-        if not wa_targets:
+        due = list_due_report_users(kind, now.hour, now.minute, today)
+        if not due:
             continue
 
-        # claim atômico por período: o loop faz polling a cada 30s, o claim garante
-        # que cada resumo saia uma única vez (mesmo com reinício / múltiplas instâncias)
-        if uid in weekly_users and claim_weekly_report_send(uid, today):
-            summary = build_weekly_report_summary(uid, closed=True)
-            _send_periodic_template(uid, wa_targets, weekly_cfg, summary, "weekly", instance)
+        def _params(user_ids: list[int], period=period) -> dict[int, dict[str, str]]:
+            summaries = build_report_summaries(user_ids, *period)
+            return {uid: _periodic_template_named_body_params(s) for uid, s in summaries.items()}
 
-        if uid in monthly_users and claim_monthly_report_send(uid, today):
-            summary = build_monthly_report_summary(uid, closed=True)
-            _send_periodic_template(uid, wa_targets, monthly_cfg, summary, "monthly", instance)
+        _run_report_batches(kind, cfg, due, today, _params, _periodic_template_quick_reply_buttons(kind))
 
 
 async def _periodic_report_loop():
@@ -0,0 +1,97 @@
+"""
+adapters/whatsapp/wa_broadcast.py — Envio concorrente com teto de vazão.
+
+Envio proativo em massa (resumos agendados) chamando `send_template` um por
+um leva ~200ms de ida e volta à Graph API por mensagem: 50 mil resumos viram
+horas. Aqui os envios rodam num pool de threads (`concurrency` requisições em
+voo) e passam por um token bucket (`rate` mensagens/s), pra não estourar o
+limite de vazão do número na Meta — acima dele a Graph API responde erro
+131056/130429 e a mensagem se perde.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence
+
+
+class TokenBucket:
+    """Token bucket thread-safe: até `burst` envios de uma vez, `rate` por
+    segundo em regime. `acquire` bloqueia até haver ficha."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate deve ser positivo")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # folga de arredondamento: 0.1s * 10/s pode dar 0.999...
+                if self._tokens >= 1 - 1e-9:
+                    self._tokens = max(0.0, self._tokens - 1)
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+@dataclass
+class BroadcastResult:
+    job: Any
+    error: Exception | None = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def broadcast(
+    jobs: Sequence[Any],
+    send: Callable[[Any], Any],
+    *,
+    concurrency: int,
+    rate: float,
+) -> list[BroadcastResult]:
+    """Chama `send(job)` pra cada job, até `concurrency` em paralelo e no
+    máximo `rate` por segundo. Falha de um job não interrompe os outros: o
+    resultado (na ordem dos jobs) traz a exceção de cada um."""
+    if not jobs:
+        return []
+    bucket = TokenBucket(rate)
+
+    def _run(job: Any) -> BroadcastResult:
+        bucket.acquire()
+        t0 = time.perf_counter()
+        try:
+            send(job)
+        except Exception as exc:
+            return BroadcastResult(job, exc, (time.perf_counter() - t0) * 1000)
+        return BroadcastResult(job, None, (time.perf_counter() - t0) * 1000)
+
+    workers = max(1, min(int(concurrency), len(jobs)))
+    if workers == 1:
+        return [_run(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wa-broadcast") as pool:
+        return list(pool.map(_run, jobs))
+
+
+__all__ = ["BroadcastResult", "TokenBucket", "broadcast"]
@@ -5,6 +5,7 @@ import logging
 import os
 import secrets
 import sys
+import weakref
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 from pathlib import Path
@@ -59,6 +60,43 @@ async def db_connect():
     )
 
 
+# ── Leituras do painel: pool compartilhado + paralelismo limitado ───────────
+# As leituras do painel usam o AsyncConnectionPool do dashboard
+# (frontend/routes/shared.py) em vez de abrir conexão nova por chamada, e os
+# blocos independentes rodam em paralelo — cada um na sua conexão. O teto
+# ADMIN_QUERY_CONCURRENCY deixa conexões do pool livres pros WebSockets dos
+# usuários enquanto o painel carrega. `db_connect` (conexão própria) continua
+# pras escritas de log, que também rodam fora do processo web.
+
+_ADMIN_QUERY_CONCURRENCY = max(1, int(os.getenv("ADMIN_QUERY_CONCURRENCY", "4")))
+_admin_query_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _admin_slot() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slot = _admin_query_slots.get(loop)
+    if slot is None:
+        slot = _admin_query_slots[loop] = asyncio.Semaphore(_ADMIN_QUERY_CONCURRENCY)
+    return slot
+
+
+async def _admin_fetch(sql: str, params: Any = None, *, one: bool = False):
+    """Uma consulta de leitura do painel numa conexão do pool. `one=True`
+    devolve a primeira linha (dict, vazio se nada), senão a lista de dicts."""
+    from frontend.routes.shared import db_connect as pooled_connect  # noqa: PLC0415 — evita ciclo core ↔ frontend
+
+    async with _admin_slot():
+        async with await pooled_connect() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, params)
+                if one:
+                    row = await cur.fetchone()
+                    return dict(row) if row else {}
+                return [dict(r) for r in await cur.fetchall()]
+
+
 def _json_safe(obj: Any) -> Any:
     """Recursively convert Decimal/datetime/date to JSON-serializable primitives."""
     if isinstance(obj, dict):
@@ -137,6 +175,16 @@ async def ensure_admin_tables():
                 ON system_event_logs (level, event_type, created_at DESC)
                 """
             )
+            # Snapshot dos contadores globais do painel (ver refresh_admin_stats).
+            await cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS admin_stats_snapshot (
+                    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                    data JSONB NOT NULL,
+                    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+                """
+            )
         await conn.commit()
 
 
@@ -375,320 +423,426 @@ async def fetch_admin_overview(days: int = 30, admin_user: str = "admin") -> dic
         audit.__exit__(None, None, None)
 
 
-async def _fetch_admin_overview_inner(days: int = 30, admin_user: str = "admin") -> dict[str, Any]:
-    days = max(7, min(int(days or 30), 180))
+# ── Snapshot dos contadores globais ──────────────────────────────────────────
+# Totais da base inteira (usuários, saldos, faturas em aberto), séries diárias
+# e mensais sobre launches, ranking de top usuários e agregados de status de
+# conta varrem tabelas inteiras — com 100k+ contas, segundos por abertura do
+# painel. Eles são recalculados de tempos em tempos (run_admin_stats_refresh_loop,
+# ADMIN_STATS_REFRESH_SECONDS) numa linha única de admin_stats_snapshot; o
+# painel lê a linha e só recalcula na hora se ela estiver velha demais
+# (ADMIN_STATS_MAX_AGE_SECONDS — ex.: processo sem as tasks de fundo).
+# Nada de PII no snapshot: o ranking guarda user_id, e-mail é lido e decifrado
+# na hora de montar a resposta.
+
+_ADMIN_STATS_WINDOW_DAYS = 180
+
+
+def _admin_stats_refresh_seconds() -> int:
+    return max(30, int(os.getenv("ADMIN_STATS_REFRESH_SECONDS", "300")))
+
+
+def _admin_stats_max_age_seconds() -> int:
+    return max(0, int(os.getenv("ADMIN_STATS_MAX_AGE_SECONDS", str(3 * _admin_stats_refresh_seconds()))))
+
+
+async def _compute_admin_stats() -> dict[str, Any]:
     now = datetime.now(timezone.utc)
     start_30d = now - timedelta(days=30)
     start_7d = now - timedelta(days=7)
-    start_window = now - timedelta(days=days)
-
-    async with await db_connect() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                SELECT
-                    (SELECT COUNT(*) FROM users) AS total_users,
-                    (SELECT COUNT(*) FROM auth_accounts) AS total_accounts,
-                    (SELECT COUNT(*) FROM auth_accounts WHERE created_at >= %s) AS accounts_30d,
-                    (SELECT COUNT(*) FROM auth_accounts WHERE created_at >= %s) AS accounts_7d,
-                    (SELECT COUNT(*) FROM auth_accounts WHERE last_activity_at >= %s) AS active_users_30d,
-                    (SELECT COUNT(*) FROM auth_accounts WHERE last_activity_at >= %s) AS active_users_7d,
-                    (SELECT COUNT(*) FROM launches WHERE criado_em >= %s AND is_internal_movement = false) AS transactions_30d,
-                    (SELECT COALESCE(SUM(valor), 0) FROM launches WHERE criado_em >= %s AND tipo IN ('receita', 'entrada') AND is_internal_movement = false) AS revenue_30d,
-                    (SELECT COALESCE(SUM(valor), 0) FROM launches WHERE criado_em >= %s AND tipo IN ('despesa', 'saida') AND is_internal_movement = false) AS expenses_30d,
-                    (SELECT COALESCE(SUM(balance), 0) FROM pockets) AS pockets_balance,
-                    (SELECT COALESCE(SUM(balance), 0) FROM investments) AS investments_balance,
-                    (SELECT COALESCE(SUM(due_amount), 0) FROM (
-                        SELECT GREATEST(0, total - COALESCE(paid_amount, 0)) AS due_amount
-                        FROM credit_bills
-                        WHERE status IN ('open', 'closed')
-                    ) x) AS cards_due_open
-                """,
-                (start_30d, start_7d, start_30d, start_7d, start_30d, start_30d, start_30d),
-            )
-            summary = dict(await cur.fetchone())
+    start_window = now - timedelta(days=_ADMIN_STATS_WINDOW_DAYS)
 
-            await cur.execute(
-                """
-                SELECT
-                    COUNT(*) FILTER (WHERE created_at >= %s) AS login_attempts_30d,
-                    COUNT(*) FILTER (WHERE created_at >= %s AND success = true) AS login_success_30d,
-                    COUNT(*) FILTER (WHERE created_at >= %s) AS login_attempts_7d,
-                    COUNT(*) FILTER (WHERE created_at >= %s AND success = true) AS login_success_7d
+    summary, daily, monthly_financials, top_users, whatsapp_activity, by_status, by_source = await asyncio.gather(
+        _admin_fetch(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM users) AS total_users,
+                (SELECT COUNT(*) FROM auth_accounts) AS total_accounts,
+                (SELECT COUNT(*) FROM auth_accounts WHERE created_at >= %s) AS accounts_30d,
+                (SELECT COUNT(*) FROM auth_accounts WHERE created_at >= %s) AS accounts_7d,
+                (SELECT COUNT(*) FROM auth_accounts WHERE last_activity_at >= %s) AS active_users_30d,
+                (SELECT COUNT(*) FROM auth_accounts WHERE last_activity_at >= %s) AS active_users_7d,
+                (SELECT COUNT(*) FROM launches WHERE criado_em >= %s AND is_internal_movement = false) AS transactions_30d,
+                (SELECT COALESCE(SUM(valor), 0) FROM launches WHERE criado_em >= %s AND tipo IN ('receita', 'entrada') AND is_internal_movement = false) AS revenue_30d,
+                (SELECT COALESCE(SUM(valor), 0) FROM launches WHERE criado_em >= %s AND tipo IN ('despesa', 'saida') AND is_internal_movement = false) AS expenses_30d,
+                (SELECT COALESCE(SUM(balance), 0) FROM pockets) AS pockets_balance,
+                (SELECT COALESCE(SUM(balance), 0) FROM investments) AS investments_balance,
+                (SELECT COALESCE(SUM(due_amount), 0) FROM (
+                    SELECT GREATEST(0, total - COALESCE(paid_amount, 0)) AS due_amount
+                    FROM credit_bills
+                    WHERE status IN ('open', 'closed')
+                ) x) AS cards_due_open
+            """,
+            (start_30d, start_7d, start_30d, start_7d, start_30d, start_30d, start_30d),
+            one=True,
+        ),
+        _admin_fetch(
+            """
+            WITH days AS (
+                SELECT generate_series(
+                    date_trunc('day', %s::timestamptz),
+                    date_trunc('day', now()),
+                    interval '1 day'
+                )::date AS bucket
+            ),
+            signups AS (
+                SELECT created_at::date AS bucket, COUNT(*) AS value
+                FROM auth_accounts
+                WHERE created_at >= %s
+                GROUP BY 1
+            ),
+            logins AS (
+                SELECT created_at::date AS bucket, COUNT(*) FILTER (WHERE success = true) AS value
                 FROM auth_login_events
-                """,
-                (start_30d, start_30d, start_7d, start_7d),
-            )
-            login_stats = dict(await cur.fetchone())
-
-            await cur.execute(
-                """
-                WITH days AS (
-                    SELECT generate_series(
-                        date_trunc('day', %s::timestamptz),
-                        date_trunc('day', now()),
-                        interval '1 day'
-                    )::date AS bucket
-                ),
-                signups AS (
-                    SELECT created_at::date AS bucket, COUNT(*) AS value
-                    FROM auth_accounts
-                    WHERE created_at >= %s
-                    GROUP BY 1
-                ),
-                logins AS (
-                    SELECT created_at::date AS bucket, COUNT(*) FILTER (WHERE success = true) AS value
-                    FROM auth_login_events
-                    WHERE created_at >= %s
-                    GROUP BY 1
-                ),
-                tx AS (
-                    SELECT criado_em::date AS bucket, COUNT(*) AS value
-                    FROM launches
-                    WHERE criado_em >= %s AND is_internal_movement = false
-                    GROUP BY 1
-                ),
-                receita AS (
-                    SELECT criado_em::date AS bucket, COALESCE(SUM(valor), 0) AS value
-                    FROM launches
-                    WHERE criado_em >= %s AND tipo IN ('receita', 'entrada') AND is_internal_movement = false
-                    GROUP BY 1
-                ),
-                despesa AS (
-                    SELECT criado_em::date AS bucket, COALESCE(SUM(valor), 0) AS value
-                    FROM launches
-                    WHERE criado_em >= %s AND tipo IN ('despesa', 'saida') AND is_internal_movement = false
-                    GROUP BY 1
-                ),
-                ativos AS (
-                    SELECT last_activity_at::date AS bucket, COUNT(*) AS value
-                    FROM auth_accounts
-                    WHERE last_activity_at >= %s
-                    GROUP BY 1
-                )
-                SELECT
-                    d.bucket,
-                    COALESCE(s.value, 0) AS signups,
-                    COALESCE(l.value, 0) AS logins,
-                    COALESCE(t.value, 0) AS transactions,
-                    COALESCE(r.value, 0) AS revenue,
-                    COALESCE(e.value, 0) AS expenses,
-                    COALESCE(a.value, 0) AS active_users
-                FROM days d
-                LEFT JOIN signups s ON s.bucket = d.bucket
-                LEFT JOIN logins l ON l.bucket = d.bucket
-                LEFT JOIN tx t ON t.bucket = d.bucket
-                LEFT JOIN receita r ON r.bucket = d.bucket
-                LEFT JOIN despesa e ON e.bucket = d.bucket
-                LEFT JOIN ativos a ON a.bucket = d.bucket
-                ORDER BY d.bucket
-                """,
-                (start_window, start_window, start_window, start_window, start_window, start_window, start_window),
-            )
-            time_series = [dict(row) for row in await cur.fetchall()]
-
-            await cur.execute(
-                """
-                SELECT
-                    DATE_TRUNC('month', criado_em)::date AS month,
-                    COUNT(*) FILTER (WHERE is_internal_movement = false) AS transaction_count,
-                    COALESCE(SUM(valor) FILTER (WHERE tipo IN ('receita', 'entrada') AND is_internal_movement = false), 0) AS revenue,
-                    COALESCE(SUM(valor) FILTER (WHERE tipo IN ('despesa', 'saida') AND is_internal_movement = false), 0) AS expenses
+                WHERE created_at >= %s
+                GROUP BY 1
+            ),
+            tx AS (
+                SELECT criado_em::date AS bucket,
+                       COUNT(*) AS transactions,
+                       COALESCE(SUM(valor) FILTER (WHERE tipo IN ('receita', 'entrada')), 0) AS revenue,
+                       COALESCE(SUM(valor) FILTER (WHERE tipo IN ('despesa', 'saida')), 0) AS expenses
                 FROM launches
-                -- meses-calendário incluindo o atual (NOW() - 6 months corta
-                -- no meio de um 7º mês e o "últimos 6 meses" mostrava 7 barras)
-                WHERE criado_em >= DATE_TRUNC('month', NOW()) - INTERVAL '5 months'
+                WHERE criado_em >= %s AND is_internal_movement = false
+                GROUP BY 1
+            ),
+            ativos AS (
+                SELECT last_activity_at::date AS bucket, COUNT(*) AS value
+                FROM auth_accounts
+                WHERE last_activity_at >= %s
                 GROUP BY 1
-                ORDER BY 1 DESC
-                """
             )
-            monthly_financials = [dict(row) for row in await cur.fetchall()]
+            SELECT
+                d.bucket,
+                COALESCE(s.value, 0) AS signups,
+                COALESCE(l.value, 0) AS logins,
+                COALESCE(t.transactions, 0) AS transactions,
+                COALESCE(t.revenue, 0) AS revenue,
+                COALESCE(t.expenses, 0) AS expenses,
+                COALESCE(a.value, 0) AS active_users
+            FROM days d
+            LEFT JOIN signups s ON s.bucket = d.bucket
+            LEFT JOIN logins l ON l.bucket = d.bucket
+            LEFT JOIN tx t ON t.bucket = d.bucket
+            LEFT JOIN ativos a ON a.bucket = d.bucket
+            ORDER BY d.bucket
+            """,
+            (start_window, start_window, start_window, start_window, start_window),
+        ),
+        _admin_fetch(
+            """
+            SELECT
+                DATE_TRUNC('month', criado_em)::date AS month,
+                COUNT(*) FILTER (WHERE is_internal_movement = false) AS transaction_count,
+                COALESCE(SUM(valor) FILTER (WHERE tipo IN ('receita', 'entrada') AND is_internal_movement = false), 0) AS revenue,
+                COALESCE(SUM(valor) FILTER (WHERE tipo IN ('despesa', 'saida') AND is_internal_movement = false), 0) AS expenses
+            FROM launches
+            -- meses-calendário incluindo o atual (NOW() - 6 months corta
+            -- no meio de um 7º mês e o "últimos 6 meses" mostrava 7 barras)
+            WHERE criado_em >= DATE_TRUNC('month', NOW()) - INTERVAL '5 months'
+            GROUP BY 1
+            ORDER BY 1 DESC
+            """
+        ),
+        _admin_fetch(
+            """
+            SELECT
+                a.user_id,
+                COALESCE(COUNT(l.id), 0) AS total_transactions,
+                COALESCE(SUM(
+                    CASE
+                        WHEN l.tipo IN ('receita', 'entrada') AND l.is_internal_movement = false THEN l.valor
+                        WHEN l.tipo IN ('despesa', 'saida') AND l.is_internal_movement = false THEN -l.valor
+                        ELSE 0
+                    END
+                ), 0) AS net_flow
+            FROM auth_accounts a
+            LEFT JOIN launches l
+                ON l.user_id = a.user_id
+               AND l.criado_em >= %s
+            GROUP BY a.user_id, a.created_at
+            ORDER BY total_transactions DESC, a.created_at DESC
+            LIMIT 10
+            """,
+            (start_30d,),
+        ),
+        _admin_fetch(
+            """
+            SELECT
+                COUNT(*) FILTER (
+                    WHERE a.last_activity_at >= NOW() - INTERVAL '24 hours' AND wa.has_identity
+                ) AS whatsapp_real_activity_24h,
+                MAX(a.last_activity_at) FILTER (WHERE wa.has_identity) AS last_whatsapp_real_activity_at,
+                COUNT(*) FILTER (
+                    WHERE a.phone_status = 'confirmed'
+                       OR a.whatsapp_verified_at IS NOT NULL
+                       OR wa.has_identity
+                ) AS whatsapp_connected_users,
+                COUNT(*) FILTER (
+                    WHERE a.phone_status = 'pending' AND NOT wa.has_identity
+                ) AS whatsapp_pending_users
+            FROM auth_accounts a
+            CROSS JOIN LATERAL (
+                SELECT EXISTS (
+                    SELECT 1
+                    FROM user_identities ui
+                    WHERE ui.user_id = a.user_id
+                      AND ui.provider = 'whatsapp'
+                ) AS has_identity
+            ) wa
+            """,
+            one=True,
+        ),
+        _admin_fetch(
+            f"""
+            SELECT {_ACCOUNT_STATUS_SQL} AS account_status,
+                   COUNT(*) AS n,
+                   COUNT(*) FILTER (
+                       WHERE a.phone_status = 'confirmed'
+                          OR EXISTS (
+                              SELECT 1 FROM user_identities ui
+                              WHERE ui.user_id = a.user_id
+                                AND ui.provider = 'whatsapp'
+                          )
+                   ) AS wa
+            FROM auth_accounts a
+            GROUP BY 1
+            """
+        ),
+        # Origem do cadastro: web × app × google × …
+        # NULL = contas anteriores à coluna → 'desconhecido'.
+        _admin_fetch(
+            """
+            SELECT coalesce(signup_source, 'desconhecido') AS src, COUNT(*) AS n
+            FROM auth_accounts
+            GROUP BY 1
+            """
+        ),
+    )
 
-            await cur.execute(
-                """
-                SELECT
-                    a.user_id,
-                    a.email,
-                    a.email_enc,
-                    a.created_at,
-                    a.last_activity_at,
-                    COALESCE(COUNT(l.id), 0) AS total_transactions,
-                    COALESCE(SUM(
-                        CASE
-                            WHEN l.tipo IN ('receita', 'entrada') AND l.is_internal_movement = false THEN l.valor
-                            WHEN l.tipo IN ('despesa', 'saida') AND l.is_internal_movement = false THEN -l.valor
-                            ELSE 0
-                        END
-                    ), 0) AS net_flow
-                FROM auth_accounts a
-                LEFT JOIN launches l
-                    ON l.user_id = a.user_id
-                   AND l.criado_em >= %s
-                GROUP BY a.user_id, a.email, a.email_enc, a.created_at, a.last_activity_at
-                ORDER BY total_transactions DESC, a.created_at DESC
-                LIMIT 10
-                """,
-                (start_30d,),
-            )
-            top_users = [_decrypt_admin_row(dict(row), admin_user, "render_admin_top_users")
-                         for row in await cur.fetchall()]
+    account_status: dict[str, int] = {st: 0 for st in _USER_STATUSES}
+    account_status["whatsapp_connected"] = 0
+    for r in by_status:
+        account_status[r["account_status"]] = int(r["n"])
+        account_status["whatsapp_connected"] += int(r["wa"])
+    account_status["total"] = sum(account_status[st] for st in _USER_STATUSES)
 
-            await cur.execute(
-                """
-                SELECT
-                    a.user_id,
-                    a.email,
-                    a.email_enc,
-                    a.plan,
-                    a.created_at,
-                    a.last_activity_at,
-                    a.phone_status,
-                    a.whatsapp_verified_at,
-                    EXISTS (
-                        SELECT 1
-                        FROM user_identities ui
-                        WHERE ui.user_id = a.user_id
-                          AND ui.provider = 'whatsapp'
-                    ) AS has_whatsapp_identity
-                FROM auth_accounts a
-                ORDER BY a.created_at DESC
-                LIMIT 10
-                """
-            )
-            recent_signups = [_decrypt_admin_row(dict(row), admin_user, "render_admin_recent_signups")
-                              for row in await cur.fetchall()]
+    return _json_safe({
+        "summary": summary,
+        "daily": daily,
+        "monthly_financials": monthly_financials,
+        "top_users": top_users,
+        "whatsapp_activity": whatsapp_activity,
+        "account_status": account_status,
+        "by_source": {r["src"]: int(r["n"]) for r in by_source},
+    })
 
-            await cur.execute(
-                """
-                SELECT email, email_enc, user_id, success, failure_reason, ip_address, created_at
-                FROM auth_login_events
-                ORDER BY created_at DESC
-                LIMIT 20
-                """
-            )
-            recent_logins = [_decrypt_admin_row(dict(row), admin_user, "render_admin_recent_logins")
-                             for row in await cur.fetchall()]
 
-            await cur.execute(
-                """
-                SELECT id, level, event_type, message, source, user_id, details, created_at
-                FROM system_event_logs
-                WHERE created_at >= NOW() - INTERVAL '24 hours'
-                ORDER BY created_at DESC
-                LIMIT 100
-                """
-            )
-            recent_errors = [dict(row) for row in await cur.fetchall()]
+async def refresh_admin_stats() -> dict[str, Any]:
+    """Recalcula o snapshot e grava (upsert na linha única). Devolve o snapshot."""
+    data = await _compute_admin_stats()
+    row = await _admin_fetch(
+        """
+        INSERT INTO admin_stats_snapshot (id, data, refreshed_at)
+        VALUES (1, %s, NOW())
+        ON CONFLICT (id) DO UPDATE SET data = EXCLUDED.data, refreshed_at = EXCLUDED.refreshed_at
+        RETURNING refreshed_at
+        """,
+        (Jsonb(data),),
+        one=True,
+    )
+    return {**data, "refreshed_at": row.get("refreshed_at")}
 
-            await cur.execute(
-                """
-                SELECT
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND level = 'error') AS backend_errors_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND level = 'warning') AS backend_warnings_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'whatsapp_webhook_received') AS whatsapp_webhooks_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'whatsapp_send_success') AS whatsapp_send_success_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type IN ('whatsapp_send_failed', 'whatsapp_send_exception')) AS whatsapp_send_failures_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'category_ai_classified') AS category_ai_success_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'category_ai_invalid_response') AS category_ai_invalid_response_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'category_ai_error') AS category_ai_errors_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type IN ('category_ai_skipped_no_api_key', 'category_ai_client_unavailable')) AS category_ai_unavailable_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'whatsapp_token_invalid') AS whatsapp_token_invalid_7d,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'whatsapp_queue_drop') AS whatsapp_queue_drop_24h,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'whatsapp_worker_error') AS whatsapp_worker_errors_7d,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'billing_signature_invalid') AS billing_signature_invalid_7d,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'billing_payment_failed') AS billing_payment_failed_7d,
-                    COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'engagement_loop_error') AS engagement_errors_7d,
-                    MAX(created_at) FILTER (WHERE event_type = 'whatsapp_webhook_received') AS last_whatsapp_webhook_at,
-                    MAX(created_at) FILTER (WHERE event_type = 'whatsapp_send_success') AS last_whatsapp_send_success_at,
-                    MAX(created_at) FILTER (WHERE event_type LIKE 'category_ai_%') AS last_category_ai_at,
-                    MAX(created_at) FILTER (WHERE event_type = 'whatsapp_token_invalid') AS last_whatsapp_token_invalid_at,
-                    MAX(created_at) FILTER (WHERE event_type = 'billing_webhook_received') AS last_billing_webhook_at
-                FROM system_event_logs
-                """
-            )
-            ops_summary = dict(await cur.fetchone())
 
-            await cur.execute(
-                """
-                SELECT
-                    COUNT(*) FILTER (
-                        WHERE a.last_activity_at >= NOW() - INTERVAL '24 hours'
-                          AND EXISTS (
-                               SELECT 1
-                               FROM user_identities ui
-                               WHERE ui.user_id = a.user_id
-                                 AND ui.provider = 'whatsapp'
-                          )
-                    ) AS whatsapp_real_activity_24h,
-                    MAX(a.last_activity_at) FILTER (
-                        WHERE EXISTS (
-                            SELECT 1
-                            FROM user_identities ui
-                            WHERE ui.user_id = a.user_id
-                              AND ui.provider = 'whatsapp'
-                        )
-                    ) AS last_whatsapp_real_activity_at,
-                    COUNT(*) FILTER (
-                        WHERE a.phone_status = 'confirmed'
-                           OR a.whatsapp_verified_at IS NOT NULL
-                           OR EXISTS (
-                               SELECT 1
-                               FROM user_identities ui
-                               WHERE ui.user_id = a.user_id
-                                 AND ui.provider = 'whatsapp'
-                           )
-                    ) AS whatsapp_connected_users,
-                    COUNT(*) FILTER (
-                        WHERE a.phone_status = 'pending'
-                          AND NOT EXISTS (
-                               SELECT 1
-                               FROM user_identities ui
-                               WHERE ui.user_id = a.user_id
-                                 AND ui.provider = 'whatsapp'
-                          )
-                    ) AS whatsapp_pending_users
-                FROM auth_accounts a
-                """
-            )
-            whatsapp_activity = dict(await cur.fetchone())
+async def get_admin_stats() -> dict[str, Any]:
+    """Snapshot atual; recalcula na hora se não existe ou passou de
+    ADMIN_STATS_MAX_AGE_SECONDS."""
+    row = await _admin_fetch(
+        "SELECT data, refreshed_at FROM admin_stats_snapshot WHERE id = 1", one=True,
+    )
+    if row:
+        age = (datetime.now(timezone.utc) - row["refreshed_at"]).total_seconds()
+        if age <= _admin_stats_max_age_seconds():
+            return {**row["data"], "refreshed_at": row["refreshed_at"]}
+    return await refresh_admin_stats()
 
-            await cur.execute(
-                """
-                SELECT level, event_type, message, source, user_id, details, created_at
-                FROM system_event_logs
-                WHERE event_type LIKE 'whatsapp_%'
-                   OR event_type LIKE 'category_ai_%'
-                   OR event_type LIKE 'billing_%'
-                   OR event_type LIKE 'engagement_%'
-                   OR event_type = 'http_unhandled_exception'
-                ORDER BY created_at DESC
-                LIMIT 25
-                """
-            )
-            recent_ops = [dict(row) for row in await cur.fetchall()]
 
-            await cur.execute(
-                """
-                SELECT
-                    COUNT(*) FILTER (WHERE event_type = 'email_sent'   AND created_at >= NOW() - INTERVAL '24 hours') AS sent_24h,
-                    COUNT(*) FILTER (WHERE event_type = 'email_failed' AND created_at >= NOW() - INTERVAL '24 hours') AS failed_24h,
-                    COUNT(*) FILTER (WHERE event_type = 'email_sent'   AND created_at >= NOW() - INTERVAL '7 days')  AS sent_7d,
-                    COUNT(*) FILTER (WHERE event_type = 'email_sent'   AND created_at >= NOW() - INTERVAL '30 days') AS sent_30d
-                FROM system_event_logs
-                """
-            )
-            email_stats = dict(await cur.fetchone())
+async def run_admin_stats_refresh_loop() -> None:
+    """Task de fundo: mantém o snapshot do painel quente."""
+    while True:
+        try:
+            await refresh_admin_stats()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print(f"[admin] refresh do snapshot falhou: {exc}", file=sys.stderr)
+        await asyncio.sleep(_admin_stats_refresh_seconds())
+
+
+_OPS_SUMMARY_SQL = """
+    SELECT
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND level = 'error') AS backend_errors_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND level = 'warning') AS backend_warnings_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'whatsapp_webhook_received') AS whatsapp_webhooks_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'whatsapp_send_success') AS whatsapp_send_success_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type IN ('whatsapp_send_failed', 'whatsapp_send_exception')) AS whatsapp_send_failures_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'category_ai_classified') AS category_ai_success_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'category_ai_invalid_response') AS category_ai_invalid_response_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'category_ai_error') AS category_ai_errors_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type IN ('category_ai_skipped_no_api_key', 'category_ai_client_unavailable')) AS category_ai_unavailable_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'whatsapp_token_invalid') AS whatsapp_token_invalid_7d,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '24 hours' AND event_type = 'whatsapp_queue_drop') AS whatsapp_queue_drop_24h,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'whatsapp_worker_error') AS whatsapp_worker_errors_7d,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'billing_signature_invalid') AS billing_signature_invalid_7d,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'billing_payment_failed') AS billing_payment_failed_7d,
+        COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '7 days' AND event_type = 'engagement_loop_error') AS engagement_errors_7d,
+        MAX(created_at) FILTER (WHERE event_type = 'whatsapp_webhook_received') AS last_whatsapp_webhook_at,
+        MAX(created_at) FILTER (WHERE event_type = 'whatsapp_send_success') AS last_whatsapp_send_success_at,
+        MAX(created_at) FILTER (WHERE event_type LIKE 'category_ai_%') AS last_category_ai_at,
+        MAX(created_at) FILTER (WHERE event_type = 'whatsapp_token_invalid') AS last_whatsapp_token_invalid_at,
+        MAX(created_at) FILTER (WHERE event_type = 'billing_webhook_received') AS last_billing_webhook_at
+    FROM system_event_logs
+"""
 
-            await cur.execute(
-                """
-                SELECT id, event_type, message, details, created_at
-                FROM system_event_logs
-                WHERE event_type IN ('email_sent', 'email_failed')
-                ORDER BY created_at DESC
-                LIMIT 50
-                """
-            )
-            recent_emails = [dict(row) for row in await cur.fetchall()]
+
+async def _fetch_admin_overview_inner(days: int = 30, admin_user: str = "admin") -> dict[str, Any]:
+    days = max(7, min(int(days or 30), _ADMIN_STATS_WINDOW_DAYS))
+    now = datetime.now(timezone.utc)
+    start_30d = now - timedelta(days=30)
+    start_7d = now - timedelta(days=7)
+
+    # Contadores globais (base inteira / janelas de launches) vêm do snapshot;
+    # o resto são leituras indexadas com LIMIT ou janelas curtas de log —
+    # independentes entre si, então saem em paralelo, cada uma na sua conexão.
+    (
+        stats,
+        login_stats,
+        recent_signups,
+        recent_logins,
+        recent_errors,
+        ops_summary,
+        recent_ops,
+        email_stats,
+        recent_emails,
+    ) = await asyncio.gather(
+        get_admin_stats(),
+        _admin_fetch(
+            """
+            SELECT
+                COUNT(*) FILTER (WHERE created_at >= %s) AS login_attempts_30d,
+                COUNT(*) FILTER (WHERE created_at >= %s AND success = true) AS login_success_30d,
+                COUNT(*) FILTER (WHERE created_at >= %s) AS login_attempts_7d,
+                COUNT(*) FILTER (WHERE created_at >= %s AND success = true) AS login_success_7d
+            FROM auth_login_events
+            WHERE created_at >= %s
+            """,
+            (start_30d, start_30d, start_7d, start_7d, start_30d),
+            one=True,
+        ),
+        _admin_fetch(
+            """
+            SELECT
+                a.user_id,
+                a.email,
+                a.email_enc,
+                a.plan,
+                a.created_at,
+                a.last_activity_at,
+                a.phone_status,
+                a.whatsapp_verified_at,
+                EXISTS (
+                    SELECT 1
+                    FROM user_identities ui
+                    WHERE ui.user_id = a.user_id
+                      AND ui.provider = 'whatsapp'
+                ) AS has_whatsapp_identity
+            FROM auth_accounts a
+            ORDER BY a.created_at DESC
+            LIMIT 10
+            """
+        ),
+        _admin_fetch(
+            """
+            SELECT email, email_enc, user_id, success, failure_reason, ip_address, created_at
+            FROM auth_login_events
+            ORDER BY created_at DESC
+            LIMIT 20
+            """
+        ),
+        _admin_fetch(
+            """
+            SELECT id, level, event_type, message, source, user_id, details, created_at
+            FROM system_event_logs
+            WHERE created_at >= NOW() - INTERVAL '24 hours'
+            ORDER BY created_at DESC
+            LIMIT 100
+            """
+        ),
+        _admin_fetch(_OPS_SUMMARY_SQL, one=True),
+        _admin_fetch(
+            """
+            SELECT level, event_type, message, source, user_id, details, created_at
+            FROM system_event_logs
+            WHERE event_type LIKE 'whatsapp_%'
+               OR event_type LIKE 'category_ai_%'
+               OR event_type LIKE 'billing_%'
+               OR event_type LIKE 'engagement_%'
+               OR event_type = 'http_unhandled_exception'
+            ORDER BY created_at DESC
+            LIMIT 25
+            """
+        ),
+        _admin_fetch(
+            """
+            SELECT
+                COUNT(*) FILTER (WHERE event_type = 'email_sent'   AND created_at >= NOW() - INTERVAL '24 hours') AS sent_24h,
+                COUNT(*) FILTER (WHERE event_type = 'email_failed' AND created_at >= NOW() - INTERVAL '24 hours') AS failed_24h,
+                COUNT(*) FILTER (WHERE event_type = 'email_sent'   AND created_at >= NOW() - INTERVAL '7 days')  AS sent_7d,
+                COUNT(*) FILTER (WHERE event_type = 'email_sent'   AND created_at >= NOW() - INTERVAL '30 days') AS sent_30d
+            FROM system_event_logs
+            WHERE event_type IN ('email_sent', 'email_failed')
+              AND created_at >= NOW() - INTERVAL '30 days'
+            """,
+            one=True,
+        ),
+        _admin_fetch(
+            """
+            SELECT id, event_type, message, details, created_at
+            FROM system_event_logs
+            WHERE event_type IN ('email_sent', 'email_failed')
+            ORDER BY created_at DESC
+            LIMIT 50
+            """
+        ),
+    )
+
+    # Top usuários: o ranking (agregado sobre launches) é do snapshot; e-mail e
+    # datas são lidos agora, só das 10 contas, e decifrados aqui.
+    ranking = stats.get("top_users") or []
+    accounts = {
+        int(r["user_id"]): r
+        for r in (await _admin_fetch(
+            """
+            SELECT user_id, email, email_enc, created_at, last_activity_at
+            FROM auth_accounts
+            WHERE user_id = ANY(%s)
+            """,
+            ([int(r["user_id"]) for r in ranking],),
+        ) if ranking else [])
+    }
+    top_users = [
+        _decrypt_admin_row({**accounts[int(r["user_id"])], **r}, admin_user, "render_admin_top_users")
+        for r in ranking
+        if int(r["user_id"]) in accounts
+    ]
+    recent_signups = [_decrypt_admin_row(row, admin_user, "render_admin_recent_signups")
+                      for row in recent_signups]
+    recent_logins = [_decrypt_admin_row(row, admin_user, "render_admin_recent_logins")
+                     for row in recent_logins]
+
+    summary = dict(stats.get("summary") or {})
+    whatsapp_activity = dict(stats.get("whatsapp_activity") or {})
+    window_start = (now - timedelta(days=days)).date().isoformat()
+    time_series = [row for row in stats.get("daily") or [] if row["bucket"] >= window_start]
 
     attempts_30d = int(login_stats.get("login_attempts_30d") or 0)
     attempts_7d = int(login_stats.get("login_attempts_7d") or 0)
@@ -704,6 +858,7 @@ async def _fetch_admin_overview_inner(days: int = 30, admin_user: str = "admin")
 
     return {
         "generated_at": now,
+        "stats_refreshed_at": stats.get("refreshed_at"),
         "window_days": days,
         "summary": summary,
         "ops_summary": {
@@ -721,7 +876,7 @@ async def _fetch_admin_overview_inner(days: int = 30, admin_user: str = "admin")
             ),
         },
         "time_series": time_series,
-        "monthly_financials": monthly_financials,
+        "monthly_financials": stats.get("monthly_financials") or [],
         "top_users": top_users,
         "recent_signups": recent_signups,
         "recent_logins": recent_logins,
@@ -886,7 +1041,7 @@ async def fetch_billing_summary(force: bool = False) -> dict[str, Any]:
     return _billing_summary_cache["data"]
 
 
-async def _fetch_checkout_funnel(cur) -> dict[str, int]:
+async def _fetch_checkout_funnel() -> dict[str, int]:
     """Funil de checkout a partir da tabela dedicada checkout_funnel_events,
     correlacionando abertura e conclusão pelo session_id do Stripe (a MESMA
     tentativa). Devolve, em 30d e 7d:
@@ -904,7 +1059,7 @@ async def _fetch_checkout_funnel(cur) -> dict[str, int]:
 
     Uma sessão sem session_id (raro — Stripe sempre devolve) entra em people
     mas não nas contagens de sessão (COUNT DISTINCT ignora NULL)."""
-    await cur.execute(
+    row = await _admin_fetch(
         """
         SELECT
             COUNT(DISTINCT user_id)    FILTER (WHERE w30)                AS people_30d,
@@ -927,10 +1082,10 @@ async def _fetch_checkout_funnel(cur) -> dict[str, int]:
             WHERE s.kind = 'started'
               AND s.created_at >= NOW() - INTERVAL '30 days'
         ) per_start
-        """
+        """,
+        one=True,
     )
-    row = await cur.fetchone()
-    return {k: int(v or 0) for k, v in dict(row).items()}
+    return {k: int(v or 0) for k, v in row.items()}
 
 
 _ADMIN_USERS_HARD_CAP = 2000
@@ -945,18 +1100,39 @@ async def fetch_admin_users(
     per_page: int = 50,
     sort: str = "created_at",
     admin_user: str = "admin",
+    cursor: str | None = None,
+    total: str | None = None,
 ) -> dict[str, Any]:
     """Lista paginada de contas com classificação de assinatura + agregados.
 
     Agregados, filtros de status/plano e paginação rodam em SQL sobre a base
-    INTEIRA (_ACCOUNT_STATUS_SQL). A única exceção é a busca (q): e-mail é
+    INTEIRA (_ACCOUNT_STATUS_SQL); os agregados saem do snapshot periódico
+    (get_admin_stats), o resto ao vivo. A única exceção é a busca (q): e-mail é
     cifrado no banco, então o match de substring exige decifrar — esse caminho
     varre no máximo _ADMIN_USERS_HARD_CAP contas mais recentes e devolve
     truncated=True quando bateu no teto.
 
     Minimização de PII: sem busca, só as rows da página devolvida são
     decifradas. Cada decrypt é auditado (purpose=render_admin_users_list).
+
+    Paginação (db/pagination.py): toda resposta traz `next_cursor`; com
+    `cursor`, a página seguinte sai por keyset na ordenação (coluna do sort,
+    user_id) em vez de OFFSET, e `page` só ecoa o número que o painel mostra.
+    `total` = exact (padrão sem cursor) | estimate | none (padrão com cursor).
+    Cursor inválido levanta InvalidCursor.
     """
+    from db.pagination import (  # noqa: PLC0415
+        TOTAL_ESTIMATE,
+        TOTAL_EXACT,
+        TOTAL_MODES,
+        TOTAL_NONE,
+        decode_cursor,
+        estimate_count_sql,
+        estimated_rows,
+        keyset_after,
+        split_page,
+    )
+
     q = (q or "").strip().lower()
     plan = (plan or "").strip().lower()
     status = (status or "").strip().lower()
@@ -990,6 +1166,12 @@ async def fetch_admin_users(
                     ) AS has_whatsapp_identity
     """
     order_sql = f"ORDER BY a.{order_col} DESC NULLS LAST, a.user_id DESC"
+    # O cursor carrega a coluna do sort: trocar o sort invalida o cursor.
+    cursor_kind = f"admin_users:{order_col}"
+    seek = decode_cursor(cursor, cursor_kind, 2) if cursor else None
+    total_mode = (total or (TOTAL_NONE if seek else TOTAL_EXACT)).strip().lower()
+    if total_mode not in TOTAL_MODES:
+        total_mode = TOTAL_EXACT
 
     clauses: list[str] = []
     params: list[Any] = []
@@ -1000,111 +1182,104 @@ async def fetch_admin_users(
         clauses.append(f"{_ACCOUNT_STATUS_SQL} = %s")
         params.append(status)
     where_sql = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    # A página em si: filtros + "depois do cursor".
+    page_clauses, page_params = list(clauses), list(params)
+    if seek:
+        seek_sql, seek_params = keyset_after(
+            [(f"a.{order_col}", seek[0]), ("a.user_id", seek[1])],
+            nullable=(f"a.{order_col}",),
+        )
+        page_clauses.append(seek_sql)
+        page_params += seek_params
+    page_where_sql = ("WHERE " + " AND ".join(page_clauses)) if page_clauses else ""
+    offset = 0 if seek else page * per_page
+
+    def _cursor_key(row: dict) -> tuple:
+        return row.get(order_col), int(row["user_id"])
+
+    async def _count() -> int | None:
+        count_sql = f"SELECT 1 FROM auth_accounts a {where_sql}"
+        if total_mode == TOTAL_EXACT:
+            row = await _admin_fetch(f"SELECT COUNT(*) AS n FROM ({count_sql}) c", tuple(params), one=True)
+            return int(row["n"])
+        if total_mode == TOTAL_ESTIMATE:
+            row = await _admin_fetch(estimate_count_sql(count_sql), tuple(params), one=True)
+            return estimated_rows(row)
+        return None
 
-    truncated = False
-    async with await db_connect() as conn:
-        async with conn.cursor() as cur:
-            # Agregados: base inteira, sempre, independente dos filtros
-            await cur.execute(
-                f"""
-                SELECT {_ACCOUNT_STATUS_SQL} AS account_status,
-                       COUNT(*) AS n,
-                       COUNT(*) FILTER (
-                           WHERE a.phone_status = 'confirmed'
-                              OR EXISTS (
-                                  SELECT 1 FROM user_identities ui
-                                  WHERE ui.user_id = a.user_id
-                                    AND ui.provider = 'whatsapp'
-                              )
-                       ) AS wa
-                FROM auth_accounts a
-                GROUP BY 1
-                """
-            )
-            aggregates: dict[str, int] = {s: 0 for s in _USER_STATUSES}
-            aggregates["whatsapp_connected"] = 0
-            for r in await cur.fetchall():
-                aggregates[r["account_status"]] = int(r["n"])
-                aggregates["whatsapp_connected"] += int(r["wa"])
-            aggregates["total"] = sum(aggregates[s] for s in _USER_STATUSES)
-
-            # Funil de checkout (tabela dedicada checkout_funnel_events):
-            # pessoas que abriram × conversão POR SESSÃO (correlação por
-            # session_id), em 30d/7d.
-            checkout_funnel = await _fetch_checkout_funnel(cur)
-
-            # Origem do cadastro (base inteira): web × app × google × …
-            # NULL = contas anteriores à coluna → 'desconhecido'.
-            await cur.execute(
-                """
-                SELECT coalesce(signup_source, 'desconhecido') AS src, COUNT(*) AS n
-                FROM auth_accounts
-                GROUP BY 1
-                """
-            )
-            by_source = {r["src"]: int(r["n"]) for r in await cur.fetchall()}
-
-            if not q:
-                await cur.execute(
-                    f"SELECT COUNT(*) AS n FROM auth_accounts a {where_sql}",
-                    tuple(params),
-                )
-                total_filtered = int((await cur.fetchone())["n"])
-                await cur.execute(
+    async def _page() -> tuple[list[dict], int | None, bool, str | None]:
+        if not q:
+            count, rows = await asyncio.gather(
+                _count(),
+                _admin_fetch(
                     f"""
                     SELECT {select_cols}
                     FROM auth_accounts a
-                    {where_sql}
+                    {page_where_sql}
                     {order_sql}
                     LIMIT %s OFFSET %s
                     """,
-                    tuple(params) + (per_page, page * per_page),
-                )
-                page_rows = [dict(r) for r in await cur.fetchall()]
-                for row in page_rows:
-                    _decrypt_admin_row(row, admin_user, "render_admin_users_list")
-            else:
-                # Busca: match contra o e-mail decifrado, varrendo as
-                # _ADMIN_USERS_HARD_CAP contas mais recentes que passam nos
-                # filtros SQL (batch de auditoria em quem chama).
-                await cur.execute(
-                    f"""
-                    SELECT {select_cols}
-                    FROM auth_accounts a
-                    {where_sql}
-                    {order_sql}
-                    LIMIT %s
-                    """,
-                    tuple(params) + (_ADMIN_USERS_HARD_CAP,),
-                )
-                rows = [dict(r) for r in await cur.fetchall()]
-                truncated = len(rows) >= _ADMIN_USERS_HARD_CAP
-                for row in rows:
-                    _decrypt_admin_row(row, admin_user, "render_admin_users_list")
-                rows = [r for r in rows if q in (r.get("email") or "").lower()]
-                total_filtered = len(rows)
-                page_rows = rows[page * per_page:(page + 1) * per_page]
-
-            tx_by_user: dict[int, int] = {}
-            if page_rows:
-                await cur.execute(
-                    """
-                    SELECT user_id, COUNT(*) AS n
-                    FROM launches
-                    WHERE user_id = ANY(%s)
-                      AND criado_em >= NOW() - INTERVAL '30 days'
-                      AND is_internal_movement = false
-                    GROUP BY user_id
-                    """,
-                    ([int(r["user_id"]) for r in page_rows],),
-                )
-                tx_by_user = {int(r["user_id"]): int(r["n"]) for r in await cur.fetchall()}
+                    tuple(page_params) + (per_page + 1, offset),
+                ),
+            )
+            rows, next_cursor = split_page(rows, per_page, _cursor_key, cursor_kind)
+            for row in rows:
+                _decrypt_admin_row(row, admin_user, "render_admin_users_list")
+            return rows, count, False, next_cursor
+        # Busca: match contra o e-mail decifrado, varrendo as
+        # _ADMIN_USERS_HARD_CAP contas mais recentes (depois do cursor) que
+        # passam nos filtros SQL (batch de auditoria em quem chama).
+        rows = await _admin_fetch(
+            f"""
+            SELECT {select_cols}
+            FROM auth_accounts a
+            {page_where_sql}
+            {order_sql}
+            LIMIT %s
+            """,
+            tuple(page_params) + (_ADMIN_USERS_HARD_CAP,),
+        )
+        hit_cap = len(rows) >= _ADMIN_USERS_HARD_CAP
+        for row in rows:
+            _decrypt_admin_row(row, admin_user, "render_admin_users_list")
+        rows = [r for r in rows if q in (r.get("email") or "").lower()]
+        matched = None if seek else len(rows)
+        page_rows, next_cursor = split_page(rows[offset:], per_page, _cursor_key, cursor_kind)
+        return page_rows, matched, hit_cap, next_cursor
+
+    # Agregados (base inteira, independente dos filtros) e origem do cadastro
+    # vêm do snapshot; funil de checkout e a página em si, ao vivo e em paralelo.
+    stats, checkout_funnel, (page_rows, total_filtered, truncated, next_cursor) = await asyncio.gather(
+        get_admin_stats(),
+        _fetch_checkout_funnel(),
+        _page(),
+    )
+    aggregates = dict(stats.get("account_status") or {})
+    by_source = dict(stats.get("by_source") or {})
+
+    tx_by_user: dict[int, int] = {}
+    if page_rows:
+        tx_by_user = {
+            int(r["user_id"]): int(r["n"])
+            for r in await _admin_fetch(
+                """
+                SELECT user_id, COUNT(*) AS n
+                FROM launches
+                WHERE user_id = ANY(%s)
+                  AND criado_em >= NOW() - INTERVAL '30 days'
+                  AND is_internal_movement = false
+                GROUP BY user_id
+                """,
+                ([int(r["user_id"]) for r in page_rows],),
+            )
+        }
 
     for row in page_rows:
         row["tx_30d"] = tx_by_user.get(int(row["user_id"]), 0)
 
     return {
         "generated_at": now,
+        "stats_refreshed_at": stats.get("refreshed_at"),
         "aggregates": aggregates,
         "checkout_funnel": checkout_funnel,
         "by_source": by_source,
@@ -1113,6 +1288,8 @@ async def fetch_admin_users(
         "page": page,
         "per_page": per_page,
         "total": total_filtered,
+        "total_is_estimate": total_filtered is not None and total_mode == TOTAL_ESTIMATE and not q,
+        "next_cursor": next_cursor,
         "truncated": truncated,
         "filters": {"q": q, "plan": plan, "status": status, "sort": order_col},
     }
@@ -1123,87 +1300,83 @@ async def fetch_admin_user_detail(user_id: int, admin_user: str = "admin") -> di
     uso + eventos recentes. LGPD: nada de conteúdo de transação — só contagens
     e datas; e-mail/telefone/nome decifrados com auditoria individual."""
     now = datetime.now(timezone.utc)
-    async with await db_connect() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                SELECT
-                    a.user_id,
-                    a.email, a.email_enc,
-                    a.phone_e164, a.phone_enc,
-                    a.display_name, a.display_name_enc,
-                    a.plan, a.plan_expires_at, a.last_payment_status,
-                    a.stripe_customer_id, a.trial_started_at, a.plan_selected_at,
-                    a.created_at, a.last_activity_at,
-                    a.phone_status, a.whatsapp_verified_at, a.whatsapp_updates_opt_out,
-                    a.engagement_opt_out, a.tip_email_opt_out, a.insight_email_opt_out,
-                    a.deletion_status, a.deletion_requested_at, a.signup_source,
-                    a.ai_messages_this_month,
-                    EXISTS (
-                        SELECT 1 FROM user_identities ui
-                        WHERE ui.user_id = a.user_id AND ui.provider = 'whatsapp'
-                    ) AS has_whatsapp_identity
-                FROM auth_accounts a
-                WHERE a.user_id = %s
-                """,
-                (int(user_id),),
-            )
-            row = await cur.fetchone()
-            if not row:
-                return None
-            profile = _decrypt_admin_row(dict(row), admin_user, "render_admin_user_detail")
-            profile["account_status"] = _derive_account_status(profile, now)
-
-            await cur.execute(
-                """
-                SELECT
-                    COUNT(*) FILTER (WHERE is_internal_movement = false) AS tx_total,
-                    COUNT(*) FILTER (
-                        WHERE is_internal_movement = false
-                          AND criado_em >= NOW() - INTERVAL '30 days'
-                    ) AS tx_30d,
-                    MAX(criado_em) FILTER (WHERE is_internal_movement = false) AS last_tx_at
-                FROM launches
-                WHERE user_id = %s
-                """,
-                (int(user_id),),
-            )
-            usage = dict(await cur.fetchone())
-
-            await cur.execute(
-                """
-                SELECT
-                    (SELECT COUNT(*) FROM pockets      WHERE user_id = %(uid)s) AS pockets_count,
-                    (SELECT COUNT(*) FROM investments  WHERE user_id = %(uid)s) AS investments_count,
-                    (SELECT COUNT(*) FROM credit_cards WHERE user_id = %(uid)s) AS cards_count
-                """,
-                {"uid": int(user_id)},
-            )
-            usage.update(dict(await cur.fetchone()))
-
-            await cur.execute(
-                """
-                SELECT level, event_type, message, source, created_at
-                FROM system_event_logs
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT 15
-                """,
-                (int(user_id),),
-            )
-            recent_events = [dict(r) for r in await cur.fetchall()]
-
-            await cur.execute(
-                """
-                SELECT success, failure_reason, ip_address, created_at
-                FROM auth_login_events
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT 10
-                """,
-                (int(user_id),),
-            )
-            recent_logins = [dict(r) for r in await cur.fetchall()]
+    uid = int(user_id)
+    row, usage, counts, recent_events, recent_logins = await asyncio.gather(
+        _admin_fetch(
+            """
+            SELECT
+                a.user_id,
+                a.email, a.email_enc,
+                a.phone_e164, a.phone_enc,
+                a.display_name, a.display_name_enc,
+                a.plan, a.plan_expires_at, a.last_payment_status,
+                a.stripe_customer_id, a.trial_started_at, a.plan_selected_at,
+                a.created_at, a.last_activity_at,
+                a.phone_status, a.whatsapp_verified_at, a.whatsapp_updates_opt_out,
+                a.engagement_opt_out, a.tip_email_opt_out, a.insight_email_opt_out,
+                a.deletion_status, a.deletion_requested_at, a.signup_source,
+                a.ai_messages_this_month,
+                EXISTS (
+                    SELECT 1 FROM user_identities ui
+                    WHERE ui.user_id = a.user_id AND ui.provider = 'whatsapp'
+                ) AS has_whatsapp_identity
+            FROM auth_accounts a
+            WHERE a.user_id = %s
+            """,
+            (uid,),
+            one=True,
+        ),
+        _admin_fetch(
+            """
+            SELECT
+                COUNT(*) FILTER (WHERE is_internal_movement = false) AS tx_total,
+                COUNT(*) FILTER (
+                    WHERE is_internal_movement = false
+                      AND criado_em >= NOW() - INTERVAL '30 days'
+                ) AS tx_30d,
+                MAX(criado_em) FILTER (WHERE is_internal_movement = false) AS last_tx_at
+            FROM launches
+            WHERE user_id = %s
+            """,
+            (uid,),
+            one=True,
+        ),
+        _admin_fetch(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM pockets      WHERE user_id = %(uid)s) AS pockets_count,
+                (SELECT COUNT(*) FROM investments  WHERE user_id = %(uid)s) AS investments_count,
+                (SELECT COUNT(*) FROM credit_cards WHERE user_id = %(uid)s) AS cards_count
+            """,
+            {"uid": uid},
+            one=True,
+        ),
+        _admin_fetch(
+            """
+            SELECT level, event_type, message, source, created_at
+            FROM system_event_logs
+            WHERE user_id = %s
+            ORDER BY created_at DESC
+            LIMIT 15
+            """,
+            (uid,),
+        ),
+        _admin_fetch(
+            """
+            SELECT success, failure_reason, ip_address, created_at
+            FROM auth_login_events
+            WHERE user_id = %s
+            ORDER BY created_at DESC
+            LIMIT 10
+            """,
+            (uid,),
+        ),
+    )
+    if not row:
+        return None
+    profile = _decrypt_admin_row(row, admin_user, "render_admin_user_detail")
+    profile["account_status"] = _derive_account_status(profile, now)
+    usage.update(counts)
 
     return {
         "generated_at": now,
@@ -1405,6 +1578,9 @@ def register_admin_routes(app: FastAPI, frontend_dir: Path, jwt_secret: str, lim
         row = await asyncio.to_thread(_grant)
         if not row:
             return {"ok": False, "error": "conta não encontrada", "email": email}
+        from core.services.plan_service import invalidate_plan_cache  # noqa: PLC0415
+
+        invalidate_plan_cache(row["user_id"])
         return {
             "ok": True,
             "user_id": row["user_id"],
@@ -1463,6 +1639,27 @@ def register_admin_routes(app: FastAPI, frontend_dir: Path, jwt_secret: str, lim
         data["admin_user"] = username
         return JSONResponse(content=_json_safe(data))
 
+    @app.get("/admin/api/wa-queue")
+    async def admin_api_wa_queue(username: str = Depends(_get_current_admin)):
+        """Fila de entrada do WhatsApp: profundidade, atraso por partição e drops."""
+        from adapters.whatsapp.wa_app import wa_queue_stats  # noqa: PLC0415
+
+        return JSONResponse(content=wa_queue_stats())
+
+    @app.get("/admin/api/plan-cache")
+    async def admin_api_plan_cache(username: str = Depends(_get_current_admin)):
+        """Cache de plano por processo: hits, misses, invalidações e tamanho."""
+        from core.services.plan_service import plan_cache_stats  # noqa: PLC0415
+
+        return JSONResponse(content=plan_cache_stats())
+
+    @app.get("/admin/api/ai-tools")
+    async def admin_api_ai_tools(username: str = Depends(_get_current_admin)):
+        """Latência das tools do chat com IA: chamadas, média e pico por tool."""
+        from core.services.ai_chat.runner import tool_latency_stats  # noqa: PLC0415
+
+        return JSONResponse(content=tool_latency_stats())
+
     @app.get("/admin/api/users")
     async def admin_api_users(
         q: str = "",
@@ -1471,17 +1668,25 @@ def register_admin_routes(app: FastAPI, frontend_dir: Path, jwt_secret: str, lim
         page: int = 0,
         per_page: int = 50,
         sort: str = "created_at",
+        cursor: str = "",
+        total: str = "",
         username: str = Depends(_get_current_admin),
     ):
         """Painel de usuários: lista paginada + agregados de assinatura + resumo
-        Stripe (MRR/ticket médio). Decrypts auditados num único batch."""
+        Stripe (MRR/ticket médio). Decrypts auditados num único batch.
+        Próxima página: `cursor` = `next_cursor` da resposta anterior."""
+        from db.pagination import InvalidCursor  # noqa: PLC0415
+
         audit = pii_audit_batch()
         audit.__enter__()
         try:
             data = await fetch_admin_users(
                 q=q, plan=plan, status=status, page=page,
                 per_page=per_page, sort=sort, admin_user=username,
+                cursor=cursor or None, total=total or None,
             )
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
         finally:
             audit.__exit__(None, None, None)
         return JSONResponse(content=_json_safe(data))
@@ -1,7 +1,8 @@
 from __future__ import annotations
 from utils_date import now_tz, _tz
 from db import (
-    get_consolidated_balance, get_launches_by_period, get_summary_by_period,
+    get_consolidated_balance, get_consolidated_balances, get_launches_by_period, get_summary_by_period,
+    report_period_totals,
     list_users_with_daily_report_enabled, list_identities_by_user,
     list_users_with_weekly_report_enabled, list_users_with_monthly_report_enabled,
     list_credit_card_due_reminders, mark_card_reminder_sent,
@@ -134,6 +135,45 @@ def _build_period_report_summary(user_id: int, start_date: date, end_date: date)
     }
 
 
+def closed_week_period(today: date) -> tuple[date, date]:
+    """Semana anterior completa (seg → dom) em relação a `today`."""
+    this_monday = today - timedelta(days=today.weekday())
+    return this_monday - timedelta(days=7), this_monday - timedelta(days=1)
+
+
+def closed_month_period(today: date) -> tuple[date, date]:
+    """Mês anterior completo em relação a `today`."""
+    end = today.replace(day=1) - timedelta(days=1)  # último dia do mês anterior
+    return end.replace(day=1), end
+
+
+def build_report_summaries(user_ids: list[int], start_date: date, end_date: date) -> dict[int, dict[str, str]]:
+    """`_build_period_report_summary` de vários usuários, em três queries.
+
+    Usado pelos resumos agendados do WhatsApp: saldo e totais do período saem
+    agrupados por usuário (db/report_batch.py) em vez de 3 conexões por usuário.
+    """
+    from core.services.plan_service import consolidated_balance_enabled
+
+    balances = get_consolidated_balances(user_ids)
+    totals = report_period_totals(user_ids, start_date, end_date)
+    start, end = start_date.strftime("%d/%m/%Y"), end_date.strftime("%d/%m/%Y")
+
+    out = {}
+    for uid, t in totals.items():
+        cb = balances.get(uid) or {}
+        saldo = cb.get("consolidated") if consolidated_balance_enabled(uid) else cb.get("manual")
+        out[uid] = {
+            "start": start,
+            "end": end,
+            "saldo": _fmt_brl(float(saldo or 0)),
+            "gastos": _fmt_brl(t["despesa"]),
+            "receita": _fmt_brl(t["receita"]),
+            "lancamentos": str(t["lancamentos"]),
+        }
+    return out
+
+
 def build_weekly_report_summary(user_id: int, closed: bool = False) -> dict[str, str]:
     """Resumo semanal.
 
@@ -141,12 +181,10 @@ def build_weekly_report_summary(user_id: int, closed: bool = False) -> dict[str,
     closed=True  (agendado na segunda): semana anterior completa (seg → dom).
     """
     today = now_tz().date()
-    this_monday = today - timedelta(days=today.weekday())
     if closed:
-        start = this_monday - timedelta(days=7)   # segunda da semana passada
-        end   = this_monday - timedelta(days=1)   # domingo da semana passada
+        start, end = closed_week_period(today)
     else:
-        start = this_monday
+        start = today - timedelta(days=today.weekday())
         end   = today
     return _build_period_report_summary(user_id, start, end)
 
@@ -159,8 +197,7 @@ def build_monthly_report_summary(user_id: int, closed: bool = False) -> dict[str
     """
     today = now_tz().date()
     if closed:
-        end   = today.replace(day=1) - timedelta(days=1)  # último dia do mês anterior
-        start = end.replace(day=1)                         # dia 1 do mês anterior
+        start, end = closed_month_period(today)
     else:
         start = today.replace(day=1)
         end   = today
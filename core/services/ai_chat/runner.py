@@ -8,7 +8,8 @@ Fluxo:
   3. Senão, salva msg do user, monta contexto (últimas N msgs) + system prompt,
      chama OpenAI com tools.
   4. Loop function calling:
-       - Read tool → executa, devolve resultado pra IA continuar.
+       - Read tool → executa, devolve resultado pra IA continuar. Reads
+         consecutivos do mesmo turno rodam em paralelo (pool limitado).
        - Write tool → NÃO executa. Vira pending action. IA é informada e
          responde com template 3 ("vou X, confirma?").
   5. Resposta final é salva como assistant message e retornada.
@@ -20,10 +21,14 @@ estão em módulos próprios. Este arquivo só orquestra.
 """
 from __future__ import annotations
 
+import contextvars
 import json
 import logging
 import os
+import threading
+import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from typing import Any
 
@@ -53,6 +58,11 @@ MAX_TOKENS = int(os.getenv("AI_CHAT_MAX_TOKENS", "1024"))
 OPENAI_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", "30"))
 OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_CHAT_MAX_RETRIES", "1"))
 
+# Reads pedidos no mesmo turno (get_balance + get_spending_trend + list_cards)
+# rodam em paralelo: o user espera o mais lento, não a soma. Cada read pega a
+# própria conexão do pool do Postgres, então o teto fica bem abaixo dele.
+TOOL_WORKERS = max(1, int(os.getenv("AI_CHAT_TOOL_WORKERS", "4")))
+
 
 LIMIT_MSG_TEMPLATE = (
     "🐷 Você usou todas suas {limit} perguntas de IA esse mês.\n"
@@ -256,17 +266,18 @@ def _run_tool_loop(client, user_id: int, messages: list[dict[str, Any]]) -> str:
             "tool_calls": tool_calls_dicts,
         })
 
-        terminal_msg: str | None = None
+        calls: list[tuple[str, str, dict[str, Any]]] = []
         for tc_dict in tool_calls_dicts:
-            tc_id = tc_dict["id"]
-            name = tc_dict["function"]["name"]
             try:
                 args = json.loads(tc_dict["function"]["arguments"] or "{}")
             except Exception:
                 args = {}
+            calls.append((tc_dict["id"], tc_dict["function"]["name"], args))
 
-            history_content, this_terminal = _dispatch_tool(user_id, name, args)
-
+        terminal_msg: str | None = None
+        for (tc_id, name, _args), (history_content, this_terminal) in zip(
+            calls, _dispatch_turn(user_id, calls)
+        ):
             db.ai_append_message(
                 user_id,
                 "tool",
@@ -318,6 +329,101 @@ def _maybe_override_trend(tool_calls_dicts: list[dict[str, Any]], user_id: int)
             fn["arguments"] = json.dumps({"months": months})
 
 
+_tool_pool: ThreadPoolExecutor | None = None
+_tool_pool_lock = threading.Lock()
+
+_tool_metrics: dict[str, dict[str, float]] = {}
+_tool_metrics_lock = threading.Lock()
+
+
+def _get_tool_pool() -> ThreadPoolExecutor:
+    global _tool_pool
+    if _tool_pool is None:
+        with _tool_pool_lock:
+            if _tool_pool is None:
+                _tool_pool = ThreadPoolExecutor(
+                    max_workers=TOOL_WORKERS, thread_name_prefix="ai-tool"
+                )
+    return _tool_pool
+
+
+def _is_read_tool(name: str) -> bool:
+    tool = get_tool(name)
+    return tool is not None and not tool.is_write
+
+
+def _dispatch_turn(
+    user_id: int, calls: list[tuple[str, str, dict[str, Any]]]
+) -> list[tuple[str, str | None]]:
+    """Despacha os tool_calls de um turno e devolve os resultados NA ORDEM dos calls.
+
+    Reads consecutivos viram um lote paralelo; write (pending ou auto-executado)
+    e tool desconhecida rodam sozinhos, na ordem, e funcionam como barreira —
+    um read pedido depois de um write continua enxergando o efeito dele.
+    """
+    results: list[tuple[str, str | None]] = []
+    batch: list[tuple[str, dict[str, Any]]] = []
+
+    def flush() -> None:
+        if len(batch) == 1:
+            results.append(_timed_dispatch(user_id, *batch[0]))
+        elif batch:
+            pool = _get_tool_pool()
+            # copy_context: tools leem CURRENT_PLATFORM/CURRENT_USER_MESSAGE
+            futures = [
+                pool.submit(contextvars.copy_context().run, _timed_dispatch, user_id, name, args)
+                for name, args in batch
+            ]
+            results.extend(f.result() for f in futures)
+        batch.clear()
+
+    for _tc_id, name, args in calls:
+        if _is_read_tool(name):
+            batch.append((name, args))
+            continue
+        flush()
+        results.append(_timed_dispatch(user_id, name, args))
+    flush()
+    return results
+
+
+def _timed_dispatch(user_id: int, name: str, args: dict[str, Any]) -> tuple[str, str | None]:
+    t0 = time.perf_counter()
+    try:
+        return _dispatch_tool(user_id, name, args)
+    finally:
+        _record_tool_latency(name, (time.perf_counter() - t0) * 1000.0)
+
+
+def _record_tool_latency(name: str, elapsed_ms: float) -> None:
+    with _tool_metrics_lock:
+        m = _tool_metrics.get(name)
+        if m is None:
+            m = _tool_metrics[name] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0}
+        m["calls"] += 1
+        m["total_ms"] += elapsed_ms
+        m["max_ms"] = max(m["max_ms"], elapsed_ms)
+    logger.debug("ai_chat: tool %s levou %.1fms", name, elapsed_ms)
+
+
+def tool_latency_stats() -> dict[str, Any]:
+    """Latência por tool neste processo (para o painel admin), da que mais
+    soma tempo pra que menos soma."""
+    with _tool_metrics_lock:
+        tools = [
+            {
+                "tool": name,
+                "calls": int(m["calls"]),
+                "total_ms": round(m["total_ms"], 1),
+                "avg_ms": round(m["total_ms"] / m["calls"], 1) if m["calls"] else None,
+                "max_ms": round(m["max_ms"], 1),
+            }
+            for name, m in _tool_metrics.items()
+        ]
+    tools.sort(key=lambda t: t["total_ms"], reverse=True)
+    return {"workers": TOOL_WORKERS, "tools": tools}
+
+
 def _dispatch_tool(user_id: int, name: str, args: dict[str, Any]) -> tuple[str, str | None]:
     """
     Despacha a tool e retorna (history_content, terminal_msg).
@@ -387,4 +493,4 @@ def _dispatch_tool(user_id: int, name: str, args: dict[str, Any]) -> tuple[str,
     return (json.dumps(result, ensure_ascii=False, default=str), None)
 
 
-__all__ = ["chat"]
+__all__ = ["chat", "tool_latency_stats"]
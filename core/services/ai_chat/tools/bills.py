@@ -253,7 +253,7 @@ def _add_boleto_execute(user_id: int, args: dict[str, Any]) -> str:
 
 
 def _check_cashflow(user_id: int, args: dict[str, Any]) -> dict[str, Any]:
-    from core.services.cashflow import project
+    from core.services.cashflow import CashflowForecast
 
     target = _resolve_date(args.get("date"), args.get("days"))
     if target is None:
@@ -263,10 +263,19 @@ def _check_cashflow(user_id: int, args: dict[str, Any]) -> dict[str, Any]:
         extra = float(extra) if extra is not None else 0.0
     except (TypeError, ValueError):
         extra = 0.0
-    p = project(user_id, target, extra)
+    engine = CashflowForecast(user_id, target)
+    p = engine.at(target, extra)
+    # Mesmo carregamento responde o dia mais apertado até o prazo: o saldo final
+    # pode fechar positivo e ainda assim ficar negativo no meio do caminho
+    # (boleto vence antes da receita entrar).
+    low = engine.lowest(target)
+    if low is not None:
+        p["menor_saldo"] = low
     p["note"] = ("projetado = saldo + receitas previstas − gastos fixos − boletos até a data"
                  + (" − boleto novo em análise" if extra > 0 else "")
-                 + ". tranquilo=true significa que o caixa fica positivo até lá.")
+                 + ". tranquilo=true significa que o caixa fica positivo até lá."
+                 + " menor_saldo = dia em que o caixa fica mais baixo antes do prazo"
+                 + (" (sem o boleto novo)" if extra > 0 else "") + ".")
     return p
 
 
@@ -17,6 +17,7 @@ não fechamento contábil.
 from __future__ import annotations
 
 import calendar
+from bisect import bisect_right
 from datetime import date, timedelta
 from typing import Any
 
@@ -32,11 +33,11 @@ def _as_date(v: Any) -> date | None:
         return None
 
 
-def _recurring_value_in_window(day: Any, freq: str, month: Any, start: date | None,
-                               amount: float, after: date, until: date) -> float:
-    """Soma o valor das ocorrências de um recorrente MENSAL/ANUAL em (after, until]."""
-    if until <= after or amount <= 0:
-        return 0.0
+def _recurring_occurrences(day: Any, freq: str, month: Any, start: date | None,
+                           after: date, until: date) -> list[date]:
+    """Datas das ocorrências de um recorrente MENSAL/ANUAL em (after, until]."""
+    if until <= after:
+        return []
     try:
         day = int(day or 1)
     except (TypeError, ValueError):
@@ -46,31 +47,39 @@ def _recurring_value_in_window(day: Any, freq: str, month: Any, start: date | No
         try:
             mnum = int(month)
         except (TypeError, ValueError):
-            return 0.0
-    total = 0.0
+            return []
+    out: list[date] = []
     y, m = after.year, after.month
     while (y, m) <= (until.year, until.month):
         if not (freq == "annual" and mnum and m != mnum):
             dim = calendar.monthrange(y, m)[1]
             d = date(y, m, min(day, dim))
             if after < d <= until and (start is None or d >= start):
-                total += amount
+                out.append(d)
         m += 1
         if m > 12:
             m, y = 1, y + 1
-    return total
+    return out
 
 
-def _open_card_bills_due(user_id: int, until: date) -> float:
-    """Saldo a pagar (total − pago) das faturas de cartão com vencimento até
-    `until` — compromissos que o saldo em conta ainda não reflete (dívida de
-    cartão não sai do saldo). Inclui 'open' (fatura corrente) e 'closed' com saldo
-    (atrasada, ainda a pagar), mesmo critério de `list_bills_with_debt`: o
-    atrasado também sai do caixa antes do alvo, então conta como saída."""
+def _recurring_value_in_window(day: Any, freq: str, month: Any, start: date | None,
+                               amount: float, after: date, until: date) -> float:
+    """Soma o valor das ocorrências de um recorrente MENSAL/ANUAL em (after, until]."""
+    if amount <= 0:
+        return 0.0
+    return amount * len(_recurring_occurrences(day, freq, month, start, after, until))
+
+
+def _open_card_bills(user_id: int) -> list[tuple[date, float]]:
+    """(vencimento, saldo a pagar) das faturas de cartão em aberto — compromissos
+    que o saldo em conta ainda não reflete (dívida de cartão não sai do saldo).
+    Inclui 'open' (fatura corrente) e 'closed' com saldo (atrasada, ainda a
+    pagar), mesmo critério de `list_bills_with_debt`: o atrasado também sai do
+    caixa antes do alvo, então conta como saída."""
     from db.connection import get_conn
     from db.cards import card_bill_due_date
 
-    total = 0.0
+    out: list[tuple[date, float]] = []
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
@@ -89,20 +98,18 @@ def _open_card_bills_due(user_id: int, until: date) -> float:
                 if pe is None:
                     continue
                 due = card_bill_due_date(pe, int(row["closing_day"] or 1), int(row["due_day"] or 1))
-                if due <= until:
-                    total += float(row["remaining"] or 0)
-    return total
+                out.append((due, float(row["remaining"] or 0)))
+    return out
 
 
-def project(user_id: int, target_date: date, extra_amount: float = 0.0) -> dict[str, Any]:
-    """Projeção de caixa até `target_date`, opcionalmente considerando um boleto
-    novo de `extra_amount`. Ver docstring do módulo."""
-    from db.accounts import get_balance
-    from db.recurring import list_recurring_expenses
-    from db.recurring_income import list_recurring_incomes
-    from db.bills import list_bills
+def _open_card_bills_due(user_id: int, until: date) -> float:
+    """Saldo a pagar das faturas de cartão com vencimento até `until`."""
+    return sum(v for due, v in _open_card_bills(user_id) if due <= until)
 
-    today = date.today()
+
+def _load_start_balance(user_id: int) -> tuple[float, str, int]:
+    """(saldo de partida, balance_source, of_bank_count)."""
+    from db.accounts import get_balance
 
     # Saldo de partida: consolidado (carteira + bancos autorizados no Open Finance)
     # quando o usuário tem banco conectado e o consolidado está liberado — senão a
@@ -126,87 +133,190 @@ def project(user_id: int, target_date: date, extra_amount: float = 0.0) -> dict[
         # como indisponível pra a previsão não devolver um número aparentemente
         # confiável sem aviso; o dashboard sinaliza a incerteza. Ver banks_excluded.
         balance_source = "unavailable"
+    return saldo, balance_source, of_bank_count
 
-    # Bancos conectados que NÃO entraram no saldo de partida (gate consolidado
-    # desligado): a projeção parte só da carteira e subestima o caixa → o
-    # dashboard mostra um aviso quando isso acontece. Quando o consolidado falha,
-    # balance_source == "unavailable" cobre o aviso (não sabemos of_bank_count).
-    banks_excluded = of_bank_count > 0 and balance_source == "manual"
-
-    receitas = 0.0
-    for inc in list_recurring_incomes(user_id):
-        if not inc.get("is_active"):
-            continue
-        receitas += _recurring_value_in_window(
-            inc.get("pay_day"), inc.get("frequency") or "monthly", inc.get("pay_month"),
-            _as_date(inc.get("start_date")), float(inc.get("amount") or 0), today, target_date,
-        )
-
-    gastos_fixos = 0.0
-    for e in list_recurring_expenses(user_id):
-        if not e.get("is_active"):
-            continue
-        if (e.get("payment_mode") or "autopay") != "autopay":
-            continue  # 'manual' = boleto; já entra em boletos_ate
-        if (e.get("frequency") or "monthly") not in ("monthly", "annual"):
-            continue  # weekly/daily/once ficam de fora do v1 da projeção
-        gastos_fixos += _recurring_value_in_window(
-            e.get("due_day"), e.get("frequency") or "monthly", e.get("due_month"),
-            _as_date(e.get("start_date")), float(e.get("amount") or 0), today, target_date,
-        )
-
-    boletos = 0.0
-    n_boletos = 0
-    for b in list_bills(user_id, include_paid=False, limit=1000):
-        if b.get("status") != "pending":
-            continue
-        d = _as_date(b.get("due_date"))
-        if d and d <= target_date:
-            boletos += float(b.get("amount") or 0)
-            n_boletos += 1
-
-    faturas_cartao = _open_card_bills_due(user_id, target_date)
-
-    extra = float(extra_amount or 0)
-    projetado = saldo + receitas - gastos_fixos - boletos - faturas_cartao - extra
-    return {
-        "today": today.isoformat(),
-        "target": target_date.isoformat(),
-        "saldo_atual": round(saldo, 2),
-        "balance_source": balance_source,
-        "of_bank_count": of_bank_count,
-        "banks_excluded": banks_excluded,
-        "receitas_previstas": round(receitas, 2),
-        "gastos_fixos_previstos": round(gastos_fixos, 2),
-        "boletos_ate": round(boletos, 2),
-        "n_boletos": n_boletos,
-        "faturas_cartao": round(faturas_cartao, 2),
-        "boleto_novo": round(extra, 2),
-        "projetado": round(projetado, 2),
-        "tranquilo": projetado >= 0,
-    }
+
+# Tipos de evento da linha do tempo (índice nas somas acumuladas).
+_RECEITA, _GASTO_FIXO, _BOLETO, _FATURA = 0, 1, 2, 3
+
+
+class CashflowForecast:
+    """Motor de projeção: carrega as entradas do usuário UMA vez e responde
+    quantas datas-alvo forem pedidas.
+
+    As entradas (saldo, recorrentes, boletos pendentes, faturas em aberto) viram
+    uma linha do tempo de eventos diários ordenada por data, com somas
+    acumuladas por tipo. Projetar até D é uma busca binária na linha do tempo —
+    30/60/90 dias, várias datas de um boleto ou a curva diária do gráfico custam
+    o mesmo que uma projeção só. Semântica idêntica à de `project` (ver
+    docstring do módulo).
+
+    Recorrentes são expandidos até `horizon`; pedir uma data além dele
+    reexpande a partir das entradas já carregadas, sem voltar ao banco.
+    """
+
+    def __init__(self, user_id: int, horizon: date | None = None):
+        from db.recurring import list_recurring_expenses
+        from db.recurring_income import list_recurring_incomes
+        from db.bills import list_bills
+
+        self.user_id = user_id
+        self.today = date.today()
+        self.saldo, self.balance_source, self.of_bank_count = _load_start_balance(user_id)
+        # Bancos conectados que NÃO entraram no saldo de partida (gate consolidado
+        # desligado): a projeção parte só da carteira e subestima o caixa → o
+        # dashboard mostra um aviso quando isso acontece. Quando o consolidado falha,
+        # balance_source == "unavailable" cobre o aviso (não sabemos of_bank_count).
+        self.banks_excluded = self.of_bank_count > 0 and self.balance_source == "manual"
+
+        # (kind, day, freq, month, start, amount) dos recorrentes que entram
+        self._recurring: list[tuple[int, Any, str, Any, date | None, float]] = []
+        for inc in list_recurring_incomes(user_id):
+            if not inc.get("is_active"):
+                continue
+            self._recurring.append((
+                _RECEITA, inc.get("pay_day"), inc.get("frequency") or "monthly", inc.get("pay_month"),
+                _as_date(inc.get("start_date")), float(inc.get("amount") or 0),
+            ))
+        for e in list_recurring_expenses(user_id):
+            if not e.get("is_active"):
+                continue
+            if (e.get("payment_mode") or "autopay") != "autopay":
+                continue  # 'manual' = boleto; já entra em boletos_ate
+            if (e.get("frequency") or "monthly") not in ("monthly", "annual"):
+                continue  # weekly/daily/once ficam de fora do v1 da projeção
+            self._recurring.append((
+                _GASTO_FIXO, e.get("due_day"), e.get("frequency") or "monthly", e.get("due_month"),
+                _as_date(e.get("start_date")), float(e.get("amount") or 0),
+            ))
+
+        # Boletos e faturas têm data fixa (inclusive vencidos, que também saem
+        # do caixa antes de qualquer alvo futuro).
+        self._fixed: list[tuple[date, int, float]] = []
+        for b in list_bills(user_id, include_paid=False, limit=1000):
+            if b.get("status") != "pending":
+                continue
+            d = _as_date(b.get("due_date"))
+            if d:
+                self._fixed.append((d, _BOLETO, float(b.get("amount") or 0)))
+        for due, remaining in _open_card_bills(user_id):
+            self._fixed.append((due, _FATURA, remaining))
+
+        self._build(horizon or self.today)
+
+    def _build(self, horizon: date) -> None:
+        events = list(self._fixed)
+        for kind, day, freq, month, start, amount in self._recurring:
+            if amount <= 0:
+                continue
+            for d in _recurring_occurrences(day, freq, month, start, self.today, horizon):
+                events.append((d, kind, amount))
+        events.sort(key=lambda ev: ev[0])
+
+        self.horizon = horizon
+        self._dates: list[date] = []
+        # _acc[i] = somas por tipo (+ nº de boletos) dos eventos [0, i)
+        self._acc: list[tuple[float, float, float, float, int]] = [(0.0, 0.0, 0.0, 0.0, 0)]
+        for d, kind, amount in events:
+            r, g, bo, fa, nb = self._acc[-1]
+            if kind == _RECEITA:
+                r += amount
+            elif kind == _GASTO_FIXO:
+                g += amount
+            elif kind == _BOLETO:
+                bo += amount
+                nb += 1
+            else:
+                fa += amount
+            self._dates.append(d)
+            self._acc.append((r, g, bo, fa, nb))
+
+    def _totals(self, target: date) -> tuple[float, float, float, float, int]:
+        if target > self.horizon:
+            self._build(target)
+        return self._acc[bisect_right(self._dates, target)]
+
+    def at(self, target_date: date, extra_amount: float = 0.0) -> dict[str, Any]:
+        """Projeção até `target_date` — mesmo dict de `project`."""
+        receitas, gastos_fixos, boletos, faturas_cartao, n_boletos = self._totals(target_date)
+        extra = float(extra_amount or 0)
+        projetado = self.saldo + receitas - gastos_fixos - boletos - faturas_cartao - extra
+        return {
+            "today": self.today.isoformat(),
+            "target": target_date.isoformat(),
+            "saldo_atual": round(self.saldo, 2),
+            "balance_source": self.balance_source,
+            "of_bank_count": self.of_bank_count,
+            "banks_excluded": self.banks_excluded,
+            "receitas_previstas": round(receitas, 2),
+            "gastos_fixos_previstos": round(gastos_fixos, 2),
+            "boletos_ate": round(boletos, 2),
+            "n_boletos": n_boletos,
+            "faturas_cartao": round(faturas_cartao, 2),
+            "boleto_novo": round(extra, 2),
+            "projetado": round(projetado, 2),
+            "tranquilo": projetado >= 0,
+        }
+
+    def curve(self, until: date) -> list[dict[str, Any]]:
+        """Saldo projetado dia a dia de hoje até `until` (gráfico do dashboard).
+
+        Uma passada só pela linha do tempo: soma corrente, sem bisect por dia.
+        """
+        self._totals(until)
+        i = bisect_right(self._dates, self.today)
+        r, g, bo, fa, _nb = self._acc[i]
+        running = self.saldo + r - g - bo - fa
+        out: list[dict[str, Any]] = []
+        d = self.today
+        while d <= until:
+            while i < len(self._dates) and self._dates[i] <= d:
+                prev, cur = self._acc[i], self._acc[i + 1]
+                running += (cur[0] - prev[0]) - (cur[1] - prev[1]) - (cur[2] - prev[2]) - (cur[3] - prev[3])
+                i += 1
+            out.append({"date": d.isoformat(), "projetado": round(running, 2)})
+            d += timedelta(days=1)
+        return out
+
+    def lowest(self, until: date) -> dict[str, Any] | None:
+        """Dia de menor saldo projetado entre hoje e `until` (onde mais aperta)."""
+        points = self.curve(until)
+        return min(points, key=lambda p: p["projetado"]) if points else None
+
+
+def project(user_id: int, target_date: date, extra_amount: float = 0.0) -> dict[str, Any]:
+    """Projeção de caixa até `target_date`, opcionalmente considerando um boleto
+    novo de `extra_amount`. Ver docstring do módulo; pra várias datas do mesmo
+    usuário, use `CashflowForecast` direto."""
+    return CashflowForecast(user_id, target_date).at(target_date, extra_amount)
 
 
-def forecast_horizons(user_id: int, horizons: tuple[int, ...] = (30, 60, 90)) -> dict[str, Any]:
+def forecast_horizons(user_id: int, horizons: tuple[int, ...] = (30, 60, 90),
+                      include_curve: bool = False) -> dict[str, Any]:
     """Previsão de saldo em vários horizontes (default 30/60/90 dias).
 
-    Feature paga (Pro+): reusa `project()` em hoje+N pra cada N e devolve
-    ``{"today": ..., "horizons": {"30": <projeção>, "60": ..., "90": ...}}`` —
-    formato pensado pro card do dashboard e pra tool de IA. Cada projeção mantém
-    a mesma semântica de `project` (saldo + receitas fixas − gastos fixos −
-    boletos até a data); ver docstring do módulo."""
+    Feature paga (Pro+): uma `CashflowForecast` só responde hoje+N pra cada N e
+    devolve ``{"today": ..., "horizons": {"30": <projeção>, "60": ..., "90": ...}}``
+    — formato pensado pro card do dashboard e pra tool de IA. Cada projeção
+    mantém a mesma semântica de `project` (saldo + receitas fixas − gastos fixos
+    − boletos até a data); ver docstring do módulo. `include_curve` acrescenta
+    ``"curve"`` com o saldo dia a dia até o maior horizonte."""
     today = date.today()
-    hz = {str(n): project(user_id, today + timedelta(days=n)) for n in horizons}
-    # A origem do saldo é a mesma em todos os horizontes; sobe pro topo pra o
-    # dashboard renderizar o aviso sem precisar abrir cada projeção.
-    any_h = next(iter(hz.values()), {})
-    return {
+    last = today + timedelta(days=max(horizons, default=0))
+    engine = CashflowForecast(user_id, last)
+    hz = {str(n): engine.at(today + timedelta(days=n)) for n in horizons}
+    out = {
         "today": today.isoformat(),
-        "balance_source": any_h.get("balance_source", "manual"),
-        "of_bank_count": any_h.get("of_bank_count", 0),
-        "banks_excluded": any_h.get("banks_excluded", False),
+        # A origem do saldo é a mesma em todos os horizontes; sobe pro topo pra o
+        # dashboard renderizar o aviso sem precisar abrir cada projeção.
+        "balance_source": engine.balance_source,
+        "of_bank_count": engine.of_bank_count,
+        "banks_excluded": engine.banks_excluded,
         "horizons": hz,
     }
+    if include_curve:
+        out["curve"] = engine.curve(last)
+    return out
 
 
-__all__ = ["project", "forecast_horizons"]
+__all__ = ["CashflowForecast", "project", "forecast_horizons"]
@@ -8,12 +8,10 @@ from typing import Optional
 
 from utils_text import (
     normalize_text,
-    LOCAL_RULES,
+    LOCAL_RULES_MATCHER,
     contains_word,
     extract_memory_candidates,
     canonicalize_category_label,
-    EXACT_WORD_KEYWORDS,
-    KEYWORD_BLOCKERS,
     STOPWORDS_PT,
     MEMORY_NOISE_TOKENS,
     MEMORY_STOP_TOKENS,
@@ -135,28 +133,16 @@ def local_rule_category(text_norm: str) -> str | None:
     """
     if not text_norm:
         return None
-    for keywords, cat2 in LOCAL_RULES:
-        for kw in keywords:
-            kw_norm = normalize_text(kw)
-            if not kw_norm:
-                continue
-            # Casos que devem ser palavra inteira:
-            #  - keyword muito curta (≤3): evita "lca" bater em "cavalcante"
-            #  - keyword na lista EXACT_WORD_KEYWORDS: evita "acoes" bater em
-            #    "transações", "investi" em "investigar", etc.
-            if len(kw_norm) <= 3 or kw_norm in EXACT_WORD_KEYWORDS:
-                ok = contains_word(text_norm, kw_norm)
-            else:
-                ok = contains_word(text_norm, kw_norm) or (kw_norm in text_norm)
-
-            # Contexto que invalida a keyword (ex.: "feira" em "sexta-feira").
-            blocker = KEYWORD_BLOCKERS.get(kw_norm)
-            if ok and blocker and blocker.search(text_norm):
-                ok = False
-
-            if ok:
-                return canonicalize_category_label(cat2)
-    return None
+    # Casos que devem ser palavra inteira (ver LOCAL_RULES_MATCHER):
+    #  - keyword muito curta (≤3): evita "lca" bater em "cavalcante"
+    #  - keyword na lista EXACT_WORD_KEYWORDS: evita "acoes" bater em
+    #    "transações", "investi" em "investigar", etc.
+    # Contexto que invalida a keyword (ex.: "feira" em "sexta-feira") sai de
+    # KEYWORD_BLOCKERS dentro do matcher.
+    hit = LOCAL_RULES_MATCHER.first(text_norm)
+    if hit is None:
+        return None
+    return canonicalize_category_label(hit[1])
 
 
 def infer_category(user_id: int, text_base: str, explicit_category: str | None = None, *, allow_ai: bool = True) -> InferResult:
@@ -0,0 +1,195 @@
+"""
+Aviso "o usuário X mudou" entre processos — pub/sub sobre LISTEN/NOTIFY.
+
+O ConnectionManager do dashboard só enxerga os WebSockets do próprio worker.
+Com mais de um worker uvicorn (ou réplica), ou com a escrita vindo de outro
+processo (bot do Discord, worker do WhatsApp, sync do Open Finance, cobrador de
+recorrentes), o aviso precisa passar pelo banco:
+
+- toda escrita nas tabelas do snapshot já avisa sozinha: a trigger de
+  dashboard_versions faz `pg_notify('user_changes', ...)` no commit (db/schema.py);
+- eventos que não são escrita (ex.: "banco sincronizou") saem por
+  `publish_user_change` / `publish_user_change_async`;
+- cada web worker roda `ChangeBus.listen(handler)` e repassa pros sockets
+  locais — o ConnectionManager já coalesce rajadas num push só.
+
+Payload: JSON com `user_id`, `event` ("changed" quando omitido) e campos extras.
+
+CHANGE_BUS=local troca o Postgres por um barramento em memória do processo
+(testes, dev com um worker só): publica e entrega no mesmo event loop, sem
+ver o que outros processos escrevem. CHANGE_BUS=off desliga a escuta e a
+publicação explícita.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "user_changes"
+DEFAULT_EVENT = "changed"
+
+# (user_id, event, extras) → None. Chamado no event loop do listener.
+ChangeHandler = Callable[[int, str, dict], Awaitable[None] | None]
+
+_RECONNECT_MAX_SECONDS = 30.0
+
+
+def _backend() -> str:
+    return (os.getenv("CHANGE_BUS") or "postgres").strip().lower()
+
+
+def _encode(user_id: int, event: str, data: dict) -> str:
+    payload = {"user_id": int(user_id), **data}
+    if event != DEFAULT_EVENT:
+        payload["event"] = event
+    return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _decode(raw: str) -> tuple[int, str, dict] | None:
+    try:
+        payload = json.loads(raw)
+        user_id = int(payload.pop("user_id"))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        logger.warning("change_bus: payload inválido: %r", raw)
+        return None
+    return user_id, str(payload.pop("event", DEFAULT_EVENT)), payload
+
+
+# ─── Publicação ──────────────────────────────────────────────────────────────
+
+def publish_user_change(user_id: int, event: str = DEFAULT_EVENT, *, conn=None, **data: Any) -> None:
+    """Avisa todos os web workers que `user_id` mudou (síncrono, qualquer processo).
+
+    Com `conn`, o NOTIFY entra na transação do chamador e só sai no commit —
+    quem receber já lê o dado novo. Sem `conn`, usa uma conexão do pool e
+    commita na hora. Best-effort: falha vira warning, a escrita já aconteceu.
+    """
+    payload = _encode(user_id, event, data)
+    if _backend() == "off":
+        return
+    if _backend() == "local":
+        LocalChangeBus.deliver(payload)
+        return
+    try:
+        if conn is not None:
+            conn.execute("select pg_notify(%s, %s)", (CHANNEL, payload))
+            return
+        from db.connection import get_conn
+
+        with get_conn() as own:
+            own.execute("select pg_notify(%s, %s)", (CHANNEL, payload))
+            own.commit()
+    except Exception as exc:
+        logger.warning("change_bus: falha ao publicar %s: %s", payload, exc)
+
+
+async def publish_user_change_async(user_id: int, event: str = DEFAULT_EVENT, **data: Any) -> None:
+    """`publish_user_change` pra quem está no event loop (não bloqueia o loop)."""
+    if _backend() == "off":
+        return
+    if _backend() == "local":
+        LocalChangeBus.deliver(_encode(user_id, event, data))
+        return
+    await asyncio.to_thread(publish_user_change, user_id, event, **data)
+
+
+# ─── Escuta ──────────────────────────────────────────────────────────────────
+
+async def _dispatch(handler: ChangeHandler, raw: str) -> None:
+    decoded = _decode(raw)
+    if decoded is None:
+        return
+    try:
+        result = handler(*decoded)
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as exc:  # um handler com erro não derruba a escuta
+        logger.warning("change_bus: handler falhou para %s: %s", raw, exc)
+
+
+class LocalChangeBus:
+    """Barramento em memória: entrega pra quem está escutando neste processo."""
+
+    _queues: set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+
+    @classmethod
+    def deliver(cls, payload: str) -> None:
+        for loop, queue in list(cls._queues):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, payload)
+            except RuntimeError:  # loop já fechado
+                cls._queues.discard((loop, queue))
+
+    async def listen(self, handler: ChangeHandler,
+                     on_reconnect: Callable[[], None] | None = None) -> None:
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        self._queues.add(entry)
+        try:
+            while True:
+                await _dispatch(handler, await entry[1].get())
+        finally:
+            self._queues.discard(entry)
+
+
+class PostgresChangeBus:
+    """LISTEN numa conexão dedicada (fora do pool), com reconexão.
+
+    NOTIFY perdido enquanto a conexão estava caída não volta: ao reconectar,
+    `on_reconnect` avisa o dono pra tratar tudo como possivelmente mudado.
+    """
+
+    def __init__(self, dsn: str | None = None):
+        self.dsn = dsn
+
+    async def listen(self, handler: ChangeHandler,
+                     on_reconnect: Callable[[], None] | None = None) -> None:
+        import psycopg
+
+        delay = 1.0
+        connected_before = False
+        while True:
+            try:
+                dsn = self.dsn or os.getenv("DATABASE_URL")
+                if not dsn:
+                    raise RuntimeError("DATABASE_URL não está definido.")
+                async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    delay = 1.0
+                    if connected_before and on_reconnect is not None:
+                        on_reconnect()
+                    connected_before = True
+                    async for notify in conn.notifies():
+                        await _dispatch(handler, notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("change_bus: escuta caiu (%s); reconectando em %.0fs", exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _RECONNECT_MAX_SECONDS)
+
+
+ChangeBus = LocalChangeBus | PostgresChangeBus
+
+
+def get_change_bus() -> ChangeBus | None:
+    """Backend escolhido por CHANGE_BUS: postgres (padrão), local ou off (None)."""
+    backend = _backend()
+    if backend == "off":
+        return None
+    return LocalChangeBus() if backend == "local" else PostgresChangeBus()
+
+
+__all__ = [
+    "CHANNEL",
+    "ChangeBus",
+    "LocalChangeBus",
+    "PostgresChangeBus",
+    "get_change_bus",
+    "publish_user_change",
+    "publish_user_change_async",
+]
@@ -4,6 +4,10 @@ Atualização automática dos investimentos.
 O cálculo de juros é idempotente por investimento/lote porque usa last_date.
 Assim, o loop pode rodar algumas vezes ao dia: ele só aplica datas novas quando
 taxas oficiais novas estiverem disponíveis.
+
+Cada passada começa pelo refresh das séries do BCB (db.refresh_market_rates):
+é o único ponto do app que busca CDI/Selic/IPCA na rede. O accrual — aqui e no
+dashboard — só lê o cache local de market_rates.
 """
 from __future__ import annotations
 
@@ -17,6 +21,7 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CHECK_INTERVAL_HOURS = 6
 DEFAULT_STARTUP_DELAY_SECONDS = 90
+DEFAULT_BATCH_USERS = 500
 
 
 def _interval_seconds() -> int:
@@ -36,28 +41,77 @@ def _startup_delay_seconds() -> int:
         return DEFAULT_STARTUP_DELAY_SECONDS
 
 
+def refresh_market_rates_safely() -> dict[str, int]:
+    import db
+
+    try:
+        return db.refresh_market_rates()
+    except Exception as exc:
+        logger.warning("Falha ao atualizar taxas do BCB: %s", exc, exc_info=True)
+        log_system_event_sync(
+            "warning",
+            "market_rates_refresh_failed",
+            f"Falha ao atualizar taxas oficiais (CDI/Selic/IPCA): {exc}",
+            source="investment_scheduler",
+        )
+        return {}
+
+
+def _batch_size() -> int:
+    raw = os.getenv("INVESTMENT_ACCRUAL_BATCH_USERS", str(DEFAULT_BATCH_USERS))
+    try:
+        return max(int(raw), 1)
+    except ValueError:
+        return DEFAULT_BATCH_USERS
+
+
+def _accrue_user(user_id: int) -> bool:
+    import db
+
+    try:
+        db.accrue_all_investments(user_id)
+        return True
+    except Exception as exc:
+        logger.warning("Falha ao atualizar investimentos user_id=%s: %s", user_id, exc, exc_info=True)
+        log_system_event_sync(
+            "warning",
+            "investment_accrual_user_failed",
+            f"Falha ao atualizar investimentos automaticamente: {exc}",
+            source="investment_scheduler",
+            user_id=user_id,
+        )
+        return False
+
+
 def accrue_all_users_investments() -> dict[str, int]:
+    """Accrual de todos os usuários em blocos de INVESTMENT_ACCRUAL_BATCH_USERS.
+
+    Cada bloco é uma transação set-based (db.accrue_investments_for_users). Se
+    o bloco falhar, refaz usuário a usuário para isolar quem quebrou sem
+    perder o resto do bloco.
+    """
     import db
 
     user_ids = db.list_users_with_investments()
     updated = 0
     failed = 0
+    lots = 0
+    size = _batch_size()
 
-    for user_id in user_ids:
+    for i in range(0, len(user_ids), size):
+        chunk = user_ids[i:i + size]
         try:
-            db.accrue_all_investments(user_id)
-            updated += 1
+            lots += db.accrue_investments_for_users(chunk)
+            updated += len(chunk)
         except Exception as exc:
-            failed += 1
-            logger.warning("Falha ao atualizar investimentos user_id=%s: %s", user_id, exc, exc_info=True)
-            log_system_event_sync(
-                "warning",
-                "investment_accrual_user_failed",
-                f"Falha ao atualizar investimentos automaticamente: {exc}",
-                source="investment_scheduler",
-                user_id=user_id,
-            )
-
+            logger.warning("Falha no accrual em bloco (%s usuários), refazendo um a um: %s", len(chunk), exc)
+            for user_id in chunk:
+                if _accrue_user(user_id):
+                    updated += 1
+                else:
+                    failed += 1
+
+    logger.info("[investments] accrual em lote: %s lote(s) alterado(s)", lots)
     return {"users": len(user_ids), "updated": updated, "failed": failed}
 
 
@@ -67,6 +121,7 @@ async def run_investment_accrual_loop() -> None:
 
     while True:
         try:
+            await asyncio.to_thread(refresh_market_rates_safely)
             result = await asyncio.to_thread(accrue_all_users_investments)
             logger.info(
                 "[investments] accrual automatico concluido users=%s updated=%s failed=%s",
@@ -19,9 +19,19 @@ Dois mundos atrás do flag PLANS_V2_ENABLED (lido dinâmico, sem redeploy):
 A FastAPI dependency `require_pro_feature` vive em
 frontend/finance_bot_websocket_custom.py para evitar import circular com
 _get_current_user — ela usa os helpers daqui.
+
+Cache de plano: os campos de plano de auth_accounts ficam num cache por
+processo (TTL PLAN_CACHE_TTL_SECONDS), então um request/mensagem resolve o
+plano no máximo uma vez mesmo chamando is_pro/get_plan_tier/get_user_limits
+várias vezes. A validade (plan_expires_at) é checada a cada chamada, não no
+cache. Quem grava plano (db.update_user_plan, set_payment_status,
+mark_plan_selected, grant do admin, merge de usuários) chama
+invalidate_plan_cache; em outros processos vale o TTL.
 """
 
 import os
+import threading
+import time
 from datetime import date, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
@@ -46,6 +56,16 @@ _STORED_PLAN_TO_TIER = {
 
 TRIAL_DAYS_DEFAULT = 30
 
+PLAN_CACHE_TTL_DEFAULT_SECONDS = 60.0
+
+# Só o que a resolução de plano lê — o resto de auth_accounts (email, hash de
+# senha, PII) não fica no cache.
+_PLAN_FIELDS = ("plan", "plan_expires_at", "plan_selected_at")
+
+_plan_cache: dict[int, tuple[float, dict | None]] = {}
+_plan_cache_lock = threading.Lock()
+_plan_cache_counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
 
 def plans_v2_enabled() -> bool:
     """Escada de tiers + trial via Stripe. LANÇADA 2026-08-06: default LIGADO
@@ -65,6 +85,58 @@ def trial_days_total() -> int:
         return TRIAL_DAYS_DEFAULT
 
 
+def _plan_cache_ttl() -> float:
+    try:
+        return max(float(os.getenv("PLAN_CACHE_TTL_SECONDS", PLAN_CACHE_TTL_DEFAULT_SECONDS)), 0.0)
+    except ValueError:
+        return PLAN_CACHE_TTL_DEFAULT_SECONDS
+
+
+def _get_plan_user(user_id: int) -> dict | None:
+    """Campos de plano de auth_accounts, via cache por processo."""
+    user_id = int(user_id)
+    now = time.monotonic()
+    with _plan_cache_lock:
+        cached = _plan_cache.get(user_id)
+        if cached is not None and now - cached[0] < _plan_cache_ttl():
+            _plan_cache_counters["hits"] += 1
+            return cached[1]
+        _plan_cache_counters["misses"] += 1
+        generation = _plan_cache_counters["invalidations"]
+
+    user = get_auth_user(user_id)
+    plan_user = {key: user.get(key) for key in _PLAN_FIELDS} if user else None
+    with _plan_cache_lock:
+        # Invalidação no meio da leitura (webhook gravando plano): o valor lido
+        # pode ser o antigo, então não entra no cache.
+        if _plan_cache_counters["invalidations"] == generation:
+            _plan_cache[user_id] = (now, plan_user)
+    return plan_user
+
+
+def invalidate_plan_cache(user_id: int | None = None) -> None:
+    """Descarta o plano em cache de `user_id` (ou de todos)."""
+    with _plan_cache_lock:
+        if user_id is None:
+            _plan_cache.clear()
+        else:
+            _plan_cache.pop(int(user_id), None)
+        _plan_cache_counters["invalidations"] += 1
+
+
+def plan_cache_stats() -> dict:
+    """Contadores do cache de plano (para o painel admin)."""
+    with _plan_cache_lock:
+        hits = _plan_cache_counters["hits"]
+        misses = _plan_cache_counters["misses"]
+        return {
+            **_plan_cache_counters,
+            "size": len(_plan_cache),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "ttl_seconds": _plan_cache_ttl(),
+        }
+
+
 def _paid_plan_active(user: dict) -> bool:
     """Assinatura paga (qualquer tier) vigente? Defensivo: se plan_expires_at
     já passou mas o webhook não rebaixou ainda (evento perdido), trata como
@@ -111,7 +183,7 @@ def get_plan_tier(user_id: int) -> str:
     vigente = free (cadastro novo entra Grátis; não há mais trial sem cartão).
     Com PLANS_V2_ENABLED off, colapsa no binário legado (pro→plus, resto free)
     pra quem chamar isto cedo demais não ver nada diferente do is_pro."""
-    user = get_auth_user(int(user_id))
+    user = _get_plan_user(user_id)
     if not user:
         return "free"
     stored = (user.get("plan") or "").lower()
@@ -131,7 +203,7 @@ def is_pro(user_id: int) -> bool:
     """
     if plans_v2_enabled():
         return tier_at_least(get_plan_tier(int(user_id)), "plus")
-    user = get_auth_user(int(user_id))
+    user = _get_plan_user(user_id)
     if not user:
         return False
     plan = (user.get("plan") or "").lower()
@@ -281,7 +353,7 @@ def needs_plan_selection(user_id: int, user: dict | None = None) -> bool:
     if not plans_v2_enabled():
         return False
     if user is None:
-        user = get_auth_user(int(user_id))
+        user = _get_plan_user(user_id)
     if not user:
         return False
     if user.get("plan_selected_at"):
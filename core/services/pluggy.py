@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import os
+import threading
 import time
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 from typing import Any
 from urllib.parse import parse_qs, urlparse
 
@@ -47,21 +50,47 @@ def _raise_for_pluggy_response(resp: httpx.Response, context: str) -> None:
     raise PluggyApiError(f"{context}: Pluggy retornou HTTP {resp.status_code}: {detail}")
 
 
-def create_pluggy_api_key() -> str:
-    """
-    Gera uma API Key temporaria da Pluggy no servidor.
-    Nunca exponha clientSecret ou apiKey no frontend.
-    """
-    configured = _configured_api_key()
-    if configured:
-        return configured
+# API Key gerada via /auth, reaproveitada em processo até perto de expirar. A
+# Pluggy emite a chave com validade de 2h; o TTL (PLUGGY_API_KEY_TTL) fica abaixo
+# disso pra nunca mandar uma chave no limite. Sem o cache, cada sync/refresh de
+# item pagava um POST /auth antes de qualquer leitura.
+_API_KEY_CACHE: dict[str, Any] = {}
+_API_KEY_LOCK = threading.Lock()
+
+
+def _api_key_ttl() -> float:
+    try:
+        return max(0.0, float(os.getenv("PLUGGY_API_KEY_TTL", "6600")))
+    except ValueError:
+        return 6600.0
+
 
+def _cached_api_key() -> str | None:
+    with _API_KEY_LOCK:
+        key = _API_KEY_CACHE.get("key")
+        if key and time.monotonic() < _API_KEY_CACHE.get("expires_at", 0.0):
+            return key
+    return None
+
+
+def _store_api_key(key: str) -> None:
+    with _API_KEY_LOCK:
+        _API_KEY_CACHE["key"] = key
+        _API_KEY_CACHE["expires_at"] = time.monotonic() + _api_key_ttl()
+
+
+def invalidate_pluggy_api_key() -> None:
+    """Descarta a API Key em cache (a próxima chamada gera outra via /auth)."""
+    with _API_KEY_LOCK:
+        _API_KEY_CACHE.clear()
+
+
+def _auth_payload() -> dict[str, str]:
     client_id, client_secret = _client_credentials()
-    with httpx.Client(timeout=_pluggy_timeout()) as client:
-        resp = client.post(
-            f"{_pluggy_base_url()}/auth",
-            json={"clientId": client_id, "clientSecret": client_secret},
-        )
+    return {"clientId": client_id, "clientSecret": client_secret}
+
+
+def _api_key_from_auth_response(resp: httpx.Response) -> str:
     _raise_for_pluggy_response(resp, "Falha ao autenticar na Pluggy")
     data = resp.json()
     api_key = data.get("apiKey") or data.get("accessToken")
@@ -70,6 +99,26 @@ def create_pluggy_api_key() -> str:
     return str(api_key)
 
 
+def create_pluggy_api_key() -> str:
+    """
+    Gera uma API Key temporaria da Pluggy no servidor (reaproveitada em processo
+    até PLUGGY_API_KEY_TTL). Nunca exponha clientSecret ou apiKey no frontend.
+    """
+    configured = _configured_api_key()
+    if configured:
+        return configured
+    cached = _cached_api_key()
+    if cached:
+        return cached
+
+    payload = _auth_payload()
+    with httpx.Client(timeout=_pluggy_timeout()) as client:
+        resp = client.post(f"{_pluggy_base_url()}/auth", json=payload)
+    api_key = _api_key_from_auth_response(resp)
+    _store_api_key(api_key)
+    return api_key
+
+
 def _pluggy_get(path: str, api_key: str, params: dict[str, Any] | None = None) -> dict:
     """GET autenticado na Pluggy. `path` começa com '/'."""
     with httpx.Client(timeout=_pluggy_timeout()) as client:
@@ -254,3 +303,131 @@ def create_pluggy_connect_token(user_id: int, webhook_url: str | None = None) ->
         "raw": data,
         "options": options,
     }
+
+
+def _pluggy_max_connections() -> int:
+    try:
+        return max(1, int(os.getenv("PLUGGY_MAX_CONNECTIONS", "20")))
+    except ValueError:
+        return 20
+
+
+class AsyncPluggyClient:
+    """Cliente assíncrono da Pluggy pro sync/refresh em lote.
+
+    Um `httpx.AsyncClient` só (pool de até PLUGGY_MAX_CONNECTIONS conexões
+    keep-alive) compartilhado por todas as chamadas, e a API Key do cache de
+    processo — gerada uma vez e renovada sozinha quando expira ou a Pluggy
+    responde 401/403. Use como `async with AsyncPluggyClient() as client:`; o
+    tick de refresh mantém um aberto pela vida do processo.
+
+    As requisições saem por `send` (não pelos verbos do httpx), o mesmo ponto
+    que o kill switch de rede dos testes guarda; `transport` troca o destino
+    (ex.: servidor Pluggy fake em memória).
+    """
+
+    def __init__(self, *, transport: httpx.AsyncBaseTransport | None = None,
+                 max_connections: int | None = None):
+        limit = max_connections or _pluggy_max_connections()
+        self._client = httpx.AsyncClient(
+            base_url=_pluggy_base_url(),
+            timeout=_pluggy_timeout(),
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            transport=transport,
+        )
+        self._auth_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncPluggyClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def api_key(self) -> str:
+        configured = _configured_api_key()
+        if configured:
+            return configured
+        cached = _cached_api_key()
+        if cached:
+            return cached
+        # Um /auth só mesmo com dezenas de itens pedindo a chave ao mesmo tempo.
+        async with self._auth_lock:
+            cached = _cached_api_key()
+            if cached:
+                return cached
+            req = self._client.build_request("POST", "/auth", json=_auth_payload())
+            api_key = _api_key_from_auth_response(await self._client.send(req))
+            _store_api_key(api_key)
+            return api_key
+
+    async def _request(self, method: str, path: str, context: str, *,
+                       params: dict[str, Any] | None = None,
+                       json: Any = None, accept: tuple[int, ...] = ()) -> httpx.Response:
+        for attempt in (0, 1):
+            key = await self.api_key()
+            req = self._client.build_request(
+                method, path, headers={"X-API-KEY": key}, params=params or {}, json=json,
+            )
+            resp = await self._client.send(req)
+            if resp.status_code in (401, 403) and attempt == 0 and not _configured_api_key():
+                invalidate_pluggy_api_key()  # chave expirou antes do TTL: gera outra
+                continue
+            if resp.status_code in accept:
+                return resp
+            _raise_for_pluggy_response(resp, context)
+            return resp
+        return resp
+
+    async def _get(self, path: str, params: dict[str, Any] | None = None) -> dict:
+        resp = await self._request("GET", path, f"Falha ao consultar {path} na Pluggy", params=params)
+        return resp.json()
+
+    async def get_item(self, item_id: str) -> dict:
+        return await self._get(f"/items/{item_id}")
+
+    async def update_item(self, item_id: str) -> dict:
+        """PATCH /items/{id} — mesma semântica de `update_pluggy_item`."""
+        resp = await self._request(
+            "PATCH", f"/items/{item_id}", f"Falha ao atualizar item {item_id} na Pluggy", json={},
+        )
+        return resp.json()
+
+    async def list_accounts(self, item_id: str) -> list[dict]:
+        results = (await self._get("/accounts", {"itemId": item_id})).get("results")
+        return list(results) if isinstance(results, list) else []
+
+    async def list_investments(self, item_id: str) -> list[dict]:
+        results = (await self._get("/investments", {"itemId": item_id})).get("results")
+        return list(results) if isinstance(results, list) else []
+
+    async def list_transactions(
+        self,
+        account_id: str,
+        *,
+        max_pages: int = 60,
+        on_page: "Callable[[], Awaitable[None] | None] | None" = None,
+    ) -> list[dict]:
+        """Mesmo contrato de `list_pluggy_transactions` (cursor do /v2/transactions,
+        heartbeat fail-soft antes de cada página); `on_page` pode ser async."""
+        out: list[dict] = []
+        params: dict[str, Any] = {"accountId": account_id}
+        for _ in range(max_pages):
+            if on_page is not None:
+                try:
+                    res = on_page()
+                    if inspect.isawaitable(res):
+                        await res
+                except Exception:
+                    pass
+            data = await self._get("/v2/transactions", params)
+            results = data.get("results")
+            if isinstance(results, list):
+                out.extend(results)
+            after = _extract_after_cursor(data.get("next"))
+            if not after or not results:
+                break
+            params = {"accountId": account_id, "after": after}
+        return out
@@ -3,11 +3,19 @@
 Fase 0 do plano de Open Finance: substitui o gerador mock por dados reais.
 NÃO toca no saldo manual nem em `launches` — isso é a Fase 1 (import + conciliação).
 
-O trabalho aqui é bloqueante (httpx + DB); chame via asyncio.to_thread a partir das rotas.
+As entradas síncronas (`sync_pluggy_item`, `sync_pluggy_user`, `refresh_all_pluggy_items`)
+bloqueiam (HTTP + DB); chame via asyncio.to_thread a partir das rotas. Por baixo, a
+leitura da Pluggy é assíncrona (`AsyncPluggyClient`): contas, investimentos e as
+transações de todas as contas de um item saem em paralelo, com teto por item
+(OF_SYNC_ITEM_CONCURRENCY) e teto global de itens em voo (OF_SYNC_CONCURRENCY).
+A gravação de cada item continua serial — uma thread, na ordem de sempre — e
+itens do mesmo usuário nunca gravam ao mesmo tempo.
 """
 
 from __future__ import annotations
 
+import asyncio
+import os
 import time
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
@@ -18,11 +26,9 @@ from dateutil import parser as _dateutil_parser
 from utils_date import _tz
 
 from core.services.pluggy import (
+    AsyncPluggyClient,
     create_pluggy_api_key,
     get_pluggy_item,
-    list_pluggy_accounts,
-    list_pluggy_investments,
-    list_pluggy_transactions,
     update_pluggy_item,
 )
 from db import (
@@ -151,51 +157,102 @@ def is_caixinha(investment: dict) -> bool:
             and str(investment.get("subtype") or "").upper() == "CDB")
 
 
-def sync_pluggy_item(provider_item_id: str) -> dict:
-    """Sincroniza um item Pluggy: contas + transações → tabelas OF. Idempotente."""
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _sync_concurrency() -> int:
+    """Itens sincronizados/atualizados ao mesmo tempo (teto global)."""
+    return _env_int("OF_SYNC_CONCURRENCY", 8)
+
+
+def _item_concurrency() -> int:
+    """Requisições simultâneas à Pluggy dentro de um mesmo item."""
+    return _env_int("OF_SYNC_ITEM_CONCURRENCY", 4)
+
+
+# Intervalo mínimo entre renovações do hold durante a leitura de um item. O hold
+# dura _SYNC_QUIET_MIN (10min); renovar a cada página — dezenas por conta, agora
+# em paralelo — só multiplicaria escritas no banco sem ganhar cobertura.
+_HEARTBEAT_MIN_INTERVAL = 30.0
+
+
+def _check_connection(provider_item_id: str) -> tuple[dict | None, dict | None]:
+    """(conexão, None) se o item pode sincronizar; (None, resultado) se não."""
     connection = get_open_finance_connection_by_item_id(provider_item_id)
     if not connection:
-        return {"ok": False, "reason": "connection_not_found", "item_id": provider_item_id}
+        return None, {"ok": False, "reason": "connection_not_found", "item_id": provider_item_id}
 
     # Trial venceu sem virar assinatura: dados importados ficam, mas o sync PARA
     # (o item nem existe mais na Pluggy). Barra webhook atrasado/replay.
     if str(connection.get("status") or "").upper() == "PAUSED":
-        return {"ok": False, "reason": "connection_paused", "item_id": provider_item_id}
+        return None, {"ok": False, "reason": "connection_paused", "item_id": provider_item_id}
 
     # Ponto comum de TODOS os caminhos que mexem na carteira — inclusive o webhook
-    # de produção, que chama esta função direto (frontend/routes/open_finance.py),
+    # de produção, que chama sync_pluggy_item direto (frontend/routes/open_finance.py),
     # sem passar por sync_pluggy_user. Segurar aqui cobre as leituras remotas
-    # abaixo, que rodam antes de qualquer commit. Os wrappers seguram mais cedo
+    # seguintes, que rodam antes de qualquer commit. Os wrappers seguram mais cedo
     # ainda (antes de listar itens / antes do PATCH e da espera); este é a rede
     # que pega qualquer caminho novo que apareça.
-    #
-    # `heartbeat` RENOVA o hold ao longo do sync: a busca de transações pode levar
-    # até 60 requisições paginadas por conta (minutos), passando do _SYNC_QUIET_MIN
-    # do hold inicial. Sem renovar, o hold expiraria no meio de um item longo — e
-    # como last_sync_at só é carimbado no fim, nada seguraria o e-mail nessa janela.
-    # Chamado a cada conta e a cada página. Expira sozinho se o processo morrer.
-    heartbeat = lambda: _hold_aggregate_emails(connection["user_id"], "sync_item")
-    heartbeat()
+    _hold_aggregate_emails(connection["user_id"], "sync_item")
+    return connection, None
 
-    api_key = create_pluggy_api_key()
 
-    accounts: list[dict] = []
-    for raw_account in list_pluggy_accounts(provider_item_id, api_key):
-        heartbeat()
+async def _fetch_item(client: AsyncPluggyClient, provider_item_id: str,
+                      user_id: int) -> tuple[list[dict], list[dict]]:
+    """Lê contas (+ transações de cada uma) e investimentos do item em paralelo.
+
+    O heartbeat RENOVA o hold ao longo da leitura: a busca de transações pode levar
+    até 60 requisições paginadas por conta, passando do _SYNC_QUIET_MIN do hold
+    inicial. Sem renovar, o hold expiraria no meio de um item longo — e como
+    last_sync_at só é carimbado no fim, nada seguraria o e-mail nessa janela.
+    Chamado a cada conta e a cada página, limitado a um a cada
+    _HEARTBEAT_MIN_INTERVAL. Expira sozinho se o processo morrer.
+    """
+    slots = asyncio.Semaphore(_item_concurrency())
+    last_beat = [time.monotonic()]
+
+    async def heartbeat() -> None:
+        now = time.monotonic()
+        if now - last_beat[0] < _HEARTBEAT_MIN_INTERVAL:
+            return
+        last_beat[0] = now
+        await asyncio.to_thread(_hold_aggregate_emails, user_id, "sync_item")
+
+    async def limited(fn, *args, **kwargs):
+        async with slots:
+            return await fn(*args, **kwargs)
+
+    async def account_with_transactions(raw_account: dict) -> dict | None:
         account = normalize_pluggy_account(raw_account)
         if not account["provider_account_id"]:
-            continue
-        raw_txs = list_pluggy_transactions(account["provider_account_id"], api_key,
-                                           on_page=heartbeat)
+            return None
+        await heartbeat()
+        raw_txs = await limited(client.list_transactions, account["provider_account_id"],
+                                on_page=heartbeat)
         account["transactions"] = [
             tx for tx in (normalize_pluggy_transaction(t) for t in raw_txs) if tx["provider_transaction_id"]
         ]
-        accounts.append(account)
+        return account
+
+    async def accounts() -> list[dict]:
+        raw_accounts = await limited(client.list_accounts, provider_item_id)
+        done = await asyncio.gather(*(account_with_transactions(a) for a in raw_accounts))
+        return [a for a in done if a is not None]
+
+    return await asyncio.gather(accounts(), limited(client.list_investments, provider_item_id))
+
 
+def _persist_item(connection: dict, provider_item_id: str, accounts: list[dict],
+                  raw_investments: list[dict]) -> dict:
+    """Grava o que foi lido do item — sempre em sequência, numa thread só."""
     result = save_open_finance_sync(connection["id"], accounts)
 
     # #10: investimentos (inclui Caixinha/CDB) — espelho em open_finance_investments.
-    investments = [normalize_pluggy_investment(i) for i in list_pluggy_investments(provider_item_id, api_key)]
+    investments = [normalize_pluggy_investment(i) for i in raw_investments]
     inv_result = save_open_finance_investments(connection["id"], investments)
 
     # Caixinhas do OF viram caixinhas do Pig automaticamente (auto-create + dedup) e o
@@ -241,9 +298,80 @@ def sync_pluggy_item(provider_item_id: str) -> dict:
     }
 
 
-def refresh_all_pluggy_items(user_id: int | None = None) -> dict:
+async def _sync_item(client: AsyncPluggyClient, provider_item_id: str,
+                     user_locks: dict[int, asyncio.Lock]) -> dict:
+    connection, skipped = await asyncio.to_thread(_check_connection, provider_item_id)
+    if skipped is not None:
+        return skipped
+    accounts, investments = await _fetch_item(client, provider_item_id, connection["user_id"])
+    # Itens do mesmo usuário não gravam juntos: o import/conciliação olha a
+    # carteira inteira do usuário, não só a conexão.
+    lock = user_locks.setdefault(connection["user_id"], asyncio.Lock())
+    async with lock:
+        return await asyncio.to_thread(_persist_item, connection, provider_item_id,
+                                       accounts, investments)
+
+
+async def sync_pluggy_items_async(item_ids: list[str], *,
+                                  client: AsyncPluggyClient | None = None) -> list[dict]:
+    """Sincroniza vários itens com até OF_SYNC_CONCURRENCY em voo. Resultados na
+    ordem de `item_ids`; falha de um item vira `{"ok": False, "reason": "error"}`
+    sem derrubar os outros."""
+    if client is None:
+        async with AsyncPluggyClient() as own:
+            return await sync_pluggy_items_async(item_ids, client=own)
+
+    gate = asyncio.Semaphore(_sync_concurrency())
+    user_locks: dict[int, asyncio.Lock] = {}
+
+    async def one(item_id: str) -> dict:
+        async with gate:
+            try:
+                return await _sync_item(client, item_id, user_locks)
+            except Exception as exc:
+                print(f"[pluggy_sync] item {item_id}: {exc}")
+                return {"ok": False, "reason": "error", "item_id": item_id, "error": str(exc)}
+
+    return list(await asyncio.gather(*(one(i) for i in item_ids)))
+
+
+def sync_pluggy_item(provider_item_id: str) -> dict:
+    """Sincroniza um item Pluggy: contas + transações → tabelas OF. Idempotente."""
+    connection, skipped = _check_connection(provider_item_id)
+    if skipped is not None:
+        return skipped
+
+    async def _fetch() -> tuple[list[dict], list[dict]]:
+        async with AsyncPluggyClient() as client:
+            return await _fetch_item(client, provider_item_id, connection["user_id"])
+
+    accounts, investments = asyncio.run(_fetch())
+    return _persist_item(connection, provider_item_id, accounts, investments)
+
+
+def _hold_item_owners(items: list[str], user_id: int | None) -> None:
+    """Segura o e-mail dos agregados dos donos de `items`, uma vez por usuário."""
+    if user_id is not None:
+        if items:
+            _hold_aggregate_emails(user_id, "refresh_all")
+        return
+    segurados: set[int] = set()
+    for item_id in items:
+        try:
+            conn = get_open_finance_connection_by_item_id(item_id)
+        except Exception:
+            continue
+        dono = (conn or {}).get("user_id")
+        if dono is not None and dono not in segurados:
+            _hold_aggregate_emails(dono, "refresh_all")
+            segurados.add(dono)
+
+
+async def refresh_all_pluggy_items_async(user_id: int | None = None, *,
+                                         client: AsyncPluggyClient | None = None) -> dict:
     """Dispara update na Pluggy pra cada item ativo (Pluggy re-busca do banco e manda
-    webhook → sync). Usado pelo tick de refresh periódico. Falhas por item são engolidas.
+    webhook → sync), com até OF_SYNC_CONCURRENCY PATCHes em voo. Usado pelo tick de
+    refresh periódico. Falhas por item são engolidas.
 
     LIMITAÇÃO CONHECIDA (decisão de 2026-08-15): este caminho é fire-and-forget —
     dispara o PATCH e retorna; o webhook chega depois e aciona sync_pluggy_item (que
@@ -259,29 +387,33 @@ def refresh_all_pluggy_items(user_id: int | None = None) -> dict:
     Fechar 100% exigiria um worker renovando o lease enquanto o item está UPDATING
     (processo/estado novo), custo desproporcional pro cenário. Reavaliar se surgir
     evidência de webhook lento recorrente."""
-    items = list_pluggy_item_ids(user_id)
-    triggered = 0
-    segurados: set[int] = set()
-    for item_id in items:
-        try:
-            # Segura o e-mail dos agregados ANTES do PATCH: daqui até o webhook
-            # trazer os dados novos, o evento maduro seguiria reivindicável com o
-            # valor velho — e o emailed_at recusaria a correção depois.
-            if user_id is not None:
-                if user_id not in segurados:
-                    _hold_aggregate_emails(user_id, "refresh_all")
-                    segurados.add(user_id)
-            else:
-                conn = get_open_finance_connection_by_item_id(item_id)
-                dono = (conn or {}).get("user_id")
-                if dono is not None and dono not in segurados:
-                    _hold_aggregate_emails(dono, "refresh_all")
-                    segurados.add(dono)
-            update_pluggy_item(item_id)
-            triggered += 1
-        except Exception:
-            pass
-    return {"triggered": triggered, "total": len(items)}
+    if client is None:
+        async with AsyncPluggyClient() as own:
+            return await refresh_all_pluggy_items_async(user_id, client=own)
+
+    items = await asyncio.to_thread(list_pluggy_item_ids, user_id)
+    # Segura o e-mail dos agregados ANTES de qualquer PATCH: daqui até o webhook
+    # trazer os dados novos, o evento maduro seguiria reivindicável com o valor
+    # velho — e o emailed_at recusaria a correção depois.
+    await asyncio.to_thread(_hold_item_owners, items, user_id)
+
+    gate = asyncio.Semaphore(_sync_concurrency())
+
+    async def one(item_id: str) -> bool:
+        async with gate:
+            try:
+                await client.update_item(item_id)
+                return True
+            except Exception:
+                return False
+
+    done = await asyncio.gather(*(one(i) for i in items))
+    return {"triggered": sum(done), "total": len(items)}
+
+
+def refresh_all_pluggy_items(user_id: int | None = None) -> dict:
+    """Versão bloqueante de `refresh_all_pluggy_items_async` (cliente próprio)."""
+    return asyncio.run(refresh_all_pluggy_items_async(user_id))
 
 
 def _hold_aggregate_emails(user_id: int, origem: str) -> None:
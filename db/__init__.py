@@ -16,6 +16,7 @@ Organização interna por domínio:
   cards       → cartões de crédito e faturas
   open_finance → conexões Open Finance/Pluggy
   reports     → relatório diário, auth, dashboard, engajamento
+  report_batch → resumos agendados em lote (due/claim/identidades/totais)
   privacy     → exportação e exclusão de conta
 """
 
@@ -98,6 +99,7 @@ from .investments import (
     list_users_with_investments,
     accrue_all_investments,
     accrue_investment_db,
+    accrue_investments_for_users,
     investment_deposit_from_account,
     investment_withdraw_to_account,
     get_latest_cdi,
@@ -106,9 +108,11 @@ from .investments import (
     get_latest_selic_aa,
     get_latest_ipca_12m,
     get_dashboard_market_rates,
+    refresh_market_rates,
     _get_cdi_daily_map,
     _business_days_between,
 )
+from .market_rates import invalidate_market_rate_cache
 
 # ── Categorias ────────────────────────────────────────────────────────────────
 from .categories import (
@@ -123,6 +127,7 @@ from .categories import (
     resolve_category_rule_target,
     get_uncategorized_launches,
     list_custom_category_names,
+    invalidate_category_rules_cache,
 )
 
 # ── Ações pendentes ───────────────────────────────────────────────────────────
@@ -228,6 +233,7 @@ from .open_finance import (
     import_open_finance_credit,
     sync_imported_open_finance_updates,
     get_consolidated_balance,
+    get_consolidated_balances,
     list_bank_accounts,
     pending_bank_outflows,
     assert_bank_covers,
@@ -332,6 +338,12 @@ from .reports import (
     sync_engagement_opt_out,
     get_user_by_email,
 )
+from .report_batch import (
+    list_due_report_users,
+    claim_report_sends,
+    list_whatsapp_identities,
+    report_period_totals,
+)
 
 # ── Login social (Google) ────────────────────────────────────────────────────
 from .google_auth import (
@@ -382,6 +394,9 @@ from .privacy import (
     is_account_scheduled_for_deletion,
     schedule_account_deletion,
     build_user_export_zip,
+    build_user_export_file,
+    iter_export_file,
+    write_user_export_zip,
     delete_user_data,
     process_due_account_deletions,
     verify_user_password,
@@ -403,6 +418,10 @@ from .analytics import (
     list_history,
     compute_behavioral_patterns,
 )
+from .rollups import rollup_sql, rebuild_monthly_rollups
+from .dashboard_versions import DASHBOARD_VERSION_SQL, dashboard_etag, get_dashboard_version
+from .history_search import parse_search_terms, search_history
+from .export_cache import get_cached_export, put_cached_export, reuse_cached_export
 
 # ── Insights proativos (Sprint 7) ───────────────────────────────────────────
 from .insights import compute_active_insights
@@ -437,15 +456,17 @@ __all__ = [
     # investments
     "create_investment", "create_investment_db", "delete_investment", "list_investments",
     "list_users_with_investments", "accrue_all_investments", "accrue_investment_db",
+    "accrue_investments_for_users",
     "investment_deposit_from_account", "investment_withdraw_to_account", "get_latest_cdi", "get_latest_cdi_aa",
     "get_latest_cdi_daily_pct", "get_latest_selic_aa", "get_latest_ipca_12m",
-    "get_dashboard_market_rates", "_get_cdi_daily_map", "_business_days_between",
+    "get_dashboard_market_rates", "refresh_market_rates", "invalidate_market_rate_cache",
+    "_get_cdi_daily_map", "_business_days_between",
     # categories
     "list_category_rules", "add_category_rule", "delete_category_rule",
     "delete_category_rules_by_category", "list_categories",
     "get_memorized_category", "upsert_category_rule", "list_user_category_rules",
     "resolve_category_rule_target", "get_uncategorized_launches",
-    "list_custom_category_names",
+    "list_custom_category_names", "invalidate_category_rules_cache",
     # pending
     "set_pending_action", "get_pending_action", "clear_pending_action",
     # budgets
@@ -491,7 +512,7 @@ __all__ = [
     "detect_recurring_income_matches", "detect_open_finance_salary",
     "detect_bill_increase", "detect_open_finance_bill_increase",
     "import_open_finance_launches", "import_open_finance_credit",
-    "sync_imported_open_finance_updates", "get_consolidated_balance", "list_bank_accounts", "pending_bank_outflows", "assert_bank_covers",
+    "sync_imported_open_finance_updates", "get_consolidated_balance", "get_consolidated_balances", "list_bank_accounts", "pending_bank_outflows", "assert_bank_covers",
     "disconnect_open_finance_connection", "save_pluggy_open_finance_item", "user_synced_within",
     "update_pluggy_open_finance_item_status",
     "list_pluggy_connections_for_trial_sweep", "pause_open_finance_connection",
@@ -502,6 +523,7 @@ __all__ = [
     "list_users_with_weekly_report_enabled", "list_users_with_monthly_report_enabled",
     "mark_daily_report_sent", "claim_daily_report_send", "was_daily_report_sent_today",
     "claim_weekly_report_send", "claim_monthly_report_send",
+    "list_due_report_users", "claim_report_sends", "list_whatsapp_identities", "report_period_totals",
     "get_last_ofx_import_end_date",
     "register_auth_user", "login_auth_user", "get_auth_user", "get_password_changed_at", "auto_link_auth_user",
     "create_dashboard_session", "get_dashboard_session", "consume_dashboard_session",
@@ -519,7 +541,8 @@ __all__ = [
     "news_url_exists", "insert_news_post", "backfill_news_image", "get_recent_news",
     # privacy
     "ensure_account_deletion_columns", "is_account_scheduled_for_deletion",
-    "schedule_account_deletion", "build_user_export_zip", "delete_user_data",
+    "schedule_account_deletion", "build_user_export_zip", "build_user_export_file",
+    "iter_export_file", "write_user_export_zip", "delete_user_data",
     "process_due_account_deletions",
     "verify_user_password", "get_user_email",
     "create_data_export_token", "consume_data_export_token",
@@ -544,7 +567,11 @@ __all__ = [
     "resolve_window", "compute_kpis", "compute_evolution", "compute_categories",
     "compute_weekday_pattern", "compute_top_merchants",
     "compute_history_quick_stats", "list_history",
+    "parse_search_terms", "search_history",
     "compute_behavioral_patterns",
+    "rollup_sql", "rebuild_monthly_rollups",
+    "DASHBOARD_VERSION_SQL", "dashboard_etag", "get_dashboard_version",
+    "get_cached_export", "put_cached_export", "reuse_cached_export",
     # insights (Sprint 7)
     "compute_active_insights",
     # agentes do Piggy
@@ -10,6 +10,7 @@ from psycopg.types.json import Json, Jsonb
 import db_support as _db_support
 from utils_date import _tz
 
+from .bulk_import import stage_rows
 from .connection import get_conn, cat_norm_sql
 from .users import ensure_user, ensure_user_tx
 
@@ -968,6 +969,23 @@ def get_ofx_import_by_hash(user_id: int, file_hash: str):
             return cur.fetchone()
 
 
+_OFX_STAGE_COLUMNS = (
+    ("ord", "integer"),
+    ("tipo", "text"),
+    ("valor", "numeric"),
+    ("categoria", "text"),
+    ("alvo", "text"),
+    ("nota", "text"),
+    ("criado_em", "timestamptz"),
+    ("efeitos", "jsonb"),
+    ("external_id", "text"),
+    ("posted_at", "date"),
+    ("currency", "text"),
+    ("is_internal_movement", "boolean"),
+    ("delta", "numeric"),
+)
+
+
 def import_ofx_launches_bulk(
     user_id: int,
     launches_rows: list[dict],
@@ -982,6 +1000,9 @@ def import_ofx_launches_bulk(
     """
     Importa transações OFX de forma IDEMPOTENTE (ON CONFLICT DO NOTHING).
     Saldo só é ajustado pelas transações efetivamente inseridas.
+
+    Set-based: as linhas vão por COPY para um staging temporário e entram em
+    `launches` num único INSERT ... SELECT (ver db/bulk_import.py).
     """
     ensure_user(user_id)
     total = len(launches_rows)
@@ -1000,35 +1021,53 @@ def import_ofx_launches_bulk(
             "imported_at": prev["imported_at"],
         }
 
-    inserted = 0
-    duplicates = 0
-    delta_total = Decimal("0")
+    # FITID repetido dentro do próprio arquivo conta como duplicata (vale a
+    # primeira ocorrência) — o staging precisa de external_id único para que o
+    # delta somado a partir do RETURNING não conte a mesma linha duas vezes.
+    staged: list[tuple] = []
+    seen_ext: set[str] = set()
+    for r in launches_rows:
+        ext_id = str(r["external_id"])
+        if ext_id in seen_ext:
+            continue
+        seen_ext.add(ext_id)
+        staged.append((
+            len(staged), r["tipo"], r["valor"], r.get("categoria"), r.get("alvo"), r.get("nota"),
+            r["criado_em"],
+            Jsonb({"delta_conta": float(r["delta"]), "ofx": r.get("ofx_meta", {})}),
+            ext_id, r.get("posted_at"), r.get("currency", "BRL"),
+            bool(r.get("is_internal_movement", False)), r["delta"],
+        ))
 
     with get_conn() as conn:
         with conn.cursor() as cur:
-            for r in launches_rows:
-                cur.execute(
-                    """
+            stage_rows(cur, "_ofx_stage", _OFX_STAGE_COLUMNS, staged)
+            # Um único INSERT ... SELECT: o ON CONFLICT descarta o que já foi
+            # importado e o RETURNING diz exatamente o que entrou — o delta de
+            # saldo vem só dessas linhas.
+            cur.execute(
+                """
+                with ins as (
                     insert into launches(
                         user_id, tipo, valor, categoria, alvo, nota, criado_em, efeitos,
                         source, external_id, posted_at, currency, imported_at, is_internal_movement
                     )
-                    values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,now(),%s)
+                    select %s, tipo, valor, categoria, alvo, nota, criado_em, efeitos,
+                           'ofx', external_id, posted_at, currency, now(), is_internal_movement
+                    from _ofx_stage
+                    order by ord
                     on conflict (user_id, source, external_id) do nothing
-                    """,
-                    (
-                        user_id, r["tipo"], r["valor"], r.get("categoria"), r.get("alvo"), r.get("nota"),
-                        r["criado_em"],
-                        Json({"delta_conta": float(r["delta"]), "ofx": r.get("ofx_meta", {})}),
-                        "ofx", r["external_id"], r.get("posted_at"), r.get("currency", "BRL"),
-                        r.get("is_internal_movement", False),
-                    ),
+                    returning external_id
                 )
-                if (cur.rowcount or 0) == 1:
-                    inserted += 1
-                    delta_total += r["delta"]
-                else:
-                    duplicates += 1
+                select count(*) as inserted, coalesce(sum(s.delta), 0) as delta_total
+                from ins join _ofx_stage s on s.external_id = ins.external_id
+                """,
+                (user_id,),
+            )
+            agg = cur.fetchone()
+            inserted = int(agg["inserted"])
+            delta_total = Decimal(str(agg["delta_total"]))
+            duplicates = total - inserted
 
             if inserted:
                 cur.execute(
@@ -14,6 +14,9 @@ Regra fechada em Sprint 3:
   Despesas no cartão de crédito (credit_transactions) são alocadas pelo mês
   em que a `credit_bills.period_end` cai — NÃO pela `purchased_at`. Isso
   reflete o "consumo" real do mês (parcelamento aparece distribuído).
+
+KPIs, evolução, categorias e dia da semana somam o rollup mensal
+(db/rollups.py) em vez de reagrupar launches + credit_transactions.
 """
 from __future__ import annotations
 
@@ -22,6 +25,18 @@ from decimal import Decimal
 from typing import Any
 
 from .connection import get_conn
+from .history_search import parse_search_terms, search_clause
+from .pagination import (
+    TOTAL_ESTIMATE,
+    TOTAL_EXACT,
+    TOTAL_MODES,
+    TOTAL_NONE,
+    decode_cursor,
+    estimate_count,
+    keyset_after,
+    split_page,
+)
+from .rollups import rollup_sql
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -95,29 +110,17 @@ def compute_kpis(user_id: int, from_date: date, to_date: date) -> dict:
     prev_to = from_date
 
     def _totals(start: date, end: date) -> dict:
+        sub_sql, sub_params = rollup_sql(user_id, start, end)
         with get_conn() as conn:
             with conn.cursor() as cur:
                 cur.execute(
-                    """
-                    SELECT tipo, SUM(valor) AS total, SUM(cnt) AS count
-                    FROM (
-                      SELECT tipo, valor, 1 AS cnt
-                      FROM launches
-                      WHERE user_id = %s
-                        AND criado_em >= %s AND criado_em < %s
-                        AND is_internal_movement = false
-                        AND tipo IN ('receita', 'despesa', 'saida')
-                      UNION ALL
-                      SELECT 'despesa' AS tipo, ct.valor, 1 AS cnt
-                      FROM credit_transactions ct
-                      JOIN credit_bills b ON b.id = ct.bill_id
-                      WHERE ct.user_id = %s
-                        AND ct.is_refund = false
-                        AND b.period_end >= %s AND b.period_end < %s
-                    ) merged
+                    f"""
+                    SELECT tipo, SUM(total) AS total, SUM(n) AS count
+                    FROM ({sub_sql}) merged
+                    WHERE tipo IN ('receita', 'despesa', 'saida')
                     GROUP BY tipo
                     """,
-                    (user_id, start, end, user_id, start, end),
+                    sub_params,
                 )
                 rows = cur.fetchall()
 
@@ -273,33 +276,19 @@ def compute_evolution(user_id: int, months: int = 6) -> list[dict]:
     Credit_transactions alocadas por bill.period_end (consistência Sprint 3).
     """
     from_date, to_date = resolve_window(months=months)
+    sub_sql, sub_params = rollup_sql(user_id, from_date, to_date)
 
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
-                SELECT mes, tipo, SUM(valor) AS total
-                FROM (
-                  SELECT TO_CHAR(DATE_TRUNC('month', criado_em), 'YYYY-MM') AS mes,
-                         tipo, valor
-                  FROM launches
-                  WHERE user_id = %s
-                    AND criado_em >= %s AND criado_em < %s
-                    AND is_internal_movement = false
-                    AND tipo IN ('receita', 'despesa', 'saida')
-                  UNION ALL
-                  SELECT TO_CHAR(DATE_TRUNC('month', b.period_end), 'YYYY-MM') AS mes,
-                         'despesa' AS tipo, ct.valor
-                  FROM credit_transactions ct
-                  JOIN credit_bills b ON b.id = ct.bill_id
-                  WHERE ct.user_id = %s
-                    AND ct.is_refund = false
-                    AND b.period_end >= %s AND b.period_end < %s
-                ) merged
+                f"""
+                SELECT TO_CHAR(month, 'YYYY-MM') AS mes, tipo, SUM(total) AS total
+                FROM ({sub_sql}) merged
+                WHERE tipo IN ('receita', 'despesa', 'saida')
                 GROUP BY mes, tipo
                 ORDER BY mes
                 """,
-                (user_id, from_date, to_date, user_id, from_date, to_date),
+                sub_params,
             )
             rows = cur.fetchall()
 
@@ -350,33 +339,18 @@ def compute_categories(
     (alocadas por bill.period_end). Faz LEFT JOIN com user_categories
     pra trazer emoji/color quando o usuário customizou.
     """
+    sub_sql, sub_params = rollup_sql(user_id, from_date, to_date)
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
-                WITH despesas AS (
+                f"""
+                WITH agg AS (
                   SELECT COALESCE(NULLIF(categoria, ''), 'sem categoria') AS categoria,
-                         valor
-                  FROM launches
-                  WHERE user_id = %s
-                    AND tipo IN ('despesa', 'saida')
-                    AND is_internal_movement = false
-                    AND criado_em >= %s AND criado_em < %s
-                  UNION ALL
-                  SELECT COALESCE(NULLIF(ct.categoria, ''), 'sem categoria') AS categoria,
-                         ct.valor
-                  FROM credit_transactions ct
-                  JOIN credit_bills b ON b.id = ct.bill_id
-                  WHERE ct.user_id = %s
-                    AND ct.is_refund = false
-                    AND b.period_end >= %s AND b.period_end < %s
-                ),
-                agg AS (
-                  SELECT categoria,
-                         SUM(valor) AS total,
-                         COUNT(*)   AS count
-                  FROM despesas
-                  GROUP BY categoria
+                         SUM(total) AS total,
+                         SUM(n)     AS count
+                  FROM ({sub_sql}) despesas
+                  WHERE tipo IN ('despesa', 'saida')
+                  GROUP BY 1
                 )
                 SELECT a.categoria AS name,
                        a.total,
@@ -389,11 +363,7 @@ def compute_categories(
                 ORDER BY a.total DESC
                 LIMIT %s
                 """,
-                (
-                    user_id, from_date, to_date,
-                    user_id, from_date, to_date,
-                    user_id, limit,
-                ),
+                (*sub_params, user_id, limit),
             )
             rows = cur.fetchall()
 
@@ -430,28 +400,19 @@ def compute_weekday_pattern(user_id: int, from_date: date, to_date: date) -> lis
     credit_transactions, esta usando purchased_at — aqui faz mais sentido
     o dia da compra real, não o fechamento da fatura).
     """
+    sub_sql, sub_params = rollup_sql(
+        user_id, from_date, to_date, sources=("launch", "credit_purchase")
+    )
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
-                SELECT dow, SUM(valor) AS total, COUNT(*) AS count
-                FROM (
-                  SELECT EXTRACT(DOW FROM criado_em)::int AS dow, valor
-                  FROM launches
-                  WHERE user_id = %s
-                    AND tipo IN ('despesa', 'saida')
-                    AND is_internal_movement = false
-                    AND criado_em >= %s AND criado_em < %s
-                  UNION ALL
-                  SELECT EXTRACT(DOW FROM ct.purchased_at)::int AS dow, ct.valor
-                  FROM credit_transactions ct
-                  WHERE ct.user_id = %s
-                    AND ct.is_refund = false
-                    AND ct.purchased_at >= %s AND ct.purchased_at < %s
-                ) merged
+                f"""
+                SELECT dow, SUM(total) AS total, SUM(n) AS count
+                FROM ({sub_sql}) merged
+                WHERE tipo IN ('despesa', 'saida')
                 GROUP BY dow
                 """,
-                (user_id, from_date, to_date, user_id, from_date, to_date),
+                sub_params,
             )
             rows = {int(r["dow"]): r for r in cur.fetchall()}
 
@@ -632,6 +593,10 @@ def compute_history_quick_stats(
     }
 
 
+# Cursor da timeline do Histórico: (criado_em, origem 'l'/'c', id).
+HISTORY_CURSOR_KIND = "history"
+
+
 def list_history(
     user_id: int,
     from_date: date | None = None,
@@ -643,9 +608,12 @@ def list_history(
     refunds_only: bool = False,
     page: int = 1,
     limit: int = 50,
+    cursor: str | None = None,
+    total: str | None = None,
 ) -> dict:
     """
-    Retorna { items: [...], total, page, limit, total_pages }.
+    Retorna { items: [...], total, total_is_estimate, page, limit, total_pages,
+              next_cursor, has_more }.
 
     Junta launches + credit_transactions (alocadas por bill.period_end).
     Filtros opcionais:
@@ -664,16 +632,29 @@ def list_history(
     Filtro 'credito' devolve só credit_transactions.
 
     Busca textual: cada palavra digitada é casada contra alvo+nota+categoria
-    via `unaccent(...) ILIKE unaccent(?)` — case-insensitive, substring, com
-    normalização de acentos ("credito" casa "crédito"). Múltiplas palavras
-    viram AND (todas precisam aparecer em algum lugar). Ex.: "compra shopping"
-    casa com nota="parcela de compra de roupa shopping".
-
-    Requer extension `unaccent` instalada (criada no init_db).
+    pelo `search_vec` indexado (db/history_search.py) — case-insensitive, por
+    prefixo de palavra (e substring, com pg_trgm), com normalização de acentos
+    ("credito" casa "crédito"). Múltiplas palavras viram AND (todas precisam
+    aparecer em algum lugar). Ex.: "compra shop" casa com
+    nota="parcela de compra de roupa shopping". A ordem continua cronológica;
+    busca por relevância é `search_history`.
+
+    Paginação (db/pagination.py): a ordem é (criado_em, origem, id) DESC e toda
+    resposta traz `next_cursor` (None na última página). Passar o cursor de
+    volta em `cursor` busca a página seguinte por keyset — custo constante, não
+    importa a profundidade; `page` vira só informativo. Sem cursor vale o modo
+    antigo por `page` (offset). `total` escolhe o total: "exact" (COUNT, padrão
+    sem cursor), "estimate" (estimativa do planner) ou "none" (padrão com
+    cursor — quem pagina por cursor já tem o total da primeira página).
+    Cursor inválido levanta InvalidCursor; `total` desconhecido, ValueError.
     """
     page = max(1, int(page or 1))
     limit = max(1, min(int(limit or 50), 200))
     offset = (page - 1) * limit
+    seek = decode_cursor(cursor, HISTORY_CURSOR_KIND, 3) if cursor else None
+    total_mode = (total or (TOTAL_NONE if seek else TOTAL_EXACT)).strip().lower()
+    if total_mode not in TOTAL_MODES:
+        raise ValueError(f"total inválido: {total!r}")
     tipo_norm = (tipo or "all").strip().lower()
     if tipo_norm not in ("despesa", "receita", "credito", "all"):
         tipo_norm = "all"
@@ -685,66 +666,94 @@ def list_history(
     include_launches = tipo_norm in ("all", "despesa", "receita")
     include_credit = tipo_norm in ("all", "credito")
 
-    # Quebra a busca em palavras (até 6 — limita custo da query).
-    # Filtra tokens muito curtos pra evitar match excessivo (ex.: "a", "e").
-    search_terms: list[str] = []
-    if q:
-        for raw in str(q).strip().split():
-            term = raw.strip().lower()
-            if len(term) >= 2:
-                search_terms.append(term)
-            if len(search_terms) >= 6:
-                break
+    # Palavras da busca (até 6, descartando as muito curtas) — ver
+    # db/history_search.py.
+    search_terms = parse_search_terms(q)
 
-    def _search_clause(prefix: str) -> tuple[str, list[Any]]:
-        """Retorna (SQL fragment, params) — todas as palavras AND'ed,
-        cada palavra OR entre campos. `prefix` deixa o caller decidir o
-        alias (ex.: '' pra launches, 'ct.' pra credit_transactions)."""
-        if not search_terms:
-            return ("", [])
-        per_term_sqls: list[str] = []
-        per_term_params: list[Any] = []
-        for term in search_terms:
-            pattern = f"%{term}%"
-            per_term_sqls.append(
-                f"(unaccent(COALESCE({prefix}alvo, '')) ILIKE unaccent(%s) "
-                f"OR unaccent(COALESCE({prefix}nota, '')) ILIKE unaccent(%s) "
-                f"OR unaccent(COALESCE({prefix}categoria, '')) ILIKE unaccent(%s))"
-            )
-            per_term_params.extend([pattern, pattern, pattern])
-        return (" AND ".join(per_term_sqls), per_term_params)
-
-    # ── Sub-query de launches ────────────────────────────────────────────────
-    launches_sql = ""
+    # ── Filtros de launches ──────────────────────────────────────────────────
+    launch_clauses: list[str] = []
     launches_params: list[Any] = []
     if include_launches:
-        clauses = ["user_id = %s"]
+        launch_clauses = ["user_id = %s"]
         launches_params.append(user_id)
         if from_date:
-            clauses.append("criado_em >= %s")
+            launch_clauses.append("criado_em >= %s")
             launches_params.append(from_date)
         if to_date:
-            clauses.append("criado_em < %s")
+            launch_clauses.append("criado_em < %s")
             launches_params.append(to_date)
         if categoria:
-            clauses.append("LOWER(COALESCE(categoria, '')) = LOWER(%s)")
+            launch_clauses.append("LOWER(COALESCE(categoria, '')) = LOWER(%s)")
             launches_params.append(categoria)
         if uncategorized:
-            clauses.append("(categoria IS NULL OR categoria = '')")
+            launch_clauses.append("(categoria IS NULL OR categoria = '')")
         if tipo_norm in ("despesa", "receita"):
-            clauses.append("tipo = %s")
+            launch_clauses.append("tipo = %s")
             launches_params.append(tipo_norm)
         else:
             # 'all': mantém só despesa/receita (resto é movimentação interna,
             # criar_caixinha, etc.)
-            clauses.append("tipo IN ('despesa', 'receita', 'saida')")
-        clauses.append("is_internal_movement = false")
-        search_sql, search_params = _search_clause("")
+            launch_clauses.append("tipo IN ('despesa', 'receita', 'saida')")
+        launch_clauses.append("is_internal_movement = false")
+        search_sql, search_params = search_clause(search_terms)
         if search_sql:
-            clauses.append(search_sql)
+            launch_clauses.append(search_sql)
             launches_params.extend(search_params)
-        launches_sql = f"""
-          SELECT id, tipo, valor, alvo, nota, categoria, criado_em,
+
+    # ── Filtros de credit_transactions ───────────────────────────────────────
+    credit_clauses: list[str] = []
+    credit_params: list[Any] = []
+    if include_credit:
+        # is_refund: true se refunds_only, false caso contrário (default).
+        credit_clauses = ["ct.user_id = %s", f"ct.is_refund = {'true' if refunds_only else 'false'}"]
+        credit_params.append(user_id)
+        if from_date:
+            credit_clauses.append("b.period_end >= %s")
+            credit_params.append(from_date)
+        if to_date:
+            credit_clauses.append("b.period_end < %s")
+            credit_params.append(to_date)
+        if categoria:
+            credit_clauses.append("LOWER(COALESCE(ct.categoria, '')) = LOWER(%s)")
+            credit_params.append(categoria)
+        if uncategorized:
+            credit_clauses.append("(ct.categoria IS NULL OR ct.categoria = '')")
+        # Pra credit_transactions, "alvo" no SELECT é c.name (alias de card):
+        # a busca casa contra ct.nota e ct.categoria e também contra o nome do
+        # cartão (útil pra "nubank").
+        search_sql, search_params = search_clause(
+            search_terms, table="credit_transactions", alias="ct.", card_user_id=user_id,
+        )
+        if search_sql:
+            credit_clauses.append(search_sql)
+            credit_params.extend(search_params)
+
+    if not include_launches and not include_credit:
+        # Caso teórico (tipo inválido com nenhum ramo). Retorna vazio.
+        return {"items": [], "total": 0, "page": page, "limit": limit, "total_pages": 0,
+                "next_cursor": None, "has_more": False}
+
+    # ── Página: ordem (criado_em, origem, id) DESC ──────────────────────────
+    # Com cursor, cada ramo começa depois da última linha entregue (keyset) e
+    # para em limit+1 — a sobra só diz se há próxima página. Sem cursor (modo
+    # página/offset, legado), cada ramo entrega offset+limit+1. Nos dois casos
+    # o ORDER BY + LIMIT dentro do ramo deixa o índice (user_id, criado_em)
+    # parar cedo, e as subqueries de banco/conciliação só rodam pras linhas
+    # que vão pra página.
+    branch_limit = limit + 1 if seek else offset + limit + 1
+
+    def _seek(ts_expr: str, origin: str, id_expr: str) -> tuple[str, list[Any]]:
+        if not seek:
+            return "", []
+        sql, params = keyset_after([(ts_expr, seek[0]), (f"'{origin}'", seek[1]), (id_expr, seek[2])])
+        return f" AND {sql}", params
+
+    branches: list[str] = []
+    page_params: list[Any] = []
+    if include_launches:
+        seek_sql, seek_params = _seek("criado_em", "l", "id")
+        branches.append(f"""
+          (SELECT id, 'l' AS src, tipo, valor, alvo, nota, categoria, criado_em,
                  -- launches não tem parcelamento (isso só existe em
                  -- credit_transactions); NULL mantém as colunas do UNION.
                  NULL::int AS installments_total, NULL::int AS installment_no,
@@ -758,43 +767,15 @@ def list_history(
                     FROM open_finance_transactions o
                    WHERE o.imported_launch_id = launches.id LIMIT 1) AS reconciliation_status
           FROM launches
-          WHERE {" AND ".join(clauses)}
-        """
-
-    # ── Sub-query de credit_transactions ─────────────────────────────────────
-    credit_sql = ""
-    credit_params: list[Any] = []
+          WHERE {" AND ".join(launch_clauses)}{seek_sql}
+          ORDER BY criado_em DESC, id DESC
+          LIMIT %s)
+        """)
+        page_params += [*launches_params, *seek_params, branch_limit]
     if include_credit:
-        # is_refund: true se refunds_only, false caso contrário (default).
-        clauses = ["ct.user_id = %s", f"ct.is_refund = {'true' if refunds_only else 'false'}"]
-        credit_params.append(user_id)
-        if from_date:
-            clauses.append("b.period_end >= %s")
-            credit_params.append(from_date)
-        if to_date:
-            clauses.append("b.period_end < %s")
-            credit_params.append(to_date)
-        if categoria:
-            clauses.append("LOWER(COALESCE(ct.categoria, '')) = LOWER(%s)")
-            credit_params.append(categoria)
-        if uncategorized:
-            clauses.append("(ct.categoria IS NULL OR ct.categoria = '')")
-        # Pra credit_transactions, "alvo" no SELECT é c.name (alias de card);
-        # mas a busca textual deve casar contra ct.nota e ct.categoria (e
-        # opcionalmente nome do cartão também — útil pra "nubank").
-        if search_terms:
-            per_term_sqls: list[str] = []
-            for term in search_terms:
-                pattern = f"%{term}%"
-                per_term_sqls.append(
-                    "(unaccent(COALESCE(c.name, '')) ILIKE unaccent(%s) "
-                    "OR unaccent(COALESCE(ct.nota, '')) ILIKE unaccent(%s) "
-                    "OR unaccent(COALESCE(ct.categoria, '')) ILIKE unaccent(%s))"
-                )
-                credit_params.extend([pattern, pattern, pattern])
-            clauses.append(" AND ".join(per_term_sqls))
-        credit_sql = f"""
-          SELECT ct.id, 'credito' AS tipo, ct.valor,
+        seek_sql, seek_params = _seek("ct.created_at", "c", "ct.id")
+        branches.append(f"""
+          (SELECT ct.id, 'c' AS src, 'credito' AS tipo, ct.valor,
                  c.name AS alvo, ct.nota, ct.categoria, ct.created_at AS criado_em,
                  ct.installments_total, ct.installment_no,
                  COALESCE(ct.source, 'manual') AS origin,
@@ -806,43 +787,49 @@ def list_history(
           FROM credit_transactions ct
           JOIN credit_cards c ON c.id = ct.card_id
           JOIN credit_bills b ON b.id = ct.bill_id
-          WHERE {" AND ".join(clauses)}
-        """
-
-    # ── Une os ramos ────────────────────────────────────────────────────────
-    if launches_sql and credit_sql:
-        union_sql = f"({launches_sql}) UNION ALL ({credit_sql})"
-        union_params = launches_params + credit_params
-    elif launches_sql:
-        union_sql = launches_sql
-        union_params = launches_params
-    elif credit_sql:
-        union_sql = credit_sql
-        union_params = credit_params
-    else:
-        # Caso teórico (tipo inválido com nenhum ramo). Retorna vazio.
-        return {"items": [], "total": 0, "page": page, "limit": limit, "total_pages": 0}
+          WHERE {" AND ".join(credit_clauses)}{seek_sql}
+          ORDER BY ct.created_at DESC, ct.id DESC
+          LIMIT %s)
+        """)
+        page_params += [*credit_params, *seek_params, branch_limit]
+
+    # Total: só as linhas que passam no filtro, sem as colunas da página.
+    count_branches: list[str] = []
+    if include_launches:
+        count_branches.append(f"SELECT 1 FROM launches WHERE {' AND '.join(launch_clauses)}")
+    if include_credit:
+        count_branches.append(
+            "SELECT 1 FROM credit_transactions ct JOIN credit_bills b ON b.id = ct.bill_id "
+            f"WHERE {' AND '.join(credit_clauses)}"
+        )
+    count_sql = f"SELECT COUNT(*) AS total FROM ({' UNION ALL '.join(count_branches)}) merged"
+    count_params = tuple(launches_params + credit_params)
 
     with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                f"SELECT COUNT(*) AS total FROM ({union_sql}) merged",
-                tuple(union_params),
-            )
-            total = int(cur.fetchone()["total"] or 0)
+            total_count: int | None = None
+            if total_mode == TOTAL_EXACT:
+                cur.execute(count_sql, count_params)
+                total_count = int(cur.fetchone()["total"] or 0)
+            elif total_mode == TOTAL_ESTIMATE:
+                total_count = estimate_count(cur, count_sql.replace("COUNT(*) AS total", "1", 1), count_params)
 
             cur.execute(
                 f"""
-                SELECT id, tipo, valor, alvo, nota, categoria, criado_em,
+                SELECT id, src, tipo, valor, alvo, nota, categoria, criado_em,
                        installments_total, installment_no,
                        origin, bank_name, reconciliation_status
-                FROM ({union_sql}) merged
-                ORDER BY criado_em DESC, id ASC
+                FROM ({" UNION ALL ".join(branches)}) merged
+                ORDER BY criado_em DESC, src DESC, id DESC
                 LIMIT %s OFFSET %s
                 """,
-                tuple(union_params + [limit, offset]),
+                tuple(page_params + [limit + 1, 0 if seek else offset]),
+            )
+            rows, next_cursor = split_page(
+                cur.fetchall(), limit,
+                lambda r: (r["criado_em"], r["src"], int(r["id"])),
+                HISTORY_CURSOR_KIND,
             )
-            rows = cur.fetchall()
 
     items = [
         {
@@ -864,13 +851,19 @@ def list_history(
         }
         for r in rows
     ]
-    total_pages = (total + limit - 1) // limit if total > 0 else 0
+    if total_count is None:
+        total_pages = None
+    else:
+        total_pages = (total_count + limit - 1) // limit if total_count > 0 else 0
     return {
         "items": items,
-        "total": total,
+        "total": total_count,
+        "total_is_estimate": total_mode == TOTAL_ESTIMATE,
         "page": page,
         "limit": limit,
         "total_pages": total_pages,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
     }
 
 
@@ -18,11 +18,12 @@ filtradas — não fazem sentido como orçamento.
 """
 from __future__ import annotations
 
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from typing import Any
 
 from .connection import get_conn, cat_norm_sql
+from .rollups import rollup_sql
 from .users import ensure_user
 
 
@@ -231,41 +232,19 @@ def sum_spent_in_category_period(
     Comparação de categoria case- e acento-insensível.
     """
     ensure_user(user_id)
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_excl = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
-    end_date_excl = end_date + timedelta(days=1)  # janela meio-aberta em period_end
-    _cat = cat_norm_sql("categoria")
-    _cat_ct = cat_norm_sql("ct.categoria")
-    _arg = cat_norm_sql("%s")
+    # Janela meio-aberta [start, end+1); meses cheios vêm do rollup mensal, e a
+    # normalização de categoria roda sobre as linhas agregadas, não por lançamento.
+    sub_sql, sub_params = rollup_sql(user_id, start_date, end_date + timedelta(days=1))
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
-                select
-                  coalesce((
-                    select sum(valor) from launches
-                    where user_id=%s
-                      and tipo = 'despesa'
-                      and {_cat} = {_arg}
-                      and is_internal_movement = false
-                      and criado_em >= %s
-                      and criado_em <  %s
-                  ), 0) +
-                  coalesce((
-                    select sum(ct.valor)
-                    from credit_transactions ct
-                    join credit_bills b on b.id = ct.bill_id
-                    where ct.user_id=%s
-                      and {_cat_ct} = {_arg}
-                      and ct.is_refund = false
-                      and b.period_end >= %s
-                      and b.period_end <  %s
-                  ), 0) as total
+                select coalesce(sum(total), 0) as total
+                from ({sub_sql}) s
+                where tipo = 'despesa'
+                  and {cat_norm_sql("categoria")} = {cat_norm_sql("%s")}
                 """,
-                (
-                    user_id, categoria, start_dt, end_excl,
-                    user_id, categoria, start_date, end_date_excl,
-                ),
+                (*sub_params, categoria),
             )
             row = cur.fetchone()
             return float(row["total"] or 0)
@@ -310,44 +289,27 @@ def get_budgets_status_for_month(
     """
     ensure_user(user_id)
     year, mon = _parse_ym(month)
+    month_start = date(year, mon, 1)
+    month_end = date(year + 1, 1, 1) if mon == 12 else date(year, mon + 1, 1)
+    # Gasto do mês inteiro sai direto do rollup mensal (launches + cartão pelo
+    # mês da fatura), sem varrer os lançamentos.
+    spent_sql, spent_params = rollup_sql(user_id, month_start, month_end)
 
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
+                f"""
                 with budgets as (
                   select id, categoria, budget
                   from category_budgets
                   where user_id=%s
                 ),
-                spent_launches as (
-                  select lower(categoria) as cat, sum(valor)::numeric as total
-                  from launches
-                  where user_id=%s
-                    and tipo in ('despesa', 'saida')
-                    and is_internal_movement = false
-                    and date_part('year',  criado_em) = %s
-                    and date_part('month', criado_em) = %s
-                    and categoria is not null
-                  group by lower(categoria)
-                ),
-                spent_cards as (
-                  select lower(ct.categoria) as cat, sum(ct.valor)::numeric as total
-                  from credit_transactions ct
-                  join credit_bills b on b.id = ct.bill_id
-                  where ct.user_id=%s
-                    and ct.is_refund = false
-                    and date_part('year',  b.period_end) = %s
-                    and date_part('month', b.period_end) = %s
-                    and ct.categoria is not null
-                  group by lower(ct.categoria)
-                ),
                 spent_all as (
-                  select cat, sum(total) as total from (
-                    select * from spent_launches
-                    union all
-                    select * from spent_cards
-                  ) s group by cat
+                  select lower(categoria) as cat, sum(total)::numeric as total
+                  from ({spent_sql}) s
+                  where tipo in ('despesa', 'saida')
+                    and categoria <> ''
+                  group by lower(categoria)
                 )
                 select
                   b.categoria,
@@ -361,12 +323,7 @@ def get_budgets_status_for_month(
                   on uc.user_id=%s and uc.name = lower(b.categoria)
                 order by lower(b.categoria)
                 """,
-                (
-                    user_id,
-                    user_id, year, mon,
-                    user_id, year, mon,
-                    user_id,
-                ),
+                (user_id, *spent_params, user_id),
             )
             rows = cur.fetchall() or []
 
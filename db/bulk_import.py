@@ -0,0 +1,37 @@
+"""
+db/bulk_import.py — Staging via COPY para as importações em lote.
+
+As importações (OFX bancário, extrato CSV/PDF, fatura OFX do cartão) gravavam
+uma linha por round-trip: um OFX de 12 meses com 1–2 mil transações virava
+milhares de idas e voltas até o Postgres do Railway. O caminho em lote é:
+
+  1. COPY de todas as linhas para uma tabela temporária (um único stream);
+  2. um `INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING` a partir dela;
+  3. o efeito (delta de saldo, faturas afetadas) sai das linhas retornadas.
+
+A tabela temporária é `on commit drop`: vive só dentro da transação do import
+e some sozinha antes de a conexão voltar ao pool.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Sequence
+
+
+def stage_rows(
+    cur,
+    table: str,
+    columns: Sequence[tuple[str, str]],
+    rows: Iterable[Sequence],
+) -> None:
+    """Cria a tabela temporária `table` e a preenche via COPY.
+
+    `columns` é uma lista de (nome, tipo SQL); cada item de `rows` traz os
+    valores na mesma ordem. `table` e os nomes de coluna são constantes do
+    chamador, nunca entrada do usuário.
+    """
+    ddl = ", ".join(f"{name} {sql_type}" for name, sql_type in columns)
+    cur.execute(f"create temp table {table} ({ddl}) on commit drop")
+    names = ", ".join(name for name, _ in columns)
+    with cur.copy(f"copy {table} ({names}) from stdin") as copy:
+        for row in rows:
+            copy.write_row(row)
@@ -8,6 +8,7 @@ from uuid import uuid4
 
 from utils_date import _tz, today_tz, billing_period_for_close_day
 
+from .bulk_import import stage_rows
 from .connection import get_conn
 from .users import ensure_user
 from .accounts import add_launch_and_update_balance
@@ -1973,6 +1974,22 @@ def consolidate_duplicate_bills(user_id: int, card_id: int, closing_day: int) ->
     return merges
 
 
+_CREDIT_OFX_STAGE_COLUMNS = (
+    ("ord", "integer"),
+    ("bill_id", "bigint"),
+    ("tipo", "text"),
+    ("valor", "numeric"),
+    ("categoria", "text"),
+    ("nota", "text"),
+    ("purchased_at", "date"),
+    ("group_id", "uuid"),
+    ("installment_no", "integer"),
+    ("installments_total", "integer"),
+    ("is_refund", "boolean"),
+    ("external_id", "text"),
+)
+
+
 def import_credit_ofx_bulk(
     user_id: int,
     card_id: int,
@@ -1994,6 +2011,7 @@ def import_credit_ofx_bulk(
 
     Deduplicação: (user_id, card_id, external_id) WHERE source='ofx'.
     Parcelamentos: agrupa por group_id linkando parcelas anteriores pelo memo_base.
+    Escrita set-based: COPY para staging + um INSERT ... SELECT (db/bulk_import.py).
     O limite vindo do OFX é só informativo no relatório de importação. Não
     gravamos automaticamente no cartão porque bancos podem exportar campos de
     limite/disponível que não refletem o limite real contratado pelo usuário.
@@ -2040,122 +2058,188 @@ def import_credit_ofx_bulk(
             _bill_cache[key] = get_or_create_bill_by_period(user_id, card_id, ps, pe)
         return _bill_cache[key]
 
-    inserted = 0
-    duplicates = 0
-    affected_bill_ids: set[int] = set()
-
+    # ── Dedupe e agrupamento de parcelas, em lote ────────────────────────
+    # Antes eram até 3 SELECTs + 1 INSERT por transação. Agora cada regra é UMA
+    # consulta sobre o arquivo inteiro e a decisão linha a linha acontece em
+    # memória, na ordem do arquivo — o que a linha N insere conta como
+    # "já existente" para as linhas seguintes, como no loop antigo.
+    def _inst_key(row: dict):
+        inst_no, inst_total = row.get("installment_no"), row.get("installments_total")
+        if not (inst_no and inst_total):
+            return None
+        return (int(inst_no), int(inst_total), Decimal(str(row["valor"])), row["posted_at"])
+
+    def _memo_pattern(row: dict) -> str:
+        return (row.get("memo_base") or "")[:25].lower()
+
+    ext_ids = [str(r["external_id"]) for r in tx_rows if r.get("external_id")]
+    inst_keys = [k for k in (_inst_key(r) for r in tx_rows) if k]
+    group_probes = [
+        (idx, int(r["installments_total"]), f"%{_memo_pattern(r)}%")
+        for idx, r in enumerate(tx_rows)
+        if r.get("installment_no") and (r.get("installments_total") or 0) > 1 and _memo_pattern(r)
+    ]
+
+    existing_ext: set[str] = set()
+    existing_inst: set[tuple] = set()
+    db_groups: dict[int, tuple] = {}
     with get_conn() as conn:
         with conn.cursor() as cur:
-            for row in tx_rows:
-                ext_id = row.get("external_id")
-                posted_at = row["posted_at"]
-                valor_row = Decimal(str(row["valor"]))
-
-                # ── Deduplicação 1: pelo FITID (source=ofx) ──────────────────
-                # Evita reimportar o mesmo arquivo duas vezes.
-                if ext_id:
-                    cur.execute(
-                        "select id from credit_transactions "
-                        "where user_id=%s and card_id=%s and source='ofx' and external_id=%s",
-                        (user_id, card_id, ext_id),
-                    )
-                    if cur.fetchone():
-                        duplicates += 1
-                        continue
-
-                # ── Deduplicação 2: por valor + data + parcela (anti-duplicata manual) ──
-                # Cobre o caso em que o usuário cadastrou o parcelamento manualmente
-                # e depois importa a fatura OFX. Sem isso, a parcela apareceria em dobro.
-                inst_no = row.get("installment_no")
-                inst_total = row.get("installments_total")
-                if inst_no and inst_total:
-                    cur.execute(
-                        """
-                        select id from credit_transactions
+            # ── Deduplicação 1: pelo FITID (source=ofx) ──────────────────────
+            # Evita reimportar o mesmo arquivo duas vezes.
+            if ext_ids:
+                cur.execute(
+                    "select external_id from credit_transactions "
+                    "where user_id=%s and card_id=%s and source='ofx' and external_id = any(%s)",
+                    (user_id, card_id, ext_ids),
+                )
+                existing_ext = {r["external_id"] for r in cur.fetchall()}
+
+            # ── Deduplicação 2: por valor + data + parcela (anti-duplicata manual) ──
+            # Cobre o caso em que o usuário cadastrou o parcelamento manualmente
+            # e depois importa a fatura OFX. Sem isso, a parcela apareceria em dobro.
+            if inst_keys:
+                cur.execute(
+                    """
+                    select ct.installment_no, ct.installments_total, ct.valor, ct.purchased_at
+                    from credit_transactions ct
+                    join unnest(%s::int[], %s::int[], %s::numeric[], %s::date[])
+                      as k(inst_no, inst_total, valor, purchased_at)
+                      on ct.installment_no = k.inst_no
+                     and ct.installments_total = k.inst_total
+                     and ct.valor = k.valor
+                     and ct.purchased_at = k.purchased_at
+                    where ct.user_id=%s and ct.card_id=%s
+                    """,
+                    (
+                        [k[0] for k in inst_keys], [k[1] for k in inst_keys],
+                        [k[2] for k in inst_keys], [k[3] for k in inst_keys],
+                        user_id, card_id,
+                    ),
+                )
+                existing_inst = {
+                    (int(r["installment_no"]), int(r["installments_total"]),
+                     Decimal(str(r["valor"])), r["purchased_at"])
+                    for r in cur.fetchall()
+                }
+
+            # ── group_id de parcelamentos já existentes ──────────────────────
+            # Busca QUALQUER parcela já existente do mesmo grupo (mesmo memo
+            # base + mesmo total de parcelas). Funciona para OFX importado fora
+            # de ordem E para ligar parcelas do OFX a parcelamentos manuais.
+            if group_probes:
+                cur.execute(
+                    """
+                    select k.ord, g.group_id, g.purchased_at
+                    from unnest(%s::int[], %s::int[], %s::text[]) as k(ord, inst_total, pattern)
+                    cross join lateral (
+                        select group_id, purchased_at from credit_transactions
                         where user_id=%s and card_id=%s
-                          and installment_no=%s
-                          and installments_total=%s
-                          and valor=%s
-                          and purchased_at=%s
-                        limit 1
-                        """,
-                        (user_id, card_id, inst_no, inst_total, valor_row, posted_at),
-                    )
-                    if cur.fetchone():
-                        duplicates += 1
-                        continue
-
-                # ── Detectar/recuperar group_id para parcelamentos ────────────
-                group_id = None
-                memo_base = row.get("memo_base") or ""
-
-                if inst_no and inst_total and inst_total > 1:
-                    # Busca QUALQUER parcela já existente do mesmo grupo
-                    # (mesmo memo base + mesmo total de parcelas).
-                    # Funciona para OFX importado fora de ordem E para ligar
-                    # parcelas do OFX a parcelamentos manuais (se o memo bater).
-                    if memo_base:
-                        cur.execute(
-                            """
-                            select group_id from credit_transactions
-                            where user_id=%s and card_id=%s
-                              and installments_total=%s
-                              and group_id is not null
-                              and lower(nota) like %s
-                            order by purchased_at desc limit 1
-                            """,
-                            (
-                                user_id, card_id,
-                                inst_total,
-                                f"%{memo_base[:25].lower()}%",
-                            ),
-                        )
-                        existing = cur.fetchone()
-                        if existing and existing["group_id"]:
-                            group_id = existing["group_id"]
-
-                    if group_id is None:
-                        group_id = uuid4()
-
-                is_refund = row.get("tipo") == "estorno"
-
-                tx_bill_id = _get_bill_for_date(posted_at)
-                affected_bill_ids.add(tx_bill_id)
+                          and installments_total = k.inst_total
+                          and group_id is not null
+                          and lower(nota) like k.pattern
+                        order by purchased_at desc limit 1
+                    ) g
+                    """,
+                    (
+                        [p[0] for p in group_probes], [p[1] for p in group_probes],
+                        [p[2] for p in group_probes], user_id, card_id,
+                    ),
+                )
+                db_groups = {int(r["ord"]): (r["group_id"], r["purchased_at"]) for r in cur.fetchall()}
+
+    staged: list[tuple] = []
+    seen_ext: set[str] = set()
+    seen_inst: set[tuple] = set()
+    # parcelas deste arquivo já aceitas: (total, nota minúscula, data, group_id)
+    file_groups: list[tuple] = []
+
+    for idx, row in enumerate(tx_rows):
+        ext_id = row.get("external_id")
+        ext_id = str(ext_id) if ext_id else None
+        posted_at = row["posted_at"]
+        valor_row = Decimal(str(row["valor"]))
+
+        if ext_id and (ext_id in existing_ext or ext_id in seen_ext):
+            continue
+        key = _inst_key(row)
+        if key and (key in existing_inst or key in seen_inst):
+            continue
+
+        inst_no = row.get("installment_no")
+        inst_total = row.get("installments_total")
+        group_id = None
+        if inst_no and inst_total and inst_total > 1:
+            pattern = _memo_pattern(row)
+            candidates = [db_groups[idx]] if idx in db_groups else []
+            if pattern:
+                candidates += [
+                    (gid, when) for total, nota_low, when, gid in file_groups
+                    if total == inst_total and pattern in nota_low
+                ]
+            if candidates:
+                group_id = max(candidates, key=lambda c: c[1])[0]
+            else:
+                group_id = uuid4()
+            file_groups.append((inst_total, (row.get("nota") or "").lower(), posted_at, group_id))
+
+        if ext_id:
+            seen_ext.add(ext_id)
+        if key:
+            seen_inst.add(key)
+
+        staged.append((
+            len(staged), _get_bill_for_date(posted_at),
+            row.get("tipo", "despesa"), valor_row,
+            row.get("categoria"), row.get("nota"), posted_at,
+            group_id, inst_no, inst_total,
+            row.get("tipo") == "estorno", ext_id,
+        ))
+
+    inserted = 0
+    affected_bill_ids: dict[int, None] = {}
 
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            if staged:
+                stage_rows(cur, "_credit_ofx_stage", _CREDIT_OFX_STAGE_COLUMNS, staged)
                 cur.execute(
                     """
                     insert into credit_transactions
                       (bill_id, user_id, card_id, tipo, valor, categoria, nota,
                        purchased_at, group_id, installment_no, installments_total,
                        is_refund, source, external_id)
-                    values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,'ofx',%s)
+                    select bill_id, %s, %s, tipo, valor, categoria, nota,
+                           purchased_at, group_id, installment_no, installments_total,
+                           is_refund, 'ofx', external_id
+                    from _credit_ofx_stage
+                    order by ord
+                    on conflict do nothing
+                    returning bill_id
                     """,
-                    (
-                        tx_bill_id, user_id, card_id,
-                        row.get("tipo", "despesa"), valor_row,
-                        row.get("categoria"), row.get("nota"),
-                        posted_at,
-                        group_id, inst_no, inst_total,
-                        is_refund, ext_id,
-                    ),
+                    (user_id, card_id),
                 )
-                inserted += 1
+                for r in cur.fetchall():
+                    inserted += 1
+                    affected_bill_ids.setdefault(int(r["bill_id"]), None)
 
             # Recalcula total de cada fatura que recebeu transações novas
-            for bid in affected_bill_ids:
+            if affected_bill_ids:
                 cur.execute(
                     """
-                    update credit_bills
-                    set total = (
-                        select coalesce(sum(case when is_refund=false then valor else -abs(valor) end), 0)
+                    update credit_bills b
+                    set total = coalesce((
+                        select sum(case when is_refund=false then valor else -abs(valor) end)
                         from credit_transactions
-                        where bill_id=%s
-                    )
-                    where id=%s
+                        where bill_id = b.id
+                    ), 0)
+                    where b.id = any(%s)
                     """,
-                    (bid, bid),
+                    (list(affected_bill_ids),),
                 )
 
+            duplicates = len(tx_rows) - inserted
+
             # Registra a importação no log
             cur.execute(
                 """
@@ -9,9 +9,13 @@ Duas tabelas distintas:
   livre. Rename emite UPDATE em cascata nas 5 tabelas que referenciam o
   texto da categoria.
 """
+import os
+import threading
+import time
+
 from .connection import get_conn
 from .users import ensure_user
-from utils_text import normalize_text
+from utils_text import KeywordMatcher, normalize_text
 
 
 # ─── Seed das 15 categorias canônicas (Sprint 3) ─────────────────────────────
@@ -66,6 +70,7 @@ def add_category_rule(user_id: int, keyword: str, category: str) -> None:
                 (user_id, keyword, category),
             )
         conn.commit()
+    invalidate_category_rules_cache(user_id)
 
 
 def delete_category_rule(user_id: int, keyword: str) -> int:
@@ -81,6 +86,7 @@ def delete_category_rule(user_id: int, keyword: str) -> int:
             )
             n = cur.rowcount
         conn.commit()
+    invalidate_category_rules_cache(user_id)
     return n
 
 
@@ -97,6 +103,7 @@ def delete_category_rules_by_category(user_id: int, category: str) -> int:
             )
             n = cur.rowcount
         conn.commit()
+    invalidate_category_rules_cache(user_id)
     return n
 
 
@@ -113,36 +120,63 @@ def list_categories(user_id: int) -> list[str]:
     return [r["category"] if isinstance(r, dict) else r[0] for r in rows]
 
 
+# ─── Matcher das regras do usuário (cache por processo) ──────────────────────
+# get_memorized_category roda em todo lançamento; em vez de buscar as regras no
+# banco e testar keyword por keyword a cada mensagem, compila um KeywordMatcher
+# por usuário e reaproveita até uma escrita nas regras (add/upsert/delete/
+# rename/merge) invalidar. O TTL cobre escritas feitas por outro worker.
+
+CATEGORY_RULES_CACHE_TTL_DEFAULT_SECONDS = 300
+
+_rule_matchers: dict[int, tuple[float, KeywordMatcher]] = {}
+_rule_matchers_lock = threading.Lock()
+
+
+def _rule_matcher_ttl() -> float:
+    raw = os.getenv("CATEGORY_RULES_CACHE_TTL_SECONDS", str(CATEGORY_RULES_CACHE_TTL_DEFAULT_SECONDS))
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        return float(CATEGORY_RULES_CACHE_TTL_DEFAULT_SECONDS)
+
+
+def _user_rule_matcher(user_id: int) -> KeywordMatcher:
+    cached = _rule_matchers.get(user_id)
+    if cached is not None and time.monotonic() - cached[0] < _rule_matcher_ttl():
+        return cached[1]
+
+    # Mais longa primeiro: "padaria do ze" vence "padaria" (mesma ordem de antes).
+    rules = list_user_category_rules(user_id)
+    matcher = KeywordMatcher(
+        ((kw, (cat or "").strip(), False) for kw, cat in rules),
+        blockers=False,
+    )
+    with _rule_matchers_lock:
+        _rule_matchers[user_id] = (time.monotonic(), matcher)
+    return matcher
+
+
+def invalidate_category_rules_cache(user_id: int | None = None) -> None:
+    """Descarta o matcher de regras de `user_id` (ou de todos) deste processo."""
+    with _rule_matchers_lock:
+        if user_id is None:
+            _rule_matchers.clear()
+        else:
+            _rule_matchers.pop(user_id, None)
+
+
 def get_memorized_category(user_id: int, memo: str) -> str | None:
     """
     Retorna categoria memorizada se alguma keyword bater com o texto.
     """
-    from utils_text import normalize_text, contains_word  # import local pra evitar loop circular
-
-    ensure_user(user_id)
     memo_norm = normalize_text(memo or "")
     if not memo_norm:
         return None
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT keyword, category FROM user_category_rules "
-                "WHERE user_id = %s ORDER BY LENGTH(keyword) DESC",
-                (user_id,),
-            )
-            rows = cur.fetchall()
-
-    for r in rows:
-        keyword = r.get("keyword") if isinstance(r, dict) else r[0]
-        category = r.get("category") if isinstance(r, dict) else r[1]
-        kw_norm = normalize_text(keyword or "")
-        if not kw_norm:
-            continue
-        if contains_word(memo_norm, kw_norm) or (kw_norm in memo_norm):
-            return (category or "").strip() or None
-
-    return None
+    hit = _user_rule_matcher(user_id).first(memo_norm)
+    if hit is None:
+        return None
+    return hit[1] or None
 
 
 def upsert_category_rule(user_id: int, keyword: str, category: str) -> None:
@@ -155,6 +189,7 @@ def upsert_category_rule(user_id: int, keyword: str, category: str) -> None:
                 (user_id, keyword, category),
             )
         conn.commit()
+    invalidate_category_rules_cache(user_id)
 
 
 def list_user_category_rules(user_id: int) -> list[tuple[str, str]]:
@@ -493,6 +528,7 @@ def update_user_category(
                 (next_name, next_emoji, next_color, user_id, int(cat_id)),
             )
         conn.commit()
+    invalidate_category_rules_cache(user_id)
     return get_user_category(user_id, cat_id)
 
 
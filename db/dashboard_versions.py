@@ -0,0 +1,36 @@
+"""
+db/dashboard_versions.py — Versão do snapshot do dashboard por usuário.
+
+`dashboard_versions.version` é incrementado por triggers (ver db/schema.py) em
+toda escrita nas tabelas que alimentam o snapshot do WebSocket — lançamentos,
+cartão, caixinhas, investimentos, orçamentos, Open Finance. Ler a versão é uma
+consulta de chave primária: o dashboard só recalcula o snapshot quando ela muda.
+
+A ETag entregue ao cliente junta a versão com a data de hoje — o rendimento de
+caixinhas/investimentos anda sozinho na virada do dia, sem escrita nenhuma.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+from .connection import get_conn
+
+
+DASHBOARD_VERSION_SQL = "select version from dashboard_versions where user_id = %s"
+
+
+def dashboard_etag(version: int | None, today: date) -> str:
+    """ETag do snapshot: versão do banco + dia (rendimento diário)."""
+    return f"{int(version or 0)}.{today.isoformat()}"
+
+
+def get_dashboard_version(user_id: int) -> int:
+    """Versão atual do snapshot do usuário (0 se nunca houve escrita)."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(DASHBOARD_VERSION_SQL, (user_id,))
+            row = cur.fetchone()
+    return int(row["version"]) if row else 0
+
+
+__all__ = ["DASHBOARD_VERSION_SQL", "dashboard_etag", "get_dashboard_version"]
@@ -0,0 +1,104 @@
+"""
+db/export_cache.py — Cache dos extratos mensais renderizados (CSV/XLSX/PDF).
+
+Renderizar o extrato (openpyxl/reportlab) custa bem mais que ler o mês do
+banco, e o mesmo mês é baixado de novo a cada reenvio por e-mail. Cada
+(usuário, mês, formato) guarda o último arquivo gerado com duas chaves:
+
+  - `data_version`: a versão do dashboard (db/dashboard_versions.py) em que o
+    arquivo foi conferido. Mesma versão → nada mudou → devolve o arquivo sem
+    nem ler os lançamentos.
+  - `input_digest`: hash do conteúdo que gerou o arquivo (itens do mês + o que
+    mais entra no layout). A versão é do usuário inteiro: um lançamento novo em
+    outubro muda a versão, mas não o extrato de março. Aí os itens são relidos,
+    o hash bate e o arquivo é reaproveitado sem renderizar de novo.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+from .connection import get_conn
+
+
+# Acima disso o arquivo não vai pro cache (anexo de e-mail já tem teto menor).
+EXPORT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def export_input_digest(payload: Any) -> str:
+    """sha256 do conteúdo que gera o extrato (JSON canônico; datas em ISO)."""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get_cached_export(user_id: int, year: int, month: int, fmt: str, data_version: int) -> bytes | None:
+    """Arquivo já conferido nesta versão dos dados, ou None."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                select content from export_render_cache
+                 where user_id = %s and year = %s and month = %s and fmt = %s
+                   and data_version = %s
+                """,
+                (user_id, year, month, fmt, data_version),
+            )
+            row = cur.fetchone()
+    return bytes(row["content"]) if row else None
+
+
+def reuse_cached_export(
+    user_id: int, year: int, month: int, fmt: str, data_version: int, input_digest: str,
+) -> bytes | None:
+    """Arquivo gerado do mesmo conteúdo (`input_digest`), marcado como
+    conferido em `data_version`; None se o conteúdo mudou."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                update export_render_cache
+                   set data_version = greatest(data_version, %s)
+                 where user_id = %s and year = %s and month = %s and fmt = %s
+                   and input_digest = %s
+                returning content
+                """,
+                (data_version, user_id, year, month, fmt, input_digest),
+            )
+            row = cur.fetchone()
+        conn.commit()
+    return bytes(row["content"]) if row else None
+
+
+def put_cached_export(
+    user_id: int, year: int, month: int, fmt: str, data_version: int, input_digest: str, content: bytes,
+) -> None:
+    """Guarda o arquivo recém-renderizado (substitui o anterior do mês/formato)."""
+    if len(content) > EXPORT_CACHE_MAX_BYTES:
+        return
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                insert into export_render_cache
+                    (user_id, year, month, fmt, data_version, input_digest, content)
+                values (%s, %s, %s, %s, %s, %s, %s)
+                on conflict (user_id, year, month, fmt) do update
+                   set data_version = excluded.data_version,
+                       input_digest = excluded.input_digest,
+                       content = excluded.content,
+                       created_at = now()
+                 where export_render_cache.data_version <= excluded.data_version
+                """,
+                (user_id, year, month, fmt, data_version, input_digest, content),
+            )
+        conn.commit()
+
+
+__all__ = [
+    "EXPORT_CACHE_MAX_BYTES",
+    "export_input_digest",
+    "get_cached_export",
+    "put_cached_export",
+    "reuse_cached_export",
+]
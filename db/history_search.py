@@ -0,0 +1,244 @@
+"""
+db/history_search.py — Busca textual no histórico (launches + credit_transactions).
+
+Cada linha carrega `search_vec`, um tsvector mantido pelo Postgres (coluna
+gerada, ver db/schema.py) sobre alvo + nota + categoria sem acento e em
+minúsculas, com índice GIN. A busca casa por PREFIXO de palavra ("merc" acha
+"Mercado Livre", "credito" acha "Crédito") e usa o índice, em vez do antigo
+`unaccent(...) ILIKE '%termo%'` que varria o histórico inteiro do usuário a
+cada tecla.
+
+Com a extensão pg_trgm instalada (opcional, criada pelo init_db quando o
+servidor tem), termos de 3+ letras casam também no MEIO da palavra ("bank"
+acha "Nubank"), via índice de trigramas sobre o mesmo texto normalizado.
+
+Regras da busca (iguais às de antes):
+  - até MAX_TERMS palavras, descartando as com menos de MIN_TERM_LEN letras;
+  - AND entre palavras, OR entre campos;
+  - em credit_transactions a palavra também pode casar com o nome do cartão.
+
+`search_history` é a busca ranqueada (mais relevante primeiro); `list_history`
+(db/analytics.py) e o filtro do dashboard usam `search_clause` pra filtrar
+mantendo a ordem cronológica.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from datetime import date
+from typing import Any
+
+from .connection import get_conn
+
+
+MAX_TERMS = 6
+MIN_TERM_LEN = 2
+# Abaixo disso o pg_trgm não extrai trigrama e o índice não ajuda.
+_TRGM_MIN_TOKEN_LEN = 3
+
+# Mesma quebra do history_search_document no banco: pontuação separa palavras.
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+_DOCUMENT_SQL = {
+    "launches": "history_search_document({a}alvo, {a}nota, {a}categoria)",
+    "credit_transactions": "history_search_document(null, {a}nota, {a}categoria)",
+}
+
+_trgm_lock = threading.Lock()
+_trgm_enabled: bool | None = None
+
+
+def parse_search_terms(q: str | None) -> list[str]:
+    """Palavras da busca, em minúsculas (até MAX_TERMS, com MIN_TERM_LEN+ letras)."""
+    terms: list[str] = []
+    for raw in str(q or "").strip().split():
+        term = raw.strip().lower()
+        if len(term) >= MIN_TERM_LEN and _TOKEN_RE.search(term):
+            terms.append(term)
+        if len(terms) >= MAX_TERMS:
+            break
+    return terms
+
+
+def prefix_tsquery(terms: list[str]) -> str:
+    """Texto de tsquery com todos os tokens em prefixo: 'mercado:* & livre:*'.
+
+    Só sobra alfanumérico em cada token, então não há como injetar operador
+    de tsquery. Acento sai no banco (history_search_normalize).
+    """
+    tokens = [tok for term in terms for tok in _TOKEN_RE.findall(term)]
+    return " & ".join(f"{tok}:*" for tok in tokens)
+
+
+def trigram_search_enabled() -> bool:
+    """Se o banco tem os índices de trigramas (pg_trgm). Cacheado por processo."""
+    global _trgm_enabled
+    if _trgm_enabled is None:
+        with _trgm_lock:
+            if _trgm_enabled is None:
+                with get_conn() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            "select 1 from pg_indexes where indexname = 'idx_launches_search_trgm'"
+                        )
+                        _trgm_enabled = cur.fetchone() is not None
+    return _trgm_enabled
+
+
+def invalidate_trigram_search_cache() -> None:
+    """Relê a disponibilidade do pg_trgm na próxima busca (ex.: depois do init_db)."""
+    global _trgm_enabled
+    with _trgm_lock:
+        _trgm_enabled = None
+
+
+def _term_match(term: str, document: str, vec: str, trgm: bool) -> tuple[str, list[Any]]:
+    """Uma palavra contra uma linha: tokens curtos (ou sem pg_trgm) por prefixo
+    no tsvector; os demais por substring no índice de trigramas."""
+    tokens = _TOKEN_RE.findall(term)
+    prefix = [t for t in tokens if not (trgm and len(t) >= _TRGM_MIN_TOKEN_LEN)]
+    inner = [t for t in tokens if trgm and len(t) >= _TRGM_MIN_TOKEN_LEN]
+    sqls: list[str] = []
+    params: list[Any] = []
+    if prefix:
+        sqls.append(f"{vec} @@ to_tsquery('simple', history_search_normalize(%s))")
+        params.append(prefix_tsquery(prefix))
+    for tok in inner:
+        sqls.append(f"{document} LIKE '%%' || history_search_normalize(%s) || '%%'")
+        params.append(tok)
+    return " AND ".join(sqls), params
+
+
+def search_clause(
+    terms: list[str],
+    *,
+    table: str = "launches",
+    alias: str = "",
+    card_user_id: int | None = None,
+) -> tuple[str, list[Any]]:
+    """(fragmento SQL, params) que filtra `table` pelas palavras `terms`.
+
+    `alias` é o prefixo das colunas ('' ou 'ct.'). Em credit_transactions,
+    com `card_user_id`, a palavra também casa com o nome de um cartão do
+    usuário. Vazio ("", []) quando não há termo.
+    """
+    if not terms:
+        return "", []
+    document = _DOCUMENT_SQL[table].format(a=alias)
+    vec = f"{alias}search_vec"
+    trgm = trigram_search_enabled()
+    per_term: list[str] = []
+    params: list[Any] = []
+    for term in terms:
+        sql, term_params = _term_match(term, document, vec, trgm)
+        if table == "credit_transactions" and card_user_id is not None:
+            sql = (
+                f"({sql} OR {alias}card_id IN ("
+                "SELECT cc.id FROM credit_cards cc WHERE cc.user_id = %s "
+                "AND history_search_document(cc.name, null, null) "
+                "LIKE '%%' || history_search_normalize(%s) || '%%'))"
+            )
+            term_params = [*term_params, card_user_id, " ".join(_TOKEN_RE.findall(term))]
+        else:
+            sql = f"({sql})"
+        per_term.append(sql)
+        params.extend(term_params)
+    return " AND ".join(per_term), params
+
+
+def search_history(
+    user_id: int,
+    q: str | None,
+    *,
+    from_date: date | None = None,
+    limit: int = 20,
+) -> dict:
+    """Busca ranqueada no histórico: { items: [...], terms: [...] }.
+
+    Ordena por relevância (ts_rank_cd do prefixo + o da palavra exata: "uber"
+    põe "Uber" antes de "Uberlândia"; termos próximos e repetidos pesam mais;
+    casamento só por substring fica com 0) e, no empate, pelo mais recente.
+    Cada item tem o mesmo formato do `list_history` + `rank`.
+    `from_date` corta o histórico (limite do plano).
+    """
+    terms = parse_search_terms(q)
+    limit = max(1, min(int(limit or 20), 100))
+    if not terms:
+        return {"items": [], "terms": []}
+    rank_query = prefix_tsquery(terms)
+    exact_query = rank_query.replace(":*", "")
+
+    launch_where, launch_params = search_clause(terms)
+    credit_where, credit_params = search_clause(
+        terms, table="credit_transactions", alias="ct.", card_user_id=user_id,
+    )
+    launch_from = "AND criado_em >= %s" if from_date else ""
+    credit_from = "AND b.period_end >= %s" if from_date else ""
+    params: list[Any] = [rank_query, exact_query, user_id, *launch_params]
+    if from_date:
+        params.append(from_date)
+    params += [rank_query, exact_query, user_id, *credit_params]
+    if from_date:
+        params.append(from_date)
+    params.append(limit)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT * FROM (
+                  SELECT id, tipo, valor, alvo, nota, categoria, criado_em,
+                         ts_rank_cd(search_vec, to_tsquery('simple', history_search_normalize(%s)))
+                         + ts_rank_cd(search_vec, to_tsquery('simple', history_search_normalize(%s))) AS rank
+                    FROM launches
+                   WHERE user_id = %s
+                     AND tipo IN ('despesa', 'receita', 'saida')
+                     AND is_internal_movement = false
+                     AND {launch_where}
+                     {launch_from}
+                  UNION ALL
+                  SELECT ct.id, 'credito' AS tipo, ct.valor, c.name AS alvo, ct.nota,
+                         ct.categoria, ct.created_at AS criado_em,
+                         ts_rank_cd(ct.search_vec, to_tsquery('simple', history_search_normalize(%s)))
+                         + ts_rank_cd(ct.search_vec, to_tsquery('simple', history_search_normalize(%s))) AS rank
+                    FROM credit_transactions ct
+                    JOIN credit_cards c ON c.id = ct.card_id
+                    JOIN credit_bills b ON b.id = ct.bill_id
+                   WHERE ct.user_id = %s
+                     AND ct.is_refund = false
+                     AND {credit_where}
+                     {credit_from}
+                ) matches
+                ORDER BY rank DESC, criado_em DESC, id ASC
+                LIMIT %s
+                """,
+                tuple(params),
+            )
+            rows = cur.fetchall()
+
+    items = [
+        {
+            "id": int(r["id"]),
+            "tipo": r["tipo"],
+            "valor": float(r["valor"]) if r["valor"] is not None else 0.0,
+            "alvo": r["alvo"],
+            "nota": r["nota"],
+            "categoria": r["categoria"],
+            "criado_em": r["criado_em"].isoformat() if r["criado_em"] else None,
+            "rank": round(float(r["rank"] or 0), 4),
+        }
+        for r in rows
+    ]
+    return {"items": items, "terms": terms}
+
+
+__all__ = [
+    "MAX_TERMS",
+    "MIN_TERM_LEN",
+    "invalidate_trigram_search_cache",
+    "parse_search_terms",
+    "prefix_tsquery",
+    "search_clause",
+    "search_history",
+    "trigram_search_enabled",
+]
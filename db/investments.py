@@ -13,7 +13,17 @@ import psycopg
 
 from utils_date import _tz, is_br_business_day
 
+from .bulk_import import stage_rows
 from .connection import get_conn
+from .market_rates import (
+    ACCRUAL_SERIES,
+    DASHBOARD_SERIES,
+    FactorIndex,
+    get_latest_rate,
+    get_rate_map,
+    get_rate_series,
+    invalidate_market_rate_cache,
+)
 from .users import ensure_user
 
 logger = logging.getLogger(__name__)
@@ -24,20 +34,39 @@ _warned_bcb_requests: set[tuple] = set()
 # Helpers de dias úteis e datas
 # ──────────────────────────────────────────────────────────────────────────────
 
+_BUSINESS_DAY_PREFIX: dict[int, list[int]] = {}
+
+
+def _business_day_prefix(year: int) -> list[int]:
+    """prefix[k] = dias úteis do dia 1 ao dia k do ano (k = tm_yday)."""
+    cached = _BUSINESS_DAY_PREFIX.get(year)
+    if cached is not None:
+        return cached
+    prefix = [0]
+    d = date(year, 1, 1)
+    while d.year == year:
+        prefix.append(prefix[-1] + (1 if is_br_business_day(d) else 0))
+        d += timedelta(days=1)
+    _BUSINESS_DAY_PREFIX[year] = prefix
+    return prefix
+
+
 def _business_days_between(d1: date, d2: date) -> int:
     """
     Dias úteis entre d1 (exclusive) e d2 (inclusive), considerando seg-sex
     e feriados nacionais brasileiros (calendário ANBIMA aproximado).
+
+    Contagem por diferença de prefixos anuais: O(nº de anos), não O(nº de dias).
     """
     if d2 <= d1:
         return 0
-    days = 0
-    cur = d1
-    while cur < d2:
-        cur = cur.fromordinal(cur.toordinal() + 1)
-        if is_br_business_day(cur):
-            days += 1
-    return days
+    start = _business_day_prefix(d1.year)
+    if d1.year == d2.year:
+        return start[d2.timetuple().tm_yday] - start[d1.timetuple().tm_yday]
+    days = start[-1] - start[d1.timetuple().tm_yday]
+    for year in range(d1.year + 1, d2.year):
+        days += _business_day_prefix(year)[-1]
+    return days + _business_day_prefix(d2.year)[d2.timetuple().tm_yday]
 
 
 def _fmt_ddmmyyyy(d: date) -> str:
@@ -146,110 +175,38 @@ def _fetch_sgs_latest_json(series_code: int, limit: int = 15) -> list[dict]:
 def _get_cdi_daily_map(cur, start: date, end: date) -> dict[date, float]:
     """
     Retorna {date: cdi_percent_per_day}.
-    Usa cache em market_rates e busca do BCB o que estiver faltando.
+    Lê só o cache local (market_rates); quem busca no BCB é refresh_market_rates.
     """
-    if end <= start:
-        return {}
-
-    cur.execute(
-        "select ref_date, value from market_rates "
-        "where code='CDI' and ref_date >= %s and ref_date <= %s order by ref_date",
-        (start, end),
-    )
-    cached = {row["ref_date"]: float(row["value"]) for row in cur.fetchall()}
-
-    data = _fetch_sgs_series_json(12, start, end)
-    if not isinstance(data, list) or not data:
-        return cached
-
-    to_upsert = []
-    for item in data:
-        if not isinstance(item, dict):
-            continue
-        try:
-            raw_date = item.get("data")
-            raw_val = item.get("valor")
-            if not raw_date or raw_val is None:
-                continue
-            d = datetime.strptime(raw_date, "%d/%m/%Y").date()
-            v = float(str(raw_val).replace(",", "."))
-            if d not in cached:
-                to_upsert.append((d, v))
-            cached[d] = v
-        except Exception as e:
-            _warn_bcb_once(
-                ("invalid_bcb_item", str(item), type(e).__name__, str(e)),
-                "Item inválido do BCB ignorado: %s | erro=%s",
-                item,
-                e,
-            )
-
-    if to_upsert:
-        cur.executemany(
-            "insert into market_rates(code, ref_date, value) values ('CDI', %s, %s) "
-            "on conflict (code, ref_date) do update set value=excluded.value",
-            to_upsert,
-        )
-
-    return cached
-
-
-def _get_sgs_daily_map(cur, code: str, series_code: int, start: date, end: date) -> dict[date, float]:
-    """Retorna {date: percent_per_day} para séries SGS diárias, com cache em market_rates."""
-    if end <= start:
-        return {}
-
-    cur.execute(
-        "select ref_date, value from market_rates "
-        "where code=%s and ref_date >= %s and ref_date <= %s order by ref_date",
-        (code, start, end),
-    )
-    cached = {row["ref_date"]: float(row["value"]) for row in cur.fetchall()}
-
-    data = _fetch_sgs_series_json(series_code, start, end)
-    if not isinstance(data, list) or not data:
-        return cached
-
-    to_upsert = []
-    for item in data:
-        try:
-            d = datetime.strptime(item["data"], "%d/%m/%Y").date()
-            v = float(str(item["valor"]).replace(",", "."))
-            if d not in cached:
-                to_upsert.append((code, d, v))
-            cached[d] = v
-        except Exception as e:
-            _warn_bcb_once(
-                ("invalid_sgs_daily_item", code, str(item), type(e).__name__, str(e)),
-                "Item inválido do SGS %s ignorado: %s | erro=%s",
-                code,
-                item,
-                e,
-            )
+    return get_rate_map(cur, "CDI", start, end)
 
-    if to_upsert:
-        cur.executemany(
-            "insert into market_rates(code, ref_date, value) values (%s, %s, %s) "
-            "on conflict (code, ref_date) do update set value=excluded.value",
-            to_upsert,
-        )
 
-    return cached
+def _get_sgs_daily_map(cur, code: str, start: date, end: date) -> dict[date, float]:
+    """Retorna {date: percent_per_day} para séries SGS diárias, do cache local."""
+    return get_rate_map(cur, code, start, end)
 
 
-def _get_sgs_monthly_map(cur, code: str, series_code: int, start: date, end: date) -> dict[date, float]:
-    """Retorna {ref_date: percent_per_month} para séries SGS mensais, com cache local."""
-    return _get_sgs_daily_map(cur, code, series_code, start, end)
+def _get_sgs_monthly_map(cur, code: str, start: date, end: date) -> dict[date, float]:
+    """Retorna {ref_date: percent_per_month} para séries SGS mensais, do cache local."""
+    return get_rate_map(cur, code, start, end)
 
 
 def _get_selic_daily_map(cur, start: date, end: date) -> dict[date, float]:
     """Taxa SELIC diária (% a.d.) no SGS/BCB (série 11)."""
-    return _get_sgs_daily_map(cur, "SELIC_DAILY", 11, start, end)
+    return _get_sgs_daily_map(cur, "SELIC_DAILY", start, end)
 
 
 def _get_ipca_monthly_map(cur, start: date, end: date) -> dict[date, float]:
     """IPCA mensal (% a.m.) no SGS/BCB (série 433)."""
-    return _get_sgs_monthly_map(cur, "IPCA_MONTHLY", 433, start, end)
+    return _get_sgs_monthly_map(cur, "IPCA_MONTHLY", start, end)
+
+
+# Funções de mapa "de fábrica" por série; _rate_index compara com elas para
+# saber se pode usar o índice compartilhado do cache local.
+_DEFAULT_RATE_MAPS = {
+    "CDI": _get_cdi_daily_map,
+    "SELIC_DAILY": _get_selic_daily_map,
+    "IPCA_MONTHLY": _get_ipca_monthly_map,
+}
 
 
 def _parse_sgs_latest(data, *, series: str) -> tuple[date, float] | None:
@@ -347,15 +304,17 @@ def get_latest_ipca_12m(cur) -> tuple[date, float] | None:
 
 
 def get_dashboard_market_rates() -> dict:
-    """Taxas oficiais úteis para o dashboard, com datas de referência."""
+    """Taxas oficiais úteis para o dashboard, com datas de referência.
+
+    Lê só o cache local; refresh_market_rates mantém os valores em dia.
+    """
     with get_conn() as conn:
         with conn.cursor() as cur:
             rates = {
-                "cdi_aa": get_latest_cdi_aa(cur),
-                "selic_aa": get_latest_selic_aa(cur),
-                "ipca_12m": get_latest_ipca_12m(cur),
+                "cdi_aa": get_latest_rate(cur, "CDI_AA"),
+                "selic_aa": get_latest_rate(cur, "SELIC_AA"),
+                "ipca_12m": get_latest_rate(cur, "IPCA_12M"),
             }
-        conn.commit()
 
     return {
         key: (
@@ -383,6 +342,115 @@ def get_latest_cdi_daily_pct() -> float:
     return float(latest)
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Refresher — único caminho que busca séries no SGS/BCB
+# ──────────────────────────────────────────────────────────────────────────────
+
+# Janela máxima buscada de uma vez quando a série ainda está vazia localmente
+# (a API do SGS recusa consultas diárias acima de 10 anos).
+MARKET_RATES_MAX_BACKFILL_DAYS = 3650
+
+
+def _parse_sgs_items(data, code: str) -> list[tuple[date, float]]:
+    out = []
+    for item in data or []:
+        try:
+            d = datetime.strptime(item["data"], "%d/%m/%Y").date()
+            v = float(str(item["valor"]).replace(",", "."))
+        except Exception as e:
+            _warn_bcb_once(
+                ("invalid_sgs_daily_item", code, str(item), type(e).__name__, str(e)),
+                "Item inválido do SGS %s ignorado: %s | erro=%s",
+                code,
+                item,
+                e,
+            )
+            continue
+        out.append((d, v))
+    return out
+
+
+def _fetch_and_store_sgs_range(cur, code: str, series_code: int, start: date, end: date) -> int:
+    if end < start:
+        return 0
+    items = _parse_sgs_items(_fetch_sgs_series_json(series_code, start, end), code)
+    if items:
+        cur.executemany(
+            "insert into market_rates(code, ref_date, value) values (%s, %s, %s) "
+            "on conflict (code, ref_date) do update set value=excluded.value",
+            [(code, d, v) for d, v in items],
+        )
+    return len(items)
+
+
+def _earliest_accrual_date(cur) -> date | None:
+    """Menor last_date entre lotes abertos de investimentos e caixinhas."""
+    cur.execute(
+        """
+        select min(d) as d from (
+            select min(last_date) as d from investment_lots where status='open'
+            union all
+            select min(last_date) from investments
+            union all
+            select min(last_date) from pocket_lots where status='open'
+        ) t
+        """
+    )
+    row = cur.fetchone()
+    return row["d"] if row else None
+
+
+def refresh_market_rates(today: date | None = None) -> dict[str, int]:
+    """
+    Busca no SGS os dias que faltam em market_rates para as séries do accrual
+    (CDI, SELIC diária, IPCA mensal) e atualiza as taxas do dashboard.
+
+    Cobre o intervalo [menor last_date em aberto, hoje]: completa o começo se
+    algum lote é mais antigo que a série local e o fim a partir do último dia
+    gravado. Roda em background (investment_scheduler); o accrual só lê o cache.
+    Retorna {código: nº de pontos recebidos do BCB}.
+    """
+    if today is None:
+        today = datetime.now(_tz()).date()
+
+    fetched: dict[str, int] = {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            needed_from = _earliest_accrual_date(cur)
+            floor = today - timedelta(days=MARKET_RATES_MAX_BACKFILL_DAYS)
+            if needed_from is None or needed_from < floor:
+                needed_from = floor
+
+            for code, series_code in ACCRUAL_SERIES.items():
+                cur.execute(
+                    "select min(ref_date) as first, max(ref_date) as last "
+                    "from market_rates where code=%s",
+                    (code,),
+                )
+                bounds = cur.fetchone()
+                first, last = bounds["first"], bounds["last"]
+                count = 0
+                if first is None:
+                    count += _fetch_and_store_sgs_range(cur, code, series_code, needed_from, today)
+                else:
+                    if needed_from < first:
+                        count += _fetch_and_store_sgs_range(
+                            cur, code, series_code, needed_from, first - timedelta(days=1)
+                        )
+                    count += _fetch_and_store_sgs_range(
+                        cur, code, series_code, last + timedelta(days=1), today
+                    )
+                fetched[code] = count
+
+            for code, series_code in DASHBOARD_SERIES.items():
+                latest = get_latest_market_rate(cur, code, series_code)
+                fetched[code] = 1 if latest else 0
+        conn.commit()
+
+    invalidate_market_rate_cache()
+    return fetched
+
+
 MONEY = Decimal("0.01")
 ZERO = Decimal("0")
 LOT_EPSILON = Decimal("0.000001")
@@ -461,6 +529,25 @@ def _taxes_for_gain(gain: Decimal, days: int, tax_profile: str | None) -> tuple[
     return iof, ir
 
 
+def _rate_index(
+    cur,
+    code: str,
+    fetch_map,
+    start: date,
+    today: date,
+    mult: float = 1.0,
+) -> FactorIndex:
+    """Índice de fatores acumulados da série `code`.
+
+    Caminho normal: índice do cache local (db/market_rates.py), montado uma vez
+    e compartilhado por todos os lotes. Se o mapa da série foi trocado
+    (scripts de diagnóstico, testes), monta o índice só do recorte devolvido.
+    """
+    if fetch_map is _DEFAULT_RATE_MAPS[code]:
+        return get_rate_series(cur, code).factor_index(mult)
+    return FactorIndex.from_rates(fetch_map(cur, start, today), mult)
+
+
 def _growth_for_period(
     cur,
     balance: Decimal,
@@ -478,61 +565,42 @@ def _growth_for_period(
 
     rate = float(rate_value)
 
-    if period == "cdi":
-        mult = rate
-        start = last_date + timedelta(days=1)
-        db_pkg = sys.modules.get("db")
-        fetch_cdi_daily_map = getattr(db_pkg, "_get_cdi_daily_map", _get_cdi_daily_map)
-        cdi_map = fetch_cdi_daily_map(cur, start, today)
-        cdi_days = sorted(d for d in cdi_map.keys() if last_date < d <= today)
-        if not cdi_days:
-            return balance, last_date
-
-        factor = 1.0
-        for d in cdi_days:
-            factor *= (1.0 + (cdi_map[d] / 100.0) * mult)
-        return Decimal(str(float(balance) * factor)), cdi_days[-1]
-
-    if period == "cdi_spread":
+    if period in ("cdi", "cdi_spread"):
         start = last_date + timedelta(days=1)
         db_pkg = sys.modules.get("db")
         fetch_cdi_daily_map = getattr(db_pkg, "_get_cdi_daily_map", _get_cdi_daily_map)
-        cdi_map = fetch_cdi_daily_map(cur, start, today)
-        cdi_days = sorted(d for d in cdi_map.keys() if last_date < d <= today)
-        if not cdi_days:
+        mult = rate if period == "cdi" else 1.0
+        index = _rate_index(cur, "CDI", fetch_cdi_daily_map, start, today, mult)
+        factor, days, applied_until = index.growth(last_date, today)
+        if not days:
             return balance, last_date
 
-        spread_daily = (1.0 + rate) ** (1.0 / 252.0) - 1.0
-        factor = 1.0
-        for d in cdi_days:
-            factor *= (1.0 + (cdi_map[d] / 100.0)) * (1.0 + spread_daily)
-        return Decimal(str(float(balance) * factor)), cdi_days[-1]
+        if period == "cdi_spread":
+            spread_daily = (1.0 + rate) ** (1.0 / 252.0) - 1.0
+            factor *= (1.0 + spread_daily) ** days
+        return Decimal(str(float(balance) * factor)), applied_until
 
     if period == "selic_spread":
         start = last_date + timedelta(days=1)
-        selic_map = _get_selic_daily_map(cur, start, today)
-        selic_days = sorted(d for d in selic_map.keys() if last_date < d <= today)
-        if not selic_days:
+        index = _rate_index(cur, "SELIC_DAILY", _get_selic_daily_map, start, today)
+        factor, days, applied_until = index.growth(last_date, today)
+        if not days:
             return balance, last_date
 
         spread_daily = (1.0 + rate) ** (1.0 / 252.0) - 1.0
-        factor = 1.0
-        for d in selic_days:
-            factor *= (1.0 + (selic_map[d] / 100.0)) * (1.0 + spread_daily)
-        return Decimal(str(float(balance) * factor)), selic_days[-1]
+        factor *= (1.0 + spread_daily) ** days
+        return Decimal(str(float(balance) * factor)), applied_until
 
     if period == "ipca_spread":
         start = (last_date.replace(day=1) + timedelta(days=32)).replace(day=1)
-        ipca_map = _get_ipca_monthly_map(cur, start, today)
-        ipca_months = sorted(d for d in ipca_map.keys() if last_date < d <= today)
-        if not ipca_months:
+        index = _rate_index(cur, "IPCA_MONTHLY", _get_ipca_monthly_map, start, today)
+        factor, months, applied_until = index.growth(last_date, today)
+        if not months:
             return balance, last_date
 
         spread_monthly = (1.0 + rate) ** (1.0 / 12.0) - 1.0
-        factor = 1.0
-        for d in ipca_months:
-            factor *= (1.0 + (ipca_map[d] / 100.0)) * (1.0 + spread_monthly)
-        return Decimal(str(float(balance) * factor)), ipca_months[-1]
+        factor *= (1.0 + spread_monthly) ** months
+        return Decimal(str(float(balance) * factor)), applied_until
 
     if period == "daily":
         daily_rate = rate
@@ -737,6 +805,125 @@ def accrue_investment_db(cur, user_id: int, inv_id: int, today: date | None = No
     return _sync_investment_from_lots(cur, user_id, inv_id)
 
 
+_LOT_ACCRUAL_STAGE_COLUMNS = (
+    ("id", "bigint"),
+    ("balance", "numeric"),
+    ("last_date", "date"),
+)
+
+
+def _accrue_open_lots(cur, user_ids: list[int], today: date) -> int:
+    """
+    Accrual em lote de todos os investimentos de `user_ids` numa transação.
+
+    Mesma regra de accrue_investment_db, mas com 1 SELECT para todos os lotes
+    abertos, crescimento calculado pelo índice de fatores acumulados (O(log n)
+    por lote, sem rede) e escrita set-based: COPY dos lotes alterados + 1 UPDATE
+    nos lotes + 1 UPDATE re-somando os investimentos. Trava investments antes de
+    investment_lots, na mesma ordem do caminho por investimento.
+    Retorna o nº de lotes alterados.
+    """
+    if not user_ids:
+        return 0
+
+    cur.execute(
+        """
+        select id, user_id, balance, rate, period, last_date, purchase_date, maturity_date
+        from investments
+        where user_id = any(%s)
+        order by id
+        for update
+        """,
+        (user_ids,),
+    )
+    investments = {int(row["id"]): row for row in cur.fetchall()}
+    if not investments:
+        return 0
+
+    cur.execute(
+        "select distinct investment_id from investment_lots where user_id = any(%s)",
+        (user_ids,),
+    )
+    with_lots = {int(row["investment_id"]) for row in cur.fetchall()}
+    for inv_id, inv in investments.items():
+        if inv_id not in with_lots:
+            _ensure_investment_lots(cur, int(inv["user_id"]), inv)
+
+    cur.execute(
+        """
+        select id, investment_id, balance, last_date, rate, period
+        from investment_lots
+        where user_id = any(%s) and status='open'
+        order by id
+        for update
+        """,
+        (user_ids,),
+    )
+    changed = []
+    for lot in cur.fetchall():
+        inv = investments[int(lot["investment_id"])]
+        lot_rate = lot["rate"] if lot["rate"] is not None else inv["rate"]
+        lot_period = lot["period"] or inv["period"]
+        new_balance, applied_until = _growth_for_period(
+            cur,
+            Decimal(str(lot["balance"] or 0)),
+            lot_period,
+            Decimal(str(lot_rate or 0)),
+            lot["last_date"],
+            today,
+        )
+        if new_balance != lot["balance"] or applied_until != lot["last_date"]:
+            changed.append((lot["id"], new_balance, applied_until or lot["last_date"]))
+
+    if changed:
+        stage_rows(cur, "_lot_accrual", _LOT_ACCRUAL_STAGE_COLUMNS, changed)
+        cur.execute(
+            """
+            update investment_lots l
+            set balance = s.balance, last_date = s.last_date
+            from _lot_accrual s
+            where l.id = s.id
+            """
+        )
+
+    # Igual a _sync_investment_from_lots: sem lote aberto o saldo zera e o
+    # last_date fica como está.
+    cur.execute(
+        """
+        update investments i
+        set balance = coalesce(t.balance, 0),
+            last_date = coalesce(t.last_date, i.last_date)
+        from (
+            select inv.id, sum(l.balance) as balance, max(l.last_date) as last_date
+            from investments inv
+            left join investment_lots l
+              on l.investment_id = inv.id and l.user_id = inv.user_id and l.status = 'open'
+            where inv.user_id = any(%s)
+            group by inv.id
+        ) t
+        where i.user_id = any(%s) and i.id = t.id
+        """,
+        (user_ids, user_ids),
+    )
+    return len(changed)
+
+
+def accrue_investments_for_users(user_ids: list[int], today: date | None = None) -> int:
+    """Aplica juros em todos os investimentos de `user_ids` numa única transação.
+
+    Usado pelo investment_scheduler em blocos de usuários. Retorna o nº de
+    lotes alterados.
+    """
+    if today is None:
+        today = datetime.now(_tz()).date()
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            changed = _accrue_open_lots(cur, user_ids, today)
+        conn.commit()
+    return changed
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # CRUD de investimentos
 # ──────────────────────────────────────────────────────────────────────────────
@@ -1109,13 +1296,10 @@ def _project_to_today(
     rate = float(rate_value)
 
     if period in ("cdi", "cdi_spread"):
-        cur.execute(
-            "select value from market_rates where code='CDI' order by ref_date desc limit 1"
-        )
-        row = cur.fetchone()
-        if not row:
+        latest = get_latest_rate(cur, "CDI")
+        if not latest:
             return balance, last_date, 0
-        latest_cdi = float(row["value"])
+        latest_cdi = latest[1]
 
         if period == "cdi":
             factor = (1.0 + (latest_cdi / 100.0) * rate) ** n
@@ -1125,13 +1309,10 @@ def _project_to_today(
         return Decimal(str(float(balance) * factor)), today, n
 
     if period == "selic_spread":
-        cur.execute(
-            "select value from market_rates where code='SELIC_DAILY' order by ref_date desc limit 1"
-        )
-        row = cur.fetchone()
-        if not row:
+        latest = get_latest_rate(cur, "SELIC_DAILY")
+        if not latest:
             return balance, last_date, 0
-        latest_selic = float(row["value"])
+        latest_selic = latest[1]
         spread_daily = (1.0 + rate) ** (1.0 / 252.0) - 1.0
         factor = ((1.0 + latest_selic / 100.0) * (1.0 + spread_daily)) ** n
         return Decimal(str(float(balance) * factor)), today, n
@@ -1158,11 +1339,7 @@ def accrue_all_investments(user_id: int, today: date | None = None):
 
     with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute("select id from investments where user_id=%s for update", (user_id,))
-            rows = cur.fetchall()
-
-            for r in rows:
-                accrue_investment_db(cur, user_id, r["id"], today=today)
+            _accrue_open_lots(cur, [user_id], today)
 
             cur.execute(
                 """
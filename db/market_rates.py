@@ -0,0 +1,174 @@
+"""
+db/market_rates.py — Séries de taxas oficiais (CDI, SELIC, IPCA) em memória.
+
+O accrual de investimentos e caixinhas roda por lote em cada carga do
+dashboard; antes, cada lote consultava a série SGS no BCB via HTTP mesmo com o
+período inteiro já gravado em `market_rates`. Agora:
+
+  * a tabela `market_rates` é a fonte da verdade local;
+  * este módulo mantém, por código de série, as datas ordenadas e os valores
+    carregados do banco — recortar um período é um bisect, sem rede;
+  * sobre cada série fica um índice de fatores acumulados (FactorIndex): o
+    rendimento de qualquer lote entre duas datas é uma divisão de dois
+    produtos prefixados, em vez de multiplicar dia a dia;
+  * só o refresher (`db.investments.refresh_market_rates`, chamado pelo loop de
+    investment_scheduler) busca no SGS os dias úteis que faltam e invalida o
+    cache da série.
+
+Cada processo recarrega a série do banco depois de MARKET_RATES_CACHE_TTL_SECONDS,
+então workers que não rodam o refresher também enxergam as taxas novas.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+# Séries diárias/mensais usadas no accrual: código local → série SGS.
+ACCRUAL_SERIES: dict[str, int] = {
+    "CDI": 12,
+    "SELIC_DAILY": 11,
+    "IPCA_MONTHLY": 433,
+}
+
+# Taxas "de vitrine" do dashboard: código local → série SGS (só o último valor).
+DASHBOARD_SERIES: dict[str, int] = {
+    "CDI_AA": 4389,
+    "SELIC_AA": 432,
+    "IPCA_12M": 13522,
+}
+
+
+def _cache_ttl_seconds() -> float:
+    raw = os.getenv("MARKET_RATES_CACHE_TTL_SECONDS", "300")
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        return 300.0
+
+
+class FactorIndex:
+    """Produtos acumulados dos fatores (1 + taxa% / 100 * mult) de uma série.
+
+    prefix[i] é o produto dos i primeiros fatores; o fator composto entre duas
+    posições é prefix[hi] / prefix[lo].
+    """
+
+    __slots__ = ("dates", "prefix")
+
+    def __init__(self, dates: list[date], values: list[float], mult: float = 1.0):
+        self.dates = dates
+        prefix = [1.0]
+        acc = 1.0
+        for value in values:
+            acc *= 1.0 + (value / 100.0) * mult
+            prefix.append(acc)
+        self.prefix = prefix
+
+    @classmethod
+    def from_rates(cls, rates: dict[date, float], mult: float = 1.0) -> "FactorIndex":
+        ordered = sorted(rates.items())
+        return cls([d for d, _ in ordered], [v for _, v in ordered], mult)
+
+    def growth(self, after: date, until: date) -> tuple[float, int, date | None]:
+        """(fator, nº de pontos, última data) para after < ref_date <= until."""
+        lo = bisect_right(self.dates, after)
+        hi = bisect_right(self.dates, until)
+        if hi <= lo:
+            return 1.0, 0, None
+        return self.prefix[hi] / self.prefix[lo], hi - lo, self.dates[hi - 1]
+
+
+class RateSeries:
+    """Série de uma taxa, ordenada por data de referência."""
+
+    __slots__ = ("code", "dates", "values", "loaded_at", "_indexes")
+
+    def __init__(self, code: str, dates: list[date], values: list[float], loaded_at: float):
+        self.code = code
+        self.dates = dates
+        self.values = values
+        self.loaded_at = loaded_at
+        self._indexes: dict[float, FactorIndex] = {}
+
+    def factor_index(self, mult: float = 1.0) -> FactorIndex:
+        """Índice de fatores acumulados para o multiplicador `mult` (ex.: 1.10 = 110% CDI).
+
+        Montado na primeira consulta e reaproveitado até a série ser recarregada;
+        na prática há poucos multiplicadores distintos entre todos os lotes.
+        """
+        index = self._indexes.get(mult)
+        if index is None:
+            index = FactorIndex(self.dates, self.values, mult)
+            self._indexes[mult] = index
+        return index
+
+    def between(self, start: date, end: date) -> dict[date, float]:
+        """{ref_date: valor} para start <= ref_date <= end."""
+        lo = bisect_left(self.dates, start)
+        hi = bisect_right(self.dates, end)
+        return dict(zip(self.dates[lo:hi], self.values[lo:hi]))
+
+    def latest(self) -> tuple[date, float] | None:
+        if not self.dates:
+            return None
+        return self.dates[-1], self.values[-1]
+
+
+_series: dict[str, RateSeries] = {}
+_lock = threading.Lock()
+
+
+def _load_series(cur, code: str) -> RateSeries:
+    cur.execute(
+        "select ref_date, value from market_rates where code=%s order by ref_date",
+        (code,),
+    )
+    rows = cur.fetchall()
+    return RateSeries(
+        code,
+        [row["ref_date"] for row in rows],
+        [float(row["value"]) for row in rows],
+        time.monotonic(),
+    )
+
+
+def get_rate_series(cur, code: str) -> RateSeries:
+    """Série `code` do cache do processo; carrega de market_rates se expirada.
+
+    Usa o cursor do chamador para não pegar uma segunda conexão do pool no
+    meio de uma transação de accrual.
+    """
+    series = _series.get(code)
+    if series is not None and time.monotonic() - series.loaded_at < _cache_ttl_seconds():
+        return series
+    with _lock:
+        series = _series.get(code)
+        if series is not None and time.monotonic() - series.loaded_at < _cache_ttl_seconds():
+            return series
+        series = _load_series(cur, code)
+        _series[code] = series
+        return series
+
+
+def get_rate_map(cur, code: str, start: date, end: date) -> dict[date, float]:
+    """{ref_date: valor} de `code` no intervalo [start, end], sem rede."""
+    if end <= start:
+        return {}
+    return get_rate_series(cur, code).between(start, end)
+
+
+def get_latest_rate(cur, code: str) -> tuple[date, float] | None:
+    """(ref_date, valor) mais recente de `code` no cache local."""
+    return get_rate_series(cur, code).latest()
+
+
+def invalidate_market_rate_cache(code: str | None = None) -> None:
+    """Descarta a série `code` (ou todas) do cache do processo."""
+    with _lock:
+        if code is None:
+            _series.clear()
+        else:
+            _series.pop(code, None)
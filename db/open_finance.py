@@ -1899,6 +1899,55 @@ def get_consolidated_balance(user_id: int) -> dict:
     }
 
 
+# `_BANK_ACCOUNTS_SQL` pra vários usuários de uma vez (resumos agendados): o
+# mesmo recorte, com o DISTINCT ON por conta real dentro de cada usuário.
+_BANK_ACCOUNTS_BULK_SQL = """
+    select user_id, coalesce(sum(balance), 0) as b, count(*) as n from (
+        select distinct on (c.user_id, a.provider_account_id)
+            c.user_id, a.balance,
+            upper(coalesce(c.status, '')) as connection_status
+        from open_finance_accounts a
+        join open_finance_connections c on c.id = a.connection_id
+        where c.user_id = any(%s) and upper(a.type) = 'BANK'
+          and upper(coalesce(a.currency, 'BRL')) = 'BRL'
+        order by c.user_id, a.provider_account_id, c.id desc
+    ) uniq
+    where connection_status not in ('PAUSED', 'DELETED')
+    group by user_id
+"""
+
+
+def get_consolidated_balances(user_ids: list[int]) -> dict[int, dict]:
+    """`get_consolidated_balance` de vários usuários em duas queries.
+
+    Usuário sem linha em `accounts` sai com manual 0 (o per-user cria a linha
+    via ensure_user; aqui é só leitura)."""
+    ids = sorted({int(u) for u in user_ids})
+    if not ids:
+        return {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "select user_id, coalesce(balance, 0) as b from accounts where user_id = any(%s)",
+                (ids,),
+            )
+            manual = {int(r["user_id"]): r["b"] for r in cur.fetchall()}
+            cur.execute(_BANK_ACCOUNTS_BULK_SQL, (ids,))
+            banks = {int(r["user_id"]): (r["b"], int(r["n"] or 0)) for r in cur.fetchall()}
+
+    out: dict[int, dict] = {}
+    for uid in ids:
+        m = manual.get(uid, Decimal("0"))
+        of_bank, of_count = banks.get(uid, (Decimal("0"), 0))
+        out[uid] = {
+            "manual": m,
+            "open_finance_bank": of_bank,
+            "of_bank_count": of_count,
+            "consolidated": (m or Decimal("0")) + (of_bank or Decimal("0")),
+        }
+    return out
+
+
 def disconnect_open_finance_connection(user_id: int, connection_id: int | None = None) -> int:
     """Desconecta banco(s) e LIMPA o que foi importado (P0 integridade).
 
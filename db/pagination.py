@@ -0,0 +1,157 @@
+"""
+db/pagination.py — Paginação por cursor (keyset) e total aproximado.
+
+`LIMIT n OFFSET k` faz o banco gerar e jogar fora as k primeiras linhas: a
+página 200 do histórico custa 200 páginas. Com keyset, a próxima página começa
+logo depois da última linha entregue (`WHERE (chave) < (última chave)`), e o
+índice vai direto ao ponto — toda página custa o mesmo.
+
+Peças:
+  - `encode_cursor` / `decode_cursor`: token opaco (base64url de JSON) com a
+    chave da última linha e um `kind` que impede usar o cursor de uma lista
+    em outra. Não é segredo nem assinatura: toda query continua filtrando pelo
+    dono, o cursor só diz onde recomeçar.
+  - `keyset_after`: predicado "depois desta chave" pra uma ordenação toda
+    DESC (NULLS LAST nas colunas anuláveis).
+  - `split_page`: busca-se `limit + 1` linhas; a sobra diz se há próxima página.
+  - `estimate_count`: total estimado pelo planner (EXPLAIN), pra quem quer
+    "cerca de N resultados" sem pagar o COUNT(*) a cada página.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Collection, Sequence
+
+# Modos de total aceitos pelas listas paginadas.
+TOTAL_EXACT = "exact"
+TOTAL_ESTIMATE = "estimate"
+TOTAL_NONE = "none"
+TOTAL_MODES = (TOTAL_EXACT, TOTAL_ESTIMATE, TOTAL_NONE)
+
+
+class InvalidCursor(ValueError):
+    """Cursor adulterado, truncado ou de outra lista (vira 400 nas rotas)."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("valor de cursor desconhecido")
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise ValueError("valor de cursor desconhecido")
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+    """Token opaco pra chave `values` da lista `kind`."""
+    raw = json.dumps([kind, *(_encode_value(v) for v in values)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, kind: str, size: int) -> list[Any]:
+    """Chave guardada em `token`. InvalidCursor se o token não for um cursor
+    de `kind` com `size` valores."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values = [_decode_value(v) for v in payload[1:]]
+    except (ValueError, TypeError, KeyError, IndexError, UnicodeDecodeError, AttributeError) as exc:
+        raise InvalidCursor("cursor inválido") from exc
+    if not isinstance(payload, list) or payload[:1] != [kind] or len(values) != size:
+        raise InvalidCursor("cursor inválido")
+    return values
+
+
+def keyset_after(
+    keys: Sequence[tuple[str, Any]],
+    *,
+    nullable: Collection[str] = (),
+) -> tuple[str, list[Any]]:
+    """(SQL, params) que seleciona as linhas DEPOIS de `keys` numa ordenação
+    `ORDER BY k1 DESC [NULLS LAST], k2 DESC, ...`.
+
+    `keys` são pares (expressão SQL, valor do cursor). Expressões listadas em
+    `nullable` ordenam com NULLS LAST. Pra colunas não anuláveis a primeira
+    condição sai como `k1 <= v1 AND (...)`, que o índice de k1 usa como limite
+    do range scan.
+    """
+    if not keys:
+        return "false", []
+    (expr, value), rest = keys[0], keys[1:]
+    rest_sql, rest_params = keyset_after(rest, nullable=nullable)
+    if expr in nullable:
+        if value is None:
+            return f"({expr} IS NULL AND {rest_sql})", rest_params
+        return (
+            f"({expr} < %s OR {expr} IS NULL OR ({expr} = %s AND ({rest_sql})))",
+            [value, value, *rest_params],
+        )
+    if not rest:
+        return f"{expr} < %s", [value]
+    return (
+        f"({expr} <= %s AND ({expr} < %s OR ({rest_sql})))",
+        [value, value, *rest_params],
+    )
+
+
+def split_page(rows: list, limit: int, key: Callable[[Any], Sequence[Any]], kind: str) -> tuple[list, str | None]:
+    """Separa as `limit + 1` linhas buscadas em (página, cursor da próxima).
+
+    O cursor é None na última página.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(kind, key(page[-1]))
+
+
+def estimate_count_sql(sql: str) -> str:
+    """EXPLAIN de `sql` cujo resultado `estimated_rows` lê (pra cursor async)."""
+    return f"EXPLAIN (FORMAT JSON) {sql}"
+
+
+def estimated_rows(explain_row: Any) -> int:
+    """Linhas estimadas na raiz do plano devolvido por `estimate_count_sql`."""
+    plan = next(iter(explain_row.values())) if isinstance(explain_row, dict) else explain_row[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(cur, sql: str, params: Sequence[Any] = ()) -> int:
+    """Nº de linhas que o planner espera de `sql` (EXPLAIN, sem executar).
+
+    Erra pra mais ou pra menos conforme as estatísticas da tabela; serve pra
+    "cerca de N", não pra contar página.
+    """
+    cur.execute(estimate_count_sql(sql), tuple(params))
+    return estimated_rows(cur.fetchone())
+
+
+__all__ = [
+    "InvalidCursor",
+    "TOTAL_ESTIMATE",
+    "TOTAL_EXACT",
+    "TOTAL_MODES",
+    "TOTAL_NONE",
+    "decode_cursor",
+    "encode_cursor",
+    "estimate_count",
+    "estimate_count_sql",
+    "estimated_rows",
+    "keyset_after",
+    "split_page",
+]
@@ -7,10 +7,12 @@ import csv
 import io
 import json
 import secrets
+import shutil
+import tempfile
 import zipfile
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Any
+from typing import Any, BinaryIO, Iterator
 from uuid import UUID
 
 from core.crypto import PiiAccessContext, decrypt_pii_optional, encrypt_pii_optional
@@ -275,138 +277,222 @@ def schedule_account_deletion(user_id: int, password: str, grace_days: int = 7)
     }
 
 
-def _fetch_rows(cur, name: str, sql: str, params: tuple) -> tuple[str, list[dict]]:
-    cur.execute(sql, params)
-    return name, [dict(row) for row in cur.fetchall()]
+# Colunas derivadas (índice de busca) — não são dado do titular.
+_EXPORT_DERIVED_COLUMNS = ("search_vec",)
 
+# Linhas por ida ao banco no cursor do servidor: a memória da exportação fica
+# em ~uma leva por tabela, não no histórico inteiro do usuário.
+EXPORT_FETCH_ROWS = 500
+# O ZIP vai pra um arquivo temporário; até este tamanho fica em memória.
+_EXPORT_SPOOL_MAX_BYTES = 4 * 1024 * 1024
+EXPORT_CHUNK_BYTES = 64 * 1024
 
-def build_user_export_zip(user_id: int) -> bytes:
-    datasets: dict[str, list[dict]] = {}
 
-    with get_conn() as conn, conn.cursor() as cur:
-        queries = [
-            ("usuario", "select * from users where id = %s", (user_id,)),
-            (
-                "conta_login",
-                """
-                select id, user_id, email, phone_e164, phone_status, phone_confirmed_at,
-                       whatsapp_verified_at, plan, plan_expires_at, created_at,
-                       stripe_customer_id, engagement_opt_out, last_activity_at,
-                       last_tip_sent_at, tip_email_opt_out, last_insight_sent_at,
-                       insight_email_opt_out, whatsapp_updates_opt_out,
-                       last_reengagement_sent_at, deletion_requested_at,
-                       deletion_scheduled_for, deletion_status,
-                       deletion_processing_started_at
-                from auth_accounts
-                where user_id = %s
-                """,
-                (user_id,),
-            ),
-            ("identidades", "select * from user_identities where user_id = %s", (user_id,)),
-            ("contas", "select * from accounts where user_id = %s", (user_id,)),
-            ("lancamentos", "select * from launches where user_id = %s", (user_id,)),
-            ("orcamentos", "select * from category_budgets where user_id = %s", (user_id,)),
-            ("regras_categorias", "select * from user_category_rules where user_id = %s", (user_id,)),
-            ("gatilhos_categorias", "select * from user_category_triggers where user_id = %s", (user_id,)),
-            ("candidatos_gatilhos_categorias", "select * from user_trigger_candidates where user_id = %s", (user_id,)),
-            ("feedback_categorias", "select * from user_category_feedback where user_id = %s", (user_id,)),
-            ("acoes_pendentes", "select * from pending_actions where user_id = %s", (user_id,)),
-            ("caixinhas", "select * from pockets where user_id = %s", (user_id,)),
-            ("investimentos", "select * from investments where user_id = %s", (user_id,)),
-            ("lotes_investimentos", "select * from investment_lots where user_id = %s", (user_id,)),
-            ("cartoes", "select * from credit_cards where user_id = %s", (user_id,)),
-            ("faturas_cartao", "select * from credit_bills where user_id = %s", (user_id,)),
-            ("transacoes_cartao", "select * from credit_transactions where user_id = %s", (user_id,)),
-            ("preferencias_resumo_diario", "select * from daily_report_prefs where user_id = %s", (user_id,)),
-            ("importacoes_ofx", "select * from ofx_imports where user_id = %s", (user_id,)),
-            ("sessoes_dashboard", "select code, user_id, expires_at, created_at from dashboard_sessions where user_id = %s", (user_id,)),
-            (
-                "conexoes_open_finance",
-                "select * from open_finance_connections where user_id = %s",
-                (user_id,),
-            ),
-            (
-                "contas_open_finance",
-                """
-                select a.*
-                from open_finance_accounts a
-                join open_finance_connections c on c.id = a.connection_id
-                where c.user_id = %s
-                """,
-                (user_id,),
-            ),
-            (
-                "transacoes_open_finance",
-                """
-                select t.*
-                from open_finance_transactions t
-                join open_finance_accounts a on a.id = t.account_id
-                join open_finance_connections c on c.id = a.connection_id
-                where c.user_id = %s
-                """,
-                (user_id,),
-            ),
-        ]
-
-        for name, sql, params in queries:
-            table_name = sql.split(" from ", 1)[-1].split()[0].strip()
-            if table_name and table_name.isidentifier() and not _table_exists(cur, table_name):
-                datasets[name] = []
-                continue
-            datasets[name] = _fetch_rows(cur, name, sql, params)[1]
-
-        optional_queries = [
-            (
-                "eventos_login",
-                "select id, user_id, email, success, failure_reason, ip_address, user_agent, created_at from auth_login_events where user_id = %s",
-                (user_id,),
-            ),
-            (
-                "eventos_sistema",
-                "select id, level, event_type, message, source, user_id, details, created_at from system_event_logs where user_id = %s",
-                (user_id,),
-            ),
-        ]
-        for name, sql, params in optional_queries:
-            table_name = sql.split(" from ", 1)[-1].split()[0].strip()
-            if _table_exists(cur, table_name):
-                datasets[name] = _fetch_rows(cur, name, sql, params)[1]
-
-    manifest = {
-        "generated_at": datetime.now(timezone.utc),
-        "user_id": user_id,
-        "format": "json+csv",
-        "datasets": {name: len(rows) for name, rows in datasets.items()},
-        "notes": [
-            "Hashes de senha não são exportados.",
-            "Arquivos CSV são cópias tabulares; dados aninhados também aparecem no JSON completo.",
-        ],
-    }
-    payload = {"manifesto": manifest, "dados": datasets}
+def _export_queries(user_id: int) -> tuple[list[tuple[str, str, tuple]], list[tuple[str, str, tuple]]]:
+    """(datasets sempre presentes, datasets de tabelas opcionais)."""
+    queries = [
+        ("usuario", "select * from users where id = %s", (user_id,)),
+        (
+            "conta_login",
+            """
+            select id, user_id, email, phone_e164, phone_status, phone_confirmed_at,
+                   whatsapp_verified_at, plan, plan_expires_at, created_at,
+                   stripe_customer_id, engagement_opt_out, last_activity_at,
+                   last_tip_sent_at, tip_email_opt_out, last_insight_sent_at,
+                   insight_email_opt_out, whatsapp_updates_opt_out,
+                   last_reengagement_sent_at, deletion_requested_at,
+                   deletion_scheduled_for, deletion_status,
+                   deletion_processing_started_at
+            from auth_accounts
+            where user_id = %s
+            """,
+            (user_id,),
+        ),
+        ("identidades", "select * from user_identities where user_id = %s", (user_id,)),
+        ("contas", "select * from accounts where user_id = %s", (user_id,)),
+        ("lancamentos", "select * from launches where user_id = %s", (user_id,)),
+        ("orcamentos", "select * from category_budgets where user_id = %s", (user_id,)),
+        ("regras_categorias", "select * from user_category_rules where user_id = %s", (user_id,)),
+        ("gatilhos_categorias", "select * from user_category_triggers where user_id = %s", (user_id,)),
+        ("candidatos_gatilhos_categorias", "select * from user_trigger_candidates where user_id = %s", (user_id,)),
+        ("feedback_categorias", "select * from user_category_feedback where user_id = %s", (user_id,)),
+        ("acoes_pendentes", "select * from pending_actions where user_id = %s", (user_id,)),
+        ("caixinhas", "select * from pockets where user_id = %s", (user_id,)),
+        ("investimentos", "select * from investments where user_id = %s", (user_id,)),
+        ("lotes_investimentos", "select * from investment_lots where user_id = %s", (user_id,)),
+        ("cartoes", "select * from credit_cards where user_id = %s", (user_id,)),
+        ("faturas_cartao", "select * from credit_bills where user_id = %s", (user_id,)),
+        ("transacoes_cartao", "select * from credit_transactions where user_id = %s", (user_id,)),
+        ("preferencias_resumo_diario", "select * from daily_report_prefs where user_id = %s", (user_id,)),
+        ("importacoes_ofx", "select * from ofx_imports where user_id = %s", (user_id,)),
+        ("sessoes_dashboard", "select code, user_id, expires_at, created_at from dashboard_sessions where user_id = %s", (user_id,)),
+        (
+            "conexoes_open_finance",
+            "select * from open_finance_connections where user_id = %s",
+            (user_id,),
+        ),
+        (
+            "contas_open_finance",
+            """
+            select a.*
+            from open_finance_accounts a
+            join open_finance_connections c on c.id = a.connection_id
+            where c.user_id = %s
+            """,
+            (user_id,),
+        ),
+        (
+            "transacoes_open_finance",
+            """
+            select t.*
+            from open_finance_transactions t
+            join open_finance_accounts a on a.id = t.account_id
+            join open_finance_connections c on c.id = a.connection_id
+            where c.user_id = %s
+            """,
+            (user_id,),
+        ),
+    ]
+    optional_queries = [
+        (
+            "eventos_login",
+            "select id, user_id, email, success, failure_reason, ip_address, user_agent, created_at from auth_login_events where user_id = %s",
+            (user_id,),
+        ),
+        (
+            "eventos_sistema",
+            "select id, level, event_type, message, source, user_id, details, created_at from system_event_logs where user_id = %s",
+            (user_id,),
+        ),
+    ]
+    return queries, optional_queries
 
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(
-            "dados.json",
-            json.dumps(_json_safe(payload), ensure_ascii=False, indent=2),
-        )
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(_json_safe(value), ensure_ascii=False)
+    return value
+
+
+def _write_dataset(conn, zf: zipfile.ZipFile, name: str, sql: str, params: tuple) -> int:
+    """Escreve `dados/<name>.ndjson` e `csv/<name>.csv` lendo `sql` por um
+    cursor do servidor, EXPORT_FETCH_ROWS linhas por vez. Devolve o nº de linhas.
+
+    O ZIP só aceita um arquivo aberto por vez: o NDJSON vai direto pro ZIP e
+    o CSV pra um temporário que é copiado logo depois.
+    """
+    count = 0
+    with tempfile.SpooledTemporaryFile(max_size=_EXPORT_SPOOL_MAX_BYTES) as csv_tmp:
+        csv_text = io.TextIOWrapper(csv_tmp, encoding="utf-8", newline="")
+        with conn.cursor(name=f"export_{name}") as cur:
+            cur.itersize = EXPORT_FETCH_ROWS
+            cur.execute(sql, params)
+            fieldnames = [
+                col.name for col in cur.description
+                if col.name not in _EXPORT_DERIVED_COLUMNS
+            ]
+            writer = csv.DictWriter(csv_text, fieldnames=fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            with zf.open(f"dados/{name}.ndjson", "w", force_zip64=True) as raw:
+                ndjson = io.TextIOWrapper(raw, encoding="utf-8", newline="\n")
+                for row in cur:
+                    for col in _EXPORT_DERIVED_COLUMNS:
+                        row.pop(col, None)
+                    ndjson.write(json.dumps(row, cls=PrivacyJSONEncoder, ensure_ascii=False))
+                    ndjson.write("\n")
+                    writer.writerow({key: _csv_value(value) for key, value in row.items()})
+                    count += 1
+                ndjson.flush()
+                ndjson.detach()
+        csv_text.flush()
+        csv_text.detach()
+        csv_tmp.seek(0)
+        with zf.open(f"csv/{name}.csv", "w", force_zip64=True) as out:
+            shutil.copyfileobj(csv_tmp, out, EXPORT_CHUNK_BYTES)
+    return count
+
+
+def _write_empty_dataset(zf: zipfile.ZipFile, name: str) -> None:
+    zf.writestr(f"dados/{name}.ndjson", "")
+    zf.writestr(f"csv/{name}.csv", "sem_dados\r\n")
+
+
+def write_user_export_zip(user_id: int, fileobj: BinaryIO) -> dict:
+    """Escreve o ZIP da exportação LGPD em `fileobj` e devolve o manifesto.
+
+    Uma tabela por vez, em NDJSON (`dados/<dataset>.ndjson`, uma linha JSON
+    por registro) e CSV, lidas por cursor do servidor — a memória não cresce
+    com o tamanho do histórico. Tudo numa transação REPEATABLE READ READ ONLY:
+    as tabelas saem do mesmo instante do banco.
+    """
+    datasets: dict[str, int] = {}
+    queries, optional_queries = _export_queries(user_id)
+
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as zf:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("set transaction isolation level repeatable read, read only")
+                for name, sql, params in queries:
+                    table_name = sql.split(" from ", 1)[-1].split()[0].strip()
+                    if table_name and table_name.isidentifier() and not _table_exists(cur, table_name):
+                        _write_empty_dataset(zf, name)
+                        datasets[name] = 0
+                        continue
+                    datasets[name] = _write_dataset(conn, zf, name, sql, params)
+
+                for name, sql, params in optional_queries:
+                    table_name = sql.split(" from ", 1)[-1].split()[0].strip()
+                    if _table_exists(cur, table_name):
+                        datasets[name] = _write_dataset(conn, zf, name, sql, params)
+
+        manifest = {
+            "generated_at": datetime.now(timezone.utc),
+            "user_id": user_id,
+            "format": "ndjson+csv",
+            "datasets": datasets,
+            "notes": [
+                "Hashes de senha não são exportados.",
+                "dados/<conjunto>.ndjson: um registro JSON por linha, com os dados aninhados completos.",
+                "csv/<conjunto>.csv: cópia tabular; campos aninhados aparecem como JSON.",
+            ],
+        }
         zf.writestr(
             "manifesto.json",
             json.dumps(_json_safe(manifest), ensure_ascii=False, indent=2),
         )
-        for name, rows in datasets.items():
-            csv_buffer = io.StringIO()
-            fieldnames = sorted({key for row in rows for key in row.keys()})
-            writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames or ["sem_dados"])
-            writer.writeheader()
-            for row in rows:
-                writer.writerow({
-                    key: json.dumps(_json_safe(value), ensure_ascii=False) if isinstance(value, (dict, list)) else value
-                    for key, value in row.items()
-                })
-            zf.writestr(f"csv/{name}.csv", csv_buffer.getvalue())
+    return _json_safe(manifest)
+
 
-    return buffer.getvalue()
+def build_user_export_file(user_id: int) -> BinaryIO:
+    """ZIP da exportação num arquivo temporário, posicionado no início.
+
+    Quem chama fecha o arquivo (ver `iter_export_file`); em disco ele some
+    ao fechar.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=_EXPORT_SPOOL_MAX_BYTES)
+    try:
+        write_user_export_zip(user_id, spool)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def iter_export_file(fileobj: BinaryIO, chunk_size: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Lê `fileobj` em pedaços (corpo de uma StreamingResponse) e fecha no fim."""
+    try:
+        while chunk := fileobj.read(chunk_size):
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def build_user_export_zip(user_id: int) -> bytes:
+    """ZIP inteiro em memória — pra anexos e testes. A rota de download usa
+    `build_user_export_file` + `iter_export_file`."""
+    with build_user_export_file(user_id) as fileobj:
+        return fileobj.read()
 
 
 def delete_user_data(user_id: int) -> dict:
@@ -425,6 +511,7 @@ def delete_user_data(user_id: int) -> dict:
         "user_mfa_backup_codes",
         "user_mfa",
         "data_export_tokens",
+        "export_render_cache",
         "auth_refresh_tokens",
         "auth_sessions",
         "user_categories",
@@ -0,0 +1,180 @@
+"""
+db/report_batch.py — Leituras e claims em lote dos resumos agendados (WhatsApp).
+
+O tick das 9h chamava, pra cada usuário, prefs → identidades → claim → resumo,
+cada passo com a própria conexão: com dezenas de milhares de usuários o tick
+levava minutos e segurava o pool. Aqui cada passo é UMA query pro lote:
+
+  - `list_due_report_users`: quem já passou do horário, ainda não recebeu o
+    resumo do período e tem WhatsApp vinculado (depois das 9h, o polling de 30s
+    vira uma query que não devolve nada);
+  - `claim_report_sends`: o mesmo claim atômico do per-user (só grava se a data
+    mudou), com `unnest` — devolve os ids que ESTE processo reservou;
+  - `list_whatsapp_identities`: números de WhatsApp dos usuários (decifrados);
+  - `report_period_totals`: gastos/receita/nº de lançamentos do período,
+    agrupados por usuário.
+
+O saldo em lote fica em db/open_finance.py (`get_consolidated_balances`).
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from core.crypto import PiiAccessContext, decrypt_pii_optional
+
+from .connection import get_conn
+
+
+# kind → (coluna do liga/desliga, coluna da data do último envio). Nunca vem do
+# usuário: seguro interpolar.
+REPORT_KINDS = {
+    "daily": ("enabled", "last_sent_date"),
+    "weekly": ("weekly_enabled", "last_weekly_sent_date"),
+    "monthly": ("monthly_enabled", "last_monthly_sent_date"),
+}
+
+
+def _kind_columns(kind: str) -> tuple[str, str]:
+    try:
+        return REPORT_KINDS[kind]
+    except KeyError:
+        raise ValueError(f"tipo de resumo inválido: {kind!r}") from None
+
+
+def list_due_report_users(kind: str, hour: int, minute: int, period_date: date) -> list[int]:
+    """Usuários com o resumo `kind` ligado, horário (prefs, default 9:00) até
+    `hour:minute`, sem envio reservado pra `period_date` e com WhatsApp."""
+    flag, sent = _kind_columns(kind)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                select u.id
+                from users u
+                left join daily_report_prefs p on p.user_id = u.id
+                where coalesce(p.{flag}, true) = true
+                  and (coalesce(p.hour, 9), coalesce(p.minute, 0)) <= (%s, %s)
+                  and p.{sent} is distinct from %s
+                  and exists (
+                      select 1 from user_identities i
+                       where i.user_id = u.id and i.provider = 'whatsapp'
+                  )
+                order by u.id asc
+                """,
+                (hour, minute, period_date),
+            )
+            return [int(r["id"]) for r in cur.fetchall()]
+
+
+def claim_report_sends(kind: str, user_ids: list[int], period_date: date) -> list[int]:
+    """Reserva o envio de `period_date` pros `user_ids`; devolve só os que este
+    processo reservou (outra instância que chegou antes fica com o resto)."""
+    _, sent = _kind_columns(kind)
+    if not user_ids:
+        return []
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                insert into daily_report_prefs (user_id, {sent})
+                select uid, %s::date from unnest(%s::bigint[]) as t(uid)
+                on conflict (user_id) do update
+                   set {sent} = excluded.{sent}
+                 where daily_report_prefs.{sent} is distinct from excluded.{sent}
+                returning user_id
+                """,
+                (period_date, list(user_ids)),
+            )
+            claimed = sorted(int(r["user_id"]) for r in cur.fetchall())
+        conn.commit()
+    return claimed
+
+
+def list_whatsapp_identities(user_ids: list[int]) -> dict[int, list[dict]]:
+    """Identidades WhatsApp por usuário, no formato de `list_identities_by_user`."""
+    if not user_ids:
+        return {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                select user_id, provider, external_id, external_id_enc
+                from user_identities
+                where user_id = any(%s) and provider = 'whatsapp'
+                order by user_id, created_at, external_id
+                """,
+                (list(user_ids),),
+            )
+            rows = cur.fetchall()
+
+    out: dict[int, list[dict]] = defaultdict(list)
+    for r in rows:
+        uid = int(r["user_id"])
+        enc = r["external_id_enc"]
+        if enc:
+            ext = decrypt_pii_optional(
+                enc,
+                ctx=PiiAccessContext(
+                    purpose="list_identities",
+                    actor=f"user:{uid}",
+                    subject_user_id=uid,
+                    field=f"{r['provider']}_id",
+                ),
+            )
+        else:
+            ext = r["external_id"]
+        out[uid].append({"provider": r["provider"], "external_id": ext})
+    return dict(out)
+
+
+def report_period_totals(user_ids: list[int], start_date: date, end_date: date) -> dict[int, dict]:
+    """Gastos, receita e nº de lançamentos de [start_date, end_date] por usuário.
+
+    Mesmas regras do per-user (`get_summary_by_period` + `get_launches_by_period`):
+    movimentação interna fica fora das somas mas conta como lançamento.
+    Usuário sem lançamento no período sai zerado.
+    """
+    ids = sorted({int(u) for u in user_ids})
+    if not ids:
+        return {}
+    start_dt = datetime.combine(start_date, datetime.min.time())
+    end_excl = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                select user_id,
+                       coalesce(sum(valor) filter (
+                           where tipo = 'despesa' and is_internal_movement = false), 0) as despesa,
+                       coalesce(sum(valor) filter (
+                           where tipo = 'receita' and is_internal_movement = false), 0) as receita,
+                       count(*) as lancamentos
+                from launches
+                where user_id = any(%s)
+                  and criado_em >= %s
+                  and criado_em < %s
+                group by user_id
+                """,
+                (ids, start_dt, end_excl),
+            )
+            rows = {int(r["user_id"]): r for r in cur.fetchall()}
+
+    out: dict[int, dict] = {}
+    for uid in ids:
+        r = rows.get(uid)
+        out[uid] = {
+            "despesa": float(r["despesa"]) if r else 0.0,
+            "receita": float(r["receita"]) if r else 0.0,
+            "lancamentos": int(r["lancamentos"]) if r else 0,
+        }
+    return out
+
+
+__all__ = [
+    "REPORT_KINDS",
+    "claim_report_sends",
+    "list_due_report_users",
+    "list_whatsapp_identities",
+    "report_period_totals",
+]
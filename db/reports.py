@@ -150,12 +150,19 @@ def consume_dashboard_session(code: str) -> int | None:
 # Billing / planos
 # ──────────────────────────────────────────────────────────────────────────────
 
+def _invalidate_plan_cache(user_id: int) -> None:
+    from core.services.plan_service import invalidate_plan_cache
+    invalidate_plan_cache(user_id)
+
+
 def update_user_plan(user_id: int, plan: str, expires_at=None) -> None:
-    return _db_support.update_user_plan_impl(get_conn, user_id, plan, expires_at)
+    _db_support.update_user_plan_impl(get_conn, user_id, plan, expires_at)
+    _invalidate_plan_cache(user_id)
 
 
 def mark_plan_selected(user_id: int) -> None:
-    return _db_support.mark_plan_selected_impl(get_conn, user_id)
+    _db_support.mark_plan_selected_impl(get_conn, user_id)
+    _invalidate_plan_cache(user_id)
 
 
 def get_user_by_stripe_customer(stripe_customer_id: str) -> int | None:
@@ -167,7 +174,8 @@ def set_stripe_customer(user_id: int, stripe_customer_id: str) -> None:
 
 
 def set_payment_status(user_id: int, status: str) -> None:
-    return _db_support.set_payment_status_impl(get_conn, user_id, status)
+    _db_support.set_payment_status_impl(get_conn, user_id, status)
+    _invalidate_plan_cache(user_id)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
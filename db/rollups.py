@@ -0,0 +1,145 @@
+"""
+db/rollups.py — Leitura do rollup mensal (`monthly_rollups`).
+
+A tabela é mantida por triggers (ver db/schema.py) e guarda, por usuário ×
+mês × origem × tipo × categoria × dia da semana, a soma e a contagem dos
+lançamentos/compras. Dashboard e Análises somam essas linhas em vez de
+reagrupar `launches` + `credit_transactions` a cada request, então o custo
+fica proporcional ao nº de meses pedidos — não ao histórico do usuário.
+
+Período [start, end) que não cai em virada de mês (ex.: histórico limitado
+pelo plano começando no dia 14, comparativo de N dias) é resolvido por
+partes: os meses cheios vêm do rollup e as pontas, dos lançamentos crus, com
+a MESMA projeção — o resultado é idêntico ao da agregação direta.
+
+Origens (`source`):
+  launch          — launches, mês de criado_em
+  credit_bill     — compras no cartão pelo mês da FATURA (credit_bills.period_end)
+  credit_purchase — compras no cartão pelo mês da compra (purchased_at)
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable
+
+from .connection import get_conn
+
+
+ROLLUP_SOURCES = ("launch", "credit_bill", "credit_purchase")
+
+# Agregação direta das pontas do período — mesmas colunas do rollup.
+_RAW_SQL = {
+    "launch": """
+        select tipo, coalesce(categoria, '') as categoria,
+               date_trunc('month', criado_em)::date as month,
+               extract(dow from criado_em)::int as dow,
+               sum(valor) as total, count(*) as n
+          from launches
+         where user_id = %s and is_internal_movement = false
+           and criado_em >= %s and criado_em < %s
+         group by 1, 2, 3, 4
+    """,
+    "credit_bill": """
+        select 'despesa' as tipo, coalesce(ct.categoria, '') as categoria,
+               date_trunc('month', b.period_end)::date as month,
+               extract(dow from ct.purchased_at)::int as dow,
+               sum(ct.valor) as total, count(*) as n
+          from credit_transactions ct
+          join credit_bills b on b.id = ct.bill_id
+         where ct.user_id = %s and ct.is_refund = false
+           and b.period_end >= %s and b.period_end < %s
+         group by 1, 2, 3, 4
+    """,
+    "credit_purchase": """
+        select 'despesa' as tipo, coalesce(categoria, '') as categoria,
+               date_trunc('month', purchased_at)::date as month,
+               extract(dow from purchased_at)::int as dow,
+               sum(valor) as total, count(*) as n
+          from credit_transactions
+         where user_id = %s and is_refund = false
+           and purchased_at >= %s and purchased_at < %s
+         group by 1, 2, 3, 4
+    """,
+}
+
+_ROLLUP_SQL = """
+        select tipo, categoria, month, dow::int as dow, total, n
+          from monthly_rollups
+         where user_id = %s and source = %s and is_internal = false
+           and month >= %s and month < %s
+"""
+
+
+def _as_date(d) -> date:
+    return d.date() if hasattr(d, "date") and callable(d.date) else d
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+
+def full_months(start: date, end: date) -> tuple[date, date]:
+    """[primeiro mês cheio, fim do último mês cheio) dentro de [start, end).
+
+    Vazio (a == b) quando o período não contém nenhum mês inteiro.
+    """
+    first = start if start.day == 1 else _next_month(start)
+    last = end.replace(day=1)
+    if last <= first:
+        return first, first
+    return first, last
+
+
+def rollup_sql(
+    user_id: int,
+    start: date,
+    end: date,
+    sources: Iterable[str] = ("launch", "credit_bill"),
+) -> tuple[str, list]:
+    """Subquery (sql, params) com colunas (tipo, categoria, month, dow, total, n)
+    cobrindo [start, end) para as `sources` pedidas — sem movimentações internas.
+
+    Pode haver mais de uma linha por chave (rollup + pontas); quem chama agrupa.
+    Não abre conexão: serve tanto pro pool síncrono quanto pro async do dashboard.
+    """
+    start, end = _as_date(start), _as_date(end)
+    parts: list[str] = []
+    params: list = []
+    if start < end:
+        m_from, m_to = full_months(start, end)
+        edges = [(start, end)] if m_from == m_to else [(start, m_from), (m_to, end)]
+        for source in sources:
+            if m_from < m_to:
+                parts.append(_ROLLUP_SQL)
+                params += [user_id, source, m_from, m_to]
+            for lo, hi in edges:
+                if lo < hi:
+                    parts.append(_RAW_SQL[source])
+                    params += [user_id, lo, hi]
+    if not parts:
+        return (
+            "select null::text as tipo, null::text as categoria, null::date as month, "
+            "null::int as dow, null::numeric as total, null::bigint as n where false",
+            [],
+        )
+    return " union all ".join(parts), params
+
+
+def rebuild_monthly_rollups(user_ids: list[int] | None = None) -> None:
+    """Recalcula o rollup a partir de launches/credit_transactions.
+
+    `user_ids=None` reconstrói tudo. Trava a tabela do rollup durante a
+    reconstrução: escritas concorrentes esperam e entram depois, por cima do
+    recálculo, sem contar em dobro.
+    """
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("lock table monthly_rollups in share row exclusive mode")
+            cur.execute(
+                "select rebuild_monthly_rollups(%s::bigint[])",
+                ([int(u) for u in user_ids] if user_ids is not None else None,),
+            )
+        conn.commit()
+
+
+__all__ = ["ROLLUP_SOURCES", "full_months", "rollup_sql", "rebuild_monthly_rollups"]
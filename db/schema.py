@@ -9,7 +9,7 @@ def init_db():
     ddl_statements = [
         # ─── Extensions ──────────────────────────────────────────────────────────
         # unaccent: normaliza acentos pra busca textual ("credito" casa "crédito").
-        # Usado em db/analytics.py:list_history.
+        # Usado na busca do histórico (db/history_search.py).
         """create extension if not exists unaccent""",
 
         # -----------------------------
@@ -714,6 +714,11 @@ def init_db():
         """
         create index if not exists idx_auth_accounts_email on auth_accounts (email)
         """,
+        # Painel admin: "cadastros recentes" e a lista de usuários ordenam por
+        # created_at com LIMIT — sem índice, varredura da base inteira.
+        """
+        create index if not exists idx_auth_accounts_created_at on auth_accounts (created_at desc)
+        """,
         """
         alter table auth_accounts add column if not exists phone_e164 text
         """,
@@ -1462,6 +1467,12 @@ def init_db():
           on user_identities (provider, external_id_hash)
           where external_id_hash is not null
         """,
+        # identidades por usuário (a PK é provider+external_id): list_identities_by_user
+        # e o `exists` do lote de resumos agendados (db/report_batch.py)
+        """
+        create index if not exists idx_user_identities_user
+          on user_identities (user_id, provider)
+        """,
 
         # email_verification_codes: email, phone_e164, display_name (transitório)
         """alter table email_verification_codes add column if not exists email_hash text""",
@@ -1875,6 +1886,529 @@ def init_db():
           before insert or update of space_id on open_finance_accounts
           for each row execute function of_account_space_same_owner()
         """,
+
+        # ─── Rollup mensal (dashboard / Análises) ──────────────────────────────
+        # Agregado por usuário × mês × origem × tipo × categoria × dia da semana,
+        # mantido por triggers em launches / credit_transactions / credit_bills —
+        # cobre todo caminho de escrita (bot, dashboard, OFX em COPY, Open
+        # Finance, merge de usuários) sem depender de cada chamador lembrar.
+        # Origens:
+        #   launch          — launches, mês de criado_em (internas com is_internal)
+        #   credit_bill     — compras no cartão, mês da FATURA (credit_bills.period_end)
+        #   credit_purchase — compras no cartão, mês da compra (purchased_at)
+        # Estornos (is_refund) ficam de fora, como em todas as leituras.
+        # `dow` é o dia da semana da data do lançamento/compra (0=dom).
+        # Categoria nula vira '' (chave primária não aceita null).
+        # Leitura em db/rollups.py; reconstrução: scripts/rebuild_monthly_rollups.py.
+        """
+        create table if not exists monthly_rollups (
+          user_id bigint not null references users(id) on delete cascade,
+          month date not null,
+          source text not null,
+          tipo text not null,
+          is_internal boolean not null default false,
+          categoria text not null default '',
+          dow smallint not null,
+          total numeric not null default 0,
+          n integer not null default 0,
+          primary key (user_id, month, source, tipo, is_internal, categoria, dow)
+        )
+        """,
+        # Triggers por STATEMENT com transition tables: um INSERT ... SELECT de
+        # 5k linhas (importação OFX) vira um único upsert agrupado. Linhas de
+        # usuário já apagado (cascade de users) são ignoradas — o próprio
+        # cascade limpa o rollup dele.
+        """
+        create or replace function monthly_rollups_launches()
+        returns trigger as $$
+        begin
+          if tg_op = 'INSERT' then
+            insert into monthly_rollups as r
+              (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+            select x.user_id, date_trunc('month', x.criado_em)::date, 'launch', x.tipo,
+                   x.is_internal_movement, coalesce(x.categoria, ''),
+                   extract(dow from x.criado_em)::smallint, sum(x.valor), count(*)
+              from new_rows x
+             group by 1, 2, 3, 4, 5, 6, 7
+             order by 1, 2, 3, 4, 5, 6, 7
+            on conflict (user_id, month, source, tipo, is_internal, categoria, dow)
+            do update set total = r.total + excluded.total, n = r.n + excluded.n;
+          elsif tg_op = 'DELETE' then
+            insert into monthly_rollups as r
+              (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+            select x.user_id, date_trunc('month', x.criado_em)::date, 'launch', x.tipo,
+                   x.is_internal_movement, coalesce(x.categoria, ''),
+                   extract(dow from x.criado_em)::smallint, -sum(x.valor), -count(*)
+              from old_rows x
+             where exists (select 1 from users u where u.id = x.user_id)
+             group by 1, 2, 3, 4, 5, 6, 7
+             order by 1, 2, 3, 4, 5, 6, 7
+            on conflict (user_id, month, source, tipo, is_internal, categoria, dow)
+            do update set total = r.total + excluded.total, n = r.n + excluded.n;
+            delete from monthly_rollups r
+             where r.n = 0 and r.user_id in (select distinct user_id from old_rows);
+          else
+            -- UPDATE: só as linhas em que algum campo agregado mudou
+            -- (user_seq, nota, alvo etc. não mexem no rollup).
+            insert into monthly_rollups as r
+              (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+            select d.user_id, d.month, 'launch', d.tipo, d.is_internal, d.categoria, d.dow,
+                   sum(d.total), sum(d.n)
+              from (
+                select o.user_id, date_trunc('month', o.criado_em)::date as month, o.tipo,
+                       o.is_internal_movement as is_internal, coalesce(o.categoria, '') as categoria,
+                       extract(dow from o.criado_em)::smallint as dow, -o.valor as total, -1 as n
+                  from old_rows o join new_rows x on x.id = o.id
+                 where (o.user_id, o.criado_em, o.tipo, o.valor, o.categoria, o.is_internal_movement)
+                       is distinct from
+                       (x.user_id, x.criado_em, x.tipo, x.valor, x.categoria, x.is_internal_movement)
+                union all
+                select x.user_id, date_trunc('month', x.criado_em)::date, x.tipo,
+                       x.is_internal_movement, coalesce(x.categoria, ''),
+                       extract(dow from x.criado_em)::smallint, x.valor, 1
+                  from old_rows o join new_rows x on x.id = o.id
+                 where (o.user_id, o.criado_em, o.tipo, o.valor, o.categoria, o.is_internal_movement)
+                       is distinct from
+                       (x.user_id, x.criado_em, x.tipo, x.valor, x.categoria, x.is_internal_movement)
+              ) d
+             where exists (select 1 from users u where u.id = d.user_id)
+             group by 1, 2, 3, 4, 5, 6, 7
+             order by 1, 2, 3, 4, 5, 6, 7
+            on conflict (user_id, month, source, tipo, is_internal, categoria, dow)
+            do update set total = r.total + excluded.total, n = r.n + excluded.n;
+            delete from monthly_rollups r
+             where r.n = 0 and r.user_id in (select distinct user_id from old_rows);
+          end if;
+          return null;
+        end;
+        $$ language plpgsql
+        """,
+        # Compras no cartão contam em duas origens: mês da fatura (credit_bill)
+        # e mês da compra (credit_purchase). A fatura já apagada (cascade de
+        # credit_bills) é descontada pelo trigger da própria fatura, abaixo.
+        """
+        create or replace function monthly_rollups_credit_transactions()
+        returns trigger as $$
+        begin
+          if tg_op = 'INSERT' then
+            insert into monthly_rollups as r
+              (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+            select d.user_id, d.month, d.source, 'despesa', false, d.categoria, d.dow,
+                   sum(d.total), sum(d.n)
+              from (
+                select x.user_id, date_trunc('month', b.period_end)::date as month,
+                       'credit_bill' as source, coalesce(x.categoria, '') as categoria,
+                       extract(dow from x.purchased_at)::smallint as dow, x.valor as total, 1 as n
+                  from new_rows x join credit_bills b on b.id = x.bill_id
+                 where not x.is_refund
+                union all
+                select x.user_id, date_trunc('month', x.purchased_at)::date, 'credit_purchase',
+                       coalesce(x.categoria, ''), extract(dow from x.purchased_at)::smallint,
+                       x.valor, 1
+                  from new_rows x
+                 where not x.is_refund
+              ) d
+             group by 1, 2, 3, 4, 5, 6, 7
+             order by 1, 2, 3, 4, 5, 6, 7
+            on conflict (user_id, month, source, tipo, is_internal, categoria, dow)
+            do update set total = r.total + excluded.total, n = r.n + excluded.n;
+            return null;
+          end if;
+
+          if tg_op = 'DELETE' then
+            insert into monthly_rollups as r
+              (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+            select d.user_id, d.month, d.source, 'despesa', false, d.categoria, d.dow,
+                   sum(d.total), sum(d.n)
+              from (
+                select o.user_id, date_trunc('month', b.period_end)::date as month,
+                       'credit_bill' as source, coalesce(o.categoria, '') as categoria,
+                       extract(dow from o.purchased_at)::smallint as dow, -o.valor as total, -1 as n
+                  from old_rows o join credit_bills b on b.id = o.bill_id
+                 where not o.is_refund
+                union all
+                select o.user_id, date_trunc('month', o.purchased_at)::date, 'credit_purchase',
+                       coalesce(o.categoria, ''), extract(dow from o.purchased_at)::smallint,
+                       -o.valor, -1
+                  from old_rows o
+                 where not o.is_refund
+              ) d
+             where exists (select 1 from users u where u.id = d.user_id)
+             group by 1, 2, 3, 4, 5, 6, 7
+             order by 1, 2, 3, 4, 5, 6, 7
+            on conflict (user_id, month, source, tipo, is_internal, categoria, dow)
+            do update set total = r.total + excluded.total, n = r.n + excluded.n;
+          else
+            insert into monthly_rollups as r
+              (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+            select d.user_id, d.month, d.source, 'despesa', false, d.categoria, d.dow,
+                   sum(d.total), sum(d.n)
+              from (
+                select o.user_id, date_trunc('month', b.period_end)::date as month,
+                       'credit_bill' as source, coalesce(o.categoria, '') as categoria,
+                       extract(dow from o.purchased_at)::smallint as dow, -o.valor as total, -1 as n
+                  from old_rows o join credit_bills b on b.id = o.bill_id
+                 where not o.is_refund
+                union all
+                select o.user_id, date_trunc('month', o.purchased_at)::date, 'credit_purchase',
+                       coalesce(o.categoria, ''), extract(dow from o.purchased_at)::smallint,
+                       -o.valor, -1
+                  from old_rows o
+                 where not o.is_refund
+                union all
+                select x.user_id, date_trunc('month', b.period_end)::date, 'credit_bill',
+                       coalesce(x.categoria, ''), extract(dow from x.purchased_at)::smallint,
+                       x.valor, 1
+                  from new_rows x join credit_bills b on b.id = x.bill_id
+                 where not x.is_refund
+                union all
+                select x.user_id, date_trunc('month', x.purchased_at)::date, 'credit_purchase',
+                       coalesce(x.categoria, ''), extract(dow from x.purchased_at)::smallint,
+                       x.valor, 1
+                  from new_rows x
+                 where not x.is_refund
+              ) d
+             where exists (select 1 from users u where u.id = d.user_id)
+             group by 1, 2, 3, 4, 5, 6, 7
+             order by 1, 2, 3, 4, 5, 6, 7
+            on conflict (user_id, month, source, tipo, is_internal, categoria, dow)
+            do update set total = r.total + excluded.total, n = r.n + excluded.n;
+          end if;
+          delete from monthly_rollups r
+           where r.n = 0 and r.user_id in (select distinct user_id from old_rows);
+          return null;
+        end;
+        $$ language plpgsql
+        """,
+        """
+        create or replace function monthly_rollups_credit_bills()
+        returns trigger as $$
+        begin
+          -- Fatura apagada (BEFORE DELETE, antes do cascade levar as compras)
+          -- ou com period_end alterado: move as compras dela de mês.
+          insert into monthly_rollups as r
+            (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+          select d.user_id, d.month, 'credit_bill', 'despesa', false, d.categoria, d.dow,
+                 sum(d.total), sum(d.n)
+            from (
+              select ct.user_id, date_trunc('month', old.period_end)::date as month,
+                     coalesce(ct.categoria, '') as categoria,
+                     extract(dow from ct.purchased_at)::smallint as dow,
+                     -ct.valor as total, -1 as n
+                from credit_transactions ct
+               where ct.bill_id = old.id and not ct.is_refund
+              union all
+              select ct.user_id, date_trunc('month', new.period_end)::date,
+                     coalesce(ct.categoria, ''), extract(dow from ct.purchased_at)::smallint,
+                     ct.valor, 1
+                from credit_transactions ct
+               where tg_op = 'UPDATE' and ct.bill_id = new.id and not ct.is_refund
+            ) d
+           where exists (select 1 from users u where u.id = d.user_id)
+           group by 1, 2, 3, 4, 5, 6, 7
+           order by 1, 2, 3, 4, 5, 6, 7
+          on conflict (user_id, month, source, tipo, is_internal, categoria, dow)
+          do update set total = r.total + excluded.total, n = r.n + excluded.n;
+          delete from monthly_rollups r
+           where r.n = 0 and r.user_id in (
+             select distinct ct.user_id from credit_transactions ct where ct.bill_id = old.id
+           );
+          if tg_op = 'DELETE' then
+            return old;
+          end if;
+          return new;
+        end;
+        $$ language plpgsql
+        """,
+        """
+        create or replace function rebuild_monthly_rollups(p_user_ids bigint[])
+        returns void as $$
+        begin
+          delete from monthly_rollups
+           where p_user_ids is null or user_id = any(p_user_ids);
+          insert into monthly_rollups
+            (user_id, month, source, tipo, is_internal, categoria, dow, total, n)
+          select d.user_id, d.month, d.source, d.tipo, d.is_internal, d.categoria, d.dow,
+                 sum(d.total), count(*)
+            from (
+              select l.user_id, date_trunc('month', l.criado_em)::date as month,
+                     'launch' as source, l.tipo, l.is_internal_movement as is_internal,
+                     coalesce(l.categoria, '') as categoria,
+                     extract(dow from l.criado_em)::smallint as dow, l.valor as total
+                from launches l
+               where p_user_ids is null or l.user_id = any(p_user_ids)
+              union all
+              select ct.user_id, date_trunc('month', b.period_end)::date, 'credit_bill',
+                     'despesa', false, coalesce(ct.categoria, ''),
+                     extract(dow from ct.purchased_at)::smallint, ct.valor
+                from credit_transactions ct join credit_bills b on b.id = ct.bill_id
+               where not ct.is_refund
+                 and (p_user_ids is null or ct.user_id = any(p_user_ids))
+              union all
+              select ct.user_id, date_trunc('month', ct.purchased_at)::date, 'credit_purchase',
+                     'despesa', false, coalesce(ct.categoria, ''),
+                     extract(dow from ct.purchased_at)::smallint, ct.valor
+                from credit_transactions ct
+               where not ct.is_refund
+                 and (p_user_ids is null or ct.user_id = any(p_user_ids))
+            ) d
+           group by 1, 2, 3, 4, 5, 6, 7;
+        end;
+        $$ language plpgsql
+        """,
+        # Triggers criados UMA vez, junto com o backfill, num único statement
+        # (= uma transação): com as três tabelas travadas pra escrita, nenhum
+        # lançamento cai entre o backfill e o trigger. Nas execuções seguintes
+        # do init_db nada é recriado — drop/create deixaria uma janela em que
+        # escritas não entram no rollup.
+        """
+        do $$
+        begin
+          if not exists (
+            select 1 from pg_trigger where tgname = 'trg_monthly_rollups_launches_ins'
+          ) then
+            lock table launches, credit_transactions, credit_bills in share row exclusive mode;
+            create trigger trg_monthly_rollups_launches_ins
+              after insert on launches referencing new table as new_rows
+              for each statement execute function monthly_rollups_launches();
+            create trigger trg_monthly_rollups_launches_upd
+              after update on launches referencing old table as old_rows new table as new_rows
+              for each statement execute function monthly_rollups_launches();
+            create trigger trg_monthly_rollups_launches_del
+              after delete on launches referencing old table as old_rows
+              for each statement execute function monthly_rollups_launches();
+            create trigger trg_monthly_rollups_credit_tx_ins
+              after insert on credit_transactions referencing new table as new_rows
+              for each statement execute function monthly_rollups_credit_transactions();
+            create trigger trg_monthly_rollups_credit_tx_upd
+              after update on credit_transactions referencing old table as old_rows new table as new_rows
+              for each statement execute function monthly_rollups_credit_transactions();
+            create trigger trg_monthly_rollups_credit_tx_del
+              after delete on credit_transactions referencing old table as old_rows
+              for each statement execute function monthly_rollups_credit_transactions();
+            create trigger trg_monthly_rollups_credit_bills_del
+              before delete on credit_bills
+              for each row execute function monthly_rollups_credit_bills();
+            create trigger trg_monthly_rollups_credit_bills_upd
+              after update of period_end on credit_bills
+              for each row when (old.period_end is distinct from new.period_end)
+              execute function monthly_rollups_credit_bills();
+            perform rebuild_monthly_rollups(null);
+          end if;
+        end;
+        $$
+        """,
+        # Versão do snapshot do dashboard por usuário: contador incrementado por
+        # triggers em toda tabela que alimenta get_financial_data. O WebSocket
+        # compara a versão que o cliente já tem com esta antes de recalcular o
+        # snapshot (ver db/dashboard_versions.py). Mesma ideia do rollup:
+        # trigger cobre bot, dashboard, OFX, Open Finance e jobs sem depender de
+        # cada chamador lembrar de avisar.
+        """
+        create table if not exists dashboard_versions (
+          user_id bigint primary key references users(id) on delete cascade,
+          version bigint not null default 0,
+          updated_at timestamptz not null default now()
+        )
+        """,
+        # O incremento fica pro commit (constraint trigger deferida): o lock na
+        # linha de dashboard_versions dura só o fim da transação, não a
+        # transação inteira. Com o incremento imediato, duas conexões do mesmo
+        # usuário abertas ao mesmo tempo (o que vários fluxos do bot fazem)
+        # esperavam uma pela outra até o fim. Cada usuário conta uma vez por
+        # transação (dashboard_versions.touched, local à transação). O mesmo
+        # ponto avisa os web workers (NOTIFY user_changes) de que o usuário mudou.
+        """
+        create or replace function dashboard_versions_touch(p_user_id bigint)
+        returns void as $$
+        declare
+          seen text := coalesce(current_setting('dashboard_versions.touched', true), '');
+        begin
+          if p_user_id is null or position(',' || p_user_id || ',' in seen) > 0 then
+            return;
+          end if;
+          perform set_config('dashboard_versions.touched',
+                             coalesce(nullif(seen, ''), ',') || p_user_id || ',', true);
+          insert into dashboard_versions as v (user_id, version)
+          select u.id, 1 from users u where u.id = p_user_id
+          on conflict (user_id) do update set version = v.version + 1, updated_at = now();
+          -- Aviso entre processos (core/services/change_bus.py): sai no commit,
+          -- junto com a versão nova.
+          perform pg_notify('user_changes', json_build_object('user_id', p_user_id)::text);
+        end;
+        $$ language plpgsql
+        """,
+        # Troca de dono (merge de usuários) conta pros dois lados.
+        """
+        create or replace function dashboard_versions_bump()
+        returns trigger as $$
+        begin
+          if tg_op <> 'INSERT' then
+            perform dashboard_versions_touch(old.user_id);
+          end if;
+          if tg_op <> 'DELETE' then
+            perform dashboard_versions_touch(new.user_id);
+          end if;
+          return null;
+        end;
+        $$ language plpgsql
+        """,
+        # Tabelas do Open Finance não têm user_id: o dono vem da conexão.
+        """
+        create or replace function dashboard_versions_bump_of()
+        returns trigger as $$
+        begin
+          if tg_op <> 'INSERT' then
+            perform dashboard_versions_touch(
+              (select c.user_id from open_finance_connections c where c.id = old.connection_id));
+          end if;
+          if tg_op <> 'DELETE' then
+            perform dashboard_versions_touch(
+              (select c.user_id from open_finance_connections c where c.id = new.connection_id));
+          end if;
+          return null;
+        end;
+        $$ language plpgsql
+        """,
+        # Uma trigger por tabela, criada só se ainda não existe — tabela nova
+        # entra acrescentando o nome. UPDATE só conta linha que de fato mudou:
+        # o accrual de caixinhas/investimentos regrava saldo igual a cada
+        # leitura do dashboard e, sem o filtro, toda leitura invalidaria a
+        # versão. A comparação é pela imagem textual da linha (funciona com
+        # colunas json, que não têm operador de igualdade).
+        """
+        do $$
+        declare
+          t text;
+          fn text;
+        begin
+          foreach t in array array[
+            'accounts', 'launches', 'pockets', 'pocket_lots', 'investments',
+            'investment_lots', 'credit_cards', 'credit_bills', 'credit_transactions',
+            'category_budgets', 'recurring_charges', 'recurring_income_credits',
+            'open_finance_connections', 'open_finance_accounts', 'open_finance_investments'
+          ] loop
+            continue when exists (
+              select 1 from pg_trigger where tgname = 'trg_dashboard_versions_' || t
+            );
+            fn := case when t in ('open_finance_accounts', 'open_finance_investments')
+                       then 'dashboard_versions_bump_of' else 'dashboard_versions_bump' end;
+            execute format(
+              'create constraint trigger %I after insert or delete on %I '
+              'deferrable initially deferred for each row execute function %I()',
+              'trg_dashboard_versions_' || t, t, fn);
+            execute format(
+              'create constraint trigger %I after update on %I '
+              'deferrable initially deferred for each row '
+              'when (old::text is distinct from new::text) execute function %I()',
+              'trg_dashboard_versions_' || t || '_upd', t, fn);
+          end loop;
+        end;
+        $$
+        """,
+
+        # -----------------------------
+        # Busca do histórico (db/history_search.py)
+        # -----------------------------
+        # `unaccent(text)` é STABLE (procura o dicionário pelo search_path);
+        # coluna gerada e índice exigem IMMUTABLE. O wrapper fixa o dicionário
+        # do schema public quando ele existe (forma recomendada pelo Postgres);
+        # sem o dicionário (unaccent empacotado sem .rules) cai na função de
+        # um argumento.
+        """
+        do $$
+        begin
+          if exists (select 1 from pg_ts_dict d
+                      where d.dictname = 'unaccent' and d.dictnamespace = 'public'::regnamespace) then
+            create or replace function history_search_normalize(t text)
+            returns text as $f$
+              select lower(public.unaccent('public.unaccent'::regdictionary, coalesce(t, '')))
+            $f$ language sql immutable parallel safe;
+          else
+            create or replace function history_search_normalize(t text)
+            returns text as $f$
+              select lower(public.unaccent(coalesce(t, '')))
+            $f$ language sql immutable parallel safe;
+          end if;
+        end;
+        $$
+        """,
+        # Texto pesquisável da linha: sem acento, minúsculo, pontuação vira
+        # espaço ("ifood.com.br" → ifood, com, br) — casa com a quebra de termos
+        # do lado do Python. Mantido pelo próprio Postgres (coluna gerada), então
+        # nenhum INSERT/UPDATE precisa lembrar dele.
+        """
+        create or replace function history_search_document(a text, b text, c text)
+        returns text as $$
+          select regexp_replace(
+            history_search_normalize(coalesce(a, '') || ' ' || coalesce(b, '') || ' ' || coalesce(c, '')),
+            '[^[:alnum:]]+', ' ', 'g')
+        $$ language sql immutable parallel safe
+        """,
+        # tsvector 'simple' (sem stemming: "mercado" não vira "merc") + GIN.
+        # Acrescentar a coluna reescreve a tabela uma vez (lock exclusivo
+        # durante o backfill); depois disso o custo é só na escrita da linha.
+        """
+        alter table launches add column if not exists search_vec tsvector
+          generated always as (
+            to_tsvector('simple'::regconfig, history_search_document(alvo, nota, categoria))
+          ) stored
+        """,
+        """
+        create index if not exists idx_launches_search_vec
+          on launches using gin (search_vec)
+        """,
+        # credit_transactions não tem alvo: o nome do cartão entra pela busca
+        # nos cartões do usuário (poucas linhas), não na linha da compra.
+        """
+        alter table credit_transactions add column if not exists search_vec tsvector
+          generated always as (
+            to_tsvector('simple'::regconfig, history_search_document(null, nota, categoria))
+          ) stored
+        """,
+        """
+        create index if not exists idx_credit_tx_search_vec
+          on credit_transactions using gin (search_vec)
+        """,
+        # pg_trgm é opcional (nem todo Postgres gerenciado tem): com ele, termo
+        # no meio da palavra ("bank" em "nubank") também usa índice. Sem ele a
+        # busca fica só por prefixo de palavra, via tsvector.
+        """
+        do $$
+        begin
+          begin
+            create extension if not exists pg_trgm;
+          exception when others then
+            raise notice 'pg_trgm indisponível: busca do histórico só por prefixo (%)', sqlerrm;
+            return;
+          end;
+          create index if not exists idx_launches_search_trgm on launches
+            using gin (history_search_document(alvo, nota, categoria) gin_trgm_ops);
+          create index if not exists idx_credit_tx_search_trgm on credit_transactions
+            using gin (history_search_document(null, nota, categoria) gin_trgm_ops);
+        end;
+        $$
+        """,
+
+        # -----------------------------
+        # Cache dos extratos mensais renderizados (db/export_cache.py)
+        # -----------------------------
+        # Uma linha por (usuário, mês, formato): o último arquivo gerado, a
+        # versão do dashboard em que foi conferido e o hash do conteúdo que o
+        # gerou. Derivado dos lançamentos — some junto com o usuário.
+        """
+        create table if not exists export_render_cache (
+          user_id bigint not null references users(id) on delete cascade,
+          year int not null,
+          month int not null,
+          fmt text not null,
+          data_version bigint not null,
+          input_digest text not null,
+          content bytea not null,
+          created_at timestamptz not null default now(),
+          primary key (user_id, year, month, fmt)
+        )
+        """,
     ]
 
     # autocommit: cada DDL roda em sua propria transacao e libera locks
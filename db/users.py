@@ -163,6 +163,14 @@ def merge_users(from_user_id: int, to_user_id: int) -> None:
 
         conn.commit()
 
+    from core.services.plan_service import invalidate_plan_cache
+    invalidate_plan_cache(from_user_id)
+    invalidate_plan_cache(to_user_id)
+
+    from .categories import invalidate_category_rules_cache
+    invalidate_category_rules_cache(from_user_id)
+    invalidate_category_rules_cache(to_user_id)
+
 
 def user_score(user_id: int) -> int:
     with get_conn() as conn, conn.cursor() as cur:
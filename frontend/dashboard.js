@@ -5598,6 +5598,12 @@ let _historyFilters = {
   q: "",               // busca textual (debounce)
   page: 1,
 };
+// Paginação por cursor (keyset) do /history/{id}/list: a página 1 vem com o
+// total exato; as seguintes pedem `cursor` (o next_cursor da última página no
+// DOM) sem recontar. Assim que uma página renderiza, a próxima já é buscada em
+// background (prefetch) — o "Carregar mais" usa a resposta pronta se os filtros
+// ainda forem os mesmos.
+let _historyPaging = { nextCursor: null, total: 0, prefetch: null };
 let _historyStatsCache = null;
 let _historyRetryTimer = null;
 const _historyListChannel = makeFetchChannel(); // dedup + abort + geração
@@ -5747,9 +5753,33 @@ function _buildHistoryQuery(filters) {
   if (filters.q && filters.q.trim()) p.set("q", filters.q.trim());
   p.set("page", String(filters.page || 1));
   p.set("limit", "50");
+  if (filters.cursor) {
+    p.set("cursor", filters.cursor);
+    p.set("total", "none");   // o total veio na página 1
+  }
   return p.toString();
 }
 
+// Busca a próxima página em background (fora do canal: não aborta nem é
+// abortada por ninguém). Guardada pela query completa — filtros + cursor.
+function _prefetchHistoryPage() {
+  const cursor = _historyPaging.nextCursor;
+  if (!cursor) { _historyPaging.prefetch = null; return; }
+  const filters = { ..._historyFilters, page: (_historyFilters.page || 1) + 1, cursor };
+  const key = _buildHistoryQuery(filters);
+  if (_historyPaging.prefetch?.key === key) return;
+  const promise = _fetchHistoryList(filters, { allowParallel: true }).catch(() => null);
+  _historyPaging.prefetch = { key, promise };
+}
+
+// Resposta do prefetch pra estes filtros, ou null (não há / falhou / outros filtros).
+async function _takeHistoryPrefetch(filters) {
+  const pf = _historyPaging.prefetch;
+  if (!pf || pf.key !== _buildHistoryQuery(filters)) return null;
+  _historyPaging.prefetch = null;
+  return await pf.promise;
+}
+
 function _isoDate(d) {
   return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(d.getDate()).padStart(2, "0")}`;
 }
@@ -5837,6 +5867,9 @@ function renderHistoryTimeline(payload, append = false) {
   }
 
   const items = payload.items || [];
+  // Cursor da próxima página e total (só a página 1 conta; as demais vêm sem).
+  if (!append) _historyPaging.total = payload.total || 0;
+  _historyPaging.nextCursor = payload.next_cursor || null;
   // Indexa os itens no array global pra o clique na linha (openHistoryDetail).
   const _base = append ? _renderedHistoryItems.length : 0;
   if (append) _renderedHistoryItems.push(...items);
@@ -5876,20 +5909,21 @@ function renderHistoryTimeline(payload, append = false) {
     root.innerHTML = html;
   }
 
-  // Paginação: mostra "Carregar mais" se há mais páginas.
-  const totalPages = payload.total_pages || 0;
-  const currentPage = payload.page || 1;
-  if (totalPages > currentPage) {
+  // Paginação: mostra "Carregar mais" se há próxima página (next_cursor).
+  if (_historyPaging.nextCursor) {
     if (moreWrap) {
       moreWrap.style.display = "";
       const btn = document.getElementById("history-load-more-btn");
       if (btn) {
-        btn.textContent = `Carregar mais (${payload.total - currentPage * 50} restantes)`;
+        const remaining = _historyPaging.total - _renderedHistoryItems.length;
+        btn.textContent = remaining > 0 ? `Carregar mais (${remaining} restantes)` : "Carregar mais";
         btn.disabled = false;
       }
     }
+    _prefetchHistoryPage();
   } else {
     if (moreWrap) moreWrap.style.display = "none";
+    _historyPaging.prefetch = null;
   }
 }
 
@@ -5986,11 +6020,15 @@ document.addEventListener("click", async (e) => {
     // loadHistoryView: contador == páginas no DOM). Passa nextPage só pro fetch;
     // se for superado ou falhar, o contador fica intacto e batendo com o DOM.
     const nextPage = (_historyFilters.page || 1) + 1;
+    const nextFilters = { ..._historyFilters, page: nextPage, cursor: _historyPaging.nextCursor };
+    if (!nextFilters.cursor) return;
     btn.disabled = true;
     btn.textContent = "Carregando…";
     let more;
     try {
-      more = await _fetchHistoryList({ ..._historyFilters, page: nextPage });
+      // Prefetch pronto (mesmos filtros + cursor) → append imediato; senão busca.
+      more = await _takeHistoryPrefetch(nextFilters);
+      if (!more || !more.ok) more = await _fetchHistoryList(nextFilters);
     } catch (err) {
       // Falha REAL (HTTP/rede): o throw do canal (guard de r.ok) chega aqui, fora
       // do try/catch do loadHistoryView. Botão volta acionável; contador intacto,
@@ -7102,18 +7140,69 @@ function sendRefreshSilent() {
   _doRefresh({ silent: true });
 }
 
+/* Protocolo versionado do /ws: cada snapshot vem com `version` (ETag). Quem
+   pede a mesma visão de novo manda a versão que tem; o servidor responde
+   `not_modified` (nada mudou) ou `delta` (só o que mudou — ver
+   frontend/dashboard_delta.py), e também empurra deltas sozinho quando os
+   dados do usuário mudam. `wsData` é o último snapshot que veio pelo WS,
+   base dos deltas; `wsView` identifica a visão (mês, página, filtro, busca). */
+let wsData = null, wsVersion = null, wsView = null;
+
+const DELTA_LIST_KEYS = {
+  recent_launches: r => `${r.tipo === "credito" ? "c" : "l"}${r.id}`,
+  pockets: r => r.id,
+  investments: r => r.id,
+  credit_cards: r => r.id,
+  expense_categories: r => r.categoria,
+};
+
+function currentWsView() {
+  return [viewYear, viewMonth, launchesPage, LAUNCHES_LIMIT, filterType || "all", getFilterText()].join("|");
+}
+
+function getMonthMessage() {
+  const msg = {
+    type: "get_month",
+    year: viewYear,
+    month: viewMonth,
+    page: launchesPage,
+    limit: LAUNCHES_LIMIT,
+    filter_type: filterType || "all",
+    q: getFilterText()
+  };
+  if (wsVersion && wsView === currentWsView()) msg.version = wsVersion;
+  return msg;
+}
+
+function rememberWsSnapshot(data, version, view) {
+  wsData = data;
+  wsVersion = version || null;
+  wsView = view;
+}
+
+function applyDashboardDelta(snapshot, delta) {
+  const out = Object.assign({}, snapshot, delta.set || {});
+  (delta.unset || []).forEach(f => { delete out[f]; });
+  Object.entries(delta.lists || {}).forEach(([field, ld]) => {
+    const key = DELTA_LIST_KEYS[field];
+    const byKey = new Map((out[field] || []).map(r => [key(r), r]));
+    (ld.remove || []).forEach(k => byKey.delete(k));
+    (ld.upsert || []).forEach(r => byKey.set(key(r), r));
+    out[field] = ld.order ? ld.order.map(k => byKey.get(k)) : Array.from(byKey.values());
+  });
+  return out;
+}
+
+function showWsData(data) {
+  lastData = data;
+  cacheMonthData(data);
+  persistSnapshotToSession(data);
+  render(data);
+}
+
 function _doRefresh({ silent }) {
   if (ws && ws.readyState === WebSocket.OPEN) {
-    const msg = {
-      type: "get_month",
-      year: viewYear,
-      month: viewMonth,
-      page: launchesPage,
-      limit: LAUNCHES_LIMIT,
-      filter_type: filterType || "all",
-      q: getFilterText()
-    };
-    ws.send(JSON.stringify(msg));
+    ws.send(JSON.stringify(getMonthMessage()));
 
     if (!silent) {
       const btn = document.getElementById("refresh-btn");
@@ -7168,10 +7257,8 @@ function connect() {
 
     if (msg.type === "snapshot" || msg.type === "month_data") {
       if (!isCurrentViewData(msg.data)) return;
-      lastData = msg.data;
-      cacheMonthData(msg.data);
-      persistSnapshotToSession(msg.data);
-      render(msg.data);
+      rememberWsSnapshot(msg.data, msg.version, currentWsView());
+      showWsData(msg.data);
       stopSpin();
       setLaunchesLoading(false);
     } else if (msg.type === "update") {
@@ -7179,18 +7266,40 @@ function connect() {
       const serverMonth = msg.data.month || (NOW.getMonth() + 1);
 
       if (serverYear === viewYear && serverMonth === viewMonth) {
-        lastData = msg.data;
-        cacheMonthData(msg.data);
-        persistSnapshotToSession(msg.data);
-        render(msg.data);
+        rememberWsSnapshot(msg.data, msg.version, currentWsView());
+        showWsData(msg.data);
         showToast();
       }
 
+      stopSpin();
+      setLaunchesLoading(false);
+    } else if (msg.type === "not_modified") {
+      // Nada mudou desde `wsData`; se a tela mostra outra coisa (cache/HTTP), volta pra ele.
+      if (msg.year === viewYear && msg.month === viewMonth && wsData && lastData !== wsData) {
+        showWsData(wsData);
+      }
+      stopSpin();
+      setLaunchesLoading(false);
+    } else if (msg.type === "delta") {
+      if (msg.year !== viewYear || msg.month !== viewMonth) return;
+      if (!wsData || msg.base !== wsVersion) {
+        // Perdemos a base (reconexão, HTTP no meio): pede o snapshot inteiro.
+        wsVersion = null;
+        ws.send(JSON.stringify(getMonthMessage()));
+        return;
+      }
+      const data = applyDashboardDelta(wsData, msg.changes || {});
+      rememberWsSnapshot(data, msg.version, wsView);
+      showWsData(data);
       stopSpin();
       setLaunchesLoading(false);
     }
   };
-  ws.onclose = () => { setStatus("disconnected"); setTimeout(connect, 3000); };
+  ws.onclose = () => {
+    setStatus("disconnected");
+    wsVersion = null;  // a conexão nova não conhece a base dos deltas
+    setTimeout(connect, 3000);
+  };
   ws.onerror = () => ws.close();
 }
 
@@ -7324,15 +7433,7 @@ function requestMonthPage(page, { smoothScroll = true, preferHttp = false, backg
   }
 
   if (!preferHttp && ws && ws.readyState === WebSocket.OPEN) {
-    ws.send(JSON.stringify({
-      type: "get_month",
-      year: viewYear,
-      month: viewMonth,
-      page: launchesPage,
-      limit: LAUNCHES_LIMIT,
-      filter_type: filterType || "all",
-      q: getFilterText()
-    }));
+    ws.send(JSON.stringify(getMonthMessage()));
   } else {
     fetchMonthHttp(viewYear, viewMonth, launchesPage, LAUNCHES_LIMIT, { background });
   }
@@ -0,0 +1,104 @@
+"""Delta entre dois snapshots do dashboard (protocolo do /ws/{user_id}).
+
+O snapshot de `get_financial_data` é grande (lançamentos da página, caixinhas,
+investimentos, cartões, categorias) e quase tudo nele se repete de um refresh
+pro outro. Em vez de reenviar o JSON inteiro, o servidor manda só o que mudou:
+
+    {"set":   {<campo>: <valor novo>, ...},
+     "lists": {<campo>: {"upsert": [...], "remove": [<chave>, ...], "order": [<chave>, ...]}}}
+
+`set` troca campos inteiros (saldo, totais do mês, orçamentos, alertas...).
+`lists` cobre as listas com identidade estável (ver LIST_KEYS): linhas novas ou
+alteradas em `upsert`, as que saíram em `remove` e a ordem final em `order`.
+`apply_delta` é a referência do que o dashboard.js faz do lado do cliente.
+
+Os snapshots comparados são os já serializados (json.loads(jdump(data))): datas
+e Decimals viram o mesmo texto que o cliente recebe.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable
+
+# Campo que muda a cada cálculo sem significar mudança de dado.
+VOLATILE_FIELDS = ("timestamp",)
+
+
+def _launch_key(row: dict) -> str:
+    # Compras no cartão entram na lista com o id de credit_transactions — pode
+    # colidir com o id de um lançamento.
+    return f"{'c' if row.get('tipo') == 'credito' else 'l'}{row.get('id')}"
+
+
+LIST_KEYS: dict[str, Callable[[dict], Any]] = {
+    "recent_launches": _launch_key,
+    "pockets": lambda r: r.get("id"),
+    "investments": lambda r: r.get("id"),
+    "credit_cards": lambda r: r.get("id"),
+    "expense_categories": lambda r: r.get("categoria"),
+}
+
+
+def _list_delta(old: list, new: list, key: Callable[[dict], Any]) -> dict | None:
+    if not all(isinstance(r, dict) for r in old + new):
+        return None
+    old_by_key = {key(r): r for r in old}
+    new_keys = [key(r) for r in new]
+    if len(set(new_keys)) != len(new_keys) or len(old_by_key) != len(old):
+        return None  # chave repetida: não dá pra aplicar por chave
+    upsert = [r for k, r in zip(new_keys, new) if old_by_key.get(k) != r]
+    remove = [k for k in old_by_key if k not in set(new_keys)]
+    order = new_keys if new_keys != [key(r) for r in old] else None
+    out: dict[str, Any] = {}
+    if upsert:
+        out["upsert"] = upsert
+    if remove:
+        out["remove"] = remove
+    if order is not None:
+        out["order"] = order
+    return out
+
+
+def snapshot_delta(old: dict, new: dict) -> dict:
+    """Delta que leva `old` a `new`. Vazio ({}) quando nada mudou."""
+    changed: dict[str, Any] = {}
+    lists: dict[str, Any] = {}
+    for field, value in new.items():
+        if field in VOLATILE_FIELDS or old.get(field) == value:
+            continue
+        key = LIST_KEYS.get(field)
+        if key and isinstance(value, list) and isinstance(old.get(field), list):
+            ld = _list_delta(old[field], value, key)
+            if ld is not None:
+                lists[field] = ld
+                continue
+        changed[field] = value
+    removed = [f for f in old if f not in new]
+    delta: dict[str, Any] = {}
+    if changed:
+        delta["set"] = changed
+    if lists:
+        delta["lists"] = lists
+    if removed:
+        delta["unset"] = removed
+    return delta
+
+
+def apply_delta(snapshot: dict, delta: dict) -> dict:
+    """Aplica `delta` (de `snapshot_delta`) e devolve o snapshot novo."""
+    out = dict(snapshot)
+    out.update(delta.get("set") or {})
+    for field in delta.get("unset") or ():
+        out.pop(field, None)
+    for field, ld in (delta.get("lists") or {}).items():
+        key = LIST_KEYS[field]
+        by_key = {key(r): r for r in out.get(field) or []}
+        for k in ld.get("remove") or ():
+            by_key.pop(k, None)
+        for r in ld.get("upsert") or ():
+            by_key[key(r)] = r
+        order = ld.get("order")
+        out[field] = [by_key[k] for k in order] if order is not None else list(by_key.values())
+    return out
+
+
+__all__ = ["LIST_KEYS", "VOLATILE_FIELDS", "apply_delta", "snapshot_delta"]
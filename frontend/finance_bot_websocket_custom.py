@@ -72,7 +72,8 @@ from db import (
     delete_investment,
     get_dashboard_market_rates,
     get_auth_user,
-    build_user_export_zip,
+    build_user_export_file,
+    iter_export_file,
     verify_user_password,
     get_user_email,
     create_data_export_token,
@@ -87,7 +88,17 @@ from db import (
     update_credit_transaction_fields,
     undo_credit_transaction,
     delete_launch_and_rollback,
+    rollup_sql,
+    DASHBOARD_VERSION_SQL,
+    dashboard_etag,
+    get_cached_export,
+    put_cached_export,
+    reuse_cached_export,
 )
+from db.export_cache import export_input_digest
+from db.history_search import parse_search_terms, search_clause
+from db.pagination import InvalidCursor, decode_cursor, keyset_after, split_page
+from frontend.dashboard_delta import snapshot_delta
 from frontend.routes.affiliates import router as affiliates_router
 from frontend.routes.agents import router as agents_router
 from frontend.routes.analytics import router as analytics_router
@@ -118,6 +129,7 @@ from frontend.routes.shared import (
     resolve_dashboard_user_id as _resolve_dashboard_user_id,
 )
 from frontend.routes.static_pages import router as static_pages_router
+from frontend.routes import shared as _shared
 
 load_app_env()
 
@@ -325,6 +337,57 @@ async def _get_dashboard_current_state(user_id: int):
     return current_pockets, current_investments, market_rates, rv_positions, of_fixed_income
 
 
+async def _dashboard_etag(user_id: int) -> str:
+    """ETag do snapshot do usuário: versão mantida por trigger + dia de hoje
+    (db/dashboard_versions.py). Uma consulta por chave primária — é o que o
+    refresh paga quando nada mudou."""
+    from utils_date import today_tz
+    async with await db_connect() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(DASHBOARD_VERSION_SQL, (user_id,))
+            row = await cur.fetchone()
+    return dashboard_etag(row["version"] if row else 0, today_tz())
+
+
+async def _send_dashboard_view(
+    ws: WebSocket,
+    user_id: int,
+    msg_type: str,
+    view: tuple,
+    client_version: str | None = None,
+) -> None:
+    """Responde um pedido de snapshot (`view` = ano, mês, página, limite, filtro, busca).
+
+    - cliente já tem a versão atual dessa visão → `not_modified` (sem recalcular);
+    - cliente tem a versão que esta conexão mandou por último → `delta`;
+    - senão → snapshot inteiro em `msg_type`, com a ETag em `version`.
+    """
+    version = await _dashboard_etag(user_id)
+    state = manager.view_state(ws, user_id)
+    if client_version and client_version == version and state.get("view") == view:
+        await ws.send_text(jdump({
+            "type": "not_modified", "year": view[0], "month": view[1], "version": version,
+        }))
+        return
+    data = await get_financial_data(user_id, *view)
+    text = jdump(data)
+    snapshot = json.loads(text)
+    if (client_version and state.get("view") == view
+            and state.get("version") == client_version and state.get("snapshot") is not None):
+        payload = jdump({
+            "type": "delta", "year": view[0], "month": view[1], "base": client_version,
+            "version": version, "changes": snapshot_delta(state["snapshot"], snapshot),
+        })
+    else:
+        payload = f'{{"type": {json.dumps(msg_type)}, "version": {json.dumps(version)}, "data": {text}}}'
+    manager.remember_view(ws, user_id, view, version, snapshot)
+    await ws.send_text(payload)
+
+
+# Cursor da lista de lançamentos do dashboard: (criado_em, origem 'l'/'c', id).
+_DASHBOARD_LAUNCHES_CURSOR_KIND = "dashboard_launches"
+
+
 def _dashboard_launch_filter_sql(filter_type: str | None, query: str | None) -> tuple[list[str], list]:
     clauses: list[str] = []
     params: list = []
@@ -341,19 +404,12 @@ def _dashboard_launch_filter_sql(filter_type: str | None, query: str | None) ->
     elif filter_type == "interno":
         clauses.append("is_internal_movement = true")
 
-    if query:
-        clauses.append(
-            """
-            (
-              lower(coalesce(nota, '')) LIKE %s
-              OR lower(coalesce(alvo, '')) LIKE %s
-              OR lower(coalesce(categoria, '')) LIKE %s
-              OR lower(coalesce(tipo, '')) LIKE %s
-            )
-            """
-        )
-        like = f"%{query.lower()}%"
-        params.extend([like, like, like, like])
+    # Busca pelo search_vec indexado (db/history_search.py) — mesma regra do
+    # Histórico — ou pelo nome do tipo ("receita", "aporte...").
+    search_sql, search_params = search_clause(parse_search_terms(query))
+    if search_sql:
+        clauses.append(f"({search_sql}) OR lower(coalesce(tipo, '')) LIKE %s")
+        params.extend([*search_params, f"%{query.lower()}%"])
 
     return clauses, params
 
@@ -366,12 +422,18 @@ async def get_financial_data(
     limit: int = 25,
     filter_type: str | None = None,
     query: str | None = None,
+    cursor: str | None = None,
 ) -> dict:
     """
     Fetch full financial snapshot for user_id.
     If year/month are given, income/expenses/categories/launches
     are scoped to that month. Balance, pockets and investments
     always reflect the current state.
+
+    Lançamentos paginam por `page` (offset) ou, com `cursor` (o
+    `launches_pagination.next_cursor` da página anterior), por keyset — sem
+    OFFSET e sem recontar o total (volta None; o cliente mantém o da primeira
+    página). Cursor inválido levanta InvalidCursor.
     """
     now = datetime.now(timezone.utc)
     y   = year  or now.year
@@ -384,6 +446,12 @@ async def get_financial_data(
     page = max(int(page or 1), 1)
     limit = max(min(int(limit or 25), 100), 1)
     offset = (page - 1) * limit
+    seek = decode_cursor(cursor, _DASHBOARD_LAUNCHES_CURSOR_KIND, 3) if cursor else None
+    seek_sql, seek_params = "", []
+    if seek:
+        seek_sql, seek_params = keyset_after([("criado_em", seek[0]), ("src", seek[1]), ("id", seek[2])])
+        seek_sql = f"WHERE {seek_sql}"
+        offset = 0
     current_pockets, current_investments, market_rates, current_rv_positions, current_of_fixed_income = await _get_dashboard_current_state(user_id)
     launch_filter_clauses, launch_filter_params = _dashboard_launch_filter_sql(filter_type, query)
     launch_filter_sql = "".join(f"\n                  AND ({clause})" for clause in launch_filter_clauses)
@@ -396,6 +464,9 @@ async def get_financial_data(
                 await cur.execute(sql, params)
                 return await cur.fetchall()
 
+    async def _none_total():
+        return [{"total": None}]
+
     pockets = current_pockets
     investments = current_investments  # do cache
     rv_positions = current_rv_positions  # renda variável (ações/FIIs via OF), do cache
@@ -431,7 +502,8 @@ async def get_financial_data(
                    t.installment_no AS installment_no,
                    b.period_end AS bill_period_end,
                    NULL::date AS posted_at,
-                   true AS has_time
+                   true AS has_time,
+                   'c' AS src
             FROM credit_transactions t
             JOIN credit_cards c ON c.id = t.card_id
             JOIN credit_bills b ON b.id = t.bill_id
@@ -441,6 +513,19 @@ async def get_financial_data(
               AND t.is_refund = false
         """
         credit_union_params = [user_id, query_start, month_end]
+        # A busca vale pras compras no cartão também (nota, categoria, nome do
+        # cartão ou o próprio tipo "credito"), como nos lançamentos.
+        credit_search_sql, credit_search_params = search_clause(
+            parse_search_terms(query), table="credit_transactions", alias="t.",
+            card_user_id=user_id,
+        )
+        if credit_search_sql:
+            credit_union_sql += f"  AND (({credit_search_sql}) OR 'credito' LIKE %s)\n"
+            credit_union_params += [*credit_search_params, f"%{(query or '').strip().lower()}%"]
+
+    # Totais e categorias do mês saem do rollup mensal (meses cheios) + pontas
+    # cruas quando o plano limita o histórico no meio do mês.
+    month_rollup_sql, month_rollup_params = rollup_sql(user_id, query_start, month_end)
 
     # ───── Paraleliza queries independentes via asyncio.gather ─────
     # Cada _q() pega uma conn do pool. Antes era sequencial dentro de UMA
@@ -459,8 +544,9 @@ async def get_financial_data(
     ) = await asyncio.gather(
         # 1) Account balance
         _q("SELECT balance FROM accounts WHERE user_id = %s", (user_id,)),
-        # 3) Total launches (com filtros + credit union)
-        _q(
+        # 3) Total launches (com filtros + credit union) — só na página por
+        # offset; por cursor o cliente já tem o total.
+        _none_total() if seek else _q(
             f"""
             SELECT COUNT(*) AS total FROM (
                 SELECT id, tipo, valor, alvo, nota, categoria, criado_em, is_internal_movement,
@@ -468,7 +554,8 @@ async def get_financial_data(
                        NULL::int AS installment_no,
                        NULL::date AS bill_period_end,
                        NULL::date AS posted_at,
-                       true AS has_time
+                       true AS has_time,
+                       'l' AS src
                 FROM launches
                 WHERE user_id = %s
                   AND criado_em >= %s AND criado_em < %s
@@ -495,7 +582,8 @@ async def get_financial_data(
                          WHEN source = 'open_finance'
                            THEN COALESCE((efeitos->>'time_known')::boolean, false)
                          ELSE true
-                       END AS has_time
+                       END AS has_time,
+                       'l' AS src
                 FROM launches
                 WHERE user_id = %s
                   AND criado_em >= %s AND criado_em < %s
@@ -503,70 +591,41 @@ async def get_financial_data(
                   {launch_filter_sql}
                 {credit_union_sql}
             ) merged
-            ORDER BY criado_em DESC, id ASC
+            {seek_sql}
+            ORDER BY criado_em DESC, src DESC, id DESC
             LIMIT %s OFFSET %s
             """,
-            (user_id, query_start, month_end, *launch_filter_params, *credit_union_params, limit, offset),
+            (user_id, query_start, month_end, *launch_filter_params, *credit_union_params,
+             *seek_params, limit + 1, offset),
         ),
         # 5) Monthly income/expense totals (sem internas).
         # Compras no cartão entram como 'despesa' alocadas pelo mês em que a
         # FATURA fecha (`credit_bills.period_end`), não pelo `purchased_at`.
         # Assim parcelamento aparece distribuído (1/3 maio, 2/3 junho, 3/3 julho)
         # em vez de tudo no mês da compra. Pagamento da fatura é launch interna,
-        # então não dobra.
+        # então não dobra. Lido do rollup mensal (db/rollups.py).
         _q(
-            """
-            SELECT tipo, SUM(valor) AS total FROM (
-                SELECT tipo, valor
-                FROM launches
-                WHERE user_id = %s
-                  AND criado_em >= %s AND criado_em < %s
-                  AND is_internal_movement = false
-                UNION ALL
-                SELECT 'despesa' AS tipo, ct.valor
-                FROM credit_transactions ct
-                JOIN credit_bills b ON b.id = ct.bill_id
-                WHERE ct.user_id = %s
-                  AND ct.is_refund = false
-                  AND b.period_end >= %s AND b.period_end < %s
-            ) merged
+            f"""
+            SELECT tipo, SUM(total) AS total
+            FROM ({month_rollup_sql}) merged
             GROUP BY tipo
             """,
-            (
-                user_id, query_start, month_end,
-                user_id, query_start, month_end,
-            ),
+            tuple(month_rollup_params),
         ),
         # 6) Categories (despesas do mês — credit_transactions alocadas por
         # `bill.period_end`, igual query 5).
         _q(
-            """
-            SELECT COALESCE(categoria, 'sem categoria') AS categoria,
-                   SUM(valor) AS total,
-                   SUM(cnt)   AS count
-            FROM (
-                SELECT categoria, valor, 1 AS cnt
-                FROM launches
-                WHERE user_id = %s
-                  AND tipo = 'despesa'
-                  AND is_internal_movement = false
-                  AND criado_em >= %s AND criado_em < %s
-                UNION ALL
-                SELECT ct.categoria, ct.valor, 1 AS cnt
-                FROM credit_transactions ct
-                JOIN credit_bills b ON b.id = ct.bill_id
-                WHERE ct.user_id = %s
-                  AND ct.is_refund = false
-                  AND b.period_end >= %s AND b.period_end < %s
-            ) merged
-            GROUP BY COALESCE(categoria, 'sem categoria')
+            f"""
+            SELECT COALESCE(NULLIF(categoria, ''), 'sem categoria') AS categoria,
+                   SUM(total) AS total,
+                   SUM(n)     AS count
+            FROM ({month_rollup_sql}) merged
+            WHERE tipo = 'despesa'
+            GROUP BY 1
             ORDER BY total DESC
             LIMIT 10
             """,
-            (
-                user_id, query_start, month_end,
-                user_id, query_start, month_end,
-            ),
+            tuple(month_rollup_params),
         ),
         # 7) Allocations (aportes do mês)
         _q(
@@ -655,6 +714,11 @@ async def get_financial_data(
     # Desempacota fetchone-style
     account = account_rows[0] if account_rows else None
     launches_total = int(launches_total_rows[0]["total"] or 0) if launches_total_rows else 0
+    launches, launches_next_cursor = split_page(
+        launches, limit,
+        lambda r: (r["criado_em"], "c" if r["tipo"] == "credito" else "l", int(r["id"])),
+        _DASHBOARD_LAUNCHES_CURSOR_KIND,
+    )
 
     # Saldo dos bancos conectados (Open Finance) — pro saldo consolidado no dashboard.
     # Só contas BANK (corrente/poupança); cartão é dívida, fica na fatura.
@@ -853,8 +917,9 @@ async def get_financial_data(
         "launches_pagination": {
             "page": page,
             "limit": limit,
-            "total": launches_total,
-            "total_pages": max((launches_total + limit - 1) // limit, 1),
+            "total": None if seek else launches_total,
+            "total_pages": None if seek else max((launches_total + limit - 1) // limit, 1),
+            "next_cursor": launches_next_cursor,
             "filter_type": (filter_type or "all").strip().lower(),
             "query": (query or "").strip(),
         },
@@ -1090,10 +1155,76 @@ def _spreadsheet_safe(v) -> str:
     return s
 
 
-async def build_csv(user_id: int, year: int, month: int) -> str | None:
+# Sobe quando o layout de algum extrato muda: invalida o que está no cache.
+_EXPORT_RENDER_REV = 1
+_EXPORT_FORMATS = ("csv", "xlsx", "pdf")
+
+
+async def _export_balance(user_id: int) -> float:
+    """Saldo atual da conta (não escopado ao mês) — mesmo número do card do dashboard."""
+    async with await db_connect() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT balance FROM accounts WHERE user_id = %s", (user_id,))
+            row = await cur.fetchone()
+    return float(row["balance"]) if row else 0.0
+
+
+async def build_month_exports(
+    user_id: int, year: int, month: int, formats: tuple[str, ...] = _EXPORT_FORMATS,
+) -> dict[str, bytes] | None:
+    """Extratos do mês nos `formats` pedidos, via cache (db/export_cache.py).
+
+    1. versão do dashboard igual à do arquivo guardado → devolve sem ler nada;
+    2. senão relê os itens do mês; conteúdo igual (hash) → devolve sem renderizar;
+    3. senão renderiza (numa thread) e guarda.
+    None se o mês não tem lançamento.
+    """
+    async with await db_connect() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(DASHBOARD_VERSION_SQL, (user_id,))
+            row = await cur.fetchone()
+    version = int(row["version"]) if row else 0
+
+    out: dict[str, bytes] = {}
+    for fmt in formats:
+        cached = await asyncio.to_thread(get_cached_export, user_id, year, month, fmt, version)
+        if cached is not None:
+            out[fmt] = cached
+    missing = [fmt for fmt in formats if fmt not in out]
+    if not missing:
+        return out
+
     items = await _fetch_export_items(user_id, year, month)
     if not items:
         return None
+    balance = await _export_balance(user_id) if "pdf" in missing else 0.0
+    for fmt in missing:
+        digest = export_input_digest(
+            [_EXPORT_RENDER_REV, fmt, year, month, balance if fmt == "pdf" else None, items]
+        )
+        content = await asyncio.to_thread(
+            reuse_cached_export, user_id, year, month, fmt, version, digest,
+        )
+        if content is None:
+            if fmt == "csv":
+                content = await asyncio.to_thread(_render_csv, items)
+            elif fmt == "xlsx":
+                content = await asyncio.to_thread(_render_xlsx, items)
+            else:
+                content = await asyncio.to_thread(_render_pdf, items, year, month, balance)
+            await asyncio.to_thread(
+                put_cached_export, user_id, year, month, fmt, version, digest, content,
+            )
+        out[fmt] = content
+    return out
+
+
+async def build_csv(user_id: int, year: int, month: int) -> str | None:
+    exports = await build_month_exports(user_id, year, month, ("csv",))
+    return exports["csv"].decode("utf-8") if exports else None
+
+
+def _render_csv(items: list[dict]) -> bytes:
     buf = io.StringIO()
     w   = csv.writer(buf)
     w.writerow(["data", "tipo", "valor", "categoria", "descricao"])
@@ -1106,7 +1237,7 @@ async def build_csv(user_id: int, year: int, month: int) -> str | None:
             _spreadsheet_safe(it["categoria"]),
             _spreadsheet_safe(it["descricao"]),
         ])
-    return buf.getvalue()
+    return buf.getvalue().encode("utf-8")
 
 
 def _export_summary(items: list[dict]) -> dict:
@@ -1132,14 +1263,16 @@ def _export_summary(items: list[dict]) -> dict:
 
 
 async def build_xlsx(user_id: int, year: int, month: int) -> bytes | None:
-    items = await _fetch_export_items(user_id, year, month)
-    if not items:
-        return None
-    return await asyncio.to_thread(_render_xlsx, items)
+    exports = await build_month_exports(user_id, year, month, ("xlsx",))
+    return exports["xlsx"] if exports else None
 
 
 def _render_xlsx(items: list[dict]) -> bytes:
+    """Planilha em modo write-only: cada linha vai pro arquivo assim que é
+    escrita, sem a grade de células inteira em memória. Estilos compartilhados
+    entre as células (um objeto por cor, não um por célula)."""
     from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font, PatternFill, Alignment
     from openpyxl.utils import get_column_letter
 
@@ -1148,37 +1281,49 @@ def _render_xlsx(items: list[dict]) -> bytes:
     POS   = "16A34A"   # verde = entrou
     NEG   = "DC2626"   # vermelho = saiu
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Lançamentos"
-    ws.append(["Data", "Tipo", "Categoria", "Descrição", "Valor"])
-    for cell in ws[1]:
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill("solid", fgColor=BRAND)
-        cell.alignment = Alignment(vertical="center")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Lançamentos")
+    # Write-only: larguras e painel congelado antes da primeira linha.
+    for i, width in enumerate((14, 12, 18, 38, 16), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+    ws.freeze_panes = "A2"
+
+    head_font = Font(bold=True, color="FFFFFF")
+    head_fill = PatternFill("solid", fgColor=BRAND)
+    head_align = Alignment(vertical="center")
+    zebra_fill = PatternFill("solid", fgColor=ZEBRA)
+    sign_font = {"+": Font(bold=True, color=POS), "-": Font(bold=True, color=NEG)}
+
+    def cell(value, font=None, fill=None, number_format=None, alignment=None):
+        c = WriteOnlyCell(ws, value=value)
+        if font is not None:
+            c.font = font
+        if fill is not None:
+            c.fill = fill
+        if number_format is not None:
+            c.number_format = number_format
+        if alignment is not None:
+            c.alignment = alignment
+        return c
+
+    ws.append([
+        cell(h, head_font, head_fill, alignment=head_align)
+        for h in ("Data", "Tipo", "Categoria", "Descrição", "Valor")
+    ])
 
     for idx, it in enumerate(items, start=2):
         d = it["data"]
         signed = it["valor"] if it["sign"] == "+" else -it["valor"]
-        color = POS if it["sign"] == "+" else NEG   # verde = entrou, vermelho = saiu
+        font = sign_font["+" if it["sign"] == "+" else "-"]   # verde = entrou, vermelho = saiu
+        fill = zebra_fill if idx % 2 == 0 else None
         ws.append([
-            d.strftime("%d/%m/%Y") if d else "",
-            it["label"],
-            _spreadsheet_safe(it["categoria"]),
-            _spreadsheet_safe(it["descricao"]),
-            round(signed, 2),
+            cell(d.strftime("%d/%m/%Y") if d else "", fill=fill),
+            cell(it["label"], font, fill),
+            cell(_spreadsheet_safe(it["categoria"]), fill=fill),
+            cell(_spreadsheet_safe(it["descricao"]), fill=fill),
+            cell(round(signed, 2), font, fill, '"R$" #,##0.00'),
         ])
-        ws.cell(row=idx, column=2).font = Font(bold=True, color=color)
-        valor_cell = ws.cell(row=idx, column=5)
-        valor_cell.font = Font(bold=True, color=color)
-        valor_cell.number_format = '"R$" #,##0.00'
-        if idx % 2 == 0:
-            for col in range(1, 6):
-                ws.cell(row=idx, column=col).fill = PatternFill("solid", fgColor=ZEBRA)
 
-    for i, width in enumerate((14, 12, 18, 38, 16), start=1):
-        ws.column_dimensions[get_column_letter(i)].width = width
-    ws.freeze_panes = "A2"
     ws.auto_filter.ref = f"A1:E{len(items) + 1}"
 
     bio = io.BytesIO()
@@ -1187,16 +1332,8 @@ def _render_xlsx(items: list[dict]) -> bytes:
 
 
 async def build_pdf(user_id: int, year: int, month: int) -> bytes | None:
-    items = await _fetch_export_items(user_id, year, month)
-    if not items:
-        return None
-    # Saldo atual da conta (não escopado ao mês) — mesmo número do card do dashboard.
-    async with await db_connect() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute("SELECT balance FROM accounts WHERE user_id = %s", (user_id,))
-            row = await cur.fetchone()
-    balance = float(row["balance"]) if row else 0.0
-    return await asyncio.to_thread(_render_pdf, items, year, month, balance)
+    exports = await build_month_exports(user_id, year, month, ("pdf",))
+    return exports["pdf"] if exports else None
 
 
 def _render_pdf(items: list[dict], year: int, month: int, balance: float = 0.0) -> bytes:
@@ -1206,7 +1343,7 @@ def _render_pdf(items: list[dict], year: int, month: int, balance: float = 0.0)
     from reportlab.lib.units import mm
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.platypus import Flowable, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
     from reportlab.graphics.shapes import Drawing, Rect
     from utils_text import fmt_brl
 
@@ -1226,12 +1363,18 @@ def _render_pdf(items: list[dict], year: int, month: int, balance: float = 0.0)
 
     base = getSampleStyleSheet()
 
+    styles: dict[tuple, ParagraphStyle] = {}   # um estilo por combinação, não por célula
+
     def par(text, size=9, color=INK, bold=False, align=TA_LEFT):
-        return Paragraph(str(text), ParagraphStyle(
-            "p", parent=base["Normal"],
-            fontName="Helvetica-Bold" if bold else "Helvetica",
-            fontSize=size, textColor=color, alignment=align, leading=size + 3,
-        ))
+        key = (size, color.hexval(), bold, align)
+        style = styles.get(key)
+        if style is None:
+            style = styles[key] = ParagraphStyle(
+                "p", parent=base["Normal"],
+                fontName="Helvetica-Bold" if bold else "Helvetica",
+                fontSize=size, textColor=color, alignment=align, leading=size + 3,
+            )
+        return Paragraph(str(text), style)
 
     summary = _export_summary(items)
     bio = io.BytesIO()
@@ -1326,37 +1469,84 @@ def _render_pdf(items: list[dict], year: int, month: int, balance: float = 0.0)
         el.append(cat_table)
 
     # ── Lançamentos ──────────────────────────────────────────────────────
+    # Um Table só com todos os lançamentos faz o reportlab medir (e, a cada
+    # quebra de página, recopiar e remedir) o mês inteiro, com 5 Paragraphs
+    # por linha vivos até o fim. _LedgerPages monta só um lote por página:
+    # o que cabe é desenhado, o resto volta como outro _LedgerPages.
     el.append(Spacer(1, 20))
     el.append(par("Lançamentos", 13, BRAND_D, bold=True))
     el.append(Spacer(1, 7))
     head = [par(h, 8, colors.white, bold=True, align=(TA_RIGHT if h == "Valor" else TA_LEFT))
             for h in ("Data", "Tipo", "Categoria", "Descrição", "Valor")]
-    lanc_rows = [head]
-    for it in items:
-        color = POS if it["sign"] == "+" else NEG   # verde = entrou, vermelho = saiu
-        d = it["data"]
-        lanc_rows.append([
-            par(d.strftime("%d/%m") if d else "", 8, MUTED),
-            par(it["label"], 8, color, bold=True),
-            par(it["categoria"] or "-", 8, INK),
-            par((it["descricao"] or "-")[:55], 8, INK),
-            par(f"{it['sign']} {fmt_brl(it['valor'])}", 8, color, bold=True, align=TA_RIGHT),
-        ])
-    lanc = Table(
-        lanc_rows,
-        colWidths=[W * 0.14, W * 0.13, W * 0.20, W * 0.38, W * 0.15],
-        repeatRows=1,
-    )
-    lanc.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), BRAND),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, ZEBRA]),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("TOPPADDING", (0, 0), (-1, -1), 5),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
-        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-    ]))
-    el.append(lanc)
+
+    def ledger_table(start: int, stop: int) -> Table:
+        lanc_rows = [head]
+        for it in items[start:stop]:
+            color = POS if it["sign"] == "+" else NEG   # verde = entrou, vermelho = saiu
+            d = it["data"]
+            lanc_rows.append([
+                par(d.strftime("%d/%m") if d else "", 8, MUTED),
+                par(it["label"], 8, color, bold=True),
+                par(it["categoria"] or "-", 8, INK),
+                par((it["descricao"] or "-")[:55], 8, INK),
+                par(f"{it['sign']} {fmt_brl(it['valor'])}", 8, color, bold=True, align=TA_RIGHT),
+            ])
+        lanc = Table(
+            lanc_rows,
+            colWidths=[W * 0.14, W * 0.13, W * 0.20, W * 0.38, W * 0.15],
+            repeatRows=1,
+        )
+        # Zebra contínua entre páginas: a paridade segue a posição no mês.
+        zebra = [colors.white, ZEBRA] if start % 2 == 0 else [ZEBRA, colors.white]
+        lanc.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), BRAND),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), zebra),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("TOPPADDING", (0, 0), (-1, -1), 5),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+            ("LEFTPADDING", (0, 0), (-1, -1), 8),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+        ]))
+        return lanc
+
+    class _LedgerPages(Flowable):
+        # Lote = linhas montadas pra preencher uma página: um pouco mais do que
+        # coube na anterior. Se o lote inteiro couber, dobra e tenta de novo —
+        # o lote tem que transbordar, senão o próximo começaria com outro
+        # cabeçalho no meio da página.
+        def __init__(self, start: int, batch: int = 48):
+            super().__init__()
+            self.start = start
+            self.batch = batch
+            self._table = None
+
+        def wrap(self, aw, ah):
+            if len(items) - self.start > self.batch:
+                # Não cabe por definição: o frame chama split().
+                self.width, self.height = aw, ah + 1
+                return self.width, self.height
+            self._table = ledger_table(self.start, len(items))
+            self.width, self.height = self._table.wrap(aw, ah)
+            return self.width, self.height
+
+        def split(self, aw, ah):
+            batch = self.batch
+            while True:
+                stop = min(self.start + batch, len(items))
+                parts = ledger_table(self.start, stop).split(aw, ah)
+                if not parts:
+                    return []
+                consumed = parts[0]._nrows - 1   # sem o cabeçalho
+                if self.start + consumed >= len(items):
+                    return [parts[0]]
+                if consumed < stop - self.start:
+                    return [parts[0], _LedgerPages(self.start + consumed, consumed + 8)]
+                batch *= 2
+
+        def draw(self):
+            self._table.drawOn(self.canv, 0, 0)
+
+    el.append(_LedgerPages(0))
 
     el.append(Spacer(1, 16))
     el.append(par(
@@ -1375,8 +1565,10 @@ class ConnectionManager:
     MAX_CONNECTIONS_PER_USER = 5
 
     def __init__(self):
-        # active[user_id][ws] = {"year": int, "month": int}
+        # active[user_id][ws] = {"year": int, "month": int,
+        #                        "view": tuple, "version": str, "snapshot": dict}
         self.active: Dict[int, Dict[WebSocket, dict]] = {}
+        self._pending_push: set[int] = set()
 
     async def connect(self, ws: WebSocket, user_id: int, year: int, month: int) -> bool:
         await ws.accept()
@@ -1423,7 +1615,103 @@ class ConnectionManager:
                 self.disconnect(ws, user_id)
         return sent
 
+    # ── Snapshot versionado por conexão ──────────────────────────────────────
+    # Cada conexão guarda a visão que o cliente tem na tela (mês + página +
+    # filtros), a ETag dela e o snapshot já serializado. É a base dos deltas:
+    # tanto da resposta a refresh/get_month quanto do push depois de escritas.
+
+    def remember_view(self, ws: WebSocket, user_id: int, view: tuple, version: str, snapshot: dict):
+        info = self.active.get(user_id, {}).get(ws)
+        if info is not None:
+            info.update(view=view, version=version, snapshot=snapshot)
+
+    def view_state(self, ws: WebSocket, user_id: int) -> dict:
+        return self.active.get(user_id, {}).get(ws) or {}
+
+    def schedule_push(self, user_id: int, delay: float = 0.25) -> None:
+        """Agenda o push de deltas pro usuário (listener das escritas do dashboard).
+
+        Coalesce rajadas de escrita num push só. Sem conexão aberta ou fora do
+        event loop (escrita vinda de thread), não faz nada — o próximo refresh
+        do cliente compara a versão e pega a mudança.
+        """
+        if not self.active.get(user_id) or user_id in self._pending_push:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        async def _later():
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._pending_push.discard(user_id)
+            await self.push_changes(user_id)
+
+        self._pending_push.add(user_id)
+        loop.create_task(_later())
+
+    async def push_changes(self, user_id: int) -> int:
+        """Manda só o delta (vs. o último snapshot enviado) pra cada conexão do
+        usuário. Conexões na mesma visão compartilham um cálculo. Devolve quantas
+        receberam delta."""
+        conns = [(ws, info) for ws, info in list(self.active.get(user_id, {}).items())
+                 if info.get("snapshot") is not None]
+        if not conns:
+            return 0
+        version = await _dashboard_etag(user_id)
+        computed: dict[tuple, dict] = {}
+        sent = 0
+        for ws, info in conns:
+            view = info["view"]
+            if view not in computed:
+                try:
+                    computed[view] = json.loads(jdump(await get_financial_data(user_id, *view)))
+                except Exception as exc:
+                    print(f"[ws] push user={user_id}: {exc}", file=sys.stderr)
+                    return sent
+            snapshot = computed[view]
+            changes = snapshot_delta(info["snapshot"], snapshot)
+            base = info.get("version")
+            if not changes:
+                # Mantém a versão que o cliente tem: o próximo refresh dele vira
+                # um delta vazio em vez de um snapshot inteiro.
+                self.remember_view(ws, user_id, view, base, snapshot)
+                continue
+            self.remember_view(ws, user_id, view, version, snapshot)
+            try:
+                await ws.send_text(jdump({
+                    "type": "delta", "year": view[0], "month": view[1],
+                    "base": base, "version": version, "changes": changes,
+                }))
+                sent += 1
+            except Exception:
+                self.disconnect(ws, user_id)
+        return sent
+
+    # ── Avisos de outros processos (core/services/change_bus.py) ─────────────
+    # Escrita feita em outro worker/processo chega aqui pelo NOTIFY: derruba o
+    # cache local do snapshot e agenda o push (coalescido) pros sockets deste
+    # worker. Eventos com nome ("open_finance_synced"...) vão também direto
+    # pro cliente.
+
+    async def on_user_change(self, user_id: int, event: str, data: dict) -> None:
+        _shared.dashboard_current_cache.pop(user_id, None)
+        if not self.active.get(user_id):
+            return
+        self.schedule_push(user_id)
+        if event != "changed":
+            await self.broadcast_to_user(user_id, jdump({"type": event, **data}))
+
+    def resync_all(self) -> None:
+        """Depois de perder a escuta: qualquer usuário pode ter mudado."""
+        _shared.dashboard_current_cache.clear()
+        for user_id in list(self.active):
+            self.schedule_push(user_id)
+
 manager = ConnectionManager()
+_shared.dashboard_change_listeners.append(manager.schedule_push)
 
 # ─── App startup ──────────────────────────────────────────────────────────────
 
@@ -1609,6 +1897,14 @@ async def lifespan(app: FastAPI):
         except Exception as exc:
             print(f"[agents] erro: {exc}", file=sys.stderr)
 
+    async def _admin_stats_refresh():
+        try:
+            await asyncio.sleep(30)
+            from core.admin_dashboard import run_admin_stats_refresh_loop  # noqa: PLC0415
+            await run_admin_stats_refresh_loop()
+        except Exception as exc:
+            print(f"[admin_stats] erro: {exc}", file=sys.stderr)
+
     async def _login_events_retention():
         try:
             await asyncio.sleep(2)
@@ -1644,17 +1940,21 @@ async def lifespan(app: FastAPI):
         if (os.getenv("OF_REFRESH_ENABLED") or "").strip().lower() not in ("1", "true", "yes", "on"):
             return
         interval = int(os.getenv("OF_REFRESH_INTERVAL_SEC", str(6 * 60 * 60)))
-        from core.services.pluggy_sync import refresh_all_pluggy_items
-        while True:
-            try:
-                res = await asyncio.to_thread(refresh_all_pluggy_items)
-                print(f"[open_finance_refresh] {res}", flush=True)
-                await asyncio.sleep(interval)
-            except asyncio.CancelledError:
-                raise
-            except Exception as exc:
-                print(f"[open_finance_refresh] erro: {exc}", file=sys.stderr)
-                await asyncio.sleep(interval)
+        from core.services.pluggy import AsyncPluggyClient
+        from core.services.pluggy_sync import refresh_all_pluggy_items_async
+        # Um cliente (pool de conexões + API Key) pela vida do processo: os PATCHes
+        # saem em paralelo, limitados por OF_SYNC_CONCURRENCY.
+        async with AsyncPluggyClient() as pluggy:
+            while True:
+                try:
+                    res = await refresh_all_pluggy_items_async(client=pluggy)
+                    print(f"[open_finance_refresh] {res}", flush=True)
+                    await asyncio.sleep(interval)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    print(f"[open_finance_refresh] erro: {exc}", file=sys.stderr)
+                    await asyncio.sleep(interval)
 
     async def _open_finance_trial_expiry():
         # Pausa conexões OF de trial vencido que não virou assinatura (libera o slot
@@ -1721,11 +2021,22 @@ async def lifespan(app: FastAPI):
                 asyncio.create_task(_news_bot(), name="news_bot"),
                 asyncio.create_task(_piggy_agents(), name="piggy_agents"),
                 asyncio.create_task(_login_events_retention(), name="login_events_retention"),
+                asyncio.create_task(_admin_stats_refresh(), name="admin_stats_refresh"),
             ]
         )
     else:
         print("[app] Background tasks desativadas neste processo.", flush=True)
 
+    # Fan-out entre processos: todo web worker escuta, mesmo os que não rodam
+    # as tasks de fundo (réplicas extras).
+    from core.services.change_bus import get_change_bus
+    change_bus = get_change_bus()
+    if change_bus is not None:
+        tasks.append(asyncio.create_task(
+            change_bus.listen(manager.on_user_change, on_reconnect=manager.resync_all),
+            name="change_bus",
+        ))
+
     yield
 
     # Shutdown: cancela tasks e aguarda com timeout para não travar
@@ -3148,7 +3459,11 @@ async def auth_account_export_download(request: Request, token: str):
     client_ip = get_remote_address(request)
     user_agent = (request.headers.get("user-agent") or "").strip() or None
 
-    content = await asyncio.to_thread(build_user_export_zip, user_id)
+    # ZIP montado num temporário (cursor do servidor, tabela por tabela) e
+    # devolvido em pedaços — a conexão volta pro pool antes do download.
+    export_file = await asyncio.to_thread(build_user_export_file, user_id)
+    export_size = export_file.seek(0, io.SEEK_END)
+    export_file.seek(0)
 
     completed_at_dt = datetime.now(timezone.utc)
     filename = f"pigbank_dados_usuario_{user_id}_{completed_at_dt:%Y%m%d}.zip"
@@ -3184,10 +3499,11 @@ async def auth_account_export_download(request: Request, token: str):
     asyncio.create_task(_notify_completed())
 
     return StreamingResponse(
-        iter([content]),
+        iter_export_file(export_file),
         media_type="application/zip",
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(export_size),
             "Cache-Control": "no-store",
         },
     )
@@ -4866,9 +5182,13 @@ async def get_data(
     limit: int = 25,
     filter_type: str = "all",
     q: str = "",
+    cursor: str | None = None,
 ):
     _authorize_dashboard_access(request, user_id)
-    return await get_financial_data(user_id, year, month, page, limit, filter_type, q)
+    try:
+        return await get_financial_data(user_id, year, month, page, limit, filter_type, q, cursor or None)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 @app.get("/history/{user_id}")
 async def monthly_history(request: Request, user_id: int, months: int = 6):
@@ -5375,12 +5695,15 @@ async def history_list_route(
     refunds_only: bool = False,
     page: int = 1,
     limit: int = 50,
+    cursor: str | None = None,
+    total: str | None = None,
 ):
     """Timeline paginada de lançamentos. Junta launches + credit_transactions
     (alocadas por bill.period_end). Filtros: faixa de datas, categoria, tipo,
     busca textual livre (q — AND entre palavras, OR entre campos alvo/nota/
     categoria/card-name), uncategorized (só sem categoria), refunds_only
-    (só estornos)."""
+    (só estornos). Paginação por `cursor` (o `next_cursor` da resposta
+    anterior); `total` = exact | estimate | none (ver db.list_history)."""
     _authorize_dashboard_access(request, user_id)
     from db import list_history
     from core.services.plan_service import history_earliest_date
@@ -5389,11 +5712,29 @@ async def history_list_route(
     earliest = await asyncio.to_thread(history_earliest_date, user_id)
     if earliest and (fd is None or fd < earliest):
         fd = earliest
+    try:
+        result = await asyncio.to_thread(
+            list_history,
+            user_id, fd, td, categoria, tipo, q,
+            bool(uncategorized), bool(refunds_only),
+            page, limit, cursor or None, total or None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"ok": True, **result}
+
+
+@app.get("/history/{user_id}/search")
+async def history_search_route(request: Request, user_id: int, q: str = "", limit: int = 20):
+    """Busca ranqueada no histórico (mais relevante primeiro), por prefixo de
+    palavra e sem acento — pro autocompletar da busca. Respeita o limite de
+    histórico do plano."""
+    _authorize_dashboard_access(request, user_id)
+    from db import search_history
+    from core.services.plan_service import history_earliest_date
+    earliest = await asyncio.to_thread(history_earliest_date, user_id)
     result = await asyncio.to_thread(
-        list_history,
-        user_id, fd, td, categoria, tipo, q,
-        bool(uncategorized), bool(refunds_only),
-        page, limit,
+        search_history, user_id, q, from_date=earliest, limit=limit,
     )
     return {"ok": True, **result}
 
@@ -5499,14 +5840,13 @@ async def export_email(request: Request, user_id: int, year: int = None, month:
     y = year  or now.year
     m = month or now.month
 
-    csv_content = await build_csv(user_id, y, m)
-    if csv_content is None:
+    exports = await build_month_exports(user_id, y, m)
+    if exports is None:
         raise HTTPException(
             status_code=404,
             detail="Nenhum lançamento encontrado neste mês para exportar.",
         )
-    xlsx_bytes = await build_xlsx(user_id, y, m)
-    pdf_bytes  = await build_pdf(user_id, y, m)
+    csv_bytes, xlsx_bytes, pdf_bytes = exports["csv"], exports["xlsx"], exports["pdf"]
 
     from db.privacy import get_user_email
     to_email = await asyncio.to_thread(get_user_email, user_id)
@@ -5523,7 +5863,7 @@ async def export_email(request: Request, user_id: int, year: int = None, month:
          "content_type": "application/pdf"},
         {"filename": f"financas_{tag}.xlsx", "content": base64.b64encode(xlsx_bytes).decode(),
          "content_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
-        {"filename": f"financas_{tag}.csv",  "content": base64.b64encode(csv_content.encode("utf-8")).decode(),
+        {"filename": f"financas_{tag}.csv",  "content": base64.b64encode(csv_bytes).decode(),
          "content_type": "text/csv"},
     ]
 
@@ -5997,13 +6337,14 @@ async def boleto_projection_route(request: Request, user_id: int, date: str, amo
 
 
 @app.get("/forecast/{user_id}")
-async def forecast_route(request: Request, user_id: int):
+async def forecast_route(request: Request, user_id: int, curve: bool = False):
     """Previsão de saldo a 30/60/90 dias (feature Pro+ da /precos). 403
-    pro_required abaixo de Pro — o dashboard usa isso pra esconder o card."""
+    pro_required abaixo de Pro — o dashboard usa isso pra esconder o card.
+    `curve=true` inclui o saldo projetado dia a dia (gráfico) no mesmo cálculo."""
     _authorize_dashboard_access(request, user_id)
     _require_pro(user_id, "forecast")
     from core.services.cashflow import forecast_horizons
-    result = await asyncio.to_thread(forecast_horizons, user_id)
+    result = await asyncio.to_thread(forecast_horizons, user_id, include_curve=curve)
     return {"ok": True, "forecast": result}
 
 
@@ -6537,14 +6878,16 @@ async def websocket_endpoint(ws: WebSocket, user_id: int):
     print(f"Connected: user={user_id} total={len(manager.active.get(user_id, {}))}")
     try:
         # Send initial snapshot with current month
-        data = await get_financial_data(user_id, now.year, now.month)
-        await ws.send_text(jdump({"type": "snapshot", "data": data}))
+        await _send_dashboard_view(ws, user_id, "snapshot", (now.year, now.month, 1, 25, "all", ""))
 
         while True:
             raw = await ws.receive_text()
             try:
                 payload = json.loads(raw) if raw.strip().startswith("{") else {"type": raw}
                 t       = payload.get("type")
+                # Versão (ETag) do snapshot que o cliente já tem pra essa mesma
+                # visão: igual à atual → not_modified; senão → delta/snapshot.
+                client_version = payload.get("version") or None
 
                 if t == "refresh":
                     y, m = manager.get_month(ws, user_id)
@@ -6552,8 +6895,9 @@ async def websocket_endpoint(ws: WebSocket, user_id: int):
                     limit = int(payload.get("limit", 25))
                     filter_type = str(payload.get("filter_type", "all"))
                     query = str(payload.get("q", ""))
-                    data = await get_financial_data(user_id, y, m, page, limit, filter_type, query)
-                    await ws.send_text(jdump({"type": "update", "data": data}))
+                    await _send_dashboard_view(
+                        ws, user_id, "update", (y, m, page, limit, filter_type, query), client_version,
+                    )
 
                 elif t == "get_month":
                     # Data for a specific month (month selector navigation)
@@ -6567,8 +6911,9 @@ async def websocket_endpoint(ws: WebSocket, user_id: int):
 
                     manager.set_month(ws, user_id, y, m)
 
-                    data = await get_financial_data(user_id, y, m, page, limit, filter_type, query)
-                    await ws.send_text(jdump({"type": "month_data", "data": data}))
+                    await _send_dashboard_view(
+                        ws, user_id, "month_data", (y, m, page, limit, filter_type, query), client_version,
+                    )
 
                 elif t == "get_history":
                     n       = min(max(int(payload.get("months", 6)), 1), 24)
@@ -19,6 +19,7 @@ from pydantic import BaseModel
 
 from core.admin_dashboard import log_system_event
 from core.audit import AuditEvent, record_audit_event
+from core.services.change_bus import publish_user_change_async
 from core.services.pluggy import (
     PluggyApiError,
     PluggyConfigError,
@@ -66,16 +67,11 @@ async def _run_pluggy_sync_bg(item_id: str) -> None:
     """Roda o sync fora do request (fire-and-forget), logando falhas."""
     try:
         result = await asyncio.to_thread(sync_pluggy_item, item_id)
-        # Atualização ao vivo (PWA): avisa o cliente conectado pra recarregar saldo/timeline.
+        # Atualização ao vivo (PWA): avisa o cliente conectado pra recarregar saldo/timeline —
+        # pelo change bus, que chega no worker onde o socket estiver.
         uid = result.get("user_id") if isinstance(result, dict) else None
         if uid:
-            try:
-                from frontend.finance_bot_websocket_custom import manager
-                await manager.broadcast_to_user(
-                    int(uid), json.dumps({"type": "open_finance_synced", "item_id": item_id})
-                )
-            except Exception:
-                pass
+            await publish_user_change_async(int(uid), "open_finance_synced", item_id=item_id)
         await log_system_event(
             "info",
             "pluggy_sync_done",
@@ -15,7 +15,7 @@ import os
 import pathlib
 from datetime import date, datetime, timezone
 from decimal import Decimal
-from typing import Any
+from typing import Any, Callable
 
 import jwt as pyjwt
 from fastapi import HTTPException, Request
@@ -150,8 +150,18 @@ DASHBOARD_CURRENT_CACHE_TTL_SECONDS = 45
 dashboard_current_cache: dict[int, tuple[float, Any, Any, Any]] = {}
 
 
+# Chamados a cada invalidação (escrita pelo dashboard). O monólito registra aqui
+# o push de deltas pros WebSockets abertos do usuário (ConnectionManager).
+dashboard_change_listeners: list[Callable[[int], None]] = []
+
+
 def invalidate_dashboard_current_cache(user_id: int) -> None:
     dashboard_current_cache.pop(int(user_id), None)
+    for listener in dashboard_change_listeners:
+        try:
+            listener(int(user_id))
+        except Exception as exc:  # aviso ao vivo é best-effort; a escrita já foi
+            logging.getLogger(__name__).warning("dashboard change listener: %s", exc)
 
 
 # ─── DB helpers (com connection pool) ────────────────────────────────────────
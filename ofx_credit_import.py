@@ -19,7 +19,7 @@ from decimal import Decimal
 
 from ofxparse import OfxParser
 from utils_date import _tz
-from utils_text import normalize_text, contains_word, LOCAL_RULES, keyword_blocked
+from utils_text import normalize_text, LOCAL_RULES_SUBSTRING_MATCHER
 from db import import_credit_ofx_bulk, list_user_category_rules
 
 logger = logging.getLogger(__name__)
@@ -135,20 +135,11 @@ def _memo_base(memo: str) -> str:
 
 def _categorize(memo_norm: str, rules_norm: list[tuple[str, str]]) -> str:
     for kw_norm, cat_norm in rules_norm:
-        if contains_word(memo_norm, kw_norm) or (kw_norm in memo_norm):
+        if kw_norm in memo_norm:
             return cat_norm
-    for keywords, cat in LOCAL_RULES:
-        cat_norm = normalize_text(cat or "")
-        if not cat_norm:
-            continue
-        for kw in keywords:
-            kw_n = normalize_text(kw or "")
-            if not kw_n:
-                continue
-            if keyword_blocked(kw_n, memo_norm):
-                continue
-            if contains_word(memo_norm, kw_n) or (kw_n in memo_norm):
-                return cat_norm
+    hit = LOCAL_RULES_SUBSTRING_MATCHER.first(memo_norm)
+    if hit:
+        return normalize_text(hit[1]) or "outros"
     return "outros"
 
 
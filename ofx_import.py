@@ -9,7 +9,7 @@ from ofxparse import OfxParser
 from utils_date import _tz
 from db import set_balance, import_ofx_launches_bulk, get_last_ofx_import_end_date
 from db import list_user_category_rules
-from utils_text import normalize_text, contains_word, LOCAL_RULES, INTERNAL_MOVEMENT_CATEGORIES, keyword_blocked
+from utils_text import normalize_text, LOCAL_RULES_SUBSTRING_MATCHER, INTERNAL_MOVEMENT_CATEGORIES
 
 # Hard cap defensivo: parser OFX vira DoS se receber arquivo gigante (memória
 # + CPU do regex/SGML). Alinhado com o cap do endpoint HTTP (8 MB) — handlers
@@ -64,24 +64,16 @@ def resolve_category(memo_norm: str, rules_norm: list[tuple[str, str]]) -> str:
     """Resolve a categoria de um memo já normalizado: regras do usuário
     primeiro, depois LOCAL_RULES, senão "outros". Compartilhada entre a
     importação OFX e a de extrato CSV/PDF (statement_import)."""
-    # B) regras do usuário (em memória)
+    # B) regras do usuário (em memória). Substring já cobre o caso de palavra
+    # inteira — sem regex por regra.
     for kw_norm, cat_norm in rules_norm:
-        if contains_word(memo_norm, kw_norm) or (kw_norm in memo_norm):
+        if kw_norm in memo_norm:
             return cat_norm
 
-    # C) LOCAL_RULES (sem DB)
-    for keywords, cat2 in LOCAL_RULES:
-        cat2_norm = normalize_text(cat2 or "")
-        if not cat2_norm:
-            continue
-        for kw in keywords:
-            kw2_norm = normalize_text(kw or "")
-            if not kw2_norm:
-                continue
-            if keyword_blocked(kw2_norm, memo_norm):
-                continue
-            if contains_word(memo_norm, kw2_norm) or (kw2_norm in memo_norm):
-                return cat2_norm
+    # C) LOCAL_RULES (sem DB) — matcher pré-compilado, mesma ordem de prioridade
+    hit = LOCAL_RULES_SUBSTRING_MATCHER.first(memo_norm)
+    if hit:
+        return normalize_text(hit[1]) or "outros"
 
     return "outros"
 
@@ -0,0 +1,152 @@
+"""
+Benchmark da busca do histórico: filtro antigo (`unaccent(...) ILIKE '%termo%'`
+por campo, varrendo o histórico inteiro do usuário) × busca pelo search_vec
+indexado (db/history_search.py), via `list_history` e `search_history`.
+
+Cria um usuário descartável, enche de lançamentos sintéticos (mercado,
+farmácia, combustível, ... com acento e maiúsculas misturados) e mede cada
+busca em dois tamanhos de histórico — o menor e o `--rows` — pra mostrar que
+o tempo da busca indexada não cresce com o histórico. O usuário é apagado
+no fim.
+
+Uso:
+  DATABASE_URL="postgresql://..." python scripts/bench_history_search.py
+  DATABASE_URL="postgresql://..." python scripts/bench_history_search.py --rows 50000 --repeat 20
+
+Rode contra um Postgres descartável ou de staging: o script cria e apaga um
+usuário e dezenas de milhares de linhas.
+"""
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (alvo, nota, categoria, peso): "Drogaria São Paulo" é rara (1 a cada 100).
+_VOCAB = [
+    ("Mercado Livre", "compra do mês", "Alimentação", 30),
+    ("Posto Ipiranga", "gasolina", "Combustível", 20),
+    ("iFood", "almoço", "Alimentação", 25),
+    ("Uber", "corrida pro trabalho", "Transporte", 20),
+    ("Netflix", "assinatura", "Lazer", 4),
+    ("Drogaria São Paulo", "remédio", "Farmácia", 1),
+]
+
+_QUERIES = ["merc", "farmacia", "uber trabalho", "drogaria remedio"]
+
+
+def _legacy_search(user_id: int, q: str, limit: int = 50) -> int:
+    """Cópia do filtro antigo do list_history (só o ramo de launches)."""
+    from db import get_conn
+
+    terms = [t.lower() for t in q.split() if len(t) >= 2][:6]
+    per_term = []
+    params: list = [user_id]
+    for term in terms:
+        per_term.append(
+            "(unaccent(COALESCE(alvo, '')) ILIKE unaccent(%s) "
+            "OR unaccent(COALESCE(nota, '')) ILIKE unaccent(%s) "
+            "OR unaccent(COALESCE(categoria, '')) ILIKE unaccent(%s))"
+        )
+        params += [f"%{term}%"] * 3
+    where = " AND ".join(["user_id = %s", "is_internal_movement = false", *per_term])
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) AS n FROM launches WHERE {where}", tuple(params))
+            total = int(cur.fetchone()["n"])
+            cur.execute(
+                f"SELECT id FROM launches WHERE {where} ORDER BY criado_em DESC, id LIMIT %s",
+                tuple(params + [limit]),
+            )
+            cur.fetchall()
+    return total
+
+
+def _grow(user_id: int, start: int, stop: int) -> None:
+    """Acrescenta as linhas [start, stop) do histórico sintético."""
+    from db import get_conn
+
+    cycle = [v for v in _VOCAB for _ in range(v[3])]
+    alvos = [v[0] for v in cycle]
+    notas = [v[1] for v in cycle]
+    cats = [v[2] for v in cycle]
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                insert into launches (user_id, tipo, valor, alvo, nota, categoria, criado_em)
+                select %s, 'despesa', 10 + (g %% 90),
+                       (%s::text[])[1 + g %% %s],
+                       (%s::text[])[1 + g %% %s] || ' #' || g,
+                       (%s::text[])[1 + g %% %s],
+                       now() - make_interval(mins => g)
+                  from generate_series(%s, %s - 1) g
+                """,
+                (user_id, alvos, len(cycle), notas, len(cycle), cats, len(cycle), start, stop),
+            )
+        conn.commit()
+        with conn.cursor() as cur:
+            cur.execute("analyze launches")
+        conn.commit()
+
+
+def _cleanup(user_id: int) -> None:
+    from db import get_conn
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("delete from launches where user_id = %s", (user_id,))
+            cur.execute("delete from users where id = %s", (user_id,))
+        conn.commit()
+
+
+def _median_ms(fn, repeat: int) -> float:
+    fn()  # aquece cache/plano
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    rows = 50_000
+    repeat = 10
+    if "--rows" in sys.argv:
+        rows = int(sys.argv[sys.argv.index("--rows") + 1])
+    if "--repeat" in sys.argv:
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1])
+
+    if not os.getenv("DATABASE_URL"):
+        print("ERRO: DATABASE_URL não setado.")
+        sys.exit(1)
+
+    from db import ensure_user, list_history, search_history
+    from db.history_search import trigram_search_enabled
+
+    user_id = int(uuid.uuid4().int % 10_000_000_000)
+    ensure_user(user_id)
+    print(f"pg_trgm: {'sim' if trigram_search_enabled() else 'não (só prefixo)'}")
+    try:
+        done = 0
+        for size in sorted({max(rows // 10, 1), rows}):
+            _grow(user_id, done, size)
+            done = size
+            print(f"\nhistórico com {size} lançamentos (mediana de {repeat} execuções)")
+            print(f"  {'busca':<20} {'achados':>8} {'ILIKE antigo':>13} {'list_history':>13} {'search_history':>15}")
+            for q in _QUERIES:
+                found = list_history(user_id, q=q, limit=50)["total"]
+                assert found == _legacy_search(user_id, q), q
+                legacy_ms = _median_ms(lambda: _legacy_search(user_id, q), repeat)
+                list_ms = _median_ms(lambda: list_history(user_id, q=q, limit=50), repeat)
+                ranked_ms = _median_ms(lambda: search_history(user_id, q, limit=20), repeat)
+                print(f"  {q:<20} {found:>8} {legacy_ms:>11.1f}ms {list_ms:>11.1f}ms {ranked_ms:>13.1f}ms")
+    finally:
+        _cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark do accrual em lote de investimentos (db.accrue_investments_for_users).
+
+Cria N usuários descartáveis com L lotes CDI cada (mistura de % do CDI e
+CDI + spread), grava uma série CDI sintética de ~1 ano em market_rates (datas
+de 1990, longe das reais) e mede uma passada do investment_scheduler sobre
+esses usuários — sem rede: as taxas saem do índice de fatores acumulados em
+memória (db/market_rates.py). Tudo é apagado no fim.
+
+Uso:
+  DATABASE_URL="postgresql://..." python scripts/bench_investment_accrual.py
+  DATABASE_URL="postgresql://..." python scripts/bench_investment_accrual.py --users 2000 --lots 10
+
+Rode contra um Postgres descartável ou de staging: o script cria e apaga
+usuários e linhas de market_rates.
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERIES_START = date(1990, 1, 1)
+SERIES_DAYS = 365
+
+
+def _arg(name: str, default: int) -> int:
+    if name in sys.argv:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def _seed(users: int, lots: int) -> list[int]:
+    from db import ensure_user, get_conn
+
+    user_ids = [int(uuid.uuid4().int % 10_000_000_000) for _ in range(users)]
+    for uid in user_ids:
+        ensure_user(uid)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            with cur.copy("copy market_rates (code, ref_date, value) from stdin") as copy:
+                for i in range(SERIES_DAYS):
+                    copy.write_row(("CDI", SERIES_START + timedelta(days=i), 0.04 + (i % 7) / 1000))
+            for n, uid in enumerate(user_ids):
+                for k in range(lots):
+                    cdi_pct = k % 2 == 0
+                    balance = Decimal("1000") + n
+                    last_date = SERIES_START + timedelta(days=k % 30)
+                    cur.execute(
+                        """
+                        insert into investments(user_id, name, balance, rate, period, last_date)
+                        values (%s, %s, %s, %s, %s, %s)
+                        returning id
+                        """,
+                        (
+                            uid, f"Bench {k}", balance,
+                            Decimal("1.10") if cdi_pct else Decimal("0.05"),
+                            "cdi" if cdi_pct else "cdi_spread",
+                            last_date,
+                        ),
+                    )
+                    inv_id = cur.fetchone()["id"]
+                    cur.execute(
+                        """
+                        insert into investment_lots(
+                            user_id, investment_id, principal_initial, principal_remaining,
+                            balance, opened_at, last_date, status
+                        )
+                        values (%s, %s, %s, %s, %s, %s, %s, 'open')
+                        """,
+                        (uid, inv_id, balance, balance, balance, last_date, last_date),
+                    )
+        conn.commit()
+    return user_ids
+
+
+def _cleanup(user_ids: list[int]) -> None:
+    from db import get_conn
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("delete from investment_lots where user_id = any(%s)", (user_ids,))
+            cur.execute("delete from investments where user_id = any(%s)", (user_ids,))
+            cur.execute("delete from accounts where user_id = any(%s)", (user_ids,))
+            cur.execute("delete from users where id = any(%s)", (user_ids,))
+            cur.execute(
+                "delete from market_rates where code='CDI' and ref_date >= %s and ref_date < %s",
+                (SERIES_START, SERIES_START + timedelta(days=SERIES_DAYS)),
+            )
+        conn.commit()
+
+
+def main():
+    users = _arg("--users", 1000)
+    lots = _arg("--lots", 10)
+
+    if not os.getenv("DATABASE_URL"):
+        print("ERRO: DATABASE_URL não setado.")
+        sys.exit(1)
+
+    from core.services.investment_scheduler import _batch_size
+    from db import accrue_investments_for_users, invalidate_market_rate_cache
+
+    today = SERIES_START + timedelta(days=SERIES_DAYS)
+    user_ids = _seed(users, lots)
+    invalidate_market_rate_cache()
+    print(f"Seed: {users} usuários × {lots} lotes = {users * lots} lotes CDI")
+    try:
+        size = _batch_size()
+        t0 = time.perf_counter()
+        changed = 0
+        for i in range(0, len(user_ids), size):
+            changed += accrue_investments_for_users(user_ids[i:i + size], today=today)
+        elapsed = time.perf_counter() - t0
+        print(f"  accrual em lote ({size} usuários/transação): {elapsed:6.2f}s  "
+              f"({changed / elapsed:8.0f} lotes/s, {changed} alterados)")
+    finally:
+        _cleanup(user_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark da importação OFX: caminho antigo (1 INSERT por transação) × caminho
+em lote (COPY + INSERT ... SELECT, ver db/bulk_import.py).
+
+Gera um OFX sintético de N transações, passa pelo parse + categorização do
+`ofx_import.import_ofx_bytes` uma vez e grava as MESMAS linhas duas vezes — uma
+com o insert linha a linha de antes, outra com o caminho atual — cada uma num
+usuário descartável, comparando só o tempo de escrita no banco. Os dois
+usuários são apagados no fim.
+
+Uso:
+  DATABASE_URL="postgresql://..." python scripts/bench_ofx_import.py
+  DATABASE_URL="postgresql://..." python scripts/bench_ofx_import.py --rows 2000
+
+Rode contra um Postgres descartável ou de staging: o script cria e apaga
+usuários. Contra o Railway a diferença é maior que local — o custo do caminho
+antigo é dominado pelo round-trip de rede, multiplicado pelo nº de linhas.
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_synthetic_ofx(rows: int) -> bytes:
+    start = date(2025, 1, 1)
+    trns = []
+    for i in range(rows):
+        d = start + timedelta(days=i % 365)
+        debit = i % 4 != 0
+        amount = Decimal(5 + (i * 37) % 900) + Decimal(i % 100) / 100
+        trns.append(
+            "<STMTTRN>"
+            f"<TRNTYPE>{'DEBIT' if debit else 'CREDIT'}"
+            f"<DTPOSTED>{d:%Y%m%d}120000"
+            f"<TRNAMT>{'-' if debit else ''}{amount}"
+            f"<FITID>BENCH{i:06d}"
+            f"<MEMO>{'PIX ENVIADO MERCADO' if debit else 'PIX RECEBIDO'} {i}"
+            "</STMTTRN>"
+        )
+    body = (
+        "OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nSECURITY:NONE\nENCODING:USASCII\n"
+        "CHARSET:1252\nCOMPRESSION:NONE\nOLDFILEUID:NONE\nNEWFILEUID:NONE\n\n"
+        "<OFX><SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>"
+        "<DTSERVER>20260101<LANGUAGE>POR</SONRS></SIGNONMSGSRSV1>"
+        "<BANKMSGSRSV1><STMTTRNRS><TRNUID>1<STATUS><CODE>0<SEVERITY>INFO</STATUS>"
+        "<STMTRS><CURDEF>BRL<BANKACCTFROM><BANKID>0001<ACCTID>12345<ACCTTYPE>CHECKING</BANKACCTFROM>"
+        f"<BANKTRANLIST><DTSTART>{start:%Y%m%d}<DTEND>{start + timedelta(days=364):%Y%m%d}"
+        + "".join(trns)
+        + "</BANKTRANLIST><LEDGERBAL><BALAMT>0.00<DTASOF>20260101</LEDGERBAL>"
+        "</STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+    )
+    return body.encode("ascii")
+
+
+def _legacy_import_ofx_launches_bulk(
+    user_id, launches_rows, *, file_hash, bank_id, acct_id, acct_type, dt_start, dt_end,
+):
+    """Cópia do caminho antigo: um INSERT ... ON CONFLICT por transação."""
+    from psycopg.types.json import Json
+
+    from db import ensure_user, get_conn
+
+    ensure_user(user_id)
+    inserted = 0
+    delta_total = Decimal("0")
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for r in launches_rows:
+                cur.execute(
+                    """
+                    insert into launches(
+                        user_id, tipo, valor, categoria, alvo, nota, criado_em, efeitos,
+                        source, external_id, posted_at, currency, imported_at, is_internal_movement
+                    )
+                    values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,now(),%s)
+                    on conflict (user_id, source, external_id) do nothing
+                    """,
+                    (
+                        user_id, r["tipo"], r["valor"], r.get("categoria"), r.get("alvo"), r.get("nota"),
+                        r["criado_em"],
+                        Json({"delta_conta": float(r["delta"]), "ofx": r.get("ofx_meta", {})}),
+                        "ofx", r["external_id"], r.get("posted_at"), r.get("currency", "BRL"),
+                        r.get("is_internal_movement", False),
+                    ),
+                )
+                if (cur.rowcount or 0) == 1:
+                    inserted += 1
+                    delta_total += r["delta"]
+            cur.execute(
+                "update accounts set balance = balance + %s where user_id=%s returning balance",
+                (delta_total, user_id),
+            )
+            new_bal = cur.fetchone()["balance"]
+        conn.commit()
+    total = len(launches_rows)
+    return {
+        "skipped_same_file": False, "total": total, "inserted": inserted,
+        "duplicates": total - inserted, "dt_start": dt_start, "dt_end": dt_end,
+        "new_balance": new_bal,
+    }
+
+
+def _cleanup(user_id: int) -> None:
+    from db import get_conn
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("delete from launches where user_id = %s", (user_id,))
+            cur.execute("delete from accounts where user_id = %s", (user_id,))
+            cur.execute("delete from users where id = %s", (user_id,))
+        conn.commit()
+
+
+def _parse_rows(ofx_bytes: bytes) -> tuple[float, list[dict]]:
+    """Roda o parse + categorização do ofx_import UMA vez e captura as linhas
+    que ele entregaria ao banco — os dois caminhos gravam exatamente o mesmo."""
+    import ofx_import
+
+    captured: dict = {}
+
+    def _capture(user_id, launches_rows, **kwargs):
+        captured["rows"] = launches_rows
+        return {"inserted": 0, "new_balance": Decimal("0")}
+
+    t0 = time.perf_counter()
+    with patch.object(ofx_import, "import_ofx_launches_bulk", _capture), \
+            patch.object(ofx_import, "list_user_category_rules", lambda user_id: []), \
+            patch.object(ofx_import, "get_last_ofx_import_end_date", lambda user_id: None), \
+            patch.object(ofx_import, "set_balance", lambda user_id, bal: bal):
+        ofx_import.import_ofx_bytes(0, ofx_bytes, "bench.ofx")
+    return time.perf_counter() - t0, captured["rows"]
+
+
+def _timed_write(rows: list[dict], legacy: bool) -> tuple[float, dict]:
+    from db import ensure_user, import_ofx_launches_bulk
+
+    write = _legacy_import_ofx_launches_bulk if legacy else import_ofx_launches_bulk
+    user_id = int(uuid.uuid4().int % 10_000_000_000)
+    ensure_user(user_id)
+    try:
+        t0 = time.perf_counter()
+        rep = write(
+            user_id, rows,
+            file_hash=f"bench-{uuid.uuid4().hex}",
+            bank_id=None, acct_id=None, acct_type=None, dt_start=None, dt_end=None,
+        )
+        return time.perf_counter() - t0, rep
+    finally:
+        _cleanup(user_id)
+
+
+def main():
+    rows = 5000
+    if "--rows" in sys.argv:
+        rows = int(sys.argv[sys.argv.index("--rows") + 1])
+
+    if not os.getenv("DATABASE_URL"):
+        print("ERRO: DATABASE_URL não setado.")
+        sys.exit(1)
+
+    ofx_bytes = build_synthetic_ofx(rows)
+    print(f"OFX sintético: {rows} transações, {len(ofx_bytes) / 1024:.0f} KB")
+
+    parse_s, launches_rows = _parse_rows(ofx_bytes)
+    print(f"  parse + categorização (comum aos dois): {parse_s:.2f}s")
+
+    legacy_s, legacy_rep = _timed_write(launches_rows, legacy=True)
+    bulk_s, bulk_rep = _timed_write(launches_rows, legacy=False)
+
+    assert legacy_rep["inserted"] == bulk_rep["inserted"] == rows
+    assert legacy_rep["new_balance"] == bulk_rep["new_balance"]
+
+    print(f"  escrita linha a linha: {legacy_s:7.2f}s  ({rows / legacy_s:8.0f} linhas/s)")
+    print(f"  escrita COPY em lote:  {bulk_s:7.2f}s  ({rows / bulk_s:8.0f} linhas/s)")
+    print(f"  ganho:                 {legacy_s / bulk_s:7.1f}x  (saldo final igual: {bulk_rep['new_balance']})")
+
+
+if __name__ == "__main__":
+    main()
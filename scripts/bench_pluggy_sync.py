@@ -0,0 +1,88 @@
+"""
+Benchmark do sync Open Finance em lote contra o servidor Pluggy fake
+(tests/_fake_pluggy.py): N itens, cada um com contas, transações paginadas e
+investimentos, latência fixa por requisição.
+
+Compara o caminho sequencial (um item por vez, uma requisição por vez — como
+era antes) com o pipeline assíncrono nos tetos configurados. A gravação no
+banco fica de fora (conexão e persistência são trocadas por no-ops): o que se
+mede é a leitura da Pluggy, que é o que estourava o intervalo do tick.
+
+Uso:
+  python scripts/bench_pluggy_sync.py
+  python scripts/bench_pluggy_sync.py --items 500 --latency 0.03 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _run(fake, items, concurrency: int, item_concurrency: int) -> float:
+    import core.services.pluggy as pg
+    import core.services.pluggy_sync as ps
+
+    os.environ["OF_SYNC_CONCURRENCY"] = str(concurrency)
+    os.environ["OF_SYNC_ITEM_CONCURRENCY"] = str(item_concurrency)
+    pg.invalidate_pluggy_api_key()
+    fake.max_in_flight = 0
+
+    async def run():
+        async with pg.AsyncPluggyClient(transport=fake.transport,
+                                        max_connections=max(1, concurrency * item_concurrency)) as client:
+            return await ps.sync_pluggy_items_async(items, client=client)
+
+    t0 = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - t0
+    failed = [r for r in results if not r.get("ok")]
+    if failed:
+        raise SystemExit(f"{len(failed)} itens falharam: {failed[:3]}")
+    return elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=500)
+    ap.add_argument("--accounts", type=int, default=2)
+    ap.add_argument("--transactions", type=int, default=120)
+    ap.add_argument("--page-size", type=int, default=50)
+    ap.add_argument("--latency", type=float, default=0.02, help="segundos por requisição")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--item-concurrency", type=int, default=4)
+    ap.add_argument("--skip-sequential", action="store_true")
+    args = ap.parse_args()
+
+    os.environ.setdefault("PLUGGY_CLIENT_ID", "bench")
+    os.environ.setdefault("PLUGGY_CLIENT_SECRET", "bench")
+    os.environ.pop("PLUGGY_API_KEY", None)
+
+    import core.services.pluggy_sync as ps
+    from tests._fake_pluggy import FakePluggy
+
+    ps._check_connection = lambda item_id: ({"id": 0, "user_id": hash(item_id) % 97}, None)
+    ps._persist_item = lambda connection, item_id, accounts, investments: {"ok": True}
+
+    fake = FakePluggy.with_items(
+        args.items, accounts=args.accounts, transactions=args.transactions,
+        latency=args.latency, page_size=args.page_size,
+    )
+    items = list(fake.items)
+    per_item = 2 + args.accounts * -(-args.transactions // args.page_size)
+    print(f"{args.items} itens, {per_item} requisições/item, latência {args.latency * 1000:.0f}ms")
+
+    if not args.skip_sequential:
+        seq = _run(fake, items, 1, 1)
+        print(f"sequencial:  {seq:8.2f}s")
+    par = _run(fake, items, args.concurrency, args.item_concurrency)
+    print(f"assíncrono:  {par:8.2f}s  (OF_SYNC_CONCURRENCY={args.concurrency}, "
+          f"OF_SYNC_ITEM_CONCURRENCY={args.item_concurrency}, pico {fake.max_in_flight} em voo)")
+    if not args.skip_sequential:
+        print(f"speedup:     {seq / par:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Reconstrói o rollup mensal (`monthly_rollups`) a partir de launches e
+credit_transactions.
+
+Os triggers mantêm o rollup sozinhos; isto serve pra corrigir dado mexido por
+fora (restore, SQL manual com triggers desligados) ou conferir divergência.
+
+Uso:
+  DATABASE_URL="postgresql://..." python scripts/rebuild_monthly_rollups.py            # todos
+  DATABASE_URL="postgresql://..." python scripts/rebuild_monthly_rollups.py 123 456    # só esses users
+
+Durante a reconstrução as escritas em lançamentos esperam o commit (a tabela do
+rollup fica travada) — rode "todos" fora do horário de pico.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    try:
+        user_ids = [int(a) for a in sys.argv[1:]] or None
+    except ValueError:
+        print("uso: python scripts/rebuild_monthly_rollups.py [user_id ...]")
+        sys.exit(1)
+
+    if not os.getenv("DATABASE_URL"):
+        print("ERRO: DATABASE_URL não setado.")
+        sys.exit(1)
+
+    from db import rebuild_monthly_rollups
+
+    alvo = "todos os usuários" if user_ids is None else f"{len(user_ids)} usuário(s)"
+    print(f"Reconstruindo rollup mensal de {alvo}...")
+    t0 = time.perf_counter()
+    rebuild_monthly_rollups(user_ids)
+    print(f"Pronto em {time.perf_counter() - t0:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+tests/_fake_pluggy.py — servidor Pluggy fake, em memória, pro sync assíncrono.
+
+Responde as rotas que `AsyncPluggyClient` usa (/auth, /accounts,
+/v2/transactions com cursor, /investments, GET/PATCH /items/{id}) a partir de
+itens sintéticos, com latência opcional por requisição. Roda num
+`httpx.MockTransport` — nada sai pra rede, então convive com o kill switch do
+conftest — e conta requisições e o pico de requisições simultâneas, que é o
+que os testes e o benchmark (scripts/bench_pluggy_sync.py) observam.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from typing import Any
+
+import httpx
+
+
+class FakePluggy:
+    def __init__(self, *, latency: float = 0.0, page_size: int = 50):
+        self.latency = latency
+        self.page_size = page_size
+        self.items: dict[str, dict[str, Any]] = {}
+        self.accounts: dict[str, list[dict]] = {}       # item_id → contas
+        self.transactions: dict[str, list[dict]] = {}   # account_id → transações
+        self.investments: dict[str, list[dict]] = {}    # item_id → investimentos
+        self.requests: Counter[str] = Counter()
+        self.patched: list[str] = []
+        self.issued_keys: list[str] = []
+        self.revoked_keys: set[str] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    # ── dados ──────────────────────────────────────────────────────────────
+    def add_item(self, item_id: str, *, accounts: int = 2, transactions: int = 120,
+                 investments: int = 1) -> None:
+        self.items[item_id] = {"id": item_id, "status": "UPDATED"}
+        self.accounts[item_id] = []
+        for a in range(accounts):
+            acc_id = f"{item_id}-acc{a}"
+            self.accounts[item_id].append({
+                "id": acc_id, "name": f"Conta {a}", "type": "BANK",
+                "subtype": "CHECKING_ACCOUNT", "balance": 1000 + a, "currencyCode": "BRL",
+            })
+            self.transactions[acc_id] = [
+                {"id": f"{acc_id}-tx{t}", "description": f"PIX {t}",
+                 "amount": -(t % 90 + 1), "date": "2026-08-14T15:30:00.000-03:00"}
+                for t in range(transactions)
+            ]
+        self.investments[item_id] = [
+            {"id": f"{item_id}-inv{i}", "name": "Caixinha", "type": "FIXED_INCOME",
+             "subtype": "CDB", "balance": 500}
+            for i in range(investments)
+        ]
+
+    @classmethod
+    def with_items(cls, n: int, **kwargs: Any) -> "FakePluggy":
+        item_kw = {k: kwargs.pop(k) for k in ("accounts", "transactions", "investments") if k in kwargs}
+        fake = cls(**kwargs)
+        for i in range(n):
+            fake.add_item(f"item-{i}", **item_kw)
+        return fake
+
+    # ── servidor ───────────────────────────────────────────────────────────
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self._handle)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self._route(request)
+        finally:
+            self.in_flight -= 1
+
+    def _route(self, request: httpx.Request) -> httpx.Response:
+        path, q = request.url.path, request.url.params
+        self.requests[f"{request.method} {path.rsplit('/', 1)[0] if path.startswith('/items/') else path}"] += 1
+
+        if path == "/auth" and request.method == "POST":
+            key = f"key-{len(self.issued_keys) + 1}"
+            self.issued_keys.append(key)
+            return httpx.Response(200, json={"apiKey": key})
+
+        key = request.headers.get("X-API-KEY")
+        if key not in self.issued_keys or key in self.revoked_keys:
+            return httpx.Response(401, json={"message": "invalid api key"})
+
+        if path == "/accounts":
+            return httpx.Response(200, json={"results": self.accounts.get(q.get("itemId"), [])})
+        if path == "/investments":
+            return httpx.Response(200, json={"results": self.investments.get(q.get("itemId"), [])})
+        if path == "/v2/transactions":
+            acc_id = q.get("accountId")
+            txs = self.transactions.get(acc_id, [])
+            start = int(q.get("after") or 0)
+            page = txs[start:start + self.page_size]
+            end = start + len(page)
+            nxt = f"?accountId={acc_id}&after={end}" if end < len(txs) else None
+            return httpx.Response(200, json={"results": page, "next": nxt})
+        if path.startswith("/items/"):
+            item_id = path.split("/")[2]
+            if item_id not in self.items:
+                return httpx.Response(404, json={"message": "item not found"})
+            if request.method == "PATCH":
+                self.patched.append(item_id)
+                self.items[item_id]["status"] = "UPDATING"
+            return httpx.Response(200, json=self.items[item_id])
+        return httpx.Response(404, json={"message": f"rota fake ausente: {path}"})
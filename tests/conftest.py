@@ -375,6 +375,46 @@ def _auto_cleanup_orphan_users():
             pass
 
 
+@pytest.fixture(autouse=True)
+def _fresh_process_caches():
+    """Testes escrevem direto no banco (market_rates, plano em auth_accounts)
+    ou trocam get_auth_user por monkeypatch; os caches em memória por processo
+    (séries de taxas, plano do usuário, regras de categoria, API Key da
+    Pluggy) não podem vazar de um teste pro outro."""
+    from core.services.plan_service import invalidate_plan_cache
+    from core.services.pluggy import invalidate_pluggy_api_key
+    from db.categories import invalidate_category_rules_cache
+    from db.market_rates import invalidate_market_rate_cache
+
+    invalidate_market_rate_cache()
+    invalidate_plan_cache()
+    invalidate_category_rules_cache()
+    invalidate_pluggy_api_key()
+    yield
+    invalidate_market_rate_cache()
+    invalidate_plan_cache()
+    invalidate_category_rules_cache()
+    invalidate_pluggy_api_key()
+
+
+@pytest.fixture()
+def fake_pluggy(monkeypatch):
+    """Servidor Pluggy fake (tests/_fake_pluggy.py) atrás de todo
+    `AsyncPluggyClient` criado pelo sync. Popule com `fake_pluggy.add_item(...)`."""
+    import core.services.pluggy as pg
+    import core.services.pluggy_sync as ps
+    from tests._fake_pluggy import FakePluggy
+
+    fake = FakePluggy()
+    monkeypatch.setenv("PLUGGY_CLIENT_ID", "fake-id")
+    monkeypatch.setenv("PLUGGY_CLIENT_SECRET", "fake-secret")
+    monkeypatch.delenv("PLUGGY_API_KEY", raising=False)
+    real_client = pg.AsyncPluggyClient
+    monkeypatch.setattr(ps, "AsyncPluggyClient",
+                        lambda **kw: real_client(transport=fake.transport, **kw))
+    return fake
+
+
 @pytest.fixture()
 def user_id():
     uid = int(uuid.uuid4().int % 10_000_000_000)  # bigint ok
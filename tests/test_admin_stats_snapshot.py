@@ -0,0 +1,83 @@
+"""
+Snapshot dos contadores globais do painel admin (admin_stats_snapshot).
+
+- snapshot fresco é reaproveitado (não recontam a base a cada abertura);
+- velho demais (ADMIN_STATS_MAX_AGE_SECONDS) é recalculado na hora;
+- o overview monta a resposta do snapshot + leituras ao vivo, com o ranking
+  de top usuários decifrado na hora (nada de PII guardada no snapshot).
+"""
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+
+from core import admin_dashboard
+from db import ensure_user, get_conn
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _admin_tables():
+    asyncio.run(admin_dashboard.ensure_admin_tables())
+
+
+def _mk_account(email: str) -> int:
+    uid = int(uuid.uuid4().int % 10_000_000_000)
+    ensure_user(uid)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "insert into auth_accounts (user_id, email, password_hash) values (%s, %s, 'x')",
+                (uid, email),
+            )
+        conn.commit()
+    return uid
+
+
+def test_snapshot_fresco_e_reaproveitado_e_velho_e_recalculado(monkeypatch):
+    monkeypatch.setenv("ADMIN_STATS_MAX_AGE_SECONDS", "3600")
+    before = asyncio.run(admin_dashboard.refresh_admin_stats())
+    total = before["summary"]["total_accounts"]
+
+    _mk_account(f"snap-{uuid.uuid4().hex[:8]}@test.local")
+
+    cached = asyncio.run(admin_dashboard.get_admin_stats())
+    assert cached["summary"]["total_accounts"] == total
+    assert cached["refreshed_at"] == before["refreshed_at"]
+
+    monkeypatch.setenv("ADMIN_STATS_MAX_AGE_SECONDS", "0")
+    fresh = asyncio.run(admin_dashboard.get_admin_stats())
+    assert fresh["summary"]["total_accounts"] == total + 1
+    assert fresh["account_status"]["total"] >= total + 1
+    assert fresh["refreshed_at"] > before["refreshed_at"]
+
+
+def test_overview_monta_do_snapshot_e_decifra_top_users(monkeypatch):
+    monkeypatch.setenv("ADMIN_STATS_MAX_AGE_SECONDS", "0")
+    email = f"snap-top-{uuid.uuid4().hex[:8]}@test.local"
+    uid = _mk_account(email)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for _ in range(300):  # passa qualquer outro usuário da suíte no ranking
+                cur.execute(
+                    "insert into launches (user_id, tipo, valor, categoria) values (%s, 'despesa', 1, 'x')",
+                    (uid,),
+                )
+        conn.commit()
+
+    data = asyncio.run(admin_dashboard.fetch_admin_overview(days=7))
+
+    assert data["stats_refreshed_at"] is not None
+    assert len(data["time_series"]) == 8  # hoje + 7 dias
+    assert data["summary"]["total_accounts"] >= 1
+    assert "login_success_rate_30d" in data["summary"]
+    top = data["top_users"][0]
+    assert top["user_id"] == uid
+    assert top["email"] == email
+    assert top["total_transactions"] == 300
+    assert "email_enc" not in top
+    snapshot_text = asyncio.run(admin_dashboard._admin_fetch(
+        "select data::text as t from admin_stats_snapshot", one=True,
+    ))["t"]
+    assert email not in snapshot_text
@@ -41,6 +41,9 @@ def configured_admin(monkeypatch):
     monkeypatch.setattr(
         admin_dashboard, "_billing_summary_cache", {"fetched_at": None, "data": None}
     )
+    # Agregados da base vêm do snapshot periódico; aqui cada teste cria contas
+    # e confere na hora — snapshot sempre recalculado.
+    monkeypatch.setenv("ADMIN_STATS_MAX_AGE_SECONDS", "0")
     # /admin/auth/login tem rate limit de 10/min (slowapi, storage em memória
     # compartilhado entre testes). Cada _admin_client() loga; num arquivo com
     # muitos testes isso estoura o teto e derruba o último com 429. Zera o
@@ -481,6 +484,39 @@ def test_users_list_pagination(panel_accounts):
     assert sql0["users"][0]["user_id"] != sql1["users"][0]["user_id"]
 
 
+
+def test_users_list_cursor_pagination(panel_accounts):
+    """Páginas por cursor (keyset) = páginas por OFFSET; com cursor o total
+    não é recontado; cursor adulterado ou de outro sort → 400."""
+    tag, uids = panel_accounts
+    client = _admin_client()
+
+    # Sem busca: filtra pelas contas free/canceled + paginação em SQL.
+    first = client.get("/admin/api/users?status=canceled&per_page=1&page=0").json()
+    assert first["next_cursor"] and first["total"] >= 2
+    second = client.get(
+        f"/admin/api/users?status=canceled&per_page=1&page=1&cursor={first['next_cursor']}"
+    ).json()
+    by_offset = client.get("/admin/api/users?status=canceled&per_page=1&page=1").json()
+    assert second["users"] == by_offset["users"]
+    assert second["total"] is None
+
+    # Busca (match no e-mail decifrado) percorrida inteira pelo cursor.
+    seen, cursor = [], ""
+    for _ in range(10):
+        data = client.get(f"/admin/api/users?q=panel-{tag}&per_page=3&cursor={cursor}").json()
+        seen += [u["user_id"] for u in data["users"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(uids.values())
+
+    assert client.get("/admin/api/users?cursor=lixo").status_code == 400
+    other_sort = client.get(f"/admin/api/users?sort=last_activity_at&cursor={first['next_cursor']}")
+    assert other_sort.status_code == 400
+    estimate = client.get("/admin/api/users?status=canceled&total=estimate").json()
+    assert isinstance(estimate["total"], int) and estimate["total_is_estimate"] is True
+
 # ── Drill-down ─────────────────────────────────────────────────────────────
 
 def test_user_detail_requires_admin_auth(panel_accounts):
@@ -0,0 +1,117 @@
+"""
+Loop de function calling do chat com IA (`runner._run_tool_loop`).
+
+Reads pedidos no mesmo turno rodam em paralelo; writes continuam sequenciais
+e funcionam como barreira; as tool messages voltam pra IA na ordem dos
+tool_call_id; cada tool soma latência em `tool_latency_stats`.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from types import SimpleNamespace
+
+from core.services.ai_chat import runner
+from core.services.ai_chat._context import CURRENT_PLATFORM
+from core.services.ai_chat.tools._base import Tool
+
+
+def _tool_call(tc_id: str, name: str, args: dict | None = None):
+    data = {
+        "id": tc_id,
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(args or {})},
+    }
+    return SimpleNamespace(model_dump=lambda: json.loads(json.dumps(data)))
+
+
+class _FakeClient:
+    """Primeira resposta pede as tools; a segunda encerra com texto."""
+
+    def __init__(self, tool_calls):
+        self.responses = [
+            SimpleNamespace(content=None, tool_calls=tool_calls),
+            SimpleNamespace(content="pronto", tool_calls=None),
+        ]
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=self.responses.pop(0))])
+
+
+def _schema(name: str) -> dict:
+    return {"type": "function", "function": {"name": name, "parameters": {}}}
+
+
+def test_reads_do_mesmo_turno_rodam_em_paralelo_e_voltam_em_ordem(user_id, monkeypatch):
+    # Barreira de 3: só libera se as três reads estiverem rodando ao mesmo tempo.
+    barrier = threading.Barrier(3, timeout=5)
+    seen_platform: list[str] = []
+
+    def _read(label):
+        def execute(uid, args):
+            barrier.wait()
+            seen_platform.append(CURRENT_PLATFORM.get())
+            return {"tool": label}
+        return Tool(schema=_schema(label), is_write=False, execute=execute)
+
+    tools = {name: _read(name) for name in ("get_balance", "get_spending_trend", "list_cards")}
+    monkeypatch.setattr(runner, "get_tool", tools.get)
+    monkeypatch.setattr(runner, "TOOL_WORKERS", 3)
+    monkeypatch.setattr(runner, "_tool_pool", None)
+    token = CURRENT_PLATFORM.set("whatsapp")
+    try:
+        messages: list[dict] = []
+        client = _FakeClient([
+            _tool_call("call_1", "get_balance"),
+            _tool_call("call_2", "get_spending_trend"),
+            _tool_call("call_3", "list_cards"),
+        ])
+        assert runner._run_tool_loop(client, user_id, messages) == "pronto"
+    finally:
+        CURRENT_PLATFORM.reset(token)
+
+    tool_msgs = [m for m in messages if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_msgs] == ["call_1", "call_2", "call_3"]
+    assert [json.loads(m["content"])["tool"] for m in tool_msgs] == [
+        "get_balance", "get_spending_trend", "list_cards",
+    ]
+    # contextvars do turno chegam nas threads do pool
+    assert seen_platform == ["whatsapp"] * 3
+
+    stats = {t["tool"]: t for t in runner.tool_latency_stats()["tools"]}
+    assert stats["get_balance"]["calls"] >= 1
+    assert stats["list_cards"]["max_ms"] >= 0
+
+
+def test_write_e_barreira_entre_reads(user_id, monkeypatch):
+    order: list[str] = []
+
+    def _read(label):
+        return Tool(
+            schema=_schema(label), is_write=False,
+            execute=lambda uid, args: order.append(label) or {"tool": label},
+        )
+
+    def _write(uid, args):
+        order.append("add_launch")
+        return "lançado"
+
+    tools = {
+        "get_balance": _read("get_balance"),
+        "list_cards": _read("list_cards"),
+        "add_launch": Tool(
+            schema=_schema("add_launch"), is_write=True, execute=_write,
+            requires_confirmation=False,
+        ),
+    }
+    monkeypatch.setattr(runner, "get_tool", tools.get)
+
+    client = _FakeClient([
+        _tool_call("call_1", "get_balance"),
+        _tool_call("call_2", "add_launch"),
+        _tool_call("call_3", "list_cards"),
+    ])
+    # write auto-executado é terminal: a resposta dele encerra o turno
+    assert runner._run_tool_loop(client, user_id, []) == "lançado"
+    assert order == ["get_balance", "add_launch", "list_cards"]
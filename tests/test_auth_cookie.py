@@ -335,13 +335,16 @@ def test_account_export_requires_password_and_emails_single_use_link(user_id, mo
 
     assert response.status_code == 200
     assert response.headers["content-type"].startswith("application/zip")
+    assert int(response.headers["content-length"]) == len(response.content)
     with zipfile.ZipFile(BytesIO(response.content)) as archive:
-        payload = json.loads(archive.read("dados.json"))
+        manifest = json.loads(archive.read("manifesto.json"))
         assert "csv/lancamentos.csv" in archive.namelist()
-    assert payload["manifesto"]["user_id"] == user_id
-    assert payload["manifesto"]["datasets"]["lancamentos"] >= 1
-    assert payload["manifesto"]["datasets"]["transacoes_cartao"] >= 1
-    assert "password_hash" not in json.dumps(payload)
+        launches = [json.loads(line) for line in archive.read("dados/lancamentos.ndjson").splitlines()]
+        exported = b"".join(archive.read(name) for name in archive.namelist())
+    assert manifest["user_id"] == user_id
+    assert manifest["datasets"]["lancamentos"] == len(launches) >= 1
+    assert manifest["datasets"]["transacoes_cartao"] >= 1
+    assert b"password_hash" not in exported
 
     # Token agora foi consumido → segundo download retorna 410.
     second = download_client.get(f"/auth/account/export/download/{export_token}")
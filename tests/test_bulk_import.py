@@ -0,0 +1,153 @@
+"""Importação em lote (COPY + INSERT ... SELECT) — OFX bancário e fatura OFX."""
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from db import (
+    create_card,
+    get_balance,
+    get_conn,
+    import_credit_ofx_bulk,
+    import_ofx_launches_bulk,
+)
+from utils_date import _tz
+
+
+def _bank_row(ext_id: str, valor: str, tipo: str = "despesa", d: date = date(2026, 3, 10)) -> dict:
+    v = Decimal(valor)
+    return {
+        "tipo": tipo,
+        "valor": v,
+        "delta": -v if tipo == "despesa" else v,
+        "categoria": "outros",
+        "nota": f"memo {ext_id}",
+        "external_id": ext_id,
+        "posted_at": d,
+        "criado_em": datetime.combine(d, time(12, 0), tzinfo=_tz()),
+        "currency": "BRL",
+        "is_internal_movement": False,
+        "ofx_meta": {"memo": f"memo {ext_id}"},
+    }
+
+
+def _bank_import(user_id: int, rows: list[dict]) -> dict:
+    return import_ofx_launches_bulk(
+        user_id, rows,
+        file_hash=f"test-{uuid.uuid4().hex}",
+        bank_id=None, acct_id=None, acct_type=None,
+        dt_start=None, dt_end=None,
+    )
+
+
+def test_ofx_bancario_em_lote_ajusta_saldo_so_pelo_que_entrou(user_id):
+    rows = [
+        _bank_row("A", "100.00", "receita"),
+        _bank_row("B", "30.50"),
+        _bank_row("B", "30.50"),  # FITID repetido no mesmo arquivo
+        _bank_row("C", "19.50"),
+    ]
+    rep = _bank_import(user_id, rows)
+
+    assert rep["total"] == 4
+    assert rep["inserted"] == 3
+    assert rep["duplicates"] == 1
+    assert rep["new_balance"] == Decimal("50.00")
+
+    # segundo arquivo sobreposto: só D é novo
+    rep2 = _bank_import(user_id, [_bank_row("C", "19.50"), _bank_row("D", "5.00")])
+    assert rep2["inserted"] == 1
+    assert rep2["duplicates"] == 1
+    assert get_balance(user_id) == Decimal("45.00")
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "select external_id, user_seq, efeitos from launches "
+                "where user_id=%s and source='ofx' order by id",
+                (user_id,),
+            )
+            got = cur.fetchall()
+    # ordem do arquivo preservada e user_seq sem buracos
+    assert [r["external_id"] for r in got] == ["A", "B", "C", "D"]
+    assert [r["user_seq"] for r in got] == [1, 2, 3, 4]
+    assert got[1]["efeitos"]["delta_conta"] == -30.5
+
+
+def _card_row(ext_id, valor, d, nota, inst_no=None, inst_total=None, memo_base=None, tipo="despesa"):
+    return {
+        "external_id": ext_id,
+        "posted_at": d,
+        "valor": Decimal(valor),
+        "tipo": tipo,
+        "categoria": "outros",
+        "nota": nota,
+        "installment_no": inst_no,
+        "installments_total": inst_total,
+        "memo_base": memo_base,
+    }
+
+
+def _card_import(user_id: int, card_id: int, rows: list[dict]) -> dict:
+    return import_credit_ofx_bulk(
+        user_id=user_id,
+        card_id=card_id,
+        tx_rows=rows,
+        file_hash=f"test-{uuid.uuid4().hex}",
+        dt_start=None,
+        dt_end=None,
+    )
+
+
+def test_fatura_ofx_em_lote_dedupe_e_agrupa_parcelas(user_id):
+    card_id = create_card(user_id, "Nubank", 10, 17)
+    rows = [
+        _card_row("f1", "100.00", date(2026, 3, 2), "LOJA X PARC 01/03", 1, 3, "LOJA X"),
+        _card_row("f2", "50.00", date(2026, 3, 3), "MERCADO"),
+        _card_row("f3", "100.00", date(2026, 4, 2), "LOJA X PARC 02/03", 2, 3, "LOJA X"),
+        _card_row("f4", "20.00", date(2026, 3, 4), "ESTORNO MERCADO", tipo="estorno"),
+    ]
+    rep = _card_import(user_id, card_id, rows)
+    assert rep["inserted"] == 4
+    assert rep["duplicates"] == 0
+
+    # reimportação com outro hash: tudo duplicado pelo FITID; a parcela 3 casa
+    # com o grupo já existente pelo memo_base
+    rows2 = rows + [_card_row("f5", "100.00", date(2026, 5, 2), "LOJA X PARC 03/03", 3, 3, "LOJA X")]
+    rep2 = _card_import(user_id, card_id, rows2)
+    assert rep2["inserted"] == 1
+    assert rep2["duplicates"] == 4
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "select external_id, group_id, bill_id, is_refund from credit_transactions "
+                "where user_id=%s order by purchased_at, id",
+                (user_id,),
+            )
+            got = {r["external_id"]: r for r in cur.fetchall()}
+            cur.execute(
+                "select id, total from credit_bills where user_id=%s and card_id=%s",
+                (user_id, card_id),
+            )
+            totals = {r["id"]: r["total"] for r in cur.fetchall()}
+
+    assert got["f1"]["group_id"] is not None
+    assert got["f1"]["group_id"] == got["f3"]["group_id"] == got["f5"]["group_id"]
+    assert got["f2"]["group_id"] is None
+    assert got["f4"]["is_refund"] is True
+    # fatura de março: 100 + 50 - 20
+    assert totals[got["f1"]["bill_id"]] == Decimal("130.00")
+
+
+def test_fatura_ofx_em_lote_nao_duplica_parcela_lancada_manualmente(user_id):
+    card_id = create_card(user_id, "Inter", 5, 12)
+    _card_import(user_id, card_id, [
+        _card_row(None, "80.00", date(2026, 3, 1), "TV PARC 01/10", 1, 10, "TV"),
+    ])
+
+    rep = _card_import(user_id, card_id, [
+        _card_row("x1", "80.00", date(2026, 3, 1), "TV PARC 01/10", 1, 10, "TV"),
+        _card_row("x2", "80.00", date(2026, 4, 1), "TV PARC 02/10", 2, 10, "TV"),
+    ])
+    assert rep["inserted"] == 1
+    assert rep["duplicates"] == 1
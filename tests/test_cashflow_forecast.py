@@ -1,53 +1,110 @@
 """Previsão de saldo 30/60/90 dias (feature Pro).
 
-`forecast_horizons` não tem lógica de projeção própria — só reusa `project()`
-em hoje+30/60/90. Aqui garantimos o contrato (chaves + datas-alvo) sem tocar no
-DB, mockando `project`.
+`forecast_horizons` carrega as entradas do usuário uma vez (`CashflowForecast`)
+e responde todos os horizontes da mesma linha do tempo. Aqui garantimos o
+contrato (chaves + datas-alvo) e a equivalência com `project` sem tocar no DB,
+mockando as leituras.
 """
 from datetime import date, timedelta
 
 
-def test_forecast_horizons_reusa_project_nos_tres_horizontes(monkeypatch):
+def _fake_inputs(monkeypatch, *, saldo=100.0, incomes=(), expenses=(), bills=(), cards=(),
+                 calls=None):
     import core.services.cashflow as cf
+    import db, db.accounts, db.recurring, db.recurring_income, db.bills
 
-    alvos: list[date] = []
-
-    def fake_project(uid, target, extra=0.0):
-        alvos.append(target)
-        return {"target": target.isoformat(), "projetado": 100.0, "tranquilo": True,
-                "balance_source": "consolidated", "of_bank_count": 2,
-                "banks_excluded": False}
-
-    monkeypatch.setattr(cf, "project", fake_project)
+    def count(name, value):
+        def _f(*a, **kw):
+            if calls is not None:
+                calls[name] = calls.get(name, 0) + 1
+            return value
+        return _f
+
+    monkeypatch.setattr(db.accounts, "get_balance", count("get_balance", saldo))
+    monkeypatch.setattr(db.recurring, "list_recurring_expenses", count("expenses", list(expenses)))
+    monkeypatch.setattr(db.recurring_income, "list_recurring_incomes", count("incomes", list(incomes)))
+    monkeypatch.setattr(db.bills, "list_bills", count("list_bills", list(bills)))
+    monkeypatch.setattr(cf, "_open_card_bills", count("cards", list(cards)))
+    monkeypatch.setattr(db, "get_consolidated_balance",
+                        count("consolidated", {"of_bank_count": 0}), raising=False)
+    return cf
+
+
+def test_forecast_horizons_carrega_entradas_uma_vez(monkeypatch):
+    calls: dict[str, int] = {}
+    today = date.today()
+    cf = _fake_inputs(
+        monkeypatch, calls=calls,
+        bills=[{"status": "pending", "due_date": today + timedelta(days=45), "amount": 300}],
+    )
 
     out = cf.forecast_horizons(42)
 
     assert set(out["horizons"].keys()) == {"30", "60", "90"}
-    today = date.today()
-    assert alvos == [today + timedelta(days=30),
-                     today + timedelta(days=60),
-                     today + timedelta(days=90)]
+    assert [out["horizons"][k]["target"] for k in ("30", "60", "90")] == [
+        (today + timedelta(days=n)).isoformat() for n in (30, 60, 90)
+    ]
     assert out["today"] == today.isoformat()
     assert out["horizons"]["30"]["projetado"] == 100.0
+    assert out["horizons"]["60"]["projetado"] == -200.0
+    assert out["horizons"]["90"]["n_boletos"] == 1
+    assert set(calls.values()) == {1}
     # origem do saldo sobe pro topo pro dashboard renderizar o aviso
-    assert out["balance_source"] == "consolidated"
-    assert out["of_bank_count"] == 2
-    assert out["banks_excluded"] is False
-
-
-def test_forecast_horizons_default_balance_source_quando_project_omite(monkeypatch):
-    import core.services.cashflow as cf
-    monkeypatch.setattr(cf, "project", lambda uid, target, extra=0.0: {"projetado": 0.0})
-    out = cf.forecast_horizons(1, horizons=(30,))
     assert out["balance_source"] == "manual"
+    assert out["of_bank_count"] == 0
     assert out["banks_excluded"] is False
+    assert "curve" not in out
 
 
-def test_forecast_horizons_aceita_horizontes_customizados(monkeypatch):
-    import core.services.cashflow as cf
-    monkeypatch.setattr(cf, "project", lambda uid, target, extra=0.0: {"t": target.isoformat()})
-    out = cf.forecast_horizons(1, horizons=(7, 15))
+def test_forecast_horizons_aceita_horizontes_customizados_e_curva(monkeypatch):
+    cf = _fake_inputs(monkeypatch)
+    out = cf.forecast_horizons(1, horizons=(7, 15), include_curve=True)
     assert set(out["horizons"].keys()) == {"7", "15"}
+    assert len(out["curve"]) == 16
+    assert out["curve"][0]["date"] == date.today().isoformat()
+
+
+def test_engine_bate_com_calculo_por_data_e_curva_soma_corrente(monkeypatch):
+    today = date.today()
+    cf = _fake_inputs(
+        monkeypatch, saldo=1000.0,
+        incomes=[{"is_active": True, "pay_day": 5, "frequency": "monthly", "amount": 2000}],
+        expenses=[
+            {"is_active": True, "due_day": 10, "frequency": "monthly", "amount": 400},
+            {"is_active": True, "due_day": 20, "frequency": "annual",
+             "due_month": (today + timedelta(days=40)).month, "amount": 900},
+            {"is_active": True, "due_day": 12, "frequency": "monthly", "amount": 50,
+             "payment_mode": "manual"},
+            {"is_active": True, "due_day": 1, "frequency": "weekly", "amount": 10},
+        ],
+        bills=[
+            {"status": "pending", "due_date": (today - timedelta(days=3)).isoformat(), "amount": 120},
+            {"status": "pending", "due_date": today + timedelta(days=17), "amount": 700},
+        ],
+        cards=[(today + timedelta(days=8), 350.0), (today + timedelta(days=38), 80.0)],
+    )
+    engine = cf.CashflowForecast(7, today + timedelta(days=30))
+    curve = {p["date"]: p["projetado"] for p in engine.curve(today + timedelta(days=120))}
+
+    for n in (0, 1, 8, 17, 30, 45, 61, 90, 120):
+        target = today + timedelta(days=n)
+        got = engine.at(target, 55)
+        receitas = cf._recurring_value_in_window(5, "monthly", None, None, 2000, today, target)
+        gastos = (cf._recurring_value_in_window(10, "monthly", None, None, 400, today, target)
+                  + cf._recurring_value_in_window(20, "annual", (today + timedelta(days=40)).month,
+                                                  None, 900, today, target))
+        boletos = 120 + (700 if n >= 17 else 0)
+        faturas = (350 if n >= 8 else 0) + (80 if n >= 38 else 0)
+        esperado = round(1000 + receitas - gastos - boletos - faturas - 55, 2)
+        assert got["projetado"] == esperado
+        assert got["receitas_previstas"] == round(receitas, 2)
+        assert got["gastos_fixos_previstos"] == round(gastos, 2)
+        # a curva é a mesma conta, sem o boleto novo
+        assert curve[target.isoformat()] == round(esperado + 55, 2)
+
+    low = engine.lowest(today + timedelta(days=30))
+    assert low["projetado"] == min(v for k, v in curve.items()
+                                   if k <= (today + timedelta(days=30)).isoformat())
 
 
 def test_project_marca_unavailable_quando_consolidado_falha(monkeypatch):
@@ -63,7 +120,7 @@ def test_project_marca_unavailable_quando_consolidado_falha(monkeypatch):
     monkeypatch.setattr(db.recurring_income, "list_recurring_incomes", lambda uid: [])
     monkeypatch.setattr(db.bills, "list_bills",
                         lambda uid, include_paid=False, limit=1000: [])
-    monkeypatch.setattr(cf, "_open_card_bills_due", lambda uid, until: 0.0)
+    monkeypatch.setattr(cf, "_open_card_bills", lambda uid: [])
 
     def boom(uid):
         raise RuntimeError("Open Finance indisponível")
@@ -79,7 +136,7 @@ def test_project_marca_unavailable_quando_consolidado_falha(monkeypatch):
 
 
 def test_card_bill_due_date_canonica_rollover_clamp_e_mesmo_dia():
-    # A projeção usa a regra canônica de db/cards.py (via _open_card_bills_due),
+    # A projeção usa a regra canônica de db/cards.py (via _open_card_bills),
     # não uma cópia própria — garante que não voltem a divergir.
     from db.cards import card_bill_due_date
     # due_day < fechamento → vencimento rola pro mês seguinte
@@ -62,3 +62,24 @@ def test_escolha_explicita_ainda_sobrescreve_local(user_id):
     # se o user REALMENTE quer mercado→lazer, respeita.
     learn_from_explicit_category(user_id, "comprei no mercado", "lazer")
     assert db.get_memorized_category(user_id, "mercado") == "lazer"
+
+
+# --- matcher das regras do usuário (cache por processo) -------------------
+
+def test_regras_do_usuario_cacheadas_ate_escrita(user_id, monkeypatch):
+    db.upsert_category_rule(user_id, "padoca", "alimentacao")
+    db.upsert_category_rule(user_id, "padoca do ze", "lazer")
+    # mais longa primeiro, como na ordem do banco
+    assert db.get_memorized_category(user_id, "padoca do ze") == "lazer"
+
+    # cache quente: nenhuma ida ao banco na próxima consulta
+    import db.categories as categories
+    monkeypatch.setattr(categories, "list_user_category_rules", lambda uid: pytest.fail("foi ao banco"))
+    assert db.get_memorized_category(user_id, "padoca da esquina") == "alimentacao"
+    monkeypatch.undo()
+
+    # escrita invalida: delete some com a regra na hora
+    db.delete_category_rule(user_id, "padoca do ze")
+    assert db.get_memorized_category(user_id, "padoca do ze") == "alimentacao"
+    db.delete_category_rules_by_category(user_id, "alimentacao")
+    assert db.get_memorized_category(user_id, "padoca do ze") is None
@@ -0,0 +1,116 @@
+"""
+Change bus (core/services/change_bus.py): aviso "usuário X mudou" entre processos.
+
+- escrita commitada nas tabelas do snapshot chega no LISTEN sozinha (trigger);
+- publicação explícita dentro de uma transação só sai no commit;
+- CHANGE_BUS=local entrega em memória, sem banco;
+- o ConnectionManager derruba o cache e agenda o push só pra quem tem socket.
+"""
+from __future__ import annotations
+
+import asyncio
+
+from core.services import change_bus
+from db.connection import get_conn
+
+
+def _collect(bus, until: int, timeout: float = 5.0):
+    """Roda `bus.listen` até juntar `until` eventos; as `actions` (síncronas,
+    em thread) disparam depois que a escuta está de pé."""
+
+    async def run(actions):
+        got: list[tuple[int, str, dict]] = []
+        done = asyncio.Event()
+
+        def handler(user_id, event, data):
+            got.append((user_id, event, data))
+            if len(got) >= until:
+                done.set()
+
+        task = asyncio.create_task(bus.listen(handler))
+        await asyncio.sleep(0.3)  # LISTEN registrado
+        for action in actions:
+            await asyncio.to_thread(action)
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return got
+
+    return run
+
+
+def test_postgres_escrita_e_publicacao_explicita_chegam_no_commit(user_id):
+    def write_launch():
+        with get_conn() as conn:
+            conn.execute(
+                "insert into launches (user_id, tipo, valor, categoria) values (%s, 'despesa', 5, 'cafe')",
+                (user_id,),
+            )
+            conn.commit()
+
+    def publish_in_transaction():
+        with get_conn() as conn:
+            change_bus.publish_user_change(user_id, "open_finance_synced", conn=conn, item_id="it-1")
+            conn.rollback()  # desfeito: não pode sair
+            change_bus.publish_user_change(user_id, "open_finance_synced", conn=conn, item_id="it-2")
+            conn.commit()
+
+    run = _collect(change_bus.PostgresChangeBus(), until=2)
+    got = asyncio.run(run([write_launch, publish_in_transaction]))
+
+    mine = [g for g in got if g[0] == user_id]
+    assert (user_id, "changed", {}) in mine
+    assert (user_id, "open_finance_synced", {"item_id": "it-2"}) in mine
+    assert (user_id, "open_finance_synced", {"item_id": "it-1"}) not in mine
+
+
+def test_local_entrega_em_memoria(monkeypatch):
+    monkeypatch.setenv("CHANGE_BUS", "local")
+    bus = change_bus.get_change_bus()
+    assert isinstance(bus, change_bus.LocalChangeBus)
+
+    run = _collect(bus, until=2)
+    got = asyncio.run(run([
+        lambda: change_bus.publish_user_change(7),
+        lambda: change_bus.publish_user_change(8, "open_finance_synced", item_id="x"),
+    ]))
+
+    assert got == [(7, "changed", {}), (8, "open_finance_synced", {"item_id": "x"})]
+
+
+def test_off_nao_escuta(monkeypatch):
+    monkeypatch.setenv("CHANGE_BUS", "off")
+    assert change_bus.get_change_bus() is None
+
+
+def test_manager_so_empurra_pra_quem_tem_socket(monkeypatch):
+    import frontend.finance_bot_websocket_custom as app
+    from frontend.routes import shared
+
+    mgr = app.ConnectionManager()
+    pushes: list[int] = []
+    broadcasts: list[tuple[int, str]] = []
+    monkeypatch.setattr(mgr, "schedule_push", lambda uid, delay=0.25: pushes.append(uid))
+
+    async def fake_broadcast(uid, payload):
+        broadcasts.append((uid, payload))
+        return 1
+
+    monkeypatch.setattr(mgr, "broadcast_to_user", fake_broadcast)
+    mgr.active[1] = {object(): {"year": 2026, "month": 10}}
+    shared.dashboard_current_cache[1] = (0.0, None, None, None)
+    shared.dashboard_current_cache[2] = (0.0, None, None, None)
+
+    async def run():
+        await mgr.on_user_change(1, "changed", {})
+        await mgr.on_user_change(2, "changed", {})
+        await mgr.on_user_change(1, "open_finance_synced", {"item_id": "it"})
+
+    asyncio.run(run())
+
+    assert 1 not in shared.dashboard_current_cache
+    assert 2 not in shared.dashboard_current_cache  # cache some mesmo sem socket aqui
+    assert pushes == [1, 1]
+    assert broadcasts == [(1, '{"type": "open_finance_synced", "item_id": "it"}')]
@@ -0,0 +1,149 @@
+"""
+Protocolo versionado do dashboard (/ws/{user_id}).
+
+- `snapshot_delta`/`apply_delta` reconstroem exatamente o snapshot novo;
+- `dashboard_versions` só anda quando um dado do usuário muda de verdade
+  (o accrual que regrava o mesmo saldo não conta);
+- o push da ConnectionManager manda só o delta e mantém a versão da conexão.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import db
+from db.connection import get_conn
+from frontend.dashboard_delta import apply_delta, snapshot_delta
+
+
+def _snapshot(**over) -> dict:
+    base = {
+        "year": 2026, "month": 10, "balance": 1500.0, "timestamp": "2026-10-18T10:00:00",
+        "recent_launches": [
+            {"id": 7, "tipo": "despesa", "valor": 30.0},
+            {"id": 7, "tipo": "credito", "valor": 99.0},
+            {"id": 5, "tipo": "receita", "valor": 3000.0},
+        ],
+        "pockets": [{"id": 1, "name": "Viagem", "balance": 100.0}],
+        "expense_categories": [{"categoria": "mercado", "total": 30.0}],
+    }
+    base.update(over)
+    return base
+
+
+def test_delta_reconstroi_o_snapshot_e_ignora_timestamp():
+    old = _snapshot()
+    assert snapshot_delta(old, _snapshot(timestamp="2026-10-18T10:05:00")) == {}
+
+    new = _snapshot(
+        balance=1470.0,
+        recent_launches=[
+            {"id": 8, "tipo": "despesa", "valor": 30.0},
+            {"id": 7, "tipo": "despesa", "valor": 30.0},
+            {"id": 7, "tipo": "credito", "valor": 99.0},
+        ],
+        pockets=[{"id": 1, "name": "Viagem", "balance": 130.0}],
+    )
+    new.pop("expense_categories")
+    delta = snapshot_delta(old, new)
+
+    assert delta["set"] == {"balance": 1470.0}
+    launches = delta["lists"]["recent_launches"]
+    # compra no cartão com o mesmo id de um lançamento não se confunde com ele
+    assert launches["upsert"] == [{"id": 8, "tipo": "despesa", "valor": 30.0}]
+    assert launches["remove"] == ["l5"]
+    assert launches["order"] == ["l8", "l7", "c7"]
+    assert delta["lists"]["pockets"] == {"upsert": [{"id": 1, "name": "Viagem", "balance": 130.0}]}
+    assert delta["unset"] == ["expense_categories"]
+
+    rebuilt = apply_delta(old, json.loads(json.dumps(delta)))
+    rebuilt["timestamp"] = new["timestamp"]
+    assert rebuilt == new
+
+
+def _version(user_id: int) -> int:
+    return db.get_dashboard_version(user_id)
+
+
+def test_versao_anda_so_quando_o_dado_muda(user_id):
+    v0 = _version(user_id)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "insert into launches (user_id, tipo, valor, categoria) "
+                "values (%s, 'despesa', 10, 'mercado') returning id",
+                (user_id,),
+            )
+            launch_id = cur.fetchone()["id"]
+        conn.commit()
+    v1 = _version(user_id)
+    assert v1 > v0
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            # regravar os mesmos valores (accrual, upsert idempotente) não muda a versão
+            cur.execute("update launches set valor = valor where id = %s", (launch_id,))
+            cur.execute("update accounts set balance = balance where user_id = %s", (user_id,))
+        conn.commit()
+    assert _version(user_id) == v1
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("update launches set valor = 12 where id = %s", (launch_id,))
+        conn.commit()
+    v2 = _version(user_id)
+    assert v2 > v1
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("delete from launches where id = %s", (launch_id,))
+        conn.commit()
+    assert _version(user_id) > v2
+
+
+class _FakeWS:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+
+def test_push_manda_so_o_delta_e_uma_conta_por_visao(monkeypatch):
+    import frontend.finance_bot_websocket_custom as app
+
+    snapshots = {"current": _snapshot()}
+    calls = []
+
+    async def fake_data(user_id, *view):
+        calls.append(view)
+        return snapshots["current"]
+
+    versions = iter(["2.2026-10-18", "3.2026-10-18"])
+
+    async def fake_etag(user_id):
+        return next(versions)
+
+    monkeypatch.setattr(app, "get_financial_data", fake_data)
+    monkeypatch.setattr(app, "_dashboard_etag", fake_etag)
+
+    mgr = app.ConnectionManager()
+    monkeypatch.setattr(app, "manager", mgr)
+    a, b = _FakeWS(), _FakeWS()
+    view = (2026, 10, 1, 25, "all", "")
+    for ws in (a, b):
+        mgr.active.setdefault(99, {})[ws] = {"year": 2026, "month": 10}
+        mgr.remember_view(ws, 99, view, "1.2026-10-18", _snapshot())
+
+    snapshots["current"] = _snapshot(balance=1400.0)
+    assert asyncio.run(mgr.push_changes(99)) == 2
+    assert calls == [view]
+    for ws in (a, b):
+        (msg,) = ws.sent
+        assert msg["type"] == "delta"
+        assert (msg["base"], msg["version"]) == ("1.2026-10-18", "2.2026-10-18")
+        assert msg["changes"] == {"set": {"balance": 1400.0}}
+
+    # sem mudança: ninguém recebe nada e a versão da conexão fica a do cliente
+    assert asyncio.run(mgr.push_changes(99)) == 0
+    assert mgr.view_state(a, 99)["version"] == "2.2026-10-18"
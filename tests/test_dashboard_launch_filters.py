@@ -15,12 +15,14 @@ def test_dashboard_filter_investimento_inclui_aportes_e_resgates():
     assert params == []
 
 
-def test_dashboard_filter_busca_textual_procura_nos_campos_visiveis():
+def test_dashboard_filter_busca_textual_usa_o_indice_de_busca_e_o_tipo():
     clauses, params = _dashboard_launch_filter_sql("all", "  Mercado  ")
 
     assert len(clauses) == 1
-    assert "lower(coalesce(nota, '')) LIKE %s" in clauses[0]
-    assert "lower(coalesce(alvo, '')) LIKE %s" in clauses[0]
-    assert "lower(coalesce(categoria, '')) LIKE %s" in clauses[0]
+    assert "search_vec @@ to_tsquery" in clauses[0] or "history_search_document(alvo, nota, categoria) LIKE" in clauses[0]
     assert "lower(coalesce(tipo, '')) LIKE %s" in clauses[0]
-    assert params == ["%mercado%", "%mercado%", "%mercado%", "%mercado%"]
+    assert params[-1] == "%mercado%"
+
+
+def test_dashboard_filter_termo_curto_demais_nao_filtra():
+    assert _dashboard_launch_filter_sql("all", "a") == ([], [])
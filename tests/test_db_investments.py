@@ -1,3 +1,4 @@
+import uuid
 from datetime import date, timedelta
 from decimal import Decimal
 
@@ -541,3 +542,168 @@ def test_resgate_de_ativo_isento_nao_desconta_ir_iof(user_id):
     assert abs(bal_inv - Decimal("430")) < Decimal("0.50")
     assert Decimal(str(taxes["ir"])) == Decimal("0.0")
     assert Decimal(str(taxes["iof"])) == Decimal("0.0")
+
+
+def _sem_bcb(*_args, **_kwargs):
+    raise AssertionError("accrual não pode chamar o BCB")
+
+
+def test_accrue_investment_db_cdi_le_so_market_rates_sem_rede(user_id, monkeypatch):
+    # Datas de 2001: isoladas das linhas de CDI que outros testes/boot gravam.
+    cdi_days = {date(2001, 3, 6): 0.05, date(2001, 3, 7): 0.06}
+    monkeypatch.setattr(investments_db, "_fetch_sgs_series_json", _sem_bcb)
+    monkeypatch.setattr(investments_db, "_fetch_sgs_latest_json", _sem_bcb)
+
+    with db.get_conn() as conn:
+        with conn.cursor() as cur:
+            for ref_date, value in cdi_days.items():
+                cur.execute(
+                    "insert into market_rates(code, ref_date, value) values ('CDI', %s, %s) "
+                    "on conflict (code, ref_date) do update set value=excluded.value",
+                    (ref_date, value),
+                )
+            cur.execute(
+                """
+                insert into investments(user_id, name, balance, rate, period, last_date)
+                values (%s, %s, %s, %s, %s, %s)
+                returning id
+                """,
+                (user_id, "CDB Cache Local", Decimal("1000"), Decimal("1.0"), "cdi", date(2001, 3, 5)),
+            )
+            inv_id = cur.fetchone()["id"]
+        conn.commit()
+
+    try:
+        with db.get_conn() as conn:
+            with conn.cursor() as cur:
+                new_bal = db.accrue_investment_db(cur, user_id, inv_id, today=date(2001, 3, 8))
+            conn.commit()
+
+        expected = Decimal(str(1000 * (1 + 0.05 / 100) * (1 + 0.06 / 100)))
+        assert abs(new_bal - expected) < Decimal("0.000001")
+        assert db.get_dashboard_market_rates().keys() == {"cdi_aa", "selic_aa", "ipca_12m"}
+    finally:
+        with db.get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("delete from investment_lots where investment_id=%s and user_id=%s", (inv_id, user_id))
+                cur.execute("delete from investments where id=%s and user_id=%s", (inv_id, user_id))
+                cur.execute("delete from market_rates where code='CDI' and ref_date = any(%s)", (list(cdi_days),))
+            conn.commit()
+
+
+def test_refresh_market_rates_busca_so_dias_faltantes_e_invalida_cache(monkeypatch):
+    today = date.today()
+    calls = []
+
+    def _fake_series(series_code, start, end):
+        calls.append((series_code, start, end))
+        if series_code == 12 and start <= today <= end:
+            return [{"data": today.strftime("%d/%m/%Y"), "valor": "0,055"}]
+        return []
+
+    monkeypatch.setattr(investments_db, "_fetch_sgs_series_json", _fake_series)
+    monkeypatch.setattr(investments_db, "_fetch_sgs_latest_json", lambda *_a, **_k: [])
+
+    yesterday = today - timedelta(days=1)
+    with db.get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "select ref_date, value from market_rates where code='CDI' and ref_date >= %s",
+                (yesterday,),
+            )
+            saved_rows = [(r["ref_date"], r["value"]) for r in cur.fetchall()]
+            cur.execute("delete from market_rates where code='CDI' and ref_date >= %s", (yesterday,))
+            cur.execute(
+                "insert into market_rates(code, ref_date, value) values ('CDI', %s, 0.05)",
+                (yesterday,),
+            )
+        conn.commit()
+
+    try:
+        with db.get_conn() as conn:
+            with conn.cursor() as cur:
+                # Aquece o cache antes do refresh: sem invalidação, hoje não apareceria.
+                assert db._get_cdi_daily_map(cur, yesterday - timedelta(days=1), today) == {yesterday: 0.05}
+
+        fetched = db.refresh_market_rates(today=today)
+
+        cdi_calls = [c for c in calls if c[0] == 12]
+        assert cdi_calls[-1] == (12, today, today)
+        assert fetched["CDI"] >= 1
+        with db.get_conn() as conn:
+            with conn.cursor() as cur:
+                assert db._get_cdi_daily_map(cur, yesterday - timedelta(days=1), today) == {
+                    yesterday: 0.05,
+                    today: 0.055,
+                }
+    finally:
+        with db.get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("delete from market_rates where code='CDI' and ref_date >= %s", (yesterday,))
+                for ref_date, value in saved_rows:
+                    cur.execute(
+                        "insert into market_rates(code, ref_date, value) values ('CDI', %s, %s)",
+                        (ref_date, value),
+                    )
+            conn.commit()
+
+
+def test_accrue_investments_for_users_em_lote_igual_ao_caminho_por_investimento(user_id, monkeypatch):
+    other_user_id = int(uuid.uuid4().int % 10_000_000_000)
+    db.ensure_user(other_user_id)
+    cdi_days = {date(2001, 4, 2): 0.05, date(2001, 4, 3): 0.06, date(2001, 4, 4): 0.04}
+    monkeypatch.setattr(investments_db, "_fetch_sgs_series_json", _sem_bcb)
+
+    with db.get_conn() as conn:
+        with conn.cursor() as cur:
+            for ref_date, value in cdi_days.items():
+                cur.execute(
+                    "insert into market_rates(code, ref_date, value) values ('CDI', %s, %s) "
+                    "on conflict (code, ref_date) do update set value=excluded.value",
+                    (ref_date, value),
+                )
+            inv_ids = []
+            for uid, rate, period in ((user_id, "1.10", "cdi"), (other_user_id, "0.05", "cdi_spread")):
+                cur.execute(
+                    """
+                    insert into investments(user_id, name, balance, rate, period, last_date)
+                    values (%s, %s, %s, %s, %s, %s)
+                    returning id
+                    """,
+                    (uid, "CDB Lote em Bloco", Decimal("1000"), Decimal(rate), period, date(2001, 4, 1)),
+                )
+                inv_ids.append((uid, cur.fetchone()["id"]))
+        conn.commit()
+
+    try:
+        changed = db.accrue_investments_for_users([user_id, other_user_id], today=date(2001, 4, 5))
+        assert changed == 2
+
+        cdi_factor = 1.0
+        cdi_110_factor = 1.0
+        for value in cdi_days.values():
+            cdi_factor *= 1 + value / 100
+            cdi_110_factor *= 1 + value / 100 * 1.10
+        spread_daily = 1.05 ** (1 / 252) - 1
+        expected = {
+            user_id: 1000 * cdi_110_factor,
+            other_user_id: 1000 * cdi_factor * (1 + spread_daily) ** 3,
+        }
+        with db.get_conn() as conn:
+            with conn.cursor() as cur:
+                for uid, inv_id in inv_ids:
+                    cur.execute("select balance, last_date from investments where id=%s", (inv_id,))
+                    row = cur.fetchone()
+                    assert abs(float(row["balance"]) - expected[uid]) < 1e-6
+                    assert row["last_date"] == date(2001, 4, 4)
+
+        # Idempotente: sem taxa nova publicada, nada muda.
+        assert db.accrue_investments_for_users([user_id, other_user_id], today=date(2001, 4, 5)) == 0
+    finally:
+        with db.get_conn() as conn:
+            with conn.cursor() as cur:
+                for uid, inv_id in inv_ids:
+                    cur.execute("delete from investment_lots where investment_id=%s", (inv_id,))
+                    cur.execute("delete from investments where id=%s", (inv_id,))
+                cur.execute("delete from market_rates where code='CDI' and ref_date = any(%s)", (list(cdi_days),))
+            conn.commit()
@@ -1,7 +1,8 @@
 """
 Export por email: POST /export/{uid} gera PDF + XLSX + CSV do mês e envia pro
 email cadastrado via send_email (com anexos base64). Testa a lógica do handler
-com auth mockada e send_email espionado — não toca rede.
+com auth mockada e send_email espionado — não toca rede. Também cobre o cache
+dos extratos renderizados (db/export_cache.py) e a tabela do PDF por página.
 """
 from __future__ import annotations
 
@@ -71,3 +72,65 @@ def test_export_email_404_sem_lancamentos(_no_auth, spy_email, pro_user_id):
         asyncio.run(app_mod.export_email(None, pro_user_id, now.year + 1, 1))
     assert exc.value.status_code == 404
     assert spy_email.get("attachments") is None
+
+
+def _add_launch_at(uid: int, valor: float, alvo: str, criado_em: datetime) -> None:
+    from db.connection import get_conn
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "insert into launches (user_id, tipo, valor, alvo, nota, categoria, criado_em) "
+                "values (%s, 'despesa', %s, %s, '', 'outros', %s)",
+                (uid, valor, alvo, criado_em),
+            )
+        conn.commit()
+
+
+def test_extrato_repetido_sai_do_cache_sem_renderizar(pro_user_id, monkeypatch):
+    """Mesma versão → cache direto; outro mês mudou → hash igual, sem render;
+    o próprio mês mudou → renderiza de novo."""
+    renders: list[str] = []
+    for fmt in ("csv", "xlsx", "pdf"):
+        real = getattr(app_mod, f"_render_{fmt}")
+
+        def counting(*args, _real=real, _fmt=fmt):
+            renders.append(_fmt)
+            return _real(*args)
+
+        monkeypatch.setattr(app_mod, f"_render_{fmt}", counting)
+
+    _add_launch_at(pro_user_id, 50, "Padaria", datetime(2026, 3, 10, 12))
+    first = asyncio.run(app_mod.build_month_exports(pro_user_id, 2026, 3))
+    assert sorted(renders) == ["csv", "pdf", "xlsx"]
+
+    renders.clear()
+    assert asyncio.run(app_mod.build_month_exports(pro_user_id, 2026, 3)) == first
+    _add_launch_at(pro_user_id, 70, "Farmácia", datetime(2026, 4, 2, 12))   # outro mês
+    assert asyncio.run(app_mod.build_month_exports(pro_user_id, 2026, 3)) == first
+    assert renders == []
+
+    _add_launch_at(pro_user_id, 30, "Feira", datetime(2026, 3, 20, 12))
+    again = asyncio.run(app_mod.build_month_exports(pro_user_id, 2026, 3))
+    assert sorted(renders) == ["csv", "pdf", "xlsx"]
+    assert b"Feira" in again["csv"] and b"Feira" not in first["csv"]
+
+
+def test_pdf_de_mes_grande_pagina_o_extrato_inteiro(monkeypatch):
+    """Tabela montada por página: toda linha aparece uma vez, com cabeçalho
+    repetido no topo de cada página."""
+    import re
+
+    import reportlab.rl_config
+
+    monkeypatch.setattr(reportlab.rl_config, "pageCompression", 0)
+    items = [
+        {"data": datetime(2026, 3, 1 + i % 28), "natureza": "despesa", "label": "Despesa",
+         "sign": "-", "categoria": "outros", "descricao": f"Loja {i}", "valor": 10.0 + i}
+        for i in range(300)
+    ]
+
+    pdf = app_mod._render_pdf(items, 2026, 3, 0.0)
+
+    assert sorted(int(n) for n in re.findall(rb"\(Loja (\d+)\)", pdf)) == list(range(300))
+    pages = len(re.findall(rb"/Type /Page\b", pdf))
+    assert pages > 5 and pdf.count(b"(Descri") == pages   # nenhum cabeçalho no meio da página
@@ -0,0 +1,98 @@
+"""
+Busca do histórico (db/history_search.py) sobre o search_vec indexado.
+
+- prefixo de palavra e sem acento, AND entre palavras, nas duas tabelas;
+- o nome do cartão continua valendo pras compras no crédito;
+- o search_vec acompanha a edição da linha (coluna gerada);
+- `search_history` ranqueia: palavra inteira antes de prefixo;
+- o predicado da busca é indexável (GIN), não varredura do histórico.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import db
+from db.connection import get_conn
+from db.history_search import parse_search_terms, prefix_tsquery
+
+
+def _launch(user_id: int, alvo: str | None, nota: str | None, categoria: str | None,
+            tipo: str = "despesa") -> int:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "insert into launches (user_id, tipo, valor, alvo, nota, categoria) "
+                "values (%s, %s, 10, %s, %s, %s) returning id",
+                (user_id, tipo, alvo, nota, categoria),
+            )
+            launch_id = cur.fetchone()["id"]
+        conn.commit()
+    return launch_id
+
+
+def _ids(result: dict) -> set[tuple[str, int]]:
+    return {(item["tipo"], item["id"]) for item in result["items"]}
+
+
+def test_termos_viram_prefixo_sem_operadores_injetados():
+    assert parse_search_terms("  Mercado a  LIVRE x y z w v u ") == [
+        "mercado", "livre"
+    ]
+    assert prefix_tsquery(["ifood.com", "r$50"]) == "ifood:* & com:* & r:* & 50:*"
+    assert prefix_tsquery(["a'b|c"]) == "a:* & b:* & c:*"
+
+
+def test_list_history_busca_por_prefixo_sem_acento_nas_duas_tabelas(user_id):
+    mercado = _launch(user_id, "Mercado Livre", "compra de café", "Alimentação")
+    farmacia = _launch(user_id, "Drogasil", None, "Farmácia")
+    card_id = db.create_card(user_id, "Nubank Roxinho", closing_day=31, due_day=20)
+    ct_id, _, _ = db.add_credit_purchase(user_id, card_id, 30, "alimentação", "ifood.com.br", date.today())
+
+    assert _ids(db.list_history(user_id, q="merc cafe")) == {("despesa", mercado)}
+    assert _ids(db.list_history(user_id, q="alimentacao")) == {("despesa", mercado), ("credito", ct_id)}
+    assert _ids(db.list_history(user_id, q="FARMÁ")) == {("despesa", farmacia)}
+    # nome do cartão + nota: cada palavra pode casar num campo diferente
+    assert _ids(db.list_history(user_id, q="nubank ifood")) == {("credito", ct_id)}
+    assert _ids(db.list_history(user_id, q="ifood", tipo="despesa")) == set()
+    assert db.list_history(user_id, q="mercado inexistente")["total"] == 0
+
+
+def test_search_vec_acompanha_a_edicao(user_id):
+    launch_id = _launch(user_id, None, "padaria", None)
+    assert _ids(db.list_history(user_id, q="padaria")) == {("despesa", launch_id)}
+
+    with get_conn() as conn:
+        conn.execute("update launches set nota = 'açougue' where id = %s", (launch_id,))
+        conn.commit()
+
+    assert db.list_history(user_id, q="padaria")["total"] == 0
+    assert _ids(db.list_history(user_id, q="acougue")) == {("despesa", launch_id)}
+
+
+def test_search_history_ranqueia_palavra_inteira_antes_do_prefixo(user_id):
+    prefixo = _launch(user_id, "Uberlândia Turismo", None, None)
+    inteira = _launch(user_id, "Uber", None, "Transporte")
+    _launch(user_id, "Padaria", None, None)
+
+    result = db.search_history(user_id, "uber")
+
+    assert result["terms"] == ["uber"]
+    assert [item["id"] for item in result["items"]] == [inteira, prefixo]
+    assert result["items"][0]["rank"] > result["items"][1]["rank"]
+    assert db.search_history(user_id, "") == {"items": [], "terms": []}
+
+
+def test_predicado_da_busca_e_indexavel():
+    """Sem varredura sequencial, o predicado sozinho tem que cair no índice
+    GIN (coluna/expressão idênticas às do índice)."""
+    from db.history_search import search_clause
+
+    sql, params = search_clause(["mercado"])
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("set local enable_seqscan = off")
+            cur.execute(f"explain select id from launches where {sql}", tuple(params))
+            plan = "\n".join(next(iter(r.values())) for r in cur.fetchall())
+        conn.rollback()
+
+    assert "idx_launches_search" in plan
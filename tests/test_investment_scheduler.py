@@ -36,3 +36,19 @@ def test_accrue_all_users_investments_continua_apos_erro(monkeypatch):
 
     assert calls == [10, 20]
     assert result == {"users": 2, "updated": 1, "failed": 1}
+
+
+def test_accrue_all_users_investments_processa_em_blocos(monkeypatch):
+    batches = []
+    fake_db = SimpleNamespace(
+        list_users_with_investments=lambda: [10, 20, 30],
+        accrue_investments_for_users=lambda user_ids: batches.append(list(user_ids)) or 4,
+        accrue_all_investments=lambda user_id: (_ for _ in ()).throw(AssertionError("fallback")),
+    )
+    monkeypatch.setitem(sys.modules, "db", fake_db)
+    monkeypatch.setenv("INVESTMENT_ACCRUAL_BATCH_USERS", "2")
+
+    result = investment_scheduler.accrue_all_users_investments()
+
+    assert batches == [[10, 20], [30]]
+    assert result == {"users": 3, "updated": 3, "failed": 0}
@@ -0,0 +1,125 @@
+"""
+Paginação por cursor (db/pagination.py) e o histórico paginado por keyset.
+
+- cursor: ida e volta com datetime, e rejeição de token adulterado/de outra lista;
+- `list_history` por cursor devolve as mesmas páginas que por OFFSET, sem
+  repetir nem pular linha quando lançamentos e compras no crédito empatam
+  no `criado_em`;
+- com cursor o total não é recontado; `total=estimate` devolve o número do planner.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+import pytest
+
+import db
+from db.connection import get_conn
+from db.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_after
+
+
+def test_cursor_ida_e_volta_e_rejeita_adulterado():
+    when = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    token = encode_cursor("history", [when, "l", 42])
+
+    assert decode_cursor(token, "history", 3) == [when, "l", 42]
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "admin_users:created_at", 3)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "history", 2)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token[:-3] + "@@@", "history", 3)
+
+
+def test_keyset_after_respeita_nulls_last():
+    sql, params = keyset_after([("a.x", None), ("a.id", 7)], nullable=("a.x",))
+    assert sql == "(a.x IS NULL AND a.id < %s)"
+    assert params == [7]
+
+
+def _seed(user_id: int) -> None:
+    """40 lançamentos + 10 compras no crédito, com vários `criado_em` repetidos."""
+    stamps = [datetime(2026, 1, 1 + i // 4, 10, tzinfo=timezone.utc) for i in range(40)]
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                "insert into launches (user_id, tipo, valor, alvo, criado_em) "
+                "values (%s, 'despesa', 10, %s, %s)",
+                [(user_id, f"loja {i}", ts) for i, ts in enumerate(stamps)],
+            )
+        conn.commit()
+    card_id = db.create_card(user_id, "Cartão", closing_day=31, due_day=20)
+    for i in range(10):
+        ct_id, _, _ = db.add_credit_purchase(user_id, card_id, 5, "outros", f"compra {i}", date(2026, 1, 5))
+        with get_conn() as conn:
+            conn.execute("update credit_transactions set created_at = %s where id = %s", (stamps[i * 4], ct_id))
+            conn.commit()
+
+
+def _key(item: dict) -> tuple[str, int]:
+    return item["tipo"], item["id"]
+
+
+def test_list_history_por_cursor_igual_ao_offset(user_id):
+    _seed(user_id)
+
+    by_offset = []
+    for page in range(1, 5):
+        by_offset += [_key(i) for i in db.list_history(user_id, page=page, limit=15)["items"]]
+
+    first = db.list_history(user_id, limit=15)
+    assert first["total"] == 50 and first["total_pages"] == 4
+    by_cursor = [_key(i) for i in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = db.list_history(user_id, limit=15, cursor=cursor)
+        assert page["total"] is None and page["total_pages"] is None
+        by_cursor += [_key(i) for i in page["items"]]
+        cursor = page["next_cursor"]
+
+    assert by_cursor == by_offset
+    assert len(set(by_cursor)) == 50
+
+
+def test_list_history_total_estimado_e_cursor_invalido(user_id):
+    _seed(user_id)
+
+    estimated = db.list_history(user_id, limit=10, total="estimate")
+    assert isinstance(estimated["total"], int) and estimated["total_is_estimate"] is True
+    with pytest.raises(InvalidCursor):
+        db.list_history(user_id, cursor="nao-e-cursor")
+    with pytest.raises(ValueError):
+        db.list_history(user_id, total="talvez")
+
+
+def test_dashboard_launches_por_cursor_igual_ao_offset(pro_user_id):
+    """/data?cursor: mesma lista do mês que as páginas numeradas (Pro: o mês
+    semeado fica fora da janela de histórico do free)."""
+    user_id = pro_user_id
+    import asyncio
+
+    import frontend.finance_bot_websocket_custom as app
+
+    _seed(user_id)
+
+    async def _walk():
+        by_offset = []
+        for page in range(1, 5):
+            data = await app.get_financial_data(user_id, 2026, 1, page=page, limit=15)
+            by_offset += [_key(i) for i in data["recent_launches"]]
+        data = await app.get_financial_data(user_id, 2026, 1, limit=15)
+        assert data["launches_pagination"]["total"] == 50
+        by_cursor = [_key(i) for i in data["recent_launches"]]
+        cursor = data["launches_pagination"]["next_cursor"]
+        page = 1
+        while cursor:
+            page += 1
+            data = await app.get_financial_data(user_id, 2026, 1, page=page, limit=15, cursor=cursor)
+            assert data["launches_pagination"]["total"] is None
+            by_cursor += [_key(i) for i in data["recent_launches"]]
+            cursor = data["launches_pagination"]["next_cursor"]
+        return by_offset, by_cursor
+
+    by_offset, by_cursor = asyncio.run(_walk())
+    assert by_cursor == by_offset
+    assert len(set(by_cursor)) == 50
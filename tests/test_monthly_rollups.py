@@ -0,0 +1,140 @@
+"""
+Rollup mensal (`monthly_rollups`) mantido por triggers.
+
+O invariante é um só: depois de qualquer escrita em launches /
+credit_transactions / credit_bills, o rollup tem exatamente o que
+`rebuild_monthly_rollups` recalcularia do zero. E as leituras de Análises que
+passaram a somar o rollup continuam batendo com a agregação direta, inclusive
+em períodos que começam/terminam no meio do mês.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import db
+from db.analytics import compute_categories, compute_kpis, compute_weekday_pattern
+from db.connection import get_conn
+
+
+def _rollup(user_id: int) -> dict:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "select month, source, tipo, is_internal, categoria, dow, total, n "
+                "from monthly_rollups where user_id = %s",
+                (user_id,),
+            )
+            return {
+                (r["month"], r["source"], r["tipo"], r["is_internal"], r["categoria"], r["dow"]):
+                    (Decimal(r["total"]), r["n"])
+                for r in cur.fetchall()
+            }
+
+
+def _assert_consistente(user_id: int) -> dict:
+    incremental = _rollup(user_id)
+    db.rebuild_monthly_rollups([user_id])
+    assert _rollup(user_id) == incremental
+    return incremental
+
+
+def _launch(cur, user_id, tipo, valor, categoria, criado_em, internal=False) -> int:
+    cur.execute(
+        "insert into launches (user_id, tipo, valor, categoria, criado_em, is_internal_movement) "
+        "values (%s, %s, %s, %s, %s, %s) returning id",
+        (user_id, tipo, valor, categoria, criado_em, internal),
+    )
+    return cur.fetchone()["id"]
+
+
+def _bill(cur, user_id, card_id, period_end) -> int:
+    cur.execute(
+        "insert into credit_bills (user_id, card_id, period_start, period_end, total) "
+        "values (%s, %s, %s, %s, 0) returning id",
+        (user_id, card_id, period_end.replace(day=1), period_end),
+    )
+    return cur.fetchone()["id"]
+
+
+def _purchase(cur, user_id, card_id, bill_id, valor, categoria, purchased_at, refund=False) -> int:
+    cur.execute(
+        "insert into credit_transactions (user_id, card_id, bill_id, valor, categoria, "
+        "purchased_at, is_refund) values (%s, %s, %s, %s, %s, %s, %s) returning id",
+        (user_id, card_id, bill_id, valor, categoria, purchased_at, refund),
+    )
+    return cur.fetchone()["id"]
+
+
+def test_triggers_mantem_rollup_igual_ao_rebuild(user_id):
+    card_id = db.create_card(user_id, "Nubank", closing_day=10, due_day=17)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            l1 = _launch(cur, user_id, "despesa", 50, "alimentação", datetime(2026, 1, 5, 12))
+            _launch(cur, user_id, "despesa", 20, None, datetime(2026, 1, 6, 12))
+            _launch(cur, user_id, "receita", 3000, "salario", datetime(2026, 1, 1, 12))
+            _launch(cur, user_id, "despesa", 500, "investimentos", datetime(2026, 1, 7, 12), internal=True)
+            l2 = _launch(cur, user_id, "saida", 80, "lazer", datetime(2026, 2, 3, 12))
+            jan = _bill(cur, user_id, card_id, date(2026, 1, 10))
+            fev = _bill(cur, user_id, card_id, date(2026, 2, 10))
+            t1 = _purchase(cur, user_id, card_id, fev, 120, "mercado", date(2026, 1, 20))
+            _purchase(cur, user_id, card_id, jan, 40, "mercado", date(2025, 12, 28))
+            _purchase(cur, user_id, card_id, jan, 15, "mercado", date(2025, 12, 29), refund=True)
+        conn.commit()
+
+    rollup = _assert_consistente(user_id)
+    # compra de 20/jan na fatura de fevereiro: mês da fatura × mês da compra
+    bill_fev = sum(v[0] for k, v in rollup.items() if k[1] == "credit_bill" and k[0] == date(2026, 2, 1))
+    compra_jan = sum(v[0] for k, v in rollup.items() if k[1] == "credit_purchase" and k[0] == date(2026, 1, 1))
+    assert bill_fev == Decimal("120")
+    assert compra_jan == Decimal("120")
+    # estorno fora; categoria nula vira ''
+    assert not any(v[0] == 15 for v in rollup.values())
+    assert any(k[4] == "" for k in rollup)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("update launches set categoria = 'mercado', valor = 55 where id = %s", (l1,))
+            cur.execute("update launches set criado_em = %s where id = %s", (datetime(2026, 3, 1, 12), l2))
+            cur.execute("update launches set nota = 'só nota' where user_id = %s", (user_id,))
+            cur.execute("update credit_transactions set bill_id = %s where id = %s", (jan, t1))
+            cur.execute("update credit_bills set period_end = %s where id = %s", (date(2026, 3, 10), fev))
+        conn.commit()
+    _assert_consistente(user_id)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("delete from launches where id = %s", (l1,))
+            cur.execute("delete from credit_bills where id = %s", (jan,))  # cascade nas compras
+        conn.commit()
+    rollup = _assert_consistente(user_id)
+    assert all(n > 0 for _total, n in rollup.values())
+
+
+def test_leituras_com_pontas_no_meio_do_mes_batem_com_agregacao_direta(user_id):
+    card_id = db.create_card(user_id, "Inter", closing_day=10, due_day=17)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for day, valor in ((3, 10), (14, 20), (28, 30)):
+                for month in (1, 2, 3):
+                    _launch(cur, user_id, "despesa", valor, "mercado", datetime(2026, month, day, 12))
+                    _launch(cur, user_id, "receita", valor * 10, "salario", datetime(2026, month, day, 12))
+            bill = _bill(cur, user_id, card_id, date(2026, 2, 15))
+            _purchase(cur, user_id, card_id, bill, 99, "lazer", date(2026, 2, 2))
+        conn.commit()
+
+    # 14/jan → 20/mar: pontas cruas + fevereiro inteiro do rollup
+    start, end = date(2026, 1, 14), date(2026, 3, 20)
+    cats = {c["name"]: c for c in compute_categories(user_id, start, end)}
+    assert cats["mercado"]["total"] == 20 + 30 + 60 + 10 + 20
+    assert cats["mercado"]["count"] == 7
+    assert cats["lazer"]["total"] == 99
+
+    kpis = compute_kpis(user_id, start, end)
+    assert kpis["total_expense"] == 140 + 99
+    assert kpis["total_income"] == 1400
+    assert kpis["transactions_count"] == 15
+
+    by_dow = {d["dow"]: d for d in compute_weekday_pattern(user_id, start, end)}
+    assert sum(d["count"] for d in by_dow.values()) == 8
+    assert by_dow[date(2026, 2, 2).isoweekday() % 7]["total"] >= 99
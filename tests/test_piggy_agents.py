@@ -1061,7 +1061,7 @@ def test_hold_agregados_e_fail_soft(monkeypatch):
     assert ps.sync_pluggy_user(42)["ok"] is True
 
 
-def test_webhook_por_item_segura_email_antes_das_leituras(monkeypatch):
+def test_webhook_por_item_segura_email_antes_das_leituras(monkeypatch, fake_pluggy):
     """P1 do Codex (6ª rodada, PR #51): em produção o webhook chama
     sync_pluggy_item DIRETO (frontend/routes/open_finance.py), sem passar por
     sync_pluggy_user — então nenhum dos wrappers segurava o e-mail nesse
@@ -1069,17 +1069,14 @@ def test_webhook_por_item_segura_email_antes_das_leituras(monkeypatch):
     import db
     import core.services.pluggy_sync as ps
 
+    fake_pluggy.add_item("item-1")
     ordem = []
     monkeypatch.setattr(ps, "get_open_finance_connection_by_item_id",
                         lambda item: {"id": 1, "user_id": 42, "status": "ACTIVE"})
+    # registra quantas requisições a Pluggy já tinha recebido no momento do hold
     monkeypatch.setattr(db, "hold_agent_emails",
-                        lambda uid, kinds, mins: ordem.append(("hold", uid)) or 1)
-    monkeypatch.setattr(ps, "create_pluggy_api_key",
-                        lambda: ordem.append("api_key") or "k")
-    monkeypatch.setattr(ps, "list_pluggy_accounts",
-                        lambda item, key: ordem.append("le_contas") or [])
+                        lambda uid, kinds, mins: ordem.append(("hold", uid, sum(fake_pluggy.requests.values()))) or 1)
     monkeypatch.setattr(ps, "save_open_finance_sync", lambda cid, accs: {})
-    monkeypatch.setattr(ps, "list_pluggy_investments", lambda item, key: [])
     monkeypatch.setattr(ps, "save_open_finance_investments", lambda cid, invs: {})
     monkeypatch.setattr(ps, "import_open_finance_launches", lambda uid, cid: {})
     monkeypatch.setattr(ps, "import_open_finance_credit", lambda uid, cid: {})
@@ -1087,33 +1084,34 @@ def test_webhook_por_item_segura_email_antes_das_leituras(monkeypatch):
 
     ps.sync_pluggy_item("item-1")
 
-    assert ("hold", 42) in ordem, "webhook não segurou o e-mail dos agregados"
-    assert ordem.index(("hold", 42)) < ordem.index("le_contas"), \
-        f"hold precisa vir ANTES das leituras remotas: {ordem}"
+    assert ordem and ordem[0][:2] == ("hold", 42), "webhook não segurou o e-mail dos agregados"
+    assert ordem[0][2] == 0, f"hold precisa vir ANTES das leituras remotas: {ordem}"
+    assert fake_pluggy.requests["GET /accounts"] == 1
 
 
-def test_refresh_periodico_segura_email_antes_do_patch(monkeypatch):
+def test_refresh_periodico_segura_email_antes_do_patch(monkeypatch, fake_pluggy):
     """Mesmo P1: o tick periódico (refresh_all_pluggy_items) dispara o PATCH
     direto. Entre o PATCH e o webhook trazer os dados, o evento maduro seguiria
     reivindicável com o valor velho."""
     import db
     import core.services.pluggy_sync as ps
 
+    fake_pluggy.add_item("i1")
+    fake_pluggy.add_item("i2")
     ordem = []
     monkeypatch.setattr(ps, "list_pluggy_item_ids", lambda uid=None: ["i1", "i2"])
     monkeypatch.setattr(ps, "get_open_finance_connection_by_item_id",
                         lambda item: {"user_id": 42})
     monkeypatch.setattr(db, "hold_agent_emails",
-                        lambda uid, kinds, mins: ordem.append(("hold", uid)) or 1)
-    monkeypatch.setattr(ps, "update_pluggy_item",
-                        lambda item, key=None: ordem.append(f"PATCH:{item}") or True)
+                        lambda uid, kinds, mins: ordem.append(("hold", uid, len(fake_pluggy.patched))) or 1)
 
     out = ps.refresh_all_pluggy_items(42)
 
     assert out["triggered"] == 2
-    assert ordem[0] == ("hold", 42), f"hold tem que vir antes do 1º PATCH: {ordem}"
+    assert sorted(fake_pluggy.patched) == ["i1", "i2"]
+    assert ordem[0] == ("hold", 42, 0), f"hold tem que vir antes do 1º PATCH: {ordem}"
     # segura uma vez por usuário, não por item
-    assert len([o for o in ordem if o == ("hold", 42)]) == 1
+    assert len(ordem) == 1
 
 
 def test_ripe_respeita_o_hold_mesmo_com_evento_maduro(monkeypatch):
@@ -1526,28 +1524,22 @@ def test_list_pluggy_transactions_heartbeat_fail_soft(monkeypatch):
     assert out == [{"id": "t1"}]  # buscou mesmo com o heartbeat explodindo
 
 
-def test_sync_item_renova_hold_durante_o_sync(monkeypatch):
+def test_sync_item_renova_hold_durante_o_sync(monkeypatch, fake_pluggy):
     """Integração: sync_pluggy_item passa o heartbeat pro loop de transações, então
     o hold é renovado ao longo de um sync com várias contas/páginas — não fica
     preso nos 10min do carimbo inicial."""
     import core.services.pluggy_sync as ps
 
+    # 2 contas × 2 páginas cada
+    fake_pluggy.page_size = 5
+    fake_pluggy.add_item("item-1", accounts=2, transactions=10)
     holds = []
+    monkeypatch.setattr(ps, "_HEARTBEAT_MIN_INTERVAL", 0.0)
     monkeypatch.setattr(ps, "get_open_finance_connection_by_item_id",
                         lambda item: {"id": 1, "user_id": 42, "status": "ACTIVE"})
     monkeypatch.setattr(ps, "_hold_aggregate_emails",
                         lambda uid, origem: holds.append(origem))
-    monkeypatch.setattr(ps, "create_pluggy_api_key", lambda: "k")
-    monkeypatch.setattr(ps, "list_pluggy_accounts",
-                        lambda item, key: [{"id": "a1"}, {"id": "a2"}])
-    # cada conta "pagina" 2 vezes: dispara o on_page 2x por conta
-    def _txs(acc, key, on_page=None):
-        for _ in range(2):
-            if on_page: on_page()
-        return []
-    monkeypatch.setattr(ps, "list_pluggy_transactions", _txs)
     monkeypatch.setattr(ps, "save_open_finance_sync", lambda cid, accs: {})
-    monkeypatch.setattr(ps, "list_pluggy_investments", lambda item, key: [])
     monkeypatch.setattr(ps, "save_open_finance_investments", lambda cid, invs: {})
     monkeypatch.setattr(ps, "import_open_finance_launches", lambda uid, cid: {})
     monkeypatch.setattr(ps, "import_open_finance_credit", lambda uid, cid: {})
@@ -31,7 +31,9 @@ def _user(plan="free", expires=None, trial_started=None, plan_selected=None):
 
 
 def _patch_user(monkeypatch, user):
+    # Troca de plano no meio do teste = o que um webhook faria: grava e invalida.
     monkeypatch.setattr(plan_service, "get_auth_user", lambda uid: user)
+    plan_service.invalidate_plan_cache()
 
 
 NOW = datetime.now(timezone.utc)
@@ -433,3 +435,48 @@ class TestAIQuota:
         assert plan_service.ai_chat_allowed(1) is False
         _patch_user(monkeypatch, _user("pro", FUTURE))
         assert plan_service.ai_chat_allowed(1) is True
+
+
+# ─── Cache de plano por processo ────────────────────────────────────────────
+
+class TestPlanCache:
+    def test_um_request_resolve_o_plano_uma_vez(self, v2, monkeypatch):
+        loads = []
+
+        def _load(uid):
+            loads.append(uid)
+            return _user("essencial", FUTURE)
+
+        monkeypatch.setattr(plan_service, "get_auth_user", _load)
+        plan_service.invalidate_plan_cache()
+        before = plan_service.plan_cache_stats()
+
+        assert plan_service.get_plan_tier(7) == "essencial"
+        assert plan_service.is_pro(7) is False
+        assert plan_service.require_min_tier(7, "essencial") is True
+        assert plan_service.get_user_limits(7) is ESSENCIAL_LIMITS
+        assert plan_service.history_earliest_date(7) is not None
+
+        stats = plan_service.plan_cache_stats()
+        assert loads == [7]
+        assert stats["misses"] - before["misses"] == 1
+        assert stats["hits"] - before["hits"] == 4
+
+    def test_cache_guarda_copia_ate_invalidar(self, v2, monkeypatch):
+        user = _user("plus", FUTURE)
+        _patch_user(monkeypatch, user)
+        assert plan_service.get_plan_tier(1) == "plus"
+        user["plan_expires_at"] = PAST
+        assert plan_service.get_plan_tier(1) == "plus"
+        plan_service.invalidate_plan_cache(1)
+        assert plan_service.get_plan_tier(1) == "free"
+
+    def test_update_user_plan_invalida(self, pro_user_id):
+        import db
+
+        assert plan_service.is_pro(pro_user_id) is True
+        db.update_user_plan(pro_user_id, "free", None)
+        assert plan_service.is_pro(pro_user_id) is False
+        db.update_user_plan(pro_user_id, "pro", None)
+        db.set_payment_status(pro_user_id, "active")
+        assert plan_service.is_pro(pro_user_id) is True
@@ -0,0 +1,103 @@
+"""
+Sync assíncrono da Pluggy (`sync_pluggy_items_async`, `refresh_all_pluggy_items_async`)
+contra o servidor fake de tests/_fake_pluggy.py.
+
+Garante: todas as contas/páginas/investimentos lidos; uma API Key só pro lote
+(renovada no 401); teto global de itens em voo; gravação serial por usuário.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import core.services.pluggy_sync as ps
+
+
+def _no_db(monkeypatch, owners: dict[str, int] | None = None):
+    """Conexão fake por item + gravação que só registra o que recebeu."""
+    owners = owners or {}
+    persisted: list[tuple[str, int, int]] = []
+    writing: dict[int, int] = {}
+    overlap: list[int] = []
+    lock = threading.Lock()
+
+    def check(item_id):
+        return {"id": hash(item_id) % 1000, "user_id": owners.get(item_id, 42)}, None
+
+    def persist(connection, item_id, accounts, investments):
+        uid = connection["user_id"]
+        with lock:
+            writing[uid] = writing.get(uid, 0) + 1
+            if writing[uid] > 1:
+                overlap.append(uid)
+        time.sleep(0.005)
+        with lock:
+            writing[uid] -= 1
+            persisted.append((item_id, sum(len(a["transactions"]) for a in accounts), len(investments)))
+        return {"ok": True, "item_id": item_id}
+
+    monkeypatch.setattr(ps, "_check_connection", check)
+    monkeypatch.setattr(ps, "_persist_item", persist)
+    return persisted, overlap
+
+
+def test_lote_le_tudo_com_uma_api_key_e_grava_serial_por_usuario(monkeypatch, fake_pluggy):
+    fake_pluggy.latency = 0.01
+    fake_pluggy.page_size = 20
+    items = [f"item-{i}" for i in range(24)]
+    for item_id in items:
+        fake_pluggy.add_item(item_id, accounts=3, transactions=45, investments=2)
+    # três usuários com oito itens cada: itens do mesmo usuário não gravam juntos
+    persisted, overlap = _no_db(monkeypatch, {i: 100 + n % 3 for n, i in enumerate(items)})
+    monkeypatch.setenv("OF_SYNC_CONCURRENCY", "6")
+
+    results = asyncio.run(ps.sync_pluggy_items_async(items))
+
+    assert [r["item_id"] for r in results] == items
+    assert sorted(persisted) == sorted((i, 3 * 45, 2) for i in items)
+    assert overlap == []
+    assert fake_pluggy.requests["POST /auth"] == 1
+    assert fake_pluggy.requests["GET /v2/transactions"] == 24 * 3 * 3
+    # teto global × teto por item
+    assert fake_pluggy.max_in_flight <= 6 * ps._item_concurrency()
+    assert fake_pluggy.max_in_flight > 1
+
+
+def test_falha_de_um_item_nao_derruba_o_lote_e_401_renova_a_chave(monkeypatch, fake_pluggy):
+    fake_pluggy.add_item("ok-1")
+    fake_pluggy.add_item("ok-2")
+    persisted, _ = _no_db(monkeypatch)
+
+    async def run():
+        async with ps.AsyncPluggyClient() as client:
+            first = await ps.sync_pluggy_items_async(["ok-1"], client=client)
+            fake_pluggy.revoked_keys.add(fake_pluggy.issued_keys[-1])  # expirou antes do TTL
+            return first + await ps.sync_pluggy_items_async(["ok-2", "sumiu"], client=client)
+
+    results = asyncio.run(run())
+
+    assert [r["ok"] for r in results] == [True, True, True]
+    assert len(fake_pluggy.issued_keys) == 2
+    # item inexistente: /accounts vazio, grava nada de conta mas não levanta
+    assert ("sumiu", 0, 0) in persisted
+
+
+def test_refresh_em_paralelo_limitado(monkeypatch, fake_pluggy):
+    fake_pluggy.latency = 0.02
+    items = [f"item-{i}" for i in range(30)]
+    for item_id in items:
+        fake_pluggy.add_item(item_id, accounts=0, investments=0)
+    monkeypatch.setattr(ps, "list_pluggy_item_ids", lambda uid=None: items + ["fora-da-pluggy"])
+    monkeypatch.setattr(ps, "_hold_item_owners", lambda items, uid: None)
+    monkeypatch.setenv("OF_SYNC_CONCURRENCY", "10")
+
+    t0 = time.monotonic()
+    out = ps.refresh_all_pluggy_items()
+    elapsed = time.monotonic() - t0
+
+    assert out == {"triggered": 30, "total": 31}
+    assert sorted(fake_pluggy.patched) == sorted(items)
+    assert fake_pluggy.max_in_flight == 10
+    # 31 PATCHes de 20ms um a um levariam > 0,6s
+    assert elapsed < 0.5
@@ -0,0 +1,74 @@
+"""
+Exportação LGPD em streaming (db/privacy.write_user_export_zip).
+
+- cada dataset sai em NDJSON (um registro por linha) + CSV, com a contagem
+  do manifesto batendo com as linhas e sem colunas derivadas (search_vec);
+- a leitura é por cursor do servidor: o pico de memória não acompanha o
+  tamanho do histórico.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import tracemalloc
+import zipfile
+
+import db.privacy as privacy
+from db.connection import get_conn
+
+
+def _seed_launches(user_id: int, n: int) -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                insert into launches (user_id, tipo, valor, alvo, nota, categoria)
+                select %s, 'despesa', 10 + g %% 50, 'Loja ' || g, repeat('nota ', 20), 'outros'
+                  from generate_series(1, %s) g
+                """,
+                (user_id, n),
+            )
+        conn.commit()
+
+
+def test_export_ndjson_e_csv_por_dataset(user_id):
+    _seed_launches(user_id, 120)
+
+    buffer = io.BytesIO()
+    manifest = privacy.write_user_export_zip(user_id, buffer)
+
+    assert manifest["format"] == "ndjson+csv"
+    assert manifest["datasets"]["lancamentos"] == 120
+    with zipfile.ZipFile(buffer) as archive:
+        names = set(archive.namelist())
+        rows = [json.loads(line) for line in archive.read("dados/lancamentos.ndjson").splitlines()]
+        table = list(csv.DictReader(io.StringIO(archive.read("csv/lancamentos.csv").decode())))
+        assert json.loads(archive.read("manifesto.json"))["datasets"] == manifest["datasets"]
+
+    assert {f"dados/{n}.ndjson" for n in manifest["datasets"]} <= names
+    assert {f"csv/{n}.csv" for n in manifest["datasets"]} <= names
+    assert len(rows) == len(table) == 120
+    assert {r["alvo"] for r in rows} == {f"Loja {i}" for i in range(1, 121)}
+    assert "search_vec" not in rows[0] and "search_vec" not in table[0]
+    assert manifest["datasets"]["cartoes"] == 0
+
+
+def test_export_memoria_nao_cresce_com_o_historico(user_id, monkeypatch):
+    monkeypatch.setattr(privacy, "EXPORT_FETCH_ROWS", 200)
+    monkeypatch.setattr(privacy, "_EXPORT_SPOOL_MAX_BYTES", 1)  # temporários direto em disco
+
+    def _peak(n_rows: int) -> int:
+        _seed_launches(user_id, n_rows)
+        tracemalloc.start()
+        try:
+            with privacy.build_user_export_file(user_id) as exported:
+                assert exported.read(2) == b"PK"
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small = _peak(500)
+    large = _peak(4500)  # histórico 10x maior
+
+    assert large < small * 2
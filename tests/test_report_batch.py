@@ -0,0 +1,134 @@
+"""
+Resumos agendados em lote (db/report_batch.py + build_report_summaries).
+
+- o resumo em lote é o mesmo que o per-user monta (saldo consolidado, interno
+  fora das somas mas contando como lançamento, usuário sem lançamento zerado);
+- `list_due_report_users` respeita horário, liga/desliga, WhatsApp vinculado e
+  o claim do período; `claim_report_sends` só reserva uma vez;
+- o token bucket segura a vazão no `rate` configurado.
+"""
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import db
+from adapters.whatsapp.wa_broadcast import TokenBucket, broadcast
+from core.reports.reports_daily import _build_period_report_summary, build_report_summaries
+from db.connection import get_conn
+
+
+@pytest.fixture()
+def other_user_id():
+    uid = int(uuid.uuid4().int % 10_000_000_000)
+    db.ensure_user(uid)
+    yield uid
+    with get_conn() as conn:
+        conn.execute("delete from users where id = %s", (uid,))
+        conn.commit()
+
+
+def _connect_fake_bank(user_id: int, balance: str) -> None:
+    connection = db.save_pluggy_open_finance_item(
+        user_id,
+        {"id": f"item-batch-{user_id}", "connector": {"id": 612, "name": "Nubank"}, "status": "UPDATED"},
+    )
+    db.save_open_finance_sync(
+        connection["id"],
+        [{
+            "provider_account_id": f"acc-batch-{user_id}",
+            "name": "Nubank Conta",
+            "type": "BANK",
+            "subtype": "CHECKING_ACCOUNT",
+            "currency": "BRL",
+            "balance": Decimal(balance),
+            "raw": {},
+            "transactions": [],
+        }],
+    )
+
+
+def _seed_launches(user_id: int, rows: list[tuple[str, float, bool, datetime]]) -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                "insert into launches (user_id, tipo, valor, alvo, is_internal_movement, criado_em) "
+                "values (%s, %s, %s, 'seed', %s, %s)",
+                [(user_id, tipo, valor, internal, ts) for tipo, valor, internal, ts in rows],
+            )
+        conn.commit()
+
+
+def test_resumo_em_lote_igual_ao_per_user(user_id, other_user_id, monkeypatch):
+    monkeypatch.setenv("OF_CONSOLIDATED_BALANCE_ENABLED", "1")
+    db.add_launch_and_update_balance(user_id, "receita", 100, None, "seed")
+    _connect_fake_bank(user_id, "250.50")
+    _seed_launches(user_id, [
+        ("despesa", 42.90, False, datetime(2026, 4, 20, 10)),
+        ("receita", 10.00, False, datetime(2026, 4, 21, 23, 30)),
+        ("despesa", 500.00, True, datetime(2026, 4, 21, 12)),   # aporte: conta, não soma
+        ("despesa", 7.00, False, datetime(2026, 4, 22, 0, 1)),  # fora do período
+    ])
+    start, end = date(2026, 4, 20), date(2026, 4, 21)
+
+    batch = build_report_summaries([user_id, other_user_id], start, end)
+
+    assert batch[user_id] == _build_period_report_summary(user_id, start, end)
+    assert batch[other_user_id] == _build_period_report_summary(other_user_id, start, end)
+    assert batch[user_id]["gastos"] == "R$ 42,90"
+    assert batch[user_id]["lancamentos"] == "3"
+    assert batch[user_id]["saldo"] == "R$ 350,50"
+    assert batch[other_user_id]["lancamentos"] == "0"
+
+
+def test_due_e_claim_em_lote(user_id, other_user_id):
+    today = date(2026, 4, 23)
+    db.bind_identity("whatsapp", f"55119{user_id % 100_000_000:08d}", user_id)
+    db.bind_identity("whatsapp", f"55118{other_user_id % 100_000_000:08d}", other_user_id)
+    db.set_daily_report_hour(other_user_id, 10, 30)
+
+    due = db.list_due_report_users("daily", 9, 0, today)
+    assert user_id in due and other_user_id not in due  # 10:30 ainda não chegou
+    assert {user_id, other_user_id} <= set(db.list_due_report_users("daily", 10, 30, today))
+
+    assert db.claim_report_sends("daily", [user_id, other_user_id], today) == sorted([user_id, other_user_id])
+    assert db.claim_report_sends("daily", [user_id], today) == []
+    assert user_id not in db.list_due_report_users("daily", 23, 59, today)
+    assert user_id in db.list_due_report_users("weekly", 9, 0, today)  # claims independentes
+
+    db.set_weekly_report_enabled(user_id, False)
+    assert user_id not in db.list_due_report_users("weekly", 9, 0, today)
+
+    identities = db.list_whatsapp_identities([user_id, other_user_id])
+    assert identities[user_id] == [{"provider": "whatsapp", "external_id": f"55119{user_id % 100_000_000:08d}"}]
+
+
+def test_due_ignora_usuario_sem_whatsapp(user_id):
+    db.bind_identity("discord", f"d{user_id}", user_id)
+    assert user_id not in db.list_due_report_users("daily", 23, 59, date(2026, 4, 23))
+
+
+def test_token_bucket_segura_a_vazao():
+    clock = [0.0]
+    bucket = TokenBucket(10, burst=2, clock=lambda: clock[0], sleep=lambda s: clock.__setitem__(0, clock[0] + s))
+
+    for _ in range(12):
+        bucket.acquire()
+
+    # 2 de rajada + 10 a 10/s → 1s
+    assert clock[0] == pytest.approx(1.0)
+
+
+def test_broadcast_preserva_ordem_e_isola_falhas():
+    def _send(n):
+        if n == 3:
+            raise RuntimeError("falhou")
+
+    results = broadcast(list(range(6)), _send, concurrency=4, rate=1000)
+
+    assert [r.job for r in results] == list(range(6))
+    assert [r.ok for r in results] == [True, True, True, False, True, True]
+    assert str(results[3].error) == "falhou"
@@ -14,3 +14,92 @@ def test_fmt_rate_spread_mostra_percentual_humano():
     assert fmt_rate(0.0008, "selic_spread") == "SELIC + 0,08% a.a."
     assert fmt_rate(0.025, "cdi_spread") == "CDI + 2,5% a.a."
     assert fmt_rate(0.0743, "ipca_spread") == "IPCA + 7,43% a.a."
+
+
+# ─── KeywordMatcher × loop antigo ────────────────────────────────────────────
+# Os matchers pré-compilados precisam devolver exatamente o que o loop keyword
+# a keyword devolvia (mesma prioridade, palavra inteira e KEYWORD_BLOCKERS).
+
+import pytest
+
+from utils_text import (
+    CATEGORY_KEYWORDS,
+    CATEGORY_KEYWORDS_MATCHER,
+    EXACT_WORD_KEYWORDS,
+    LOCAL_RULES,
+    LOCAL_RULES_MATCHER,
+    LOCAL_RULES_SUBSTRING_MATCHER,
+    KeywordMatcher,
+    contains_word,
+    extract_keyword_for_memory,
+    guess_category,
+    keyword_blocked,
+    normalize_text,
+)
+
+
+def _loop_antigo(rules, text_norm, exact):
+    for keywords, cat in rules:
+        for kw in keywords:
+            kw_norm = normalize_text(kw)
+            if not kw_norm:
+                continue
+            if exact(kw_norm):
+                ok = contains_word(text_norm, kw_norm)
+            else:
+                ok = contains_word(text_norm, kw_norm) or (kw_norm in text_norm)
+            if ok and not keyword_blocked(kw_norm, text_norm):
+                return kw_norm, cat
+    return None
+
+
+def _textos():
+    fixos = [
+        "sexta feira no mercado", "feirao de carros", "mercado pago", "supermercado extra",
+        "amazon prime video", "amazonia turismo", "jogo de cama casal", "casa de show",
+        "pagamento da fatura", "transacoes do mes", "investigar fraude", "educacao infantil",
+        "aplicacao cdb", "uber para o aeroporto", "padaria do ze", "primeiro boleto",
+        "game pass ultimate", "vacina do cachorro", "", "x",
+    ]
+    por_keyword = []
+    for keywords, _cat in LOCAL_RULES:
+        for kw in keywords[:3]:
+            por_keyword.append(f"compra {normalize_text(kw)} centro")
+            por_keyword.append(f"{normalize_text(kw)}s")
+    return [normalize_text(t) for t in fixos] + por_keyword
+
+
+@pytest.mark.parametrize("text_norm", _textos())
+def test_matchers_local_rules_batem_com_loop_antigo(text_norm):
+    def exact(kw):
+        return len(kw) <= 3 or kw in EXACT_WORD_KEYWORDS
+
+    assert LOCAL_RULES_MATCHER.first(text_norm) == _loop_antigo(LOCAL_RULES, text_norm, exact)
+    assert LOCAL_RULES_SUBSTRING_MATCHER.first(text_norm) == _loop_antigo(
+        LOCAL_RULES, text_norm, lambda kw: False
+    )
+    antigo = _loop_antigo(LOCAL_RULES, text_norm, lambda kw: len(kw) <= 3)
+    if antigo:
+        assert extract_keyword_for_memory(text_norm) == antigo[0]
+
+    rules_cat = [(words, cat) for cat, words in CATEGORY_KEYWORDS.items()]
+    antigo_cat = _loop_antigo(rules_cat, text_norm, exact)
+    assert guess_category(text_norm) == (antigo_cat[1] if antigo_cat else "outros")
+    assert CATEGORY_KEYWORDS_MATCHER.first(text_norm) == antigo_cat
+
+
+def test_keyword_matcher_prioridade_e_sobreposicao():
+    m = KeywordMatcher([
+        ("mercado livre", "compras online", False),
+        ("mercado", "mercado", False),
+        ("ado", "curta", True),
+    ])
+    # a mais prioritária vence mesmo começando na mesma posição da outra
+    assert m.first("compra mercado livre sp") == ("mercado livre", "compras online")
+    assert m.first("supermercado") == ("mercado", "mercado")
+    # palavra inteira: "ado" dentro de "mercado" não conta, sozinha conta
+    assert KeywordMatcher([("ado", "curta", True)]).first("supermercado") is None
+    assert KeywordMatcher([("ado", "curta", True)]).first("ado ado") == ("ado", "curta")
+    # blocker descarta e cai na próxima
+    assert m.first("mercado pago") is None
+    assert KeywordMatcher([("mercado", "m", False)], blockers=False).first("mercado pago") == ("mercado", "m")
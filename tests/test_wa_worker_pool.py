@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+from adapters.whatsapp import wa_app
+
+
+def _payload(wa_id: str, text: str) -> dict:
+    return {
+        "entry": [{
+            "changes": [{
+                "value": {
+                    "messages": [{"from": wa_id, "type": "text", "text": {"body": text}}],
+                },
+            }],
+        }],
+    }
+
+
+def _text(payload: dict) -> str:
+    return payload["entry"][0]["changes"][0]["value"]["messages"][0]["text"]["body"]
+
+
+def test_mesmo_wa_id_cai_sempre_na_mesma_particao(monkeypatch):
+    monkeypatch.setattr(wa_app, "_shards", wa_app._build_shards(8, 80))
+    shard = wa_app._shard_for(_payload("5511999990001", "a"))
+    for i in range(20):
+        assert wa_app._shard_for(_payload("5511999990001", str(i))) is shard
+    # payload só de status não tem remetente — vai para uma partição fixa
+    status_only = {"entry": [{"changes": [{"value": {"statuses": [{"status": "read"}]}}]}]}
+    assert wa_app._shard_for(status_only) is wa_app._shard_for({})
+
+
+def test_pool_preserva_ordem_por_usuario_e_paraleliza_usuarios(monkeypatch):
+    processed: list[tuple[str, str]] = []
+    lock = threading.Lock()
+
+    def fake_process(payload):
+        # a 1ª mensagem do usuário lento demora: as do rápido não podem esperar
+        if _text(payload) == "lento-0":
+            time.sleep(0.3)
+        with lock:
+            processed.append((payload["entry"][0]["changes"][0]["value"]["messages"][0]["from"], _text(payload)))
+        return 1
+
+    monkeypatch.setattr(wa_app, "process_payload", fake_process)
+
+    async def scenario():
+        monkeypatch.setattr(wa_app, "_shards", wa_app._build_shards(2, 20))
+        # escolhe dois wa_ids que caem em partições diferentes
+        slow = "5511900000000"
+        fast = next(
+            f"55119000000{i:02d}" for i in range(1, 100)
+            if wa_app._shard_for(_payload(f"55119000000{i:02d}", "x")) is not wa_app._shard_for(_payload(slow, "x"))
+        )
+        for i in range(3):
+            assert wa_app._enqueue(wa_app._shard_for(_payload(slow, "")), _payload(slow, f"lento-{i}"))
+            assert wa_app._enqueue(wa_app._shard_for(_payload(fast, "")), _payload(fast, f"rapido-{i}"))
+
+        pool = asyncio.create_task(wa_app._worker_loop())
+        await asyncio.wait_for(asyncio.gather(*(s.queue.join() for s in wa_app._shards)), timeout=5)
+        pool.cancel()
+        return slow, fast
+
+    slow, fast = asyncio.run(scenario())
+
+    assert [t for w, t in processed if w == slow] == ["lento-0", "lento-1", "lento-2"]
+    assert [t for w, t in processed if w == fast] == ["rapido-0", "rapido-1", "rapido-2"]
+    # o usuário rápido terminou tudo antes do lento sair da 1ª mensagem
+    assert processed[:3] == [(fast, "rapido-0"), (fast, "rapido-1"), (fast, "rapido-2")]
+
+    stats = wa_app.wa_queue_stats()
+    assert stats["workers"] == 2
+    assert stats["depth"] == 0
+    assert sum(s["processed"] for s in stats["shards"]) == 6
+    assert max(s["max_lag_ms"] for s in stats["shards"]) >= 250
+
+
+def test_particao_lotada_descarta_e_conta(monkeypatch):
+    monkeypatch.setattr(wa_app, "_shards", wa_app._build_shards(1, 2))
+    shard = wa_app._shards[0]
+
+    assert wa_app._enqueue(shard, _payload("5511", "1"))
+    assert wa_app._enqueue(shard, _payload("5511", "2"))
+    assert not wa_app._enqueue(shard, _payload("5511", "3"))
+
+    stats = wa_app.wa_queue_stats()
+    assert stats["depth"] == 2
+    assert stats["maxsize"] == 2
+    assert stats["dropped"] == 1
+    assert stats["shards"][0]["enqueued"] == 2
+    assert stats["shards"][0]["lag_ms"] >= 0
@@ -5,39 +5,39 @@ from unittest.mock import patch
 from adapters.whatsapp.wa_app import _daily_report_tick, _dedupe_whatsapp_targets
 
 
+_FAKE_NOW = type("FakeNow", (), {"hour": 9, "minute": 0, "date": lambda self: date(2026, 4, 23)})()
+_WA_IDS = {123: [{"provider": "whatsapp", "external_id": "5511999999999"}]}
+
+
 def test_daily_report_tick_nao_envia_quando_claim_falha():
     with patch.dict(os.environ, {"WA_PROACTIVE_TEMPLATE_NAME": "daily_opener"}, clear=False), \
-         patch("adapters.whatsapp.wa_app.now_tz") as now_mock, \
-         patch("adapters.whatsapp.wa_app.list_users_with_daily_report_enabled", return_value=[123]), \
-         patch("adapters.whatsapp.wa_app.get_daily_report_prefs", return_value={"enabled": True, "hour": 9, "minute": 0}), \
-         patch("adapters.whatsapp.wa_app.claim_daily_report_send", return_value=False) as claim_mock, \
-         patch("adapters.whatsapp.wa_app.build_daily_report_text") as build_mock, \
-         patch("adapters.whatsapp.wa_app.build_due_bill_reminders", return_value=[]), \
-         patch("adapters.whatsapp.wa_app.list_identities_by_user", return_value=[{"provider": "whatsapp", "external_id": "5511999999999"}]), \
+         patch("adapters.whatsapp.wa_app.now_tz", return_value=_FAKE_NOW), \
+         patch("adapters.whatsapp.wa_app.list_due_report_users", return_value=[123]) as due_mock, \
+         patch("adapters.whatsapp.wa_app.claim_report_sends", return_value=[]) as claim_mock, \
+         patch("adapters.whatsapp.wa_app.build_report_summaries") as build_mock, \
+         patch("adapters.whatsapp.wa_app.list_whatsapp_identities", return_value=_WA_IDS), \
          patch("adapters.whatsapp.wa_app.send_template") as template_mock:
-        now_mock.return_value = type("FakeNow", (), {"hour": 9, "minute": 0, "date": lambda self: date(2026, 4, 23)})()
         _daily_report_tick()
 
-    claim_mock.assert_called_once_with(123, date(2026, 4, 23))
+    due_mock.assert_called_once_with("daily", 9, 0, date(2026, 4, 23))
+    claim_mock.assert_called_once_with("daily", [123], date(2026, 4, 23))
     build_mock.assert_not_called()
     template_mock.assert_not_called()
 
 
 def test_daily_report_tick_nao_envia_whatsapp_sem_template_configurado():
     with patch.dict(os.environ, {"WA_PROACTIVE_TEMPLATE_NAME": ""}, clear=False), \
-         patch("adapters.whatsapp.wa_app.now_tz") as now_mock, \
-         patch("adapters.whatsapp.wa_app.list_users_with_daily_report_enabled", return_value=[123]), \
-         patch("adapters.whatsapp.wa_app.get_daily_report_prefs", return_value={"enabled": True, "hour": 9, "minute": 0}), \
-         patch("adapters.whatsapp.wa_app.claim_daily_report_send") as claim_mock, \
-         patch("adapters.whatsapp.wa_app.build_daily_report_text", return_value="resumo"), \
-         patch("adapters.whatsapp.wa_app.build_due_bill_reminders", return_value=[]), \
-         patch("adapters.whatsapp.wa_app.list_identities_by_user", return_value=[{"provider": "whatsapp", "external_id": "5511999999999"}]), \
+         patch("adapters.whatsapp.wa_app.now_tz", return_value=_FAKE_NOW), \
+         patch("adapters.whatsapp.wa_app.list_due_report_users", return_value=[123]), \
+         patch("adapters.whatsapp.wa_app.claim_report_sends") as claim_mock, \
+         patch("adapters.whatsapp.wa_app.list_whatsapp_identities", return_value=_WA_IDS), \
+         patch("adapters.whatsapp.wa_app.log_system_event_sync") as event_mock, \
          patch("adapters.whatsapp.wa_app.send_template") as template_mock:
-        now_mock.return_value = type("FakeNow", (), {"hour": 9, "minute": 0, "date": lambda self: date(2026, 4, 23)})()
         _daily_report_tick()
 
     claim_mock.assert_not_called()
     template_mock.assert_not_called()
+    assert event_mock.call_args.args[1] == "whatsapp_proactive_template_missing"
 
 
 def test_daily_report_tick_envia_apenas_template_quando_configurado():
@@ -47,17 +47,15 @@ def test_daily_report_tick_envia_apenas_template_quando_configurado():
         "WA_PROACTIVE_TEMPLATE_INCLUDE_REPORT": "0",
         "WA_PROACTIVE_TEMPLATE_STOP_BUTTON": "0",
     }, clear=False), \
-         patch("adapters.whatsapp.wa_app.now_tz") as now_mock, \
-         patch("adapters.whatsapp.wa_app.list_users_with_daily_report_enabled", return_value=[123]), \
-         patch("adapters.whatsapp.wa_app.get_daily_report_prefs", return_value={"enabled": True, "hour": 9, "minute": 0}), \
-         patch("adapters.whatsapp.wa_app.claim_daily_report_send", return_value=True), \
-         patch("adapters.whatsapp.wa_app.build_daily_report_text", return_value="resumo"), \
-         patch("adapters.whatsapp.wa_app.build_due_bill_reminders", return_value=[]), \
-         patch("adapters.whatsapp.wa_app.list_identities_by_user", return_value=[{"provider": "whatsapp", "external_id": "5511999999999"}]), \
+         patch("adapters.whatsapp.wa_app.now_tz", return_value=_FAKE_NOW), \
+         patch("adapters.whatsapp.wa_app.list_due_report_users", return_value=[123]), \
+         patch("adapters.whatsapp.wa_app.claim_report_sends", return_value=[123]), \
+         patch("adapters.whatsapp.wa_app.build_report_summaries") as build_mock, \
+         patch("adapters.whatsapp.wa_app.list_whatsapp_identities", return_value=_WA_IDS), \
          patch("adapters.whatsapp.wa_app.send_template") as template_mock:
-        now_mock.return_value = type("FakeNow", (), {"hour": 9, "minute": 0, "date": lambda self: date(2026, 4, 23)})()
         _daily_report_tick()
 
+    build_mock.assert_not_called()
     template_mock.assert_called_once_with(
         "5511999999999",
         "daily_opener",
@@ -74,24 +72,23 @@ def test_daily_report_tick_envia_resumo_como_parametro_do_template_quando_habili
         "WA_PROACTIVE_TEMPLATE_INCLUDE_REPORT": "1",
         "WA_PROACTIVE_TEMPLATE_STOP_BUTTON": "1",
     }, clear=False), \
-         patch("adapters.whatsapp.wa_app.now_tz") as now_mock, \
-         patch("adapters.whatsapp.wa_app.list_users_with_daily_report_enabled", return_value=[123]), \
-         patch("adapters.whatsapp.wa_app.get_daily_report_prefs", return_value={"enabled": True, "hour": 9, "minute": 0}), \
-         patch("adapters.whatsapp.wa_app.claim_daily_report_send", return_value=True), \
-         patch("adapters.whatsapp.wa_app.build_daily_report_text", return_value="resumo"), \
-         patch("adapters.whatsapp.wa_app.build_daily_report_summary", return_value={
+         patch("adapters.whatsapp.wa_app.now_tz", return_value=_FAKE_NOW), \
+         patch("adapters.whatsapp.wa_app.list_due_report_users", return_value=[123]), \
+         patch("adapters.whatsapp.wa_app.claim_report_sends", return_value=[123]), \
+         patch("adapters.whatsapp.wa_app.build_report_summaries", return_value={123: {
+             "start": "22/04/2026",
+             "end": "22/04/2026",
              "saldo": "R$ 1.000,00",
              "gastos": "R$ 42,90",
              "receita": "R$ 10,00",
              "lancamentos": "2",
-         }), \
-         patch("adapters.whatsapp.wa_app.build_due_bill_reminders", return_value=[{"message": "lembrete", "card_id": 7}]), \
-         patch("adapters.whatsapp.wa_app.list_identities_by_user", return_value=[{"provider": "whatsapp", "external_id": "5511999999999"}]), \
-         patch("adapters.whatsapp.wa_app.mark_card_reminder_sent"), \
+         }}) as build_mock, \
+         patch("adapters.whatsapp.wa_app.list_whatsapp_identities", return_value=_WA_IDS), \
          patch("adapters.whatsapp.wa_app.send_template") as template_mock:
-        now_mock.return_value = type("FakeNow", (), {"hour": 9, "minute": 0, "date": lambda self: date(2026, 4, 23)})()
         _daily_report_tick()
 
+    # resumo de ontem
+    build_mock.assert_called_once_with([123], date(2026, 4, 22), date(2026, 4, 22))
     template_mock.assert_called_once_with(
         "5511999999999",
         "daily_report",
@@ -106,6 +103,35 @@ def test_daily_report_tick_envia_resumo_como_parametro_do_template_quando_habili
     )
 
 
+def test_daily_report_tick_falha_de_um_envio_nao_para_o_lote():
+    ids = {
+        123: [{"provider": "whatsapp", "external_id": "5511999999999"}],
+        456: [{"provider": "whatsapp", "external_id": "5511888888888"}],
+    }
+
+    def _send(to, *args, **kwargs):
+        if to == "5511999999999":
+            raise RuntimeError("graph 500")
+
+    with patch.dict(os.environ, {
+        "WA_PROACTIVE_TEMPLATE_NAME": "daily_opener",
+        "WA_PROACTIVE_TEMPLATE_INCLUDE_REPORT": "0",
+    }, clear=False), \
+         patch("adapters.whatsapp.wa_app.now_tz", return_value=_FAKE_NOW), \
+         patch("adapters.whatsapp.wa_app.list_due_report_users", return_value=[123, 456]), \
+         patch("adapters.whatsapp.wa_app.claim_report_sends", return_value=[123, 456]), \
+         patch("adapters.whatsapp.wa_app.list_whatsapp_identities", return_value=ids), \
+         patch("adapters.whatsapp.wa_app.log_system_event_sync") as event_mock, \
+         patch("adapters.whatsapp.wa_app.send_template", side_effect=_send) as template_mock:
+        _daily_report_tick()
+
+    assert sorted(c.args[0] for c in template_mock.call_args_list) == ["5511888888888", "5511999999999"]
+    events = {c.args[1]: c.kwargs for c in event_mock.call_args_list}
+    assert events["whatsapp_daily_report_send_failed"]["user_id"] == 123
+    assert events["whatsapp_daily_report_batch_sent"]["details"]["sent"] == 1
+    assert events["whatsapp_daily_report_batch_sent"]["details"]["failed"] == 1
+
+
 def test_dedupe_whatsapp_targets_remove_destinos_repetidos_do_mesmo_numero():
     ids = [
         {"provider": "whatsapp", "external_id": "11999999999"},
@@ -474,6 +474,127 @@ def keyword_blocked(kw_norm: str, text_norm: str) -> bool:
     blocker = KEYWORD_BLOCKERS.get(kw_norm)
     return bool(blocker and blocker.search(text_norm or ""))
 
+
+def _is_word_char(c: str) -> bool:
+    # mesma noção de \w do `re` usada por contains_word
+    return c.isalnum() or c == "_"
+
+
+class KeywordMatcher:
+    """Casa um texto normalizado contra uma lista ORDENADA de keywords de uma vez.
+
+    Antes, cada categorização varria LOCAL_RULES (~1000 keywords) normalizando a
+    keyword e rodando um `re.search` por item — numa importação OFX de 2k linhas
+    isso era a maior parte do CPU. Aqui as keywords são normalizadas uma única
+    vez e viram um autômato Aho-Corasick: uma passada no texto acha todas as
+    ocorrências, e vence a keyword de menor prioridade (posição na lista) que
+    casou e não foi invalidada por KEYWORD_BLOCKERS — o mesmo resultado do loop
+    antigo.
+
+    `entries` é uma sequência de (keyword, valor, palavra_inteira). Com
+    palavra_inteira=True a keyword só vale cercada por fronteira de palavra
+    (como `contains_word`); senão basta aparecer como substring.
+    `blockers=False` ignora KEYWORD_BLOCKERS (regras do usuário nunca usaram).
+    """
+
+    __slots__ = ("_entries", "_goto", "_out", "_fail", "_blockers")
+
+    def __init__(self, entries, *, blockers: bool = True):
+        self._blockers = blockers
+        self._entries: list[tuple[str, object, bool]] = []
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[int]] = [[]]
+        for kw, value, whole_word in entries:
+            kw_norm = normalize_text(kw or "")
+            if not kw_norm:
+                continue
+            node = 0
+            for ch in kw_norm:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(len(self._entries))
+            self._entries.append((kw_norm, value, bool(whole_word)))
+
+        # links de falha em BFS; a saída de cada nó herda a do seu link
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, nxt in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+                queue.append(nxt)
+        self._goto = goto
+        self._out = out
+        self._fail = fail
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _matched(self, text_norm: str) -> set[int]:
+        """Índices das entries que casam em `text_norm` (fronteira já checada)."""
+        goto, out, fail, entries = self._goto, self._out, self._fail, self._entries
+        n = len(text_norm)
+        hits: set[int] = set()
+        node = 0
+        for pos, ch in enumerate(text_norm):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                if idx in hits:
+                    continue
+                kw_norm, _value, whole_word = entries[idx]
+                if whole_word:
+                    start = pos - len(kw_norm) + 1
+                    if start > 0 and _is_word_char(text_norm[start - 1]):
+                        continue
+                    if pos + 1 < n and _is_word_char(text_norm[pos + 1]):
+                        continue
+                hits.add(idx)
+        return hits
+
+    def first(self, text_norm: str) -> tuple[str, object] | None:
+        """(keyword, valor) da primeira entry, em ordem de prioridade, que casa
+        em `text_norm` e não está bloqueada; None se nenhuma."""
+        if not text_norm or not self._entries:
+            return None
+        for idx in sorted(self._matched(text_norm)):
+            kw_norm, value, _whole_word = self._entries[idx]
+            if not (self._blockers and keyword_blocked(kw_norm, text_norm)):
+                return kw_norm, value
+        return None
+
+
+def _is_exact_word_keyword(kw_norm: str) -> bool:
+    # keyword curta (≤3) ou listada em EXACT_WORD_KEYWORDS: só palavra inteira
+    return len(kw_norm) <= 3 or kw_norm in EXACT_WORD_KEYWORDS
+
+
+def _rules_entries(rules, whole_word):
+    for keywords, cat in rules:
+        for kw in keywords:
+            kw_norm = normalize_text(kw or "")
+            yield kw_norm, cat, whole_word(kw_norm)
+
+
+# Matchers das LOCAL_RULES, montados uma vez no import. Cada chamador mantém a
+# semântica de palavra inteira que sempre teve:
+#  - LOCAL_RULES_MATCHER: ≤3 ou EXACT_WORD_KEYWORDS → palavra inteira
+#    (local_rule_category / infer_category);
+#  - MEMORY_KEYWORD_MATCHER: só ≤3 → palavra inteira (extract_keyword_for_memory);
+#  - LOCAL_RULES_SUBSTRING_MATCHER: tudo por substring (importação OFX/extrato).
+LOCAL_RULES_MATCHER = KeywordMatcher(_rules_entries(LOCAL_RULES, _is_exact_word_keyword))
+MEMORY_KEYWORD_MATCHER = KeywordMatcher(_rules_entries(LOCAL_RULES, lambda kw_norm: len(kw_norm) <= 3))
+LOCAL_RULES_SUBSTRING_MATCHER = KeywordMatcher(_rules_entries(LOCAL_RULES, lambda kw_norm: False))
+
 # Categorias que representam movimentações internas (não entram em receita/despesa do dashboard)
 INTERNAL_MOVEMENT_CATEGORIES = {
     "investimento_aporte",
@@ -656,20 +777,9 @@ def extract_memory_candidates(text: str | None, limit: int = 3) -> list[str]:
 
 def extract_keyword_for_memory(text_norm: str) -> str:
     # 1) se bater em alguma keyword das regras locais, salva essa keyword
-    for keywords, _cat in LOCAL_RULES:
-        for kw in keywords:
-            kw_norm = normalize_text(kw)
-            if kw_norm:
-                if len(kw_norm) <= 3:
-                    ok = contains_word(text_norm, kw_norm)
-                else:
-                    ok = contains_word(text_norm, kw_norm) or (kw_norm in text_norm)
-
-                if ok and keyword_blocked(kw_norm, text_norm):
-                    ok = False
-
-                if ok:
-                    return kw_norm
+    hit = MEMORY_KEYWORD_MATCHER.first(text_norm)
+    if hit:
+        return hit[0]
 
     # 2) fallback: pega o último "token útil" (exclui números e stopwords)
     tokens = [
@@ -1033,22 +1143,16 @@ CATEGORY_KEYWORDS = {
     "outros": []
 }
 
+# Mesma ordem de CATEGORY_KEYWORDS (a primeira categoria que casa vence).
+CATEGORY_KEYWORDS_MATCHER = KeywordMatcher(
+    _rules_entries(((words, cat) for cat, words in CATEGORY_KEYWORDS.items()), _is_exact_word_keyword)
+)
+
 def guess_category(text: str) -> str:
     # Normaliza pra que EXACT_WORD_KEYWORDS/KEYWORD_BLOCKERS funcionem igual ao
     # infer_category (ex.: "prime" não pode bater em "primeiro").
-    t = normalize_text(text)
-    for cat, words in CATEGORY_KEYWORDS.items():
-        for w in words:
-            w_norm = normalize_text(w)
-            if not w_norm:
-                continue
-            if len(w_norm) <= 3 or w_norm in EXACT_WORD_KEYWORDS:
-                ok = contains_word(t, w_norm)
-            else:
-                ok = w_norm in t
-            if ok and not keyword_blocked(w_norm, t):
-                return cat
-    return "outros"
+    hit = CATEGORY_KEYWORDS_MATCHER.first(normalize_text(text))
+    return hit[1] if hit else "outros"
 
 def parse_note_after_amount(text: str, amount: float) -> str:
     """